@@ -1,14 +1,41 @@
 """
 Agent modules for Pokemon Emerald speedrunning agent
+
+The step modules are imported on first use: simple mode never loads the four
+modules and the four-module agent never loads SimpleAgent.
 """
 
-from pyparsing import deque
-from utils.vlm import VLM
-from .action import action_step
-from .memory import memory_step
-from .perception import perception_step
-from .planning import planning_step
-from .simple import SimpleAgent, get_simple_agent, simple_mode_processing_multiprocess, configure_simple_agent_defaults
+import asyncio
+import importlib
+from collections import deque
+
+from utils.http_transport import configure_http_transport
+from utils.llm_logger import log_llm_action
+from utils.vlm import VLM, ImagePipeline
+from utils.vlm_cache import VLMResponseCache
+from utils.vlm_retry import RetryPolicy
+
+# Public name -> submodule that defines it (loaded by __getattr__ on first access)
+_LAZY_EXPORTS = {
+    'action_step': '.action',
+    'action_step_async': '.action',
+    'memory_step': '.memory',
+    'perception_step': '.perception',
+    'perception_step_async': '.perception',
+    'planning_step': '.planning',
+    'planning_step_async': '.planning',
+    'SimpleAgent': '.simple',
+    'StreamingActionParser': '.simple',
+    'get_simple_agent': '.simple',
+    'simple_mode_processing_multiprocess': '.simple',
+    'configure_simple_agent_defaults': '.simple',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class Agent:
@@ -28,18 +55,69 @@ class Agent:
         backend = args.backend if args else "gemini"
         model_name = args.model_name if args else "gemini-2.5-flash"
         simple_mode = args.simple if args else False
+        concurrent_modules = getattr(args, 'concurrent_modules', False) if args else False
+        
+        # Pooled HTTP transport shared by the VLM backends and the client loop
+        if args and hasattr(args, 'http_pool_size'):
+            configure_http_transport(max_connections=args.http_pool_size, timeout=args.http_timeout,
+                                     http2=not args.no_http2)
+        
+        # Optional content-addressed response cache (replays and repeated situations skip the API)
+        cache = None
+        if args and getattr(args, 'vlm_cache', False):
+            cache = VLMResponseCache(ttl_seconds=args.vlm_cache_ttl, image_hash=args.vlm_cache_image_hash)
+        
+        # Frame preprocessing shared by every module (encoded once per frame)
+        image_pipeline = None
+        if args and hasattr(args, 'image_encoding'):
+            image_pipeline = ImagePipeline(resize=args.image_resize, encoding=args.image_encoding,
+                                           quality=args.image_quality)
+        
+        # Retry budget per API call, optional hedging, and failover to a secondary backend
+        retry_policy = None
+        fallback_backend = fallback_model = None
+        if args and hasattr(args, 'vlm_retry_deadline'):
+            retry_policy = RetryPolicy(deadline=args.vlm_retry_deadline, hedge_percentile=args.vlm_hedge_percentile)
+            fallback_backend, fallback_model = args.fallback_backend, args.fallback_model_name
+        
+        # Local model options (device, prompt prefix KV cache, micro-batching)
+        backend_kwargs = {}
+        if args and backend == 'local' and hasattr(args, 'local_prefix_cache'):
+            backend_kwargs = {'device': args.local_device, 'prefix_cache': args.local_prefix_cache,
+                              'batch_size': args.local_batch_size, 'batch_window_ms': args.local_batch_window_ms}
         
         # Initialize VLM
-        self.vlm = VLM(backend=backend, model_name=model_name)
+        self.vlm = VLM(backend=backend, model_name=model_name, cache=cache, image_pipeline=image_pipeline,
+                       retry_policy=retry_policy, fallback_backend=fallback_backend, fallback_model=fallback_model,
+                       **backend_kwargs)
         print(f"   VLM: {backend}/{model_name}")
+        if fallback_backend:
+            print(f"   Fallback VLM: {fallback_backend}/{fallback_model or model_name}")
+        if image_pipeline is not None:
+            print(f"   Images: resize={image_pipeline.resize} encoding={image_pipeline.encoding}")
+        if cache is not None:
+            print(f"   VLM cache: {cache.path} ({cache.image_hash} image keys)")
         print(self.vlm)
         
         # Initialize agent mode
         self.simple_mode = simple_mode
         if simple_mode:
+            from .simple import get_simple_agent
+            
             # Use global SimpleAgent instance to enable checkpoint persistence
             self.simple_agent = get_simple_agent(self.vlm)
+            self.simple_agent.stream_responses = bool(getattr(args, 'stream_actions', False))
+            self.simple_agent.prompt_token_budget = getattr(args, 'prompt_token_budget', None)
+            self.simple_agent.use_search_planner = bool(getattr(args, 'search_planner', False))
+            if hasattr(args, 'port'):
+                self.simple_agent.planner_url = f"http://localhost:{args.port}/plan"
             print(f"   Mode: Simple (direct frame->action)")
+            prompt_budget = self.simple_agent.get_prompt_token_budget()
+            print(f"   Prompt budget: {f'{prompt_budget} tokens' if prompt_budget else 'unlimited'}")
+            if self.simple_agent.use_search_planner:
+                print(f"   Search planner: {self.simple_agent.planner_url}")
+            if self.simple_agent.stream_responses:
+                print("   Streaming: actions are queued as soon as the ACTION block is generated")
         else:
             # Four-module agent context
             self.context = {
@@ -49,7 +127,15 @@ class Agent:
                 'action': [],
                 'observation_buffer': deque(maxlen=10)  # Store last 10 observations
             }
+            self.step_count = 0
             print(f"   Mode: Four-module architecture")
+        
+        # Concurrent four-module steps run on one event loop reused across steps,
+        # so the async VLM clients keep their connections
+        self.concurrent_modules = concurrent_modules and not simple_mode
+        self._loop = None
+        if self.concurrent_modules:
+            print(f"   Modules: concurrent (perception overlaps memory + planning)")
     
     def step(self, game_state):
         """
@@ -69,8 +155,21 @@ class Agent:
         if self.simple_mode:
             # Simple mode - delegate to SimpleAgent
             return self.simple_agent.step(game_state)
+        elif self.concurrent_modules:
+            try:
+                if self._loop is None:
+                    self._loop = asyncio.new_event_loop()
+                return self._loop.run_until_complete(self._step_concurrent(game_state))
+            except Exception as e:
+                print(f"❌ Agent error: {e}")
+                return None
         else:
             # Four-module processing
+            from .action import action_step
+            from .memory import memory_step
+            from .perception import perception_step
+            from .planning import planning_step
+            
             try:
                 # 1. Perception - understand what's happening
                 print('HERE BEFORE PERCEPTION STEP')
@@ -120,6 +219,8 @@ class Agent:
 
                  # Store action result
                 self.context['action'].append(action_output)
+                self.step_count += 1
+                log_llm_action(action_output, self.step_count)
                 
                 # Keep recent actions reasonable size
                 if len(self.context['action']) > 40:
@@ -130,15 +231,102 @@ class Agent:
             except Exception as e:
                 print(f"❌ Agent error: {e}")
                 return None
+    
+    async def _step_concurrent(self, game_state):
+        """
+        Four-module step with independent VLM calls in flight together.
+        
+        Perception of the new frame runs alongside memory + planning, which work
+        from what was known at the end of the previous step (memory and the plan
+        lag perception by one step). Action waits for both and sees the fresh
+        perception directly.
+        """
+        from .action import action_step_async
+        from .memory import memory_step
+        from .perception import perception_step_async
+        from .planning import planning_step_async
+        
+        previous_context = {
+            'memory': self.context.get('memory', []),
+            'perception_output': self.context.get('perception_output', None),
+        }
+        observations = list(self.context.get('observation_buffer', []))
+        
+        async def update_memory_and_plan():
+            # memory_step is local bookkeeping; keep it off the event loop
+            memory_output = await asyncio.to_thread(
+                memory_step,
+                previous_context['memory'],
+                self.context.get('planning_output', None),
+                self.context.get('action', []),
+                observations,
+            )
+            plan_context = dict(previous_context, memory=memory_output)
+            plan = await planning_step_async(
+                plan_context,
+                self.context.get('planning_output', None),
+                game_state,
+                self.vlm
+            )
+            return memory_output, plan
+        
+        perception_output, (memory_output, planning_output) = await asyncio.gather(
+            perception_step_async(game_state.get('frame'), game_state, self.vlm),
+            update_memory_and_plan(),
+        )
+        self.context['perception_output'] = perception_output
+        self.context['memory'] = memory_output
+        self.context['planning_output'] = planning_output
+        self.context['observation_buffer'].append({
+            "frame_id": game_state.get('frame_id', -1),
+            "observation": perception_output,
+            "state": game_state
+        })
+        
+        action_output, _ = await action_step_async(
+            memory_output,
+            planning_output,
+            perception_output,
+            game_state,
+            self.context.get('action', []),
+            self.vlm
+        )
+        
+        self.context['action'].append(action_output)
+        self.step_count += 1
+        log_llm_action(action_output, self.step_count)
+        if len(self.context['action']) > 40:
+            self.context['action'] = self.context['action'][-40:]
+        
+        return action_output
+    
+    def set_early_action_callback(self, callback):
+        """
+        Register callback(actions) for actions parsed from a streamed response before step() returns.
+        
+        Only simple mode streams; in other modes the callback is never called.
+        """
+        if self.simple_mode:
+            self.simple_agent.early_action_callback = callback
+    
+    def close(self):
+        """Release the event loop used for concurrent module steps"""
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
 
 
 __all__ = [
     'Agent',
     'action_step',
+    'action_step_async',
     'memory_step', 
     'perception_step',
+    'perception_step_async',
     'planning_step',
+    'planning_step_async',
     'SimpleAgent',
+    'StreamingActionParser',
     'get_simple_agent',
     'simple_mode_processing_multiprocess',
     'configure_simple_agent_defaults'
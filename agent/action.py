@@ -1,7 +1,7 @@
 import logging
 import random
 import sys
-import weave
+from utils import telemetry
 from agent.system_prompt import system_prompt
 from utils.state_formatter import format_state_for_llm, format_state_summary, get_movement_options, get_party_health_summary
 from utils.vlm import VLM
@@ -9,12 +9,8 @@ from utils.vlm import VLM
 # Set up module logging
 logger = logging.getLogger(__name__)
 
-@weave.op()
-def action_step(memory_context, current_plan, latest_observation, state_data, recent_actions, vlm):
-    """
-    Decide and perform the next action button(s) based on memory, plan, observation, and comprehensive state.
-    Returns a list of action buttons as strings.
-    """
+def build_action_prompt(memory_context, current_plan, latest_observation, state_data, recent_actions):
+    """Complete action prompt (system prompt included) for the current state"""
     # Get formatted state context and useful summaries
     state_context = format_state_for_llm(state_data)
     state_summary = format_state_summary(state_data)
@@ -151,9 +147,13 @@ When traversing give multiple movement commands in sequence to move efficiently.
 REMEMBER MOST IMPORTANT OF ALL: ACTIONS MUST BE IN <ACTIONS> </ACTIONS> TAGS AND VALID BUTTONS ONLY: A, B, UP, DOWN, LEFT, RIGHT, START"""
     
     # Construct complete prompt for VLM
-    complete_prompt = system_prompt + action_prompt
-    
-    action_response = vlm.get_text_query(complete_prompt, "ACTION").strip().upper()
+    return system_prompt + action_prompt
+
+def parse_action_response(action_response, state_data):
+    """Buttons from the VLM's action response, with a state-based default when none parse"""
+    action_response = action_response.strip().upper()
+    game_data = state_data.get('game', {})
+    party_health = get_party_health_summary(state_data)
     valid_buttons = ['A', 'B', 'START', 'UP', 'DOWN', 'LEFT', 'RIGHT']
     
     # Print VLM response for debugging
@@ -199,6 +199,24 @@ REMEMBER MOST IMPORTANT OF ALL: ACTIONS MUST BE IN <ACTIONS> </ACTIONS> TAGS AND
             actions = [random.choice(['B'])]  # Random exploration
     
     logger.info(f"[ACTION] Actions decided: {', '.join(actions)}")
+    return actions
+
+@telemetry.op()
+def action_step(memory_context, current_plan, latest_observation, state_data, recent_actions, vlm):
+    """
+    Decide and perform the next action button(s) based on memory, plan, observation, and comprehensive state.
+    Returns a list of action buttons as strings.
+    """
+    complete_prompt = build_action_prompt(memory_context, current_plan, latest_observation, state_data, recent_actions)
+    action_response = vlm.get_text_query(complete_prompt, "ACTION").strip().upper()
+    actions = parse_action_response(action_response, state_data)
 
     # return raw action_response for logging in wandb weave
-    return actions, action_response 
\ No newline at end of file
+    return actions, action_response
+
+@telemetry.op()
+async def action_step_async(memory_context, current_plan, latest_observation, state_data, recent_actions, vlm):
+    """action_step using the VLM's async API"""
+    complete_prompt = build_action_prompt(memory_context, current_plan, latest_observation, state_data, recent_actions)
+    action_response = (await vlm.get_text_query_async(complete_prompt, "ACTION")).strip().upper()
+    return parse_action_response(action_response, state_data), action_response
@@ -1,6 +1,6 @@
 import logging
 from collections import deque
-import weave
+from utils import telemetry
 from agent.system_prompt import system_prompt
 from utils.state_formatter import format_state_summary, get_party_health_summary
 from utils.vlm import VLM
@@ -55,7 +55,7 @@ def extract_key_state_info(state_data):
     
     return key_info
 
-@weave.op()
+@telemetry.op()
 def memory_step(memory_context, current_plan, recent_actions, observation_buffer,):
     """
     Maintain a rolling buffer of the previous 50 actions and observations with state information.
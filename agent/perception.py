@@ -1,6 +1,6 @@
 import time
 import logging
-import weave
+from utils import telemetry
 from utils.vlm import VLM
 from utils.state_formatter import format_state_for_llm, format_state_summary
 from agent.system_prompt import system_prompt
@@ -8,12 +8,8 @@ from agent.system_prompt import system_prompt
 # Set up module logging
 logger = logging.getLogger(__name__)
 
-@weave.op()
-def perception_step(frame, state_data, vlm):
-    """
-    Observe and describe your current situation using both visual and comprehensive state data.
-    Returns (observation, slow_thinking_needed)
-    """
+def build_perception_prompt(state_data):
+    """Complete perception prompt (system prompt included) for the current state"""
     # Format the comprehensive state context using the utility
     state_context = format_state_for_llm(state_data)
     
@@ -38,6 +34,19 @@ Based on the visual frame and the above game state data, describe your current s
 Combine visual observation with the game state data to give a complete picture of the current situation.
 You should mostly carefully describe the current and immediate observation in detail, so the next action step can make a good decision."""
     
-    observation = vlm.get_query(frame, system_prompt + perception_prompt, "PERCEPTION")
+    return system_prompt + perception_prompt
+
+@telemetry.op()
+def perception_step(frame, state_data, vlm):
+    """
+    Observe and describe your current situation using both visual and comprehensive state data.
+    Returns (observation, slow_thinking_needed)
+    """
+    observation = vlm.get_query(frame, build_perception_prompt(state_data), "PERCEPTION")
+
+    return observation
 
-    return observation 
\ No newline at end of file
+@telemetry.op()
+async def perception_step_async(frame, state_data, vlm):
+    """perception_step using the VLM's async API"""
+    return await vlm.get_query_async(frame, build_perception_prompt(state_data), "PERCEPTION")
@@ -1,5 +1,5 @@
 import logging
-import weave
+from utils import telemetry
 from utils.vlm import VLM
 from utils.state_formatter import format_state_for_llm, format_state_summary
 from agent.system_prompt import system_prompt
@@ -7,23 +7,17 @@ from agent.system_prompt import system_prompt
 # Set up module logging
 logger = logging.getLogger(__name__)
 
-@weave.op()
-def planning_step(context, current_plan, state_data, vlm):
-    """
-    Decide and update your high-level plan based on memory context, current state, and the need for slow thinking.
-    Returns updated plan.
-    """
-    # Get formatted state context
-    state_context = format_state_for_llm(state_data)
+def _log_planning_start(state_data):
     state_summary = format_state_summary(state_data)
     
     logger.info("[PLANNING] Starting planning step")
     logger.info(f"[PLANNING] State: {state_summary}")
     logger.info(f"[PLANNING] Slow thinking needed: not doing slow thinking anymore")
-    
-    # Check if current plan is accomplished
-    if current_plan:
-        plan_check_prompt = f"""PLAN ASSESSMENT TASK
+
+def build_plan_check_prompt(context, current_plan, state_data):
+    """Prompt asking whether the current plan is accomplished"""
+    state_context = format_state_for_llm(state_data)
+    plan_check_prompt = f"""PLAN ASSESSMENT TASK
 You are the agent playing Pokemon Emerald. Assess your current situation and plan progress.
         
 You will be provided with the following information:
@@ -60,15 +54,12 @@ Considering your current location, pokemon party, money, traversability, and rec
 - Are there terrain obstacles (water, blocked paths) to navigate?
 
 Then describe in detail the next objective and next goal as you are trying to speedrun prioritize making progress in-game and reaching the next area."""
-        
-        plan_status = vlm.get_text_query(system_prompt + plan_check_prompt, "PLANNING-ASSESSMENT")
-        if "yes" in plan_status.lower():
-            current_plan = None
-            logger.info("[PLANNING] Current plan marked as completed")
-    
-    # Generate new plan if needed
-    if current_plan is None:
-        planning_prompt =  f"""PLAN CREATION TASK
+    return system_prompt + plan_check_prompt
+
+def build_plan_creation_prompt(context, state_data):
+    """Prompt for a new plan"""
+    state_context = format_state_for_llm(state_data)
+    planning_prompt =  f"""PLAN CREATION TASK
 You are the agent playing Pokemon Emerald. Assess your current situation and make an initial plan for the next goal.
         
 You will be provided with the following information:
@@ -101,10 +92,48 @@ Considering your current location, pokemon party, money, traversability, and rec
 - Are there terrain obstacles (water, blocked paths) to navigate?
         
 Then describe in detail the next immediate goal."""
-        
+    return system_prompt + planning_prompt
+
+def _log_final_plan(current_plan):
+    logger.info(f"[PLANNING] Final plan: {current_plan[:300]}..." if len(current_plan) > 300 else f"[PLANNING] Final plan: {current_plan}")
+
+@telemetry.op()
+def planning_step(context, current_plan, state_data, vlm):
+    """
+    Decide and update your high-level plan based on memory context, current state, and the need for slow thinking.
+    Returns updated plan.
+    """
+    _log_planning_start(state_data)
+    
+    # Check if current plan is accomplished
+    if current_plan:
+        plan_status = vlm.get_text_query(build_plan_check_prompt(context, current_plan, state_data), "PLANNING-ASSESSMENT")
+        if "yes" in plan_status.lower():
+            current_plan = None
+            logger.info("[PLANNING] Current plan marked as completed")
+    
+    # Generate new plan if needed
+    if current_plan is None:
+        current_plan = vlm.get_text_query(build_plan_creation_prompt(context, state_data), "PLANNING-CREATION")
+        logger.info("[PLANNING] New plan created")
+    
+    _log_final_plan(current_plan)
+    return current_plan
 
-        current_plan = vlm.get_text_query(system_prompt + planning_prompt, "PLANNING-CREATION")
+@telemetry.op()
+async def planning_step_async(context, current_plan, state_data, vlm):
+    """planning_step using the VLM's async API"""
+    _log_planning_start(state_data)
+    
+    if current_plan:
+        plan_status = await vlm.get_text_query_async(build_plan_check_prompt(context, current_plan, state_data), "PLANNING-ASSESSMENT")
+        if "yes" in plan_status.lower():
+            current_plan = None
+            logger.info("[PLANNING] Current plan marked as completed")
+    
+    if current_plan is None:
+        current_plan = await vlm.get_text_query_async(build_plan_creation_prompt(context, state_data), "PLANNING-CREATION")
         logger.info("[PLANNING] New plan created")
     
-    logger.info(f"[PLANNING] Final plan: {current_plan[:300]}..." if len(current_plan) > 300 else f"[PLANNING] Final plan: {current_plan}")
-    return current_plan 
\ No newline at end of file
+    _log_final_plan(current_plan)
+    return current_plan
@@ -38,7 +38,10 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
 
+from utils.llm_logger import log_llm_action, log_llm_prompt_budget
+from utils.prompt_budget import BudgetedPrompt, PromptBudget, make_token_counter, prompt_budget_for_model
 from utils.state_formatter import format_state_for_llm
+from utils.vlm import VLMResponse
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +50,7 @@ DEFAULT_MAX_HISTORY_ENTRIES = 100  # Previous states/locations with context
 DEFAULT_MAX_RECENT_ACTIONS = 50    # Recent button presses
 DEFAULT_HISTORY_DISPLAY_COUNT = 30 # Number of history entries shown to LLM
 DEFAULT_ACTIONS_DISPLAY_COUNT = 40 # Number of recent actions shown to LLM
+DEFAULT_PLANNER_URL = "http://localhost:8000/plan"  # Server-side savestate search planner
 
 def configure_simple_agent_defaults(max_history_entries: int = None, max_recent_actions: int = None, 
                                   history_display_count: int = None, actions_display_count: int = None):
@@ -66,6 +70,171 @@ def configure_simple_agent_defaults(max_history_entries: int = None, max_recent_
     logger.info(f"Updated SimpleAgent defaults: {DEFAULT_MAX_HISTORY_ENTRIES} history, {DEFAULT_MAX_RECENT_ACTIONS} actions, "
                f"display {DEFAULT_HISTORY_DISPLAY_COUNT}/{DEFAULT_ACTIONS_DISPLAY_COUNT}")
 
+VALID_ACTIONS = ['A', 'B', 'START', 'SELECT', 'UP', 'DOWN', 'LEFT', 'RIGHT']
+MAX_ACTIONS_PER_STEP = 10
+RESPONSE_SECTIONS = ('ANALYSIS', 'OBJECTIVES', 'PLAN', 'REASONING', 'ACTION')
+
+PROMPT_INTRO = """You are playing Pokemon Emerald. Progress quickly to the milestones by balancing exploration and exploitation of things you know. 
+            Based on the current game frame and state information, think through your next move and choose the best button action."""
+
+# Response format and movement rules (never trimmed by the prompt budget)
+RESPONSE_FORMAT = """Available actions: A, B, START, SELECT, UP, DOWN, LEFT, RIGHT
+
+IMPORTANT: Please think step by step before choosing your action. Structure your response like this:
+
+ANALYSIS:
+[Analyze what you see in the frame and current game state - what's happening? where are you? what should you be doing? 
+IMPORTANT: Look carefully at the game image for NPCs (people, trainers) that might not be shown on the map. NPCs appear as sprite characters and can block movement or trigger battles/dialogue.]
+
+OBJECTIVES:
+[Review your current objectives. You have main storyline objectives (story_*) that track overall Emerald progression - these are automatically verified and you CANNOT manually complete them. You can create your own sub-objectives to help achieve the main goals. Do any need to be updated, added, or marked as complete?
+- Add sub-objectives: ADD_OBJECTIVE: type:description:target_value (e.g., "ADD_OBJECTIVE: location:Find Pokemon Center in town:(15,20)" or "ADD_OBJECTIVE: item:Buy Pokeballs:5")
+- Complete sub-objectives only: COMPLETE_OBJECTIVE: objective_id:notes (e.g., "COMPLETE_OBJECTIVE: my_sub_obj_123:Successfully bought Pokeballs")
+- NOTE: Do NOT try to complete storyline objectives (story_*) - they auto-complete when milestones are reached]
+
+"""
+
+DECISION_FORMAT = """PLAN:
+[Think about your immediate goal - what do you want to accomplish in the next few actions? Consider your current objectives and recent history. 
+Check MOVEMENT MEMORY for areas you've had trouble with before and plan your route accordingly.]
+
+REASONING:
+[Explain why you're choosing this specific action. Reference the MOVEMENT PREVIEW and MOVEMENT MEMORY sections. Check the visual frame for NPCs before moving. If you see NPCs in the image, avoid walking into them. Consider any failed movements or known obstacles from your memory.]
+
+ACTION:
+[Your final action choice - PREFER SINGLE ACTIONS like 'RIGHT' or 'A'. Only use multiple actions like 'UP, UP, RIGHT' if you've verified each step is WALKABLE in the movement preview and map.]
+
+"""
+
+# With streamed responses the action comes before its explanation, so the buttons can be sent while REASONING is generated
+STREAMING_DECISION_FORMAT = """PLAN:
+[Think about your immediate goal - what do you want to accomplish in the next few actions? Consider your current objectives and recent history. 
+Check the MOVEMENT PREVIEW and MOVEMENT MEMORY for areas you've had trouble with before and plan your route accordingly. Check the visual frame for NPCs before moving. If you see NPCs in the image, avoid walking into them.]
+
+ACTION:
+[Your final action choice - PREFER SINGLE ACTIONS like 'RIGHT' or 'A'. Only use multiple actions like 'UP, UP, RIGHT' if you've verified each step is WALKABLE in the movement preview and map. Leave a blank line after the action.]
+
+REASONING:
+[Explain why you chose this action. Reference the MOVEMENT PREVIEW and MOVEMENT MEMORY entries you relied on and any failed movements or known obstacles from your memory.]
+
+"""
+
+MOVEMENT_RULES = """🚨 PATHFINDING RULES:
+1. **SINGLE STEP FIRST**: Always prefer single actions (UP, DOWN, LEFT, RIGHT, A, B) unless you're 100% certain about multi-step paths
+2. **CHECK EVERY STEP**: Before chaining movements, verify EACH step in your sequence using the MOVEMENT PREVIEW and map
+3. **BLOCKED = STOP**: If ANY step shows BLOCKED in the movement preview, the entire sequence will fail
+4. **NO BLIND CHAINS**: Never chain movements through areas you can't see or verify as walkable
+5. **PERFORM PATHFINDING**: Find a path to a target location (X',Y') from the player position (X,Y) on the map. DO NOT TRAVERSE THROUGH OBSTACLES (#) -- it will not work.
+
+💡 SMART MOVEMENT STRATEGY:
+- Use MOVEMENT PREVIEW to see exactly what happens with each direction
+- If your target requires multiple steps, plan ONE step at a time
+- Only chain 2-3 moves if ALL intermediate tiles are confirmed WALKABLE
+- When stuck, try a different direction rather than repeating the same blocked move
+
+EXAMPLE - DON'T DO THIS:
+❌ "I want to go right 5 tiles" → "RIGHT, RIGHT, RIGHT, RIGHT, RIGHT" (may hit wall on step 2!)
+
+EXAMPLE - DO THIS INSTEAD:
+✅ Check movement preview → "RIGHT shows (X+1,Y) WALKABLE" → "RIGHT" (single safe step)
+✅ Next turn, check again → "RIGHT shows (X+2,Y) WALKABLE" → "RIGHT" (another safe step)
+
+💡 SMART NAVIGATION:
+- Check the VISUAL FRAME for NPCs (people/trainers) before moving - they're not always on the map!
+- Review MOVEMENT MEMORY for locations where you've failed to move before
+- Only explore areas marked with ? (these are confirmed explorable edges)
+- Avoid areas surrounded by # (walls) - they're fully blocked
+- Use doors (D), stairs (S), or walk around obstacles when pathfinding suggests it
+
+💡 NPC & OBSTACLE HANDLING:
+- If you see NPCs in the image, avoid walking into them or interact with A/B if needed
+- If a movement fails (coordinates don't change), that location likely has an NPC or obstacle
+- Use your MOVEMENT MEMORY to remember problem areas and plan around them
+- NPCs can trigger battles or dialogue, which may be useful for objectives
+"""
+
+RESPONSE_INSTRUCTIONS = RESPONSE_FORMAT + DECISION_FORMAT + MOVEMENT_RULES
+STREAMING_RESPONSE_INSTRUCTIONS = RESPONSE_FORMAT + STREAMING_DECISION_FORMAT + MOVEMENT_RULES
+
+# Prompt section priorities: under the token budget, lower ones are summarized, truncated or dropped first
+SECTION_PRIORITIES = {
+    'game_state': 90,
+    'stuck_warning': 85,
+    'objectives': 70,
+    'planner_suggestion': 65,
+    'recent_actions': 50,
+    'movement_memory': 40,
+    'history': 30,
+}
+
+
+def _extract_actions(text: str, limit: int = MAX_ACTIONS_PER_STEP) -> List[str]:
+    """Valid button names in text (comma, period or space separated), in order; [] if none"""
+    tokens = text.upper().replace(',', ' ').replace('.', ' ').split()
+    return [token for token in tokens if token in VALID_ACTIONS][:limit]
+
+
+class StreamingActionParser:
+    """
+    Incremental parser for streamed structured responses.
+    
+    Feed it response chunks as they arrive; it returns the actions as soon as the
+    ACTION block ends (a blank line, the next section header or the action limit),
+    while the model is still writing the REASONING after it. The actions are the
+    ones _parse_structured_response finds in the same block, one or more lines long.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+        self._section = None
+        self._block: List[str] = []
+        self.actions: Optional[List[str]] = None
+    
+    def feed(self, chunk: str) -> Optional[List[str]]:
+        """Consume a chunk; returns the actions the first time they become available"""
+        if self.actions is not None:
+            return None
+        self._buffer += chunk
+        while self.actions is None and '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            self._consume_line(line)
+        return self.actions
+    
+    def finish(self) -> Optional[List[str]]:
+        """Flush the last (unterminated) line and close an ACTION block that runs to the end of the stream"""
+        if self.actions is not None:
+            return None
+        if self._buffer:
+            line, self._buffer = self._buffer, ""
+            self._consume_line(line)
+        if self.actions is None and self._section == 'ACTION':
+            self._end_block()
+        return self.actions
+    
+    def _consume_line(self, line: str):
+        line = line.strip()
+        for section in RESPONSE_SECTIONS:
+            if line.upper().startswith(section + ':'):
+                if self._section == 'ACTION':
+                    self._end_block()
+                self._section = section
+                line = line[len(section) + 1:].strip()
+                break
+        if self.actions is not None or self._section != 'ACTION':
+            return
+        if not line:
+            if self._block:  # Blank line after the buttons
+                self._end_block()
+            return
+        self._block.extend(_extract_actions(line))
+        if len(self._block) >= MAX_ACTIONS_PER_STEP:
+            self._end_block()
+    
+    def _end_block(self):
+        self._section = None
+        self.actions = self._block[:MAX_ACTIONS_PER_STEP] or None
+
+
 @dataclass
 class Objective:
     """Single objective/goal for the agent"""
@@ -116,9 +285,24 @@ class SimpleAgent:
     """
     
     def __init__(self, vlm, max_history_entries: int = None, max_recent_actions: int = None, 
-                 history_display_count: int = None, actions_display_count: int = None):
+                 history_display_count: int = None, actions_display_count: int = None,
+                 use_search_planner: bool = False, planner_url: str = DEFAULT_PLANNER_URL,
+                 stream_responses: bool = False, prompt_token_budget: Optional[int] = None):
         self.vlm = vlm
         
+        # Prompt token target (None: per-model default, 0: unlimited)
+        self.prompt_token_budget = prompt_token_budget
+        self._count_tokens = None
+        
+        # Stream VLM responses and hand the ACTION block to early_action_callback as soon as it ends
+        self.stream_responses = stream_responses
+        self.early_action_callback = None
+        
+        # Savestate search planner on the server (replaces VLM calls for deterministic navigation).
+        # Off by default: each overworld step with a location objective waits for a search.
+        self.use_search_planner = use_search_planner
+        self.planner_url = planner_url
+        
         # Use current global defaults if not specified
         max_history_entries = max_history_entries or DEFAULT_MAX_HISTORY_ENTRIES
         max_recent_actions = max_recent_actions or DEFAULT_MAX_RECENT_ACTIONS
@@ -578,85 +762,21 @@ class SimpleAgent:
             completed_objectives_list = self.get_completed_objectives()
             objectives_summary = self._format_objectives_for_llm(active_objectives, completed_objectives_list)
             
-            # Create enhanced prompt with objectives, history context and chain of thought request
-            prompt = f"""You are playing Pokemon Emerald. Progress quickly to the milestones by balancing exploration and exploitation of things you know. 
-            Based on the current game frame and state information, think through your next move and choose the best button action.
-
-RECENT ACTION HISTORY (last {self.actions_display_count} actions):
-{recent_actions_str}
-
-LOCATION/CONTEXT HISTORY (last {self.history_display_count} steps):
-{history_summary}
-
-CURRENT OBJECTIVES:
-{objectives_summary}
-
-CURRENT GAME STATE:
-{formatted_state}
-
-{movement_memory}
-
-{stuck_warning}
-
-Available actions: A, B, START, SELECT, UP, DOWN, LEFT, RIGHT
-
-IMPORTANT: Please think step by step before choosing your action. Structure your response like this:
-
-ANALYSIS:
-[Analyze what you see in the frame and current game state - what's happening? where are you? what should you be doing? 
-IMPORTANT: Look carefully at the game image for NPCs (people, trainers) that might not be shown on the map. NPCs appear as sprite characters and can block movement or trigger battles/dialogue.]
-
-OBJECTIVES:
-[Review your current objectives. You have main storyline objectives (story_*) that track overall Emerald progression - these are automatically verified and you CANNOT manually complete them. You can create your own sub-objectives to help achieve the main goals. Do any need to be updated, added, or marked as complete?
-- Add sub-objectives: ADD_OBJECTIVE: type:description:target_value (e.g., "ADD_OBJECTIVE: location:Find Pokemon Center in town:(15,20)" or "ADD_OBJECTIVE: item:Buy Pokeballs:5")
-- Complete sub-objectives only: COMPLETE_OBJECTIVE: objective_id:notes (e.g., "COMPLETE_OBJECTIVE: my_sub_obj_123:Successfully bought Pokeballs")
-- NOTE: Do NOT try to complete storyline objectives (story_*) - they auto-complete when milestones are reached]
-
-PLAN:
-[Think about your immediate goal - what do you want to accomplish in the next few actions? Consider your current objectives and recent history. 
-Check MOVEMENT MEMORY for areas you've had trouble with before and plan your route accordingly.]
-
-REASONING:
-[Explain why you're choosing this specific action. Reference the MOVEMENT PREVIEW and MOVEMENT MEMORY sections. Check the visual frame for NPCs before moving. If you see NPCs in the image, avoid walking into them. Consider any failed movements or known obstacles from your memory.]
-
-ACTION:
-[Your final action choice - PREFER SINGLE ACTIONS like 'RIGHT' or 'A'. Only use multiple actions like 'UP, UP, RIGHT' if you've verified each step is WALKABLE in the movement preview and map.]
-
-🚨 PATHFINDING RULES:
-1. **SINGLE STEP FIRST**: Always prefer single actions (UP, DOWN, LEFT, RIGHT, A, B) unless you're 100% certain about multi-step paths
-2. **CHECK EVERY STEP**: Before chaining movements, verify EACH step in your sequence using the MOVEMENT PREVIEW and map
-3. **BLOCKED = STOP**: If ANY step shows BLOCKED in the movement preview, the entire sequence will fail
-4. **NO BLIND CHAINS**: Never chain movements through areas you can't see or verify as walkable
-5. **PERFORM PATHFINDING**: Find a path to a target location (X',Y') from the player position (X,Y) on the map. DO NOT TRAVERSE THROUGH OBSTACLES (#) -- it will not work.
-
-💡 SMART MOVEMENT STRATEGY:
-- Use MOVEMENT PREVIEW to see exactly what happens with each direction
-- If your target requires multiple steps, plan ONE step at a time
-- Only chain 2-3 moves if ALL intermediate tiles are confirmed WALKABLE
-- When stuck, try a different direction rather than repeating the same blocked move
-
-EXAMPLE - DON'T DO THIS:
-❌ "I want to go right 5 tiles" → "RIGHT, RIGHT, RIGHT, RIGHT, RIGHT" (may hit wall on step 2!)
-
-EXAMPLE - DO THIS INSTEAD:
-✅ Check movement preview → "RIGHT shows (X+1,Y) WALKABLE" → "RIGHT" (single safe step)
-✅ Next turn, check again → "RIGHT shows (X+2,Y) WALKABLE" → "RIGHT" (another safe step)
-
-💡 SMART NAVIGATION:
-- Check the VISUAL FRAME for NPCs (people/trainers) before moving - they're not always on the map!
-- Review MOVEMENT MEMORY for locations where you've failed to move before
-- Only explore areas marked with ? (these are confirmed explorable edges)
-- Avoid areas surrounded by # (walls) - they're fully blocked
-- Use doors (D), stairs (S), or walk around obstacles when pathfinding suggests it
-
-💡 NPC & OBSTACLE HANDLING:
-- If you see NPCs in the image, avoid walking into them or interact with A/B if needed
-- If a movement fails (coordinates don't change), that location likely has an NPC or obstacle
-- Use your MOVEMENT MEMORY to remember problem areas and plan around them
-- NPCs can trigger battles or dialogue, which may be useful for objectives
-
-
-Context: {context} | Coords: {coords} """
+            # Deterministic navigation: a plan found by searching savestates needs no VLM round trip
+            plan = self.get_planner_suggestion(context)
+            if (plan and plan.get("reached") and plan.get("buttons")
+                    and plan["objective"]["objective"] == "coordinate"):
+                target = tuple(plan["objective"]["target"])
+                print(f"🧭 Search planner path to {target}: {plan['buttons']}")
+                return self._record_step(game_state, coords, context, map_id, plan["buttons"],
+                                         f"Search planner path to {target}")
+            planner_suggestion = self._format_planner_suggestion(plan)
+            
+            # Prompt sections by priority, trimmed to the model's token budget
+            budgeted = self._build_prompt(recent_actions_str, history_summary, objectives_summary, formatted_state,
+                                          movement_memory, stuck_warning, planner_suggestion, context, coords,
+                                          active_objectives)
+            prompt = budgeted.text
             
             # Print complete prompt to terminal for debugging
             print("\n" + "="*120)
@@ -677,7 +797,8 @@ Context: {context} | Coords: {coords} """
             if frame and (hasattr(frame, 'save') or hasattr(frame, 'shape')):
                 print("🔍 Making VLM call...")
                 try:
-                    response = self.vlm.get_query(frame, prompt, "simple_mode")
+                    response, early_actions = self._query_vlm(frame, prompt)
+                    log_llm_prompt_budget("simple_mode", budgeted.report(), getattr(response, 'token_usage', None))
                     print(f"🔍 VLM response received: {response[:100]}..." if len(response) > 100 else f"🔍 VLM response: {response}")
                 except Exception as e:
                     print(f"❌ VLM call failed: {e}")
@@ -688,61 +809,213 @@ Context: {context} | Coords: {coords} """
             
             # Extract action(s) from structured response
             actions, reasoning = self._parse_structured_response(response)
+            if early_actions:
+                actions = early_actions  # Already handed to the callback; keep history consistent
             
-            # Check for failed movement by comparing previous coordinates
-            if len(self.state.history) > 0:
-                prev_coords = self.state.history[-1].player_coords
-                if prev_coords and coords:
-                    # If coordinates didn't change and we attempted a movement, record it as failed
-                    if (prev_coords == coords and 
-                        isinstance(actions, list) and len(actions) > 0 and 
-                        actions[0] in ['UP', 'DOWN', 'LEFT', 'RIGHT']):
-                        self.record_failed_movement(coords, actions[0], "movement_blocked")
-                    elif (prev_coords == coords and 
-                          isinstance(actions, str) and 
-                          actions in ['UP', 'DOWN', 'LEFT', 'RIGHT']):
-                        self.record_failed_movement(coords, actions, "movement_blocked")
-
-            # Record this step in history with reasoning
-            game_state_summary = self.create_game_state_summary(game_state)
-            action_with_reasoning = f"{actions} | Reasoning: {reasoning}" if reasoning else str(actions)
-            history_entry = HistoryEntry(
-                timestamp=datetime.now(),
-                player_coords=coords,
-                map_id=map_id,
-                context=context,
-                action_taken=action_with_reasoning,
-                game_state_summary=game_state_summary
-            )
-            self.state.history.append(history_entry)
-            
-            # Update recent actions
-            if isinstance(actions, list):
-                self.state.recent_actions.extend(actions)
-            else:
-                self.state.recent_actions.append(actions)
-            
-            # Reset stuck detection for other locations when we move
-            if coords:
-                keys_to_reset = [k for k in self.state.stuck_detection.keys() 
-                               if not k.startswith(f"{coords[0]}_{coords[1]}")]
-                for key in keys_to_reset:
-                    if self.state.stuck_detection[key] > 0:
-                        self.state.stuck_detection[key] = max(0, self.state.stuck_detection[key] - 1)
-            
-            # Update server with agent step and metrics (for agent thinking display)
-            self._update_server_metrics()
-            
-            return actions
+            return self._record_step(game_state, coords, context, map_id, actions, reasoning)
             
         except Exception as e:
             logger.error(f"Error in simple agent processing: {e}")
             return ["A"]  # Default safe action as list
     
+    def get_prompt_token_budget(self) -> int:
+        """Token target for step prompts (0 = unlimited)"""
+        if self.prompt_token_budget is not None:
+            return self.prompt_token_budget
+        return prompt_budget_for_model(getattr(self.vlm, 'model_name', None), getattr(self.vlm, 'backend_type', None))
+    
+    def _token_counter(self):
+        if self._count_tokens is None:
+            # Exact counts from the local model's tokenizer when there is one
+            processor = getattr(getattr(self.vlm, 'backend', None), 'processor', None)
+            self._count_tokens = make_token_counter(getattr(self.vlm, 'model_name', None),
+                                                    getattr(processor, 'tokenizer', None))
+        return self._count_tokens
+    
+    def _build_prompt(self, recent_actions_str: str, history_summary: str, objectives_summary: str,
+                      formatted_state: str, movement_memory: str, stuck_warning: str, planner_suggestion: str,
+                      context: str, coords: Optional[Tuple[int, int]],
+                      active_objectives: List[Objective]) -> BudgetedPrompt:
+        """
+        Assemble the step prompt within the token budget.
+        
+        Sections keep their order; when the prompt is too long, the history, movement
+        memory and recent actions are cut back before the objectives and the current
+        game state. The intro, response format and context line are always sent in full.
+        """
+        recent_actions = list(self.state.recent_actions)
+        history_lines = history_summary.splitlines()
+        
+        budget = PromptBudget(self.get_prompt_token_budget(), self._token_counter())
+        budget.add_required('intro', PROMPT_INTRO)
+        budget.add('recent_actions', recent_actions_str, SECTION_PRIORITIES['recent_actions'], keep="tail",
+                   header=f"RECENT ACTION HISTORY (last {self.actions_display_count} actions):",
+                   summary=', '.join(recent_actions[-10:]) if len(recent_actions) > 10 else None)
+        budget.add('history', history_summary, SECTION_PRIORITIES['history'], keep="tail",
+                   header=f"LOCATION/CONTEXT HISTORY (last {self.history_display_count} steps):",
+                   summary="\n".join(history_lines[-5:]) if len(history_lines) > 5 else None)
+        budget.add('objectives', objectives_summary, SECTION_PRIORITIES['objectives'], header="CURRENT OBJECTIVES:",
+                   summary=self._format_objectives_for_llm(active_objectives[:2], []))
+        budget.add('game_state', formatted_state, SECTION_PRIORITIES['game_state'], header="CURRENT GAME STATE:")
+        budget.add('movement_memory', movement_memory, SECTION_PRIORITIES['movement_memory'])
+        budget.add('stuck_warning', stuck_warning.strip(), SECTION_PRIORITIES['stuck_warning'])
+        budget.add('planner_suggestion', planner_suggestion, SECTION_PRIORITIES['planner_suggestion'])
+        budget.add_required('instructions', STREAMING_RESPONSE_INSTRUCTIONS if self.stream_responses
+                            else RESPONSE_INSTRUCTIONS)
+        budget.add_required('context', f"Context: {context} | Coords: {coords} ")
+        
+        budgeted = budget.fit()
+        if budgeted.trimmed:
+            print(f"✂️ Prompt trimmed from {budgeted.original_tokens} to {budgeted.estimated_tokens} tokens "
+                  f"(budget {budgeted.max_tokens}): {', '.join(budgeted.trimmed)}")
+        return budgeted
+    
+    def _query_vlm(self, frame, prompt: str) -> Tuple[str, Optional[List[str]]]:
+        """
+        Query the VLM for this step.
+        
+        Returns (full response, actions already passed to early_action_callback or None).
+        When streaming, the callback gets the actions as soon as the ACTION block ends,
+        while the model is still generating the REASONING after it.
+        """
+        if not self.stream_responses or not hasattr(self.vlm, 'stream_query'):
+            return self.vlm.get_query(frame, prompt, "simple_mode"), None
+        
+        parser = StreamingActionParser()
+        pieces = []
+        early_actions = None
+        
+        def emit(actions):
+            nonlocal early_actions
+            if not actions or early_actions is not None or self.early_action_callback is None:
+                return
+            early_actions = actions
+            print(f"⚡ Early actions from stream: {actions}")
+            try:
+                self.early_action_callback(actions)
+            except Exception as e:
+                logger.warning(f"Early action callback failed: {e}")
+        
+        try:
+            for piece in self.vlm.stream_query(frame, prompt, "simple_mode"):
+                pieces.append(piece)
+                emit(parser.feed(piece))
+        except Exception as e:
+            if early_actions is None:
+                raise
+            # The buttons are already on the server; keep them rather than failing the step
+            logger.warning(f"Stream failed after early actions were sent: {e}")
+            return self._join_stream(pieces), early_actions
+        emit(parser.finish())
+        return self._join_stream(pieces), early_actions
+    
+    @staticmethod
+    def _join_stream(pieces: List[str]) -> VLMResponse:
+        """The streamed reply, with the token usage the backend sent in its last piece"""
+        token_usage = next((piece.token_usage for piece in reversed(pieces)
+                            if getattr(piece, 'token_usage', None)), None)
+        return VLMResponse("".join(pieces), token_usage)
+    
+    def _record_step(self, game_state: Dict[str, Any], coords: Optional[Tuple[int, int]], context: str,
+                     map_id: Optional[int], actions, reasoning: str):
+        """Record a chosen action in history, movement memory and server metrics, then return it"""
+        # Check for failed movement by comparing previous coordinates
+        if len(self.state.history) > 0:
+            prev_coords = self.state.history[-1].player_coords
+            if prev_coords and coords:
+                # If coordinates didn't change and we attempted a movement, record it as failed
+                if (prev_coords == coords and 
+                    isinstance(actions, list) and len(actions) > 0 and 
+                    actions[0] in ['UP', 'DOWN', 'LEFT', 'RIGHT']):
+                    self.record_failed_movement(coords, actions[0], "movement_blocked")
+                elif (prev_coords == coords and 
+                      isinstance(actions, str) and 
+                      actions in ['UP', 'DOWN', 'LEFT', 'RIGHT']):
+                    self.record_failed_movement(coords, actions, "movement_blocked")
+
+        # Record this step in history with reasoning
+        game_state_summary = self.create_game_state_summary(game_state)
+        action_with_reasoning = f"{actions} | Reasoning: {reasoning}" if reasoning else str(actions)
+        history_entry = HistoryEntry(
+            timestamp=datetime.now(),
+            player_coords=coords,
+            map_id=map_id,
+            context=context,
+            action_taken=action_with_reasoning,
+            game_state_summary=game_state_summary
+        )
+        self.state.history.append(history_entry)
+        
+        # Update recent actions
+        if isinstance(actions, list):
+            self.state.recent_actions.extend(actions)
+        else:
+            self.state.recent_actions.append(actions)
+        log_llm_action(actions, self.state.step_counter, reasoning)
+        
+        # Reset stuck detection for other locations when we move
+        if coords:
+            keys_to_reset = [k for k in self.state.stuck_detection.keys() 
+                           if not k.startswith(f"{coords[0]}_{coords[1]}")]
+            for key in keys_to_reset:
+                if self.state.stuck_detection[key] > 0:
+                    self.state.stuck_detection[key] = max(0, self.state.stuck_detection[key] - 1)
+        
+        # Update server with agent step and metrics (for agent thinking display)
+        self._update_server_metrics()
+        
+        return actions
+    
+    def request_search_plan(self, objective: Dict[str, Any], timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """Ask the server's savestate search planner for a button plan (None if unavailable)"""
+        try:
+            from utils.http_transport import get_http_client
+            response = get_http_client().post(self.planner_url, json=objective, timeout=timeout)
+            if response.status_code != 200:
+                logger.debug(f"Planner declined {objective}: {response.status_code}")
+                return None
+            return response.json()
+        except Exception as e:
+            # Silent fail - server might not be running or in different mode
+            logger.debug(f"Planner unavailable: {e}")
+            return None
+    
+    def get_planner_suggestion(self, context: str) -> Optional[Dict[str, Any]]:
+        """Plan toward the first coordinate sub-objective, or through the current dialogue"""
+        if not self.use_search_planner:
+            return None
+        
+        objective = None
+        if context == "overworld":
+            for obj in self.get_active_objectives():
+                if (obj.objective_type == "location" and isinstance(obj.target_value, (tuple, list))
+                        and len(obj.target_value) == 2):
+                    # Same radius check_objective_completion uses
+                    objective = {"objective": "coordinate", "target": list(obj.target_value), "tolerance": 2}
+                    break
+        elif context == "dialogue":
+            objective = {"objective": "dialogue", "max_depth": 2}
+        
+        if objective is None:
+            return None
+        plan = self.request_search_plan(objective)
+        if plan is not None:
+            plan["objective"] = objective
+        return plan
+    
+    def _format_planner_suggestion(self, plan: Optional[Dict[str, Any]]) -> str:
+        """Planner result as a prompt section (empty when there is nothing useful)"""
+        if not plan or not plan.get("buttons"):
+            return ""
+        outcome = "reaches" if plan.get("reached") else "gets closest to"
+        return (f"SEARCH PLANNER SUGGESTION (simulated ahead in the emulator):\n"
+                f"{', '.join(plan['buttons'])} {outcome} the {plan['objective']['objective']} objective")
+    
     def _update_server_metrics(self):
         """Update server with current agent step count and LLM metrics"""
         try:
-            import requests
+            import httpx
+            from utils.http_transport import get_http_client
             from utils.llm_logger import get_llm_logger
             
             # Get current LLM metrics
@@ -751,14 +1024,14 @@ Context: {context} | Coords: {coords} """
             
             # Send metrics to server
             try:
-                response = requests.post(
+                response = get_http_client().post(
                     "http://localhost:8000/agent_step",
                     json={"metrics": metrics},
                     timeout=1
                 )
                 if response.status_code != 200:
                     logger.warning(f"Failed to update server metrics: {response.status_code}")
-            except requests.exceptions.RequestException:
+            except httpx.HTTPError:
                 # Silent fail - server might not be running or in different mode
                 pass
                 
@@ -767,22 +1040,8 @@ Context: {context} | Coords: {coords} """
     
     def _parse_actions(self, response: str) -> List[str]:
         """Parse action response from LLM into list of valid actions"""
-        response_upper = response.upper().strip()
-        valid_actions = ['A', 'B', 'START', 'SELECT', 'UP', 'DOWN', 'LEFT', 'RIGHT']
-        
         # Parse multiple actions (could be comma or space separated)
-        actions_found = []
-        # Replace commas with spaces for consistent parsing
-        response_clean = response_upper.replace(',', ' ').replace('.', ' ')
-        tokens = response_clean.split()
-        
-        for token in tokens:
-            if token in valid_actions:
-                # Skip if this token appears to be part of a section header
-                # (i.e., preceded by other letters without space)
-                actions_found.append(token)
-                if len(actions_found) >= 10:  # Max 10 actions
-                    break
+        actions_found = _extract_actions(response)
         
         # If no valid actions found, use default
         if not actions_found:
@@ -844,8 +1103,11 @@ Context: {context} | Coords: {coords} """
                     current_section = 'action'
                     # Extract actions from this line
                     action_text = line[7:].strip()  # Remove "ACTION:" prefix
-                    if action_text:  # Only parse if there's content
-                        actions = self._parse_actions(action_text)
+                    actions = _extract_actions(action_text)
+                elif not line:
+                    # A blank line after the buttons ends the ACTION block (as in StreamingActionParser)
+                    if current_section == 'action' and actions:
+                        current_section = None
                 elif line and current_section:
                     # Continue content of current section
                     if current_section == 'analysis':
@@ -858,12 +1120,10 @@ Context: {context} | Coords: {coords} """
                         reasoning += " " + line
                     elif current_section == 'action':
                         # Additional action parsing from action section content
-                        if line.strip():  # Only process non-empty lines
-                            additional_actions = self._parse_actions(line)
-                            actions.extend(additional_actions)
-                            if len(actions) >= 10:  # Max 10 actions
-                                actions = actions[:10]
-                                break
+                        actions.extend(_extract_actions(line))
+                        if len(actions) >= MAX_ACTIONS_PER_STEP:
+                            actions = actions[:MAX_ACTIONS_PER_STEP]
+                            current_section = None
             
             # Process objectives if mentioned
             if objectives_section:
@@ -0,0 +1,173 @@
+"""
+Memory-first dialog reading for Pokemon Emerald.
+
+Reads dialog text straight from the RAM string buffers with a precomputed
+charmap table (one memory slice per buffer, no per-byte work in Python), caches
+decoded text by buffer checksum, and exposes the text printer / message box
+flags so callers only fall back to OCR when RAM and the screen disagree.
+"""
+
+import logging
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+from .emerald_utils import EmeraldCharmap
+
+logger = logging.getLogger(__name__)
+
+# Byte -> decoded string, built once from the Emerald charmap
+CHARMAP_TABLE: Tuple[str, ...] = tuple(EmeraldCharmap.charmap)
+TEXT_TERMINATOR = bytes([EmeraldCharmap.terminator])
+VALID_TEXT_BYTES: Tuple[bool, ...] = tuple(char != "" for char in CHARMAP_TABLE)
+
+# pokeemerald text printer render states (RENDER_STATE_HANDLE_CHAR .. RENDER_STATE_PAUSE)
+MAX_TEXT_PRINTER_STATE = 6
+MAX_WINDOWS = 32
+
+
+def decode_text_buffer(data: bytes) -> str:
+    """Decode an Emerald string buffer up to its terminator using the charmap table"""
+    end = data.find(TEXT_TERMINATOR)
+    if end >= 0:
+        data = data[:end]
+    return "".join(map(CHARMAP_TABLE.__getitem__, data))
+
+
+def _clean_buffer_text(text: str) -> str:
+    """Normalize decoded buffer text, returns "" if it is too short to be dialog"""
+    if len(text.strip()) <= 5:  # Minimum meaningful length
+        return ""
+    cleaned = " ".join(text.split())
+    return cleaned if len(cleaned) > 5 else ""
+
+
+@dataclass
+class DialogSignals:
+    """Snapshot of the RAM fields that say whether a message box is up"""
+    printer_valid: bool       # Text printer 0 looks like a real TextPrinter struct
+    printer_active: bool      # Text printer 0 is currently printing characters
+    printer_state: int
+    printer_window: int
+    script_global_mode: int
+    script_immediate_mode: int
+    msg_is_signpost: int
+    msg_box_cancelable: int
+    dialog_state: int
+    overworld_freeze: int
+
+    @property
+    def script_running(self) -> bool:
+        """A script context is executing (same valid range as script dialog detection)"""
+        return 1 <= self.script_global_mode <= 10 or 1 <= self.script_immediate_mode <= 10
+
+    @property
+    def message_box_flags(self) -> bool:
+        """Message box / dialog flags are set to reasonable (initialized) values"""
+        return (
+            0 < self.msg_is_signpost <= 10
+            or 0 < self.msg_box_cancelable <= 10
+            or 0 < self.dialog_state < 0xFF
+            or self.overworld_freeze > 0
+        )
+
+    @property
+    def box_expected(self) -> bool:
+        """RAM says a dialogue box should currently be on screen"""
+        if self.printer_valid and self.printer_active:
+            return True
+        return self.script_running or self.message_box_flags
+
+
+class DialogReader:
+    """Reads dialog text and message box state from RAM with checksum caching"""
+
+    def __init__(self, read_memory: Callable[[int, int], bytes], addresses):
+        """
+        Args:
+            read_memory: Callable (address, size) -> bytes, one slice per call
+            addresses: MemoryAddresses with text buffer and dialog flag addresses
+        """
+        self._read_memory = read_memory
+        self.addresses = addresses
+
+        # Text buffer addresses from Pokemon Emerald decompilation symbols
+        # https://raw.githubusercontent.com/pret/pokeemerald/symbols/pokeemerald.sym
+        # Order by size (largest first) to prioritize longer dialog text
+        self.text_buffers: List[Tuple[int, int]] = [
+            (addresses.G_STRING_VAR4, 1000),  # Main string variable 4 (largest) - PRIORITY
+            (addresses.G_DISPLAYED_STRING_BATTLE, 300),  # Battle dialog text
+            (addresses.G_STRING_VAR1, 256),   # Main string variable 1
+            (addresses.G_STRING_VAR2, 256),   # Main string variable 2
+            (addresses.G_STRING_VAR3, 256),   # Main string variable 3
+            (addresses.G_BATTLE_TEXT_BUFF1, 16),  # Battle text buffer 1
+            (addresses.G_BATTLE_TEXT_BUFF2, 16),  # Battle text buffer 2
+            (addresses.G_BATTLE_TEXT_BUFF3, 16),  # Battle text buffer 3
+            # Legacy addresses (keeping for compatibility)
+            (addresses.TEXT_BUFFER_1, 200),
+            (addresses.TEXT_BUFFER_2, 200),
+            (addresses.TEXT_BUFFER_3, 200),
+            (addresses.TEXT_BUFFER_4, 200),
+        ]
+
+        # buffer address -> (checksum of raw bytes, cleaned text)
+        self._buffer_cache: Dict[int, Tuple[int, str]] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def clear_cache(self):
+        """Forget decoded buffers (e.g. after loading a state)"""
+        self._buffer_cache.clear()
+
+    def _read_buffer_text(self, address: int, size: int) -> str:
+        """Decode one buffer, reusing the previous result if its bytes are unchanged"""
+        data = self._read_memory(address, size)
+        checksum = zlib.crc32(data)
+        cached = self._buffer_cache.get(address)
+        if cached is not None and cached[0] == checksum:
+            self.cache_hits += 1
+            return cached[1]
+
+        self.cache_misses += 1
+        text = _clean_buffer_text(decode_text_buffer(data))
+        self._buffer_cache[address] = (checksum, text)
+        return text
+
+    def read_text(self) -> str:
+        """Return the longest meaningful text found in the dialog buffers"""
+        dialog_text = ""
+        for buffer_addr, buffer_size in self.text_buffers:
+            try:
+                text = self._read_buffer_text(buffer_addr, buffer_size)
+            except Exception as e:
+                logger.debug(f"Failed to read from buffer 0x{buffer_addr:08X} (size: {buffer_size}): {e}")
+                continue
+            # Prefer longer text (more likely to be full dialog)
+            if len(text) > len(dialog_text):
+                dialog_text = text
+        return dialog_text.strip()
+
+    def _read_u8(self, address: int) -> int:
+        return self._read_memory(address, 1)[0]
+
+    def read_signals(self) -> DialogSignals:
+        """Snapshot text printer, script context and message box flags"""
+        a = self.addresses
+        printer = self._read_memory(a.TEXT_PRINTERS, a.TEXT_PRINTER_SIZE)
+        active = printer[a.TEXT_PRINTER_ACTIVE_OFFSET]
+        state = printer[a.TEXT_PRINTER_STATE_OFFSET]
+        window = printer[a.TEXT_PRINTER_WINDOW_OFFSET]
+        printer_valid = active in (0, 1) and state <= MAX_TEXT_PRINTER_STATE and window < MAX_WINDOWS
+
+        return DialogSignals(
+            printer_valid=printer_valid,
+            printer_active=printer_valid and active == 1,
+            printer_state=state,
+            printer_window=window,
+            script_global_mode=self._read_u8(a.SCRIPT_CONTEXT_GLOBAL + a.SCRIPT_MODE_OFFSET),
+            script_immediate_mode=self._read_u8(a.SCRIPT_CONTEXT_IMMEDIATE + a.SCRIPT_MODE_OFFSET),
+            msg_is_signpost=self._read_u8(a.MSG_IS_SIGNPOST),
+            msg_box_cancelable=self._read_u8(a.MSG_BOX_CANCELABLE),
+            dialog_state=self._read_u8(a.DIALOG_STATE),
+            overworld_freeze=self._read_u8(a.OVERWORLD_FREEZE),
+        )
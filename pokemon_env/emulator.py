@@ -3,10 +3,10 @@ import time
 import threading
 import queue
 import tempfile
-import json
 import os
 import shutil
 import hashlib
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 import numpy as np
@@ -18,12 +18,20 @@ import mgba.image
 from mgba._pylib import ffi, lib
 
 from .memory_reader import PokemonEmeraldReader
+from .milestone_rules import MilestoneRuleEngine, TRACKED_MILESTONES
+from .milestone_store import MilestoneStore, read_snapshot
+from .ram_watch import RamWatcher, milestone_watches
+from .snapshot_pool import DEFAULT_MAX_BYTES, SnapshotHandle, SnapshotPool
 from utils.state_formatter import save_persistent_world_map, load_persistent_world_map
 
 logger = logging.getLogger(__name__)
 
 # some acknowledgement to https://github.com/dvruette/pygba
 
+# Order used for split times: tracked milestones, then badges (tracked separately)
+SPLIT_ORDER = TRACKED_MILESTONES + ("STONE_BADGE",)
+SPLIT_ORDER_INDEX = {milestone_id: index for index, milestone_id in enumerate(SPLIT_ORDER)}
+
 class MilestoneTracker:
     """Persistent milestone tracking system integrated with emulator"""
     
@@ -40,32 +48,51 @@ class MilestoneTracker:
         self.milestones = {}
         self.latest_milestone = None
         self.latest_split_time = "00:00:00"
+        # Writes go through a background writer; the game thread never touches disk
+        self._store = MilestoneStore(self.filename)
         # Don't automatically load from file - only load when explicitly requested
     
+    @property
+    def store(self) -> MilestoneStore:
+        """Write-behind store for the current runtime file (follows changes to self.filename)"""
+        if self._store.path != self.filename:
+            self._store.close()
+            self._store = MilestoneStore(self.filename)
+        return self._store
+    
+    @staticmethod
+    def state_milestones_file(state_filename: str) -> str:
+        """Milestones file saved next to a state file"""
+        state_dir = os.path.dirname(state_filename)
+        base_name = os.path.splitext(os.path.basename(state_filename))[0]
+        return os.path.join(state_dir, f"{base_name}_milestones.json")
+    
+    def _set_milestones(self, milestones: dict):
+        """Replace in-memory progress and recompute the latest milestone"""
+        self.milestones = milestones
+        
+        # Determine the latest completed milestone based on timestamps
+        latest_timestamp = 0
+        latest_milestone_id = None
+        for milestone_id, milestone_data in self.milestones.items():
+            if milestone_data.get('completed', False):
+                timestamp = milestone_data.get('timestamp', 0)
+                if timestamp > latest_timestamp:
+                    latest_timestamp = timestamp
+                    latest_milestone_id = milestone_id
+        
+        # Set the latest milestone if we found one
+        if latest_milestone_id:
+            self.latest_milestone = latest_milestone_id
+            self.latest_split_time = self.milestones[latest_milestone_id].get('split_formatted', '00:00:00')
+            logger.info(f"Latest milestone from file: {latest_milestone_id}")
+    
     def load_from_file(self):
-        """Load milestone progress from file"""
+        """Load milestone progress from file, replaying any events logged after the last snapshot"""
         try:
-            if os.path.exists(self.filename):
-                with open(self.filename, 'r') as f:
-                    data = json.load(f)
-                    self.milestones = data.get('milestones', {})
-                
-                # Determine the latest completed milestone based on timestamps
-                latest_timestamp = 0
-                latest_milestone_id = None
-                for milestone_id, milestone_data in self.milestones.items():
-                    if milestone_data.get('completed', False):
-                        timestamp = milestone_data.get('timestamp', 0)
-                        if timestamp > latest_timestamp:
-                            latest_timestamp = timestamp
-                            latest_milestone_id = milestone_id
-                
-                # Set the latest milestone if we found one
-                if latest_milestone_id:
-                    self.latest_milestone = latest_milestone_id
-                    self.latest_split_time = self.milestones[latest_milestone_id].get('split_formatted', '00:00:00')
-                    logger.info(f"Latest milestone from file: {latest_milestone_id}")
-                
+            store = self.store
+            if os.path.exists(self.filename) or os.path.exists(store.log_path):
+                self._set_milestones(store.load())
                 logger.info(f"Loaded {len(self.milestones)} milestone records from {self.filename}")
             else:
                 logger.info(f"No existing milestone file found, starting fresh")
@@ -75,27 +102,30 @@ class MilestoneTracker:
             self.milestones = {}
     
     def save_to_file(self):
-        """Save milestone progress to file"""
+        """Queue a full snapshot of the current progress (written in the background)"""
         try:
-            data = {
-                'milestones': self.milestones,
-                'last_updated': time.time(),
-                'version': '1.0'
-            }
-            with open(self.filename, 'w') as f:
-                json.dump(data, f, indent=2)
-            logger.debug(f"Saved milestone progress to {self.filename}")
+            self.store.record_replace(self.milestones)
+            logger.debug(f"Queued milestone progress for {self.filename}")
         except Exception as e:
             logger.warning(f"Error saving milestones to file: {e}")
     
-    def mark_completed(self, milestone_id: str, timestamp: float = None):
-        """Mark a milestone as completed and log split time"""
+    def flush(self):
+        """Block until all queued milestone writes are on disk"""
+        self.store.flush()
+    
+    def close(self):
+        """Flush pending writes and stop the background writer"""
+        self._store.close()
+    
+    def mark_completed(self, milestone_id: str, timestamp: float = None, frame: Optional[int] = None):
+        """Mark a milestone as completed and log split time (frame: emulator frame it happened on)"""
         if timestamp is None:
             timestamp = time.time()
         
         if milestone_id not in self.milestones or not self.milestones[milestone_id].get('completed', False):
             # Calculate split time from previous milestone or start
             split_time = self._calculate_split_time(milestone_id, timestamp)
+            total_time = self._calculate_total_time(timestamp)
             
             self.milestones[milestone_id] = {
                 'completed': True,
@@ -103,16 +133,18 @@ class MilestoneTracker:
                 'first_completed': timestamp,
                 'split_time': split_time,
                 'split_formatted': self._format_time(split_time),
-                'total_time': self._calculate_total_time(timestamp),
-                'total_formatted': self._format_time(self._calculate_total_time(timestamp))
+                'total_time': total_time,
+                'total_formatted': self._format_time(total_time)
             }
+            if frame is not None:
+                self.milestones[milestone_id]['frame'] = frame
             
             # Store the latest completed milestone for easy access
             self.latest_milestone = milestone_id
             self.latest_split_time = self._format_time(split_time)
             
             logger.info(f"Milestone completed: {milestone_id} (Split: {self._format_time(split_time)})")
-            self.save_to_file()
+            self.store.record_completed(milestone_id, self.milestones[milestone_id])
             return True
         return False
     
@@ -128,46 +160,18 @@ class MilestoneTracker:
         """Reset a milestone (for testing)"""
         if milestone_id in self.milestones:
             del self.milestones[milestone_id]
-            self.save_to_file()
+            self.store.record_reset(milestone_id)
             logger.info(f"Reset milestone: {milestone_id}")
     
     def _calculate_split_time(self, milestone_id: str, timestamp: float) -> float:
-        """Calculate split time from previous milestone completion or start"""
-        # Define milestone order for split calculation
-        milestone_order = [
-            # Phase 1: Game Initialization
-            "GAME_RUNNING", "PLAYER_NAME_SET", "INTRO_CUTSCENE_COMPLETE",
-            
-            # Phase 2: Tutorial & Starting Town
-            "LITTLEROOT_TOWN", "PLAYER_HOUSE_ENTERED", "PLAYER_BEDROOM", 
-            "RIVAL_HOUSE", "RIVAL_BEDROOM",
-            
-            # Phase 3: Professor Birch & Starter
-            "ROUTE_101", "STARTER_CHOSEN", "BIRCH_LAB_VISITED",
-            
-            # Phase 4: Rival
-            "OLDALE_TOWN", "ROUTE_103", "RECEIVED_POKEDEX",
-            
-            # Phase 5: Route 102 & Petalburg
-            "ROUTE_102", "PETALBURG_CITY", "DAD_FIRST_MEETING", "GYM_EXPLANATION",
-            
-            # Phase 6: Road to Rustboro City
-            "ROUTE_104_SOUTH", "PETALBURG_WOODS", "TEAM_AQUA_GRUNT_DEFEATED",
-            "ROUTE_104_NORTH", "RUSTBORO_CITY",
-            
-            # Phase 7: First Gym Challenge
-            "RUSTBORO_GYM_ENTERED", "ROXANNE_DEFEATED", "FIRST_GYM_COMPLETE",
-            
-            # Badge milestones (tracked separately)
-            "STONE_BADGE"
-        ]
-        
+        """Calculate split time from previous milestone completion or start (in-memory only)"""
         try:
             # Special case for first milestone - split time is 0
             if milestone_id == "GAME_RUNNING":
                 return 0.0
             
-            if milestone_id not in milestone_order:
+            current_index = SPLIT_ORDER_INDEX.get(milestone_id)
+            if current_index is None:
                 # For unlisted milestones, find the most recent completion
                 latest_timestamp = 0
                 for _, data in self.milestones.items():
@@ -175,12 +179,9 @@ class MilestoneTracker:
                         latest_timestamp = data.get('timestamp', 0)
                 return timestamp - latest_timestamp if latest_timestamp > 0 else 0.0
             
-            # Find the previous milestone in the order
-            current_index = milestone_order.index(milestone_id)
-            
             # Look backwards for the most recent completed milestone
             for i in range(current_index - 1, -1, -1):
-                prev_milestone = milestone_order[i]
+                prev_milestone = SPLIT_ORDER[i]
                 if self.is_completed(prev_milestone):
                     prev_timestamp = self.milestones[prev_milestone].get('timestamp', 0)
                     return timestamp - prev_timestamp
@@ -244,37 +245,31 @@ class MilestoneTracker:
     def reset_all(self):
         """Reset all milestones (for testing)"""
         self.milestones = {}
-        self.save_to_file()
+        self.store.record_reset_all()
         logger.info("Reset all milestones")
     
     def load_milestones_for_state(self, state_filename: str = None):
         """Load milestones from file, optionally with a specific state filename"""
         if state_filename:
             # If a state filename is provided, try to load milestones from a corresponding file
-            # Get the directory and base name of the state file
-            state_dir = os.path.dirname(state_filename)
-            base_name = os.path.splitext(os.path.basename(state_filename))[0]
-            milestone_filename = os.path.join(state_dir, f"{base_name}_milestones.json")
+            milestone_filename = self.state_milestones_file(state_filename)
             
             # Track that we loaded from a state-specific file
             self.loaded_state_milestones_file = milestone_filename
             logger.info(f"Loading milestones from state-specific file: {milestone_filename}")
             
             try:
-                # Temporarily change filename to load from state file
-                original_filename = self.filename
-                self.filename = milestone_filename
-                self.load_from_file()
-                # Restore runtime cache filename (always in main directory)
-                self.filename = original_filename
+                # A save for this state may still be queued
+                self.flush()
+                if os.path.exists(milestone_filename):
+                    self._set_milestones(read_snapshot(milestone_filename))
+                else:
+                    logger.info(f"Milestone file not found: {milestone_filename}, starting fresh milestones for this state")
+                    self.milestones = {}
+                # The runtime cache now continues from the state's progress
+                self.store.record_replace(self.milestones)
                 logger.info(f"Loaded {len(self.milestones)} milestones from state {state_filename}")
                 logger.info(f"Runtime milestone cache will be saved to: {self.filename}")
-            except FileNotFoundError:
-                logger.info(f"Milestone file not found: {milestone_filename}, starting fresh milestones for this state")
-                # Start with empty milestones for this state
-                self.milestones = {}
-                # Don't create the state file, just use runtime cache
-                logger.info(f"Runtime milestone cache will be saved to: {self.filename}")
             except Exception as e:
                 logger.error(f"Error loading milestone file {milestone_filename}: {e}")
                 # Fall back to default milestone file
@@ -288,31 +283,15 @@ class MilestoneTracker:
             self.load_from_file()
     
     def save_milestones_for_state(self, state_filename: str = None):
-        """Save milestones to file, optionally with a specific state filename"""
+        """Save milestones to file, optionally with a specific state filename.
+        
+        The file is written by the background writer; call flush() if it must exist on return.
+        """
         if state_filename:
             # If a state filename is provided, save milestones to a corresponding file
-            # Get the directory and base name of the state file
-            state_dir = os.path.dirname(state_filename)
-            base_name = os.path.splitext(os.path.basename(state_filename))[0]
-            milestone_filename = os.path.join(state_dir, f"{base_name}_milestones.json")
-            
-            original_filename = self.filename
-            self.filename = milestone_filename
+            milestone_filename = self.state_milestones_file(state_filename)
             logger.info(f"Saving {len(self.milestones)} milestones to state-specific file: {milestone_filename}")
-            
-            try:
-                self.save_to_file()
-                logger.info(f"Successfully saved milestones to {milestone_filename}")
-            except Exception as e:
-                logger.error(f"Error saving milestone file {milestone_filename}: {e}")
-                # Fall back to default milestone file
-                self.filename = original_filename
-                self.save_to_file()
-                return original_filename
-            finally:
-                # Restore original filename
-                self.filename = original_filename
-            
+            self.store.export(milestone_filename, self.milestones)
             return milestone_filename
         else:
             # Save to default milestone file
@@ -351,6 +330,13 @@ class EmeraldEmulator:
         
         # Milestone tracker for progress tracking (using cache file)
         self.milestone_tracker = MilestoneTracker(os.path.join(self.cache_dir, "milestones_progress.json"))
+        # Compiled milestone rules, evaluated against state deltas
+        self.milestone_engine = MilestoneRuleEngine()
+        
+        # Per-frame RAM watchpoints that drive milestone detection (see enable_milestone_watch)
+        self.frame_count = 0
+        self.ram_watcher = None
+        self._watch_fields = {}
 
         # Dialog state tracking for FPS adjustment
         self._cached_dialog_state = False
@@ -359,6 +345,10 @@ class EmeraldEmulator:
         
         # Track currently loaded state file
         self._current_state_file = None
+        
+        # In-memory savestate arena for search and retry loops (created on first snapshot)
+        self.snapshot_pool = None
+        self.snapshot_pool_bytes = DEFAULT_MAX_BYTES
 
         # Define key mapping for mgba
         self.KEY_MAP = {
@@ -461,6 +451,52 @@ class EmeraldEmulator:
         if self.core:
             for _ in range(frames):
                 self.core.run_frame()
+                self._after_frame()
+
+    def enable_milestone_watch(self):
+        """Detect milestones from per-frame RAM watchpoints instead of polling"""
+        if not self.memory_reader:
+            raise RuntimeError("Emulator not initialized")
+        self.ram_watcher = RamWatcher(self.read_memory, milestone_watches(self.memory_reader.addresses))
+        self._watch_fields = {}
+        logger.info(f"Milestone RAM watch enabled ({len(self.ram_watcher.watches)} fields)")
+
+    def _after_frame(self):
+        """Count the frame and diff the watched RAM fields"""
+        self.frame_count += 1
+        if self.ram_watcher is None:
+            return
+        changes = self.ram_watcher.poll(self.frame_count)
+        if changes:
+            self._on_watched_ram_change(changes)
+
+    def _on_watched_ram_change(self, changes):
+        """Decode only the fields that changed and run the milestone rules for this frame"""
+        changed = {change.name: change.new for change in changes}
+        fields = self._watch_fields
+        reader = self.memory_reader
+        try:
+            if "player_name" in changed:
+                fields["name"] = reader._decode_pokemon_text(changed["player_name"]).strip()
+            if "party_count" in changed or "party" not in fields:
+                fields["party"] = [{"species_name": p.species_name} for p in reader.read_party_pokemon()]
+            if "badges" in changed or "system_flags" in changed or "badges" not in fields:
+                fields["badges"] = reader.read_badges()
+            # The moving van location depends on party and badges as well as the map id
+            if changed.keys() & {"map", "party_count", "badges"} or "location" not in fields:
+                fields["location"] = reader.read_location()
+        except Exception as e:
+            logger.debug(f"Failed to decode watched RAM fields: {e}")
+            return
+
+        state = {
+            "player": {"location": fields["location"], "name": fields.get("name", ""), "party": fields["party"]},
+            "game": {"badges": fields["badges"]},
+        }
+        completed = self.milestone_engine.update(state, self.milestone_tracker, timestamp=time.time(),
+                                                 frame=self.frame_count)
+        for milestone_id in completed:
+            print(f"🎯 Milestone detected: {milestone_id} (frame {self.frame_count})")
 
     def get_current_fps(self, base_fps: int = 30) -> int:
         """Get current FPS - quadruples during dialog for faster text progression"""
@@ -524,6 +560,7 @@ class EmeraldEmulator:
                 self.core.add_keys(key_code)
         
         self.core.run_frame()
+        self._after_frame()
         
         # Clear all buttons
         for button in buttons:
@@ -601,6 +638,94 @@ class EmeraldEmulator:
             logger.error(f"Failed to save state: {e}")
             return None
 
+    def _get_snapshot_pool(self) -> SnapshotPool:
+        if self.snapshot_pool is None:
+            mgba_core = self.core._core
+            
+            def save_into(buffer) -> bool:
+                return bool(mgba_core.saveState(mgba_core, ffi.from_buffer("unsigned char[]", buffer,
+                                                                           require_writable=True)))
+            
+            def load_from(buffer) -> bool:
+                return bool(mgba_core.loadState(mgba_core, ffi.from_buffer("unsigned char[]", buffer)))
+            
+            self.snapshot_pool = SnapshotPool(mgba_core.stateSize(mgba_core), save_into, load_from,
+                                              self.snapshot_pool_bytes)
+            logger.info(f"Snapshot pool: {self.snapshot_pool.capacity} slots of {self.snapshot_pool.state_size} bytes")
+        return self.snapshot_pool
+
+    def snapshot(self, pin: bool = False) -> SnapshotHandle:
+        """Snapshot the current state into the in-memory pool (no bytes copy, no file I/O)"""
+        if not self.core:
+            raise RuntimeError("Emulator not initialized")
+        return self._get_snapshot_pool().snapshot(frame=self.frame_count, pin=pin)
+
+    def restore(self, handle: SnapshotHandle):
+        """Restore a pooled snapshot without touching milestone, map or stitcher files"""
+        if not self.core:
+            raise RuntimeError("Emulator not initialized")
+        self._get_snapshot_pool().restore(handle)
+        if handle.frame is not None:
+            self.frame_count = handle.frame
+        self._reset_runtime_caches()
+
+    def _reset_runtime_caches(self):
+        """Only in-memory caches are reset; the next frame re-reads everything"""
+        self._mem_cache = {}
+        if self.ram_watcher is not None:
+            self.ram_watcher.reset()
+            self._watch_fields = {}
+        self.milestone_engine.reset()
+        if hasattr(self, '_cached_state'):
+            delattr(self, '_cached_state')
+        if hasattr(self, '_cached_state_time'):
+            delattr(self, '_cached_state_time')
+        if self.memory_reader:
+            self.memory_reader.reset_dialog_tracking()
+            self.memory_reader.invalidate_map_cache(clear_buffer_address=False)
+
+    def create_search_clone(self) -> "EmeraldEmulator":
+        """
+        A second headless emulator on the same ROM for lookahead search.
+        
+        Frames simulated on the clone never reach the live game's video, frame
+        cache, map stitcher or milestone log. It shares this emulator's milestone
+        tracker for read-only completion checks. Bring it to the live state with
+        sync_from_state() before each search.
+        """
+        clone = EmeraldEmulator(self.rom_path, headless=True, sound=False)
+        clone.milestone_tracker = self.milestone_tracker
+        clone.snapshot_pool_bytes = self.snapshot_pool_bytes
+        clone.initialize()
+        return clone
+
+    def sync_from_state(self, state_bytes: bytes, frame_count: Optional[int] = None):
+        """Jump to a raw state captured from another emulator (no file I/O, no extra frame)"""
+        if not self.core:
+            raise RuntimeError("Emulator not initialized")
+        self.core.load_raw_state(bytes(state_bytes))
+        self.core.set_keys(raw=0)
+        if frame_count is not None:
+            self.frame_count = frame_count
+        self._reset_runtime_caches()
+
+    @contextmanager
+    def lookahead(self):
+        """
+        Explore from the current state (e.g. search planning).
+        
+        Milestone detection is suspended so simulated futures never count, and the
+        game is restored to the starting snapshot on exit. Yields that snapshot.
+        """
+        root = self.snapshot(pin=True)
+        watcher, self.ram_watcher = self.ram_watcher, None
+        try:
+            yield root
+        finally:
+            self.ram_watcher = watcher
+            self.restore(root)
+            self.snapshot_pool.discard(root)
+
     def load_state(self, path: Optional[str] = None, state_bytes: Optional[bytes] = None):
         """Load emulator state from file or memory"""
         if not self.core:
@@ -617,6 +742,12 @@ class EmeraldEmulator:
                 self.core.load_raw_state(state_bytes)
                 logger.info("State loaded.")
                 
+                # Watched fields jump on load, re-read all of them on the next frame
+                if self.ram_watcher is not None:
+                    self.ram_watcher.reset()
+                    self._watch_fields = {}
+                self.milestone_engine.reset()
+                
                 # Reset dialog tracking and invalidate map cache when loading new state
                 if self.memory_reader:
                     self.memory_reader.reset_dialog_tracking()
@@ -648,17 +779,16 @@ class EmeraldEmulator:
                     print(f"🗺️ DEBUG: Loading state from path: {path}")
                     # Copy state files to cache first
                     self._copy_state_files_to_cache(path)
-                    # Load milestones from cache file
-                    cache_milestones_file = os.path.join(self.cache_dir, "milestones_progress.json")
-                    if os.path.exists(cache_milestones_file):
-                        # Update filename and then load
-                        self.milestone_tracker.filename = cache_milestones_file
-                        self.milestone_tracker.load_from_file()
-                        logger.info(f"Milestones loaded from cache file: {cache_milestones_file}")
-                    else:
-                        # Fallback to state-specific file
+                    # Load milestones straight from the state's file; the runtime cache
+                    # is rewritten from memory by the background writer
+                    self.milestone_tracker.flush()
+                    if os.path.exists(MilestoneTracker.state_milestones_file(path)):
                         self.milestone_tracker.load_milestones_for_state(path)
                         logger.info(f"Milestones loaded for state {path}")
+                    else:
+                        # No state-specific milestones: keep the runtime cache
+                        self.milestone_tracker.load_from_file()
+                        logger.info(f"Milestones loaded from cache file: {self.milestone_tracker.filename}")
                     
                     # Load the persistent location grids (contains all map data)
                     print(f"🗺️ DEBUG: About to call _load_persistent_grids_for_state")
@@ -700,10 +830,6 @@ class EmeraldEmulator:
                         shutil.copy2(current_stitcher_file, target_stitcher_file)
                         logger.info(f"Map stitcher data copied to {target_stitcher_file}")
                     
-                    # Also save current milestones
-                    if hasattr(self, 'milestone_tracker'):
-                        milestone_filename = self.milestone_tracker.save_milestones_for_state(state_filename)
-                        logger.info(f"Milestones saved to {milestone_filename}")
                 else:
                     # For regular saves, update the map stitcher save file path
                     self.memory_reader.update_map_stitcher_save_file(state_filename)
@@ -744,7 +870,7 @@ class EmeraldEmulator:
             logger.error(f"Error loading persistent grids for state: {e}")
     
     def _copy_state_files_to_cache(self, state_filename: str):
-        """Copy state-specific map stitcher and milestones to cache for working storage"""
+        """Copy state-specific map stitcher to cache for working storage (milestones are loaded by MilestoneTracker)"""
         import os
         import shutil
         
@@ -777,16 +903,6 @@ class EmeraldEmulator:
             with open(cache_map_stitcher_file, 'w') as f:
                 json.dump(empty_data, f, indent=2)
             print(f"🗺️ DEBUG: No state file found, created fresh map stitcher cache")
-        
-        # Copy milestones file to main directory (not cache, as requested)
-        state_milestones_file = os.path.join(state_dir, f"{base_name}_milestones.json")
-        cache_milestones_file = os.path.join(self.cache_dir, "milestones_progress.json")  # Cache directory as requested
-        
-        if os.path.exists(state_milestones_file):
-            shutil.copy2(state_milestones_file, cache_milestones_file)
-            print(f"🗺️ DEBUG: Copied milestones from {state_milestones_file} to {cache_milestones_file}")
-        else:
-            print(f"🗺️ DEBUG: No state-specific milestones file found: {state_milestones_file}")
     
     def start_frame_capture(self, fps: int = 30):
         """Start asynchronous frame capture"""
@@ -839,6 +955,7 @@ class EmeraldEmulator:
             self.frame_thread.join(timeout=1)
         if self.core:
             self.core = None
+        self.milestone_tracker.flush()
         logger.info("Emulator stopped.")
 
     def get_info(self) -> Dict[str, Any]:
@@ -1098,388 +1215,16 @@ class EmeraldEmulator:
     def check_and_update_milestones(self, game_state: Dict[str, Any]):
         """Check current game state and update milestones"""
         try:
-            # Debug: Show current state
-            location = game_state.get("player", {}).get("location", "Unknown")
-            print(f"🔍 Checking milestones for location: {location}")
-            # Only check milestones that aren't already completed
-            milestones_to_check = [
-                # Phase 1: Game Initialization  
-                "GAME_RUNNING", "PLAYER_NAME_SET", "INTRO_CUTSCENE_COMPLETE",
-                
-                # Phase 2: Tutorial & Starting Town
-                "LITTLEROOT_TOWN", "PLAYER_HOUSE_ENTERED", "PLAYER_BEDROOM", 
-                "RIVAL_HOUSE", "RIVAL_BEDROOM",
-                
-                # Phase 3: Professor Birch & Starter
-                "ROUTE_101", "STARTER_CHOSEN", "BIRCH_LAB_VISITED",
-                
-                # Phase 4: Rival
-                "OLDALE_TOWN", "ROUTE_103", "RECEIVED_POKEDEX",
-                
-                # Phase 5: Route 102 & Petalburg
-                "ROUTE_102", "PETALBURG_CITY", "DAD_FIRST_MEETING", "GYM_EXPLANATION",
-                
-                # Phase 6: Road to Rustboro City
-                "ROUTE_104_SOUTH", "PETALBURG_WOODS", "TEAM_AQUA_GRUNT_DEFEATED", 
-                "ROUTE_104_NORTH", "RUSTBORO_CITY",
-                
-                # Phase 7: First Gym Challenge
-                "RUSTBORO_GYM_ENTERED", "ROXANNE_DEFEATED", "FIRST_GYM_COMPLETE"
-            ]
-            
-            for milestone_id in milestones_to_check:
-                if not self.milestone_tracker.is_completed(milestone_id):
-                    if self._check_milestone_condition(milestone_id, game_state):
-                        print(f"🎯 Milestone detected: {milestone_id}")
-                        self.milestone_tracker.mark_completed(milestone_id)
-                    else:
-                        # Debug: Log why condition failed for key milestones
-                        if milestone_id in ["INTRO_CUTSCENE_COMPLETE", "PLAYER_NAME_SET", "LITTLEROOT_TOWN"]:
-                            location = game_state.get("player", {}).get("location", "")
-                            print(f"❌ {milestone_id} condition not met (location: {location})")
-                else:
-                    # Debug: Log already completed milestones
-                    if milestone_id in ["INTRO_CUTSCENE_COMPLETE", "PLAYER_NAME_SET", "LITTLEROOT_TOWN"]:
-                        print(f"✅ {milestone_id} already completed")
+            # Only rules whose inputs changed since the last check are evaluated
+            for milestone_id in self.milestone_engine.update(game_state, self.milestone_tracker):
+                print(f"🎯 Milestone detected: {milestone_id}")
         
         except Exception as e:
             logger.warning(f"Error checking milestones: {e}")
     
     def _check_milestone_condition(self, milestone_id: str, game_state: Dict[str, Any]) -> bool:
         """Check if a specific milestone condition is met based on current game state"""
-        try:
-            # Test milestones (should always work)
-            if milestone_id == "GAME_RUNNING":
-                return True  # If we can execute this, game is running
-            elif milestone_id == "HAS_PARTY":
-                if game_state:
-                    party = game_state.get("player", {}).get("party", [])
-                    return len(party) > 0
-                return False
-            
-            # Location-based milestones - check current location
-            elif milestone_id == "LITTLEROOT_TOWN":
-                if game_state:
-                    location = game_state.get("player", {}).get("location", "")
-                    return "LITTLEROOT" in str(location).upper()
-                return False
-
-            elif milestone_id == "OLDALE_TOWN":
-                if game_state:
-                    # Only count Oldale Town if we've already been to Littleroot Town
-                    if not self.milestone_tracker.is_completed("LITTLEROOT_TOWN"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "OLDALE" in str(location).upper()
-                return False
-            elif milestone_id == "RUSTBORO_CITY":
-                if game_state:
-                    # Only count Rustboro City if we've already been to Petalburg City
-                    if not self.milestone_tracker.is_completed("PETALBURG_CITY"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "RUSTBORO" in str(location).upper()
-                return False
-            elif milestone_id == "DEWFORD_TOWN":
-                if game_state:
-                    # Only count Dewford Town if we've already been to Rustboro City
-                    if not self.milestone_tracker.is_completed("RUSTBORO_CITY"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "DEWFORD" in str(location).upper()
-                return False
-            elif milestone_id == "SLATEPORT_CITY":
-                if game_state:
-                    # Only count Slateport City if we've already been to Dewford Town
-                    if not self.milestone_tracker.is_completed("DEWFORD_TOWN"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "SLATEPORT" in str(location).upper()
-                return False
-            elif milestone_id == "MAUVILLE_CITY":
-                if game_state:
-                    # Only count Mauville City if we've already been to Slateport City
-                    if not self.milestone_tracker.is_completed("SLATEPORT_CITY"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "MAUVILLE" in str(location).upper()
-                return False
-                
-
-                
-            # Badge milestones - check badge count/list
-            elif milestone_id == "STONE_BADGE":
-                if game_state:
-                    badges = game_state.get("game", {}).get("badges", [])
-                    if isinstance(badges, list):
-                        return len(badges) >= 1 or any("Stone" in str(b) for b in badges)
-                    elif isinstance(badges, int):
-                        return badges >= 1
-                return False
-            elif milestone_id == "KNUCKLE_BADGE":
-                if game_state:
-                    badges = game_state.get("game", {}).get("badges", [])
-                    if isinstance(badges, list):
-                        return len(badges) >= 2 or any("Knuckle" in str(b) for b in badges)
-                    elif isinstance(badges, int):
-                        return badges >= 2
-                return False
-            elif milestone_id == "DYNAMO_BADGE":
-                if game_state:
-                    badges = game_state.get("game", {}).get("badges", [])
-                    if isinstance(badges, list):
-                        return len(badges) >= 3 or any("Dynamo" in str(b) for b in badges)
-                    elif isinstance(badges, int):
-                        return badges >= 3
-                return False
-                
-            # Phase 1: Game Initialization milestones
-            elif milestone_id == "INTRO_CUTSCENE_COMPLETE":
-                if game_state:
-                    location = game_state.get("player", {}).get("location", "")
-                    return "MOVING_VAN" in str(location).upper()
-                return False
-            elif milestone_id == "PLAYER_NAME_SET":
-                if game_state:
-                    player_name = game_state.get("player", {}).get("name", "")
-                    # Player name is set if we have a non-empty name that's not the default
-                    return (player_name and 
-                            str(player_name).strip() != "" and 
-                            str(player_name).strip() not in ["", "UNKNOWN", "PLAYER"])
-                return False
-                
-            # Phase 2: Tutorial & Starting Town milestones
-            elif milestone_id == "PLAYER_HOUSE_ENTERED":
-                if game_state:
-                    location = game_state.get("player", {}).get("location", "")
-                    return "LITTLEROOT TOWN BRENDANS HOUSE 1F" in str(location).upper()
-                return False
-            elif milestone_id == "PLAYER_BEDROOM":
-                if game_state:
-                    location = game_state.get("player", {}).get("location", "")
-                    return "LITTLEROOT TOWN BRENDANS HOUSE 2F" in str(location).upper()
-                return False
-            elif milestone_id == "RIVAL_HOUSE":
-                if game_state:
-                    location = game_state.get("player", {}).get("location", "")
-                    return "LITTLEROOT TOWN MAYS HOUSE 1F" in str(location).upper()
-                return False
-            elif milestone_id == "RIVAL_BEDROOM":
-                if game_state:
-                    location = game_state.get("player", {}).get("location", "")
-                    return "LITTLEROOT TOWN MAYS HOUSE 2F" in str(location).upper()
-                return False
-                
-            # Phase 3: Professor Birch & Starter milestones
-            elif milestone_id == "ROUTE_101":
-                if game_state:
-                    location = game_state.get("player", {}).get("location", "")
-                    return "ROUTE_101" in str(location).upper() or "ROUTE 101" in str(location).upper()
-                return False
-            elif milestone_id == "STARTER_CHOSEN":
-                if game_state:
-                    party = game_state.get("player", {}).get("party", [])
-                    return len(party) >= 1 and any(p.get("species_name", "").strip() for p in party)
-                return False
-            elif milestone_id == "BIRCH_LAB_VISITED":
-                if game_state:
-                    location = game_state.get("player", {}).get("location", "")
-                    return "LITTLEROOT TOWN PROFESSOR BIRCHS LAB" in str(location).upper()
-                return False
-                
-            # Phase 4: Early Route Progression milestones
-            elif milestone_id == "ROUTE_103":
-                if game_state:
-                    # Only count Route 103 if we've already been to Route 101 and have starter
-                    if not self.milestone_tracker.is_completed("ROUTE_101"):
-                        return False
-                    if not self.milestone_tracker.is_completed("STARTER_CHOSEN"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "ROUTE_103" in str(location).upper() or "ROUTE 103" in str(location).upper()
-                return False
-            # elif milestone_id == "RIVAL_BATTLE_1":
-            #     # Check for specific state hash from dialog after the battle (c9086d56)
-            #     if game_state:
-            #         # Create state hash for comparison
-            #         state_str = str(game_state)
-            #         state_hash = hashlib.md5(state_str.encode()).hexdigest()[:8]
-                    
-            #         # Check for battle completion state hash or traditional conditions
-            #         return (state_hash == "c9086d56" or 
-            #                 (self.milestone_tracker.is_completed("ROUTE_103") and
-            #                  self.milestone_tracker.is_completed("STARTER_CHOSEN")))
-            #     return False
-            elif milestone_id == "RECEIVED_POKEDEX":
-                if game_state:
-                    # Check if we're in Birch's lab AND have completed Route 103
-                    location = game_state.get("player", {}).get("location", "")
-                    return (self.milestone_tracker.is_completed("ROUTE_103") and 
-                            "LITTLEROOT TOWN PROFESSOR BIRCHS LAB" in str(location).upper())
-                return False
-            ## Phase 5: Route 102 & Petalburg
-            elif milestone_id == "ROUTE_102":
-                if game_state:
-                    # Only count Route 102 if we've received Pokedex
-                    if not self.milestone_tracker.is_completed("RECEIVED_POKEDEX"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "ROUTE_102" in str(location).upper() or "ROUTE 102" in str(location).upper()
-                return False
-            elif milestone_id == "PETALBURG_CITY":
-                if game_state:
-                    # Enforce proper game progression through required towns
-                    if not self.milestone_tracker.is_completed("LITTLEROOT_TOWN"):
-                        return False
-                    if not self.milestone_tracker.is_completed("OLDALE_TOWN"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "PETALBURG" in str(location).upper()
-                return False
-            elif milestone_id == "DAD_FIRST_MEETING":
-                # Meeting Dad happens in Petalburg Gym
-                if game_state:
-                    # Must have visited Petalburg City first
-                    if not self.milestone_tracker.is_completed("PETALBURG_CITY"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "PETALBURG CITY GYM" in str(location).upper() or "PETALBURG_CITY_GYM" in str(location).upper()
-                return False
-            elif milestone_id == "GYM_EXPLANATION":
-                # Gym explanation happens after meeting Dad in the gym
-                if game_state:
-                    # Must have met Dad and still be in gym
-                    if not self.milestone_tracker.is_completed("DAD_FIRST_MEETING"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "PETALBURG CITY GYM" in str(location).upper() or "PETALBURG_CITY_GYM" in str(location).upper()
-                return False
-                
-            # Phase 6: Pre-Gym Preparation milestones
-            elif milestone_id == "ROUTE_104_SOUTH":
-                if game_state:
-                    # Only count if we've been to Petalburg
-                    if not self.milestone_tracker.is_completed("PETALBURG_CITY"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "ROUTE_104" in str(location).upper() or "ROUTE 104" in str(location).upper()
-                return False
-            elif milestone_id == "MR_BRINEY_MET":
-                # Assume meeting Mr. Briney happens on Route 104
-                if game_state:
-                    return self.milestone_tracker.is_completed("ROUTE_104_SOUTH")
-                return False
-            elif milestone_id == "PETALBURG_WOODS":
-                if game_state:
-                    # Only count if we've been to Route 104
-                    if not self.milestone_tracker.is_completed("ROUTE_104_SOUTH"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "PETALBURG_WOODS" in str(location).upper() or "PETALBURG WOODS" in str(location).upper()
-                return False
-            elif milestone_id == "TEAM_AQUA_GRUNT_DEFEATED":
-                # Team Aqua grunt defeated at specific location in Petalburg Woods
-                if game_state:
-                    # Must have visited Petalburg Woods
-                    if not self.milestone_tracker.is_completed("PETALBURG_WOODS"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    # Check if in Petalburg Woods and at specific coordinates
-                    if "PETALBURG_WOODS" in str(location).upper() or "PETALBURG WOODS" in str(location).upper():
-                        # Check for Map_18_0B at coords (26,23) or (27,23)
-                        pos = game_state.get("player", {}).get("pos", [])
-                        if len(pos) >= 2:
-                            x, y = pos[0], pos[1]
-                            if y == 23 and x in [26, 27]:
-                                return True
-                    return self.milestone_tracker.is_completed("PETALBURG_WOODS")
-                return False
-            elif milestone_id == "DEVON_GOODS_OBTAINED":
-                # Assume Devon Goods obtained after defeating Team Aqua grunt
-                if game_state:
-                    return self.milestone_tracker.is_completed("TEAM_AQUA_GRUNT_DEFEATED")
-                return False
-                
-            # Phase 8: Rustboro City Approach milestones
-            elif milestone_id == "ROUTE_104_NORTH":
-                if game_state:
-                    # Only count if we've been through Petalburg Woods
-                    if not self.milestone_tracker.is_completed("PETALBURG_WOODS"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return (("ROUTE_104" in str(location).upper() or "ROUTE 104" in str(location).upper()) and 
-                            self.milestone_tracker.is_completed("DEVON_GOODS_OBTAINED"))
-                return False
-            elif milestone_id == "DEVON_CORP_VISITED":
-                if game_state:
-                    location = game_state.get("player", {}).get("location", "")
-                    return ("DEVON" in str(location).upper() and 
-                            self.milestone_tracker.is_completed("RUSTBORO_CITY"))
-                return False
-            elif milestone_id == "DEVON_GOODS_DELIVERED":
-                # Assume goods delivered after visiting Devon Corp
-                if game_state:
-                    return self.milestone_tracker.is_completed("DEVON_CORP_VISITED")
-                return False
-            elif milestone_id == "LETTER_RECEIVED":
-                # Assume letter received after delivering goods
-                if game_state:
-                    return self.milestone_tracker.is_completed("DEVON_GOODS_DELIVERED")
-                return False
-            elif milestone_id == "POKEBALLS_PURCHASED":
-                # Assume Pokeballs purchased in Rustboro City
-                if game_state:
-                    return self.milestone_tracker.is_completed("RUSTBORO_CITY")
-                return False
-                
-            # Phase 9: Gym Preparation milestones
-            elif milestone_id == "RUSTBORO_GYM_ENTERED":
-                if game_state:
-                    # Must have visited Rustboro City first
-                    if not self.milestone_tracker.is_completed("RUSTBORO_CITY"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    return "RUSTBORO_GYM" in str(location).upper() or "RUSTBORO CITY GYM" in str(location).upper()
-                return False
-            elif milestone_id == "GYM_TRAINERS_DEFEATED":
-                # Assume gym trainers defeated after entering gym
-                if game_state:
-                    return self.milestone_tracker.is_completed("RUSTBORO_GYM_ENTERED")
-                return False
-            elif milestone_id == "ROXANNE_BATTLE_STARTED":
-                # Assume Roxanne battle started after defeating gym trainers
-                if game_state:
-                    return self.milestone_tracker.is_completed("GYM_TRAINERS_DEFEATED")
-                return False
-                
-            # Phase 10: First Gym Victory milestones
-            elif milestone_id == "ROXANNE_DEFEATED":
-                # Roxanne defeated when Stone Badge is obtained
-                if game_state:
-                    # Must have Stone Badge
-                    return self.milestone_tracker.is_completed("STONE_BADGE")
-                return False
-            elif milestone_id == "TM_ROCK_TOMB_RECEIVED":
-                # Assume TM received after defeating Roxanne
-                if game_state:
-                    return self.milestone_tracker.is_completed("ROXANNE_DEFEATED")
-                return False
-            elif milestone_id == "FIRST_GYM_COMPLETE":
-                # Complete after getting Stone Badge and exiting gym
-                if game_state:
-                    # Must have Stone Badge and not be in gym
-                    if not self.milestone_tracker.is_completed("STONE_BADGE"):
-                        return False
-                    location = game_state.get("player", {}).get("location", "")
-                    # Not in any gym
-                    return "GYM" not in str(location).upper()
-                return False
-                
-            return False
-            
-        except Exception as e:
-            logger.warning(f"Error checking milestone condition {milestone_id}: {e}")
-            return False
+        return self.milestone_engine.check(milestone_id, game_state, self.milestone_tracker.is_completed)
     
     def get_milestones(self) -> Dict[str, Any]:
         """Get current milestone data and progress"""
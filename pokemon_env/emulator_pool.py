@@ -0,0 +1,395 @@
+"""
+Multi-process emulator pool with shared-memory observations.
+
+EmulatorPool runs one headless mGBA core per worker process, so dozens of games
+can run in parallel across every CPU of a node without contending for the GIL.
+Commands (step, reset, load/save state) travel over a pipe per worker, while
+observations are written by the workers straight into one shared-memory block:
+
+    frames:   (N, 160, 240, 3) uint8
+    features: (N,) RAM_FEATURE_DTYPE
+
+step_async()/step_wait() and reset_async()/reset_wait() let the caller overlap
+its own work (e.g. model inference) with emulation. A worker that crashes, hangs
+past the timeout or closes its pipe is restarted automatically from the last
+state it was reset to; `restarted` reports which workers were restarted by the
+last wait.
+"""
+
+import logging
+import multiprocessing as mp
+import shutil
+import tempfile
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .memory_reader import MemoryAddresses
+from .ram_features import RAM_FEATURE_DTYPE, actions_to_masks
+from .vector_env import GBA_HEIGHT, GBA_WIDTH, Actions, HeadlessCore
+
+logger = logging.getLogger(__name__)
+
+
+def _observation_views(buf, num_workers: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Frame and feature arrays laid out back to back in a shared buffer"""
+    frames_shape = (num_workers, GBA_HEIGHT, GBA_WIDTH, 3)
+    frames_size = int(np.prod(frames_shape))
+    features_offset = (frames_size + 7) // 8 * 8
+    frames = np.ndarray(frames_shape, dtype=np.uint8, buffer=buf, offset=0)
+    features = np.ndarray((num_workers,), dtype=RAM_FEATURE_DTYPE, buffer=buf, offset=features_offset)
+    return frames, features
+
+
+def _observation_nbytes(num_workers: int) -> int:
+    frames_size = num_workers * GBA_HEIGHT * GBA_WIDTH * 3
+    return (frames_size + 7) // 8 * 8 + num_workers * RAM_FEATURE_DTYPE.itemsize
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    try:
+        # The pool owns the block; workers must not unlink it when they exit
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(index: int, rom_path: str, shm_name: str, num_workers: int, conn,
+                 state_bytes: Optional[bytes], core_factory: Optional[Callable[[bytes, Path], Any]] = None):
+    """Worker process: own one core, write observations to shared memory, answer commands"""
+    if core_factory is None:
+        import mgba.log
+        mgba.log.silence()
+        core_factory = HeadlessCore
+
+    shm = _attach_shared_memory(shm_name)
+    tmp_dir = Path(tempfile.mkdtemp())
+    try:
+        frames, features = _observation_views(shm.buf, num_workers)
+        frame_out, features_out = frames[index], features[index]
+        addresses = MemoryAddresses()
+
+        try:
+            core = core_factory(Path(rom_path).read_bytes(), tmp_dir)
+            if state_bytes is not None:
+                core.load_state(state_bytes)
+            core.observe(frame_out, features_out, addresses)
+        except Exception as e:
+            # Report the boot failure instead of dying with a closed pipe
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+            return
+        conn.send(("ok", None))
+
+        while True:
+            command, payload = conn.recv()
+            try:
+                if command == "step":
+                    key_mask, num_frames = payload
+                    core.run(key_mask, num_frames)
+                    result = None
+                elif command == "load_state":
+                    core.load_state(payload)
+                    result = None
+                elif command == "reset":
+                    core.reset()
+                    result = None
+                elif command == "save_state":
+                    result = core.save_state()
+                elif command == "close":
+                    conn.send(("ok", None))
+                    return
+                else:
+                    raise ValueError(f"Unknown command: {command}")
+                if command != "save_state":
+                    core.observe(frame_out, features_out, addresses)
+                conn.send(("ok", result))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        # Drop array views before closing the mapping
+        frame_out = features_out = frames = features = None
+        try:
+            shm.close()
+        except BufferError:
+            pass
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class WorkerError(RuntimeError):
+    """A worker rejected a command (the worker itself is still healthy)"""
+
+    def __init__(self, message: str, workers: Sequence[int] = ()):
+        super().__init__(message)
+        self.workers = list(workers)  # Indices of the workers that rejected it
+
+
+class EmulatorPool:
+    """One headless Pokemon Emerald core per process with shared-memory observations"""
+
+    def __init__(self, rom_path: str, num_workers: int, initial_state: Optional[bytes] = None,
+                 timeout: float = 30.0, start_method: str = "spawn",
+                 core_factory: Optional[Callable[[bytes, Path], Any]] = None):
+        """
+        Args:
+            rom_path: Path to the Emerald ROM
+            num_workers: Number of worker processes (one core each)
+            initial_state: Savestate bytes that workers boot into and reset() restores
+            timeout: Seconds to wait for a worker reply before restarting it
+            start_method: multiprocessing start method ("spawn" is safe with threads)
+            core_factory: Picklable callable building a worker's core from (rom_bytes, tmp_dir)
+                (default: HeadlessCore)
+        """
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self.rom_path = rom_path
+        self.num_workers = num_workers
+        self.initial_state = initial_state
+        self.timeout = timeout
+        self.core_factory = core_factory
+        self._ctx = mp.get_context(start_method)
+
+        self._shm = None
+        self._processes: List[Optional[mp.Process]] = [None] * num_workers
+        self._conns = [None] * num_workers
+        # State each worker returns to on reset() or after a restart
+        self._reset_states: List[Optional[bytes]] = [initial_state] * num_workers
+        self._pending: List[int] = []
+
+        self.frames = None
+        self.features = None
+        self.restarts = np.zeros(num_workers, dtype=np.int64)
+        self.restarted = np.zeros(num_workers, dtype=bool)
+
+    # Lifecycle ---------------------------------------------------------------
+
+    def initialize(self):
+        """Create the shared observation block and start every worker"""
+        self._shm = shared_memory.SharedMemory(create=True, size=_observation_nbytes(self.num_workers))
+        self.frames, self.features = _observation_views(self._shm.buf, self.num_workers)
+        self.frames[...] = 0
+        self.features[...] = 0
+
+        for i in range(self.num_workers):
+            self._start_worker(i)
+        # Workers boot in parallel; wait for all of them
+        failed = {}
+        for i in range(self.num_workers):
+            ok, result = self._await_boot(i)
+            if not ok:
+                failed[i] = result
+        if failed:
+            self.close()
+            raise RuntimeError(f"Emulator workers failed to start: {failed}")
+        logger.info(f"Emulator pool started with {self.num_workers} workers")
+
+    def close(self):
+        """Stop every worker and release the shared memory"""
+        for i in range(self.num_workers):
+            conn = self._conns[i]
+            if conn is not None:
+                try:
+                    conn.send(("close", None))
+                    if conn.poll(1.0):
+                        conn.recv()
+                except (OSError, EOFError):
+                    pass
+            self._stop_worker(i)
+        self._pending = []
+        if self._shm is not None:
+            self.frames = self.features = None
+            try:
+                self._shm.close()
+            except BufferError:
+                logger.warning("Observation arrays still referenced; shared memory unmapped at exit")
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        self.initialize()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _start_worker(self, i: int):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(i, self.rom_path, self._shm.name, self.num_workers, child_conn, self._reset_states[i],
+                  self.core_factory),
+            name=f"emerald-worker-{i}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self._processes[i] = process
+        self._conns[i] = parent_conn
+
+    def _stop_worker(self, i: int):
+        process, conn = self._processes[i], self._conns[i]
+        if process is not None:
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=1.0)
+        if conn is not None:
+            conn.close()
+        self._processes[i] = None
+        self._conns[i] = None
+
+    def _restart_worker(self, i: int, reason: str):
+        logger.warning(f"Restarting emulator worker {i}: {reason}")
+        self._stop_worker(i)
+        self._start_worker(i)
+        self.restarts[i] += 1
+        self.restarted[i] = True
+        ok, result = self._await_boot(i)
+        if not ok:
+            raise RuntimeError(f"Emulator worker {i} failed to restart: {result}")
+
+    # Messaging ---------------------------------------------------------------
+
+    def _check_initialized(self):
+        if self._shm is None:
+            raise RuntimeError("Emulator pool not initialized")
+
+    def _indices(self, indices: Optional[Iterable[int]]) -> List[int]:
+        if indices is None:
+            return list(range(self.num_workers))
+        indices = [int(i) for i in indices]
+        for i in indices:
+            if not 0 <= i < self.num_workers:
+                raise IndexError(f"Worker index {i} out of range for {self.num_workers} workers")
+        return indices
+
+    def _await_reply(self, i: int, timeout: Optional[float]):
+        """(True, result) on success, (False, reason) if the worker is gone or hung"""
+        conn = self._conns[i]
+        try:
+            if not conn.poll(timeout):
+                return False, f"no reply within {timeout}s"
+            status, result = conn.recv()
+        except (EOFError, OSError) as e:
+            return False, f"pipe closed ({e})"
+        if status == "error":
+            raise WorkerError(f"Worker {i}: {result}", workers=[i])
+        return True, result
+
+    def _await_boot(self, i: int):
+        """(True, None) once a started worker is ready, (False, reason) if it failed to boot"""
+        try:
+            return self._await_reply(i, self.timeout)
+        except WorkerError as e:
+            return False, str(e)
+
+    def _send_all(self, messages: Sequence[Tuple[int, str, object]]):
+        if self._pending:
+            raise RuntimeError("Previous async call has not been waited on")
+        for i, command, payload in messages:
+            try:
+                self._conns[i].send((command, payload))
+            except (OSError, BrokenPipeError):
+                # Dead worker: it is restarted when the reply is collected
+                pass
+            self._pending.append(i)
+
+    def _wait_all(self, timeout: Optional[float]) -> List[object]:
+        timeout = self.timeout if timeout is None else timeout
+        pending, self._pending = self._pending, []
+        self.restarted[...] = False
+        results, errors, rejected, restart_errors = [], [], [], []
+        # Every pending reply is read before raising, so none is left for the next command
+        for i in pending:
+            try:
+                ok, result = self._await_reply(i, timeout)
+            except WorkerError as e:
+                errors.append(str(e))
+                rejected.append(i)
+                results.append(None)
+                continue
+            if not ok:
+                # The restarted worker has written its reset observation
+                try:
+                    self._restart_worker(i, result)
+                except RuntimeError as e:
+                    restart_errors.append(str(e))
+                result = None
+            results.append(result)
+        if restart_errors:
+            raise RuntimeError("; ".join(restart_errors + errors))
+        if errors:
+            raise WorkerError("; ".join(errors), workers=rejected)
+        return results
+
+    # Public API --------------------------------------------------------------
+
+    def step_async(self, actions: Actions, frames: int = 1):
+        """Send one key mask (or button list) per worker without waiting"""
+        self._check_initialized()
+        masks = actions_to_masks(actions, self.num_workers)
+        self._send_all([(i, "step", (int(masks[i]), frames)) for i in range(self.num_workers)])
+
+    def step_wait(self, timeout: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Wait for the pending step.
+
+        Returns:
+            (frames, features) views of shared memory; copy them to keep a history.
+        """
+        self._wait_all(timeout)
+        return self.frames, self.features
+
+    def step(self, actions: Actions, frames: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        self.step_async(actions, frames)
+        return self.step_wait()
+
+    def reset_async(self, indices: Optional[Iterable[int]] = None):
+        """Return workers to their reset state (initial_state, last load_state, or power-on)"""
+        self._check_initialized()
+        messages = []
+        for i in self._indices(indices):
+            state = self._reset_states[i]
+            messages.append((i, "reset", None) if state is None else (i, "load_state", state))
+        self._send_all(messages)
+
+    def reset_wait(self, timeout: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        self._wait_all(timeout)
+        return self.frames, self.features
+
+    def reset(self, indices: Optional[Iterable[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        self.reset_async(indices)
+        return self.reset_wait()
+
+    def load_state(self, state_bytes: Union[bytes, Sequence[bytes]], indices: Optional[Iterable[int]] = None):
+        """Load savestate bytes into workers; they also become those workers' reset state"""
+        self._check_initialized()
+        indices = self._indices(indices)
+        if isinstance(state_bytes, (bytes, bytearray)):
+            states = [bytes(state_bytes)] * len(indices)
+        else:
+            states = [bytes(state) for state in state_bytes]
+            if len(states) != len(indices):
+                raise ValueError(f"Got {len(states)} states for {len(indices)} workers")
+        self._send_all([(i, "load_state", state) for i, state in zip(indices, states)])
+        rejected = []
+        try:
+            self._wait_all(None)
+        except WorkerError as e:
+            rejected = e.workers
+            raise
+        finally:
+            # Only states a worker accepted become its reset state (restarted workers booted the old one)
+            for i, state in zip(indices, states):
+                if i not in rejected and not self.restarted[i]:
+                    self._reset_states[i] = state
+
+    def save_state(self, index: int) -> Optional[bytes]:
+        """Savestate bytes of one worker (None if it had to be restarted)"""
+        self._check_initialized()
+        index = self._indices([index])[0]
+        self._send_all([(index, "save_state", None)])
+        return self._wait_all(None)[0]
@@ -6,9 +6,10 @@ import time
 
 from mgba._pylib import ffi, lib
 
-from pokemon_env.emerald_utils import ADDRESSES, Pokemon_format, parse_pokemon, EmeraldCharmap
+from pokemon_env.emerald_utils import ADDRESSES, Pokemon_format, parse_pokemon
 from .enums import MetatileBehavior, StatusCondition, Tileset, PokemonType, PokemonSpecies, Move, Badge, MapLocation
 from .types import PokemonData
+from .dialog_reader import DialogReader, decode_text_buffer, VALID_TEXT_BYTES
 from utils.ocr_dialogue import create_ocr_detector
 from utils import state_formatter
 
@@ -58,6 +59,7 @@ class MemoryAddresses:
     GAME_STATE = 0x03005074
     MENU_STATE = 0x03005078
     DIALOG_STATE = 0x020370B8
+    OVERWORLD_FREEZE = 0x02022B4C
     IN_BATTLE_FLAG = 0x030026F9
     IN_BATTLE_MASK = 0x02
     
@@ -111,6 +113,13 @@ class MemoryAddresses:
     MSG_IS_SIGNPOST = 0x020370BC         # gMsgIsSignPost
     MSG_BOX_CANCELABLE = 0x020370BD      # gMsgBoxIsCancelable
     
+    # Text printer used by the message box (sTextPrinters[0], unconfirmed)
+    TEXT_PRINTERS = 0x020201B0
+    TEXT_PRINTER_SIZE = 0x24
+    TEXT_PRINTER_WINDOW_OFFSET = 0x04    # printerTemplate.windowId
+    TEXT_PRINTER_ACTIVE_OFFSET = 0x1B
+    TEXT_PRINTER_STATE_OFFSET = 0x1C
+    
     # Map layout addresses
     MAP_HEADER = 0x02037318
     MAP_LAYOUT_OFFSET = 0x00
@@ -252,6 +261,9 @@ class PokemonEmeraldReader:
         # Dialog detection control (can be disabled for no-ocr mode)
         self._dialog_detection_enabled = True
         
+        # Memory-first dialog text reader (checksum-cached buffer decoding + RAM box signals)
+        self._dialog_reader = DialogReader(self.read_memory, self.addresses)
+        
         # Track A button presses to prevent dialogue cache repopulation
         self._a_button_pressed_time = 0.0
         
@@ -308,6 +320,10 @@ class PokemonEmeraldReader:
     def _read_bytes(self, address: int, length: int) -> bytes:
         """Read a sequence of bytes from memory"""
         try:
+            data = self.read_memory(address, length)
+            if len(data) == length:
+                return bytes(data)
+            # Read crosses the end of the memory region - fall back to wrapping byte reads
             result = bytearray()
             for i in range(length):
                 result.append(self._read_u8(address + i))
@@ -352,9 +368,8 @@ class PokemonEmeraldReader:
         if not byte_array:
             return ""
         
-        # Use the proper EmeraldCharmap from emerald_utils.py
-        charmap = EmeraldCharmap()
-        return charmap.decode(byte_array)
+        # Precomputed EmeraldCharmap lookup table
+        return decode_text_buffer(bytes(byte_array))
 
     def read_player_name(self) -> str:
         """Read player name from Save Block 2"""
@@ -557,7 +572,7 @@ class PokemonEmeraldReader:
             
             # Fallback to original dialog state detection for compatibility
             dialog_state = self._read_u8(self.addresses.DIALOG_STATE)
-            overworld_freeze = self._read_u8(0x02022B4C)
+            overworld_freeze = self._read_u8(self.addresses.OVERWORLD_FREEZE)
             
             # If both dialog flags are 0, we're definitely not in dialog (regardless of text)
             if dialog_state == 0 and overworld_freeze == 0:
@@ -751,6 +766,16 @@ class PokemonEmeraldReader:
             'is_active': False,
             'detection_result': False
         }
+        
+        # Background OCR results belong to the previous state
+        if self._ocr_detector and self._ocr_detector.ocr_executor:
+            self._ocr_detector.ocr_executor.clear_latest()
+
+    def enable_async_ocr(self, max_workers: int = 2) -> bool:
+        """Move OCR into a background process pool so state reads never wait on Tesseract"""
+        if not self._ocr_enabled:
+            return False
+        return self._ocr_detector.enable_async_ocr(max_workers=max_workers)
 
     def invalidate_map_cache(self, clear_buffer_address=True):
         """Invalidate map-related caches when transitioning between areas"""
@@ -3255,106 +3280,24 @@ class PokemonEmeraldReader:
         try:
             # Always try to read dialog text, regardless of game state
             # The game state detection might not be reliable for dialog
-            
-            # Text buffer addresses from Pokemon Emerald decompilation symbols
-            # https://raw.githubusercontent.com/pret/pokeemerald/symbols/pokeemerald.sym
-            # Order by size (largest first) to prioritize longer dialog text
-            text_buffers = [
-                (self.addresses.G_STRING_VAR4, 1000),  # Main string variable 4 (largest) - PRIORITY
-                (self.addresses.G_DISPLAYED_STRING_BATTLE, 300),  # Battle dialog text
-                (self.addresses.G_STRING_VAR1, 256),   # Main string variable 1
-                (self.addresses.G_STRING_VAR2, 256),   # Main string variable 2
-                (self.addresses.G_STRING_VAR3, 256),   # Main string variable 3
-                (self.addresses.G_BATTLE_TEXT_BUFF1, 16),  # Battle text buffer 1
-                (self.addresses.G_BATTLE_TEXT_BUFF2, 16),  # Battle text buffer 2
-                (self.addresses.G_BATTLE_TEXT_BUFF3, 16),  # Battle text buffer 3
-                # Legacy addresses (keeping for compatibility)
-                (self.addresses.TEXT_BUFFER_1, 200),
-                (self.addresses.TEXT_BUFFER_2, 200),
-                (self.addresses.TEXT_BUFFER_3, 200),
-                (self.addresses.TEXT_BUFFER_4, 200),
-            ]
-            
-            dialog_text = ""
-            
-            for buffer_addr, buffer_size in text_buffers:
-                try:
-                    # Read the specified amount of bytes for this buffer
-                    buffer_bytes = self._read_bytes(buffer_addr, buffer_size)
-                    
-                    # Look for text patterns
-                    text_lines = []
-                    current_line = []
-                    space_count = 0
-                    
-                    for byte in buffer_bytes:
-                        # Check if this is a valid text character using our existing mapping
-                        if self._is_valid_text_byte(byte):
-                            space_count = 0
-                            current_line.append(byte)
-                        elif byte == 0x7F:  # Space character in Emerald
-                            space_count += 1
-                            current_line.append(byte)
-                        elif byte == 0x4E:  # Line break character
-                            # End current line
-                            if current_line:
-                                text = self._decode_pokemon_text(bytes(current_line))
-                                if text.strip():
-                                    text_lines.append(text)
-                                current_line = []
-                                space_count = 0
-                        elif byte == 0xFF:  # End of string
-                            break
-                        
-                        # If we see too many consecutive spaces, might be end of meaningful text
-                        if space_count > 15 and current_line:
-                            text = self._decode_pokemon_text(bytes(current_line))
-                            if text.strip():
-                                text_lines.append(text)
-                            current_line = []
-                            space_count = 0
-                    
-                    # Add final line if any
-                    if current_line:
-                        text = self._decode_pokemon_text(bytes(current_line))
-                        if text.strip():
-                            text_lines.append(text)
-                    
-                    # Join lines and check if we got meaningful text
-                    potential_text = "\n".join(text_lines)
-                    if len(potential_text.strip()) > 5:  # Minimum meaningful length
-                        # Clean up the text - remove excessive whitespace and special characters
-                        cleaned_text = potential_text.strip()
-                        # Remove null bytes and other control characters
-                        cleaned_text = ''.join(char for char in cleaned_text if ord(char) >= 32 or char in '\n\t')
-                        # Normalize whitespace
-                        cleaned_text = ' '.join(cleaned_text.split())
-                        
-                        if len(cleaned_text) > 5:
-                            # Prefer longer text (more likely to be full dialog)
-                            if len(cleaned_text) > len(dialog_text):
-                                dialog_text = cleaned_text
-                                logger.debug(f"Found better dialog text: {dialog_text[:100]}...")
-                            # If this is the first meaningful text found, use it
-                            elif not dialog_text:
-                                dialog_text = cleaned_text
-                                logger.debug(f"Found dialog text: {dialog_text[:100]}...")
-                        
-                except Exception as e:
-                    logger.debug(f"Failed to read from buffer 0x{buffer_addr:08X} (size: {buffer_size}): {e}")
-                    continue
-            
-            return dialog_text.strip()
-            
+            return self._dialog_reader.read_text()
         except Exception as e:
             logger.warning(f"Failed to read dialog: {e}")
             return ""
 
+    def read_dialog_signals(self):
+        """Snapshot of the text printer / message box flags in RAM"""
+        return self._dialog_reader.read_signals()
+
     def read_dialog_with_ocr_fallback(self, screenshot=None) -> str:
         """
         Read dialog text with smart OCR validation to detect stale memory.
         
-        Preference order:
+        OCR only runs when RAM and the screen disagree: no dialogue box on screen
+        means no dialogue, and a visible box with matching RAM message box signals
+        means the memory text is authoritative.
+        
+        Preference order when OCR is needed:
         1. Both memory AND OCR detect text -> Use memory (most accurate)
         2. Only OCR detects text -> Use OCR (memory failed)  
         3. Only memory detects text -> Suppress (likely stale/buggy memory)
@@ -3386,6 +3329,16 @@ class PokemonEmeraldReader:
         # If we have OCR available and a screenshot, use smart validation
         if self._ocr_enabled and screenshot is not None and hasattr(screenshot, 'size'):
             try:
+                # Memory-first: the box visibility check is cheap, only run OCR when
+                # the RAM signals and the screen disagree
+                if not self._ocr_detector.skip_dialogue_box_detection:
+                    if not self._ocr_detector.is_dialogue_box_visible(screenshot):
+                        logger.debug("No dialogue box on screen - ignoring memory text")
+                        return ""
+                    if memory_text and self.read_dialog_signals().box_expected:
+                        logger.debug("Dialogue box on screen matches RAM signals - using memory text")
+                        return memory_text.strip()
+                
                 ocr_text = self._ocr_detector.detect_dialogue_from_screenshot(screenshot)
                 
                 # Normalize for comparison (strip whitespace, handle None)
@@ -3652,9 +3605,8 @@ class PokemonEmeraldReader:
 
     def _is_valid_text_byte(self, byte: int) -> bool:
         """Check if a byte represents a valid text character in Pokemon Emerald"""
-        # Use the EmeraldCharmap to check if byte is valid
-        charmap = EmeraldCharmap()
-        return byte < len(charmap.charmap) and charmap.charmap[byte] != ""
+        # Precomputed from the EmeraldCharmap
+        return 0 <= byte < len(VALID_TEXT_BYTES) and VALID_TEXT_BYTES[byte]
 
     def read_flags(self) -> Dict[str, bool]:
         """Read game flags to track progress and visited locations"""
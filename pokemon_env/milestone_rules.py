@@ -0,0 +1,354 @@
+"""
+Declarative milestone rules for Pokemon Emerald progress tracking.
+
+Each milestone is described by a MilestoneRule (location substrings, party / name /
+badge conditions and prerequisite milestones). MilestoneRuleEngine compiles the table
+once into predicate closures indexed by the state fields they read, so a check only
+evaluates rules whose inputs (or prerequisites) changed since the previous check.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# State fields a rule can read (its triggers)
+LOCATION = "location"
+NAME = "name"
+PARTY = "party"
+BADGES = "badges"
+STATE_FIELDS = (LOCATION, NAME, PARTY, BADGES)
+
+
+@dataclass(frozen=True)
+class MilestoneRule:
+    """
+    One milestone condition. All given conditions must hold.
+
+    Attributes:
+        milestone_id: Milestone name stored in the tracker
+        location: Any of these substrings must appear in the upper-cased location
+        not_location: None of these substrings may appear in the upper-cased location
+        requires: Milestones that must already be completed
+        party_min: Minimum party size
+        starter: At least one party member has a species name
+        name_set: Player name is set to something other than a default
+        badges_min / badge_name: Badge count (or a badge with this name in the list)
+        always: Condition is always true (the game is running)
+    """
+    milestone_id: str
+    location: Tuple[str, ...] = ()
+    not_location: Tuple[str, ...] = ()
+    requires: Tuple[str, ...] = ()
+    party_min: int = 0
+    starter: bool = False
+    name_set: bool = False
+    badges_min: int = 0
+    badge_name: Optional[str] = None
+    always: bool = False
+
+    @property
+    def triggers(self) -> FrozenSet[str]:
+        """State fields whose change can flip this rule"""
+        fields = set()
+        if self.location or self.not_location:
+            fields.add(LOCATION)
+        if self.party_min or self.starter:
+            fields.add(PARTY)
+        if self.name_set:
+            fields.add(NAME)
+        if self.badges_min:
+            fields.add(BADGES)
+        return frozenset(fields)
+
+
+# Every known milestone condition. Rules only run when listed in TRACKED_MILESTONES.
+MILESTONE_RULES: List[MilestoneRule] = [
+    # Test milestones
+    MilestoneRule("GAME_RUNNING", always=True),
+    MilestoneRule("HAS_PARTY", party_min=1),
+
+    # Towns and cities, in story order
+    MilestoneRule("LITTLEROOT_TOWN", location=("LITTLEROOT",)),
+    MilestoneRule("OLDALE_TOWN", location=("OLDALE",), requires=("LITTLEROOT_TOWN",)),
+    MilestoneRule("PETALBURG_CITY", location=("PETALBURG",), requires=("LITTLEROOT_TOWN", "OLDALE_TOWN")),
+    MilestoneRule("RUSTBORO_CITY", location=("RUSTBORO",), requires=("PETALBURG_CITY",)),
+    MilestoneRule("DEWFORD_TOWN", location=("DEWFORD",), requires=("RUSTBORO_CITY",)),
+    MilestoneRule("SLATEPORT_CITY", location=("SLATEPORT",), requires=("DEWFORD_TOWN",)),
+    MilestoneRule("MAUVILLE_CITY", location=("MAUVILLE",), requires=("SLATEPORT_CITY",)),
+
+    # Badges
+    MilestoneRule("STONE_BADGE", badges_min=1, badge_name="Stone"),
+    MilestoneRule("KNUCKLE_BADGE", badges_min=2, badge_name="Knuckle"),
+    MilestoneRule("DYNAMO_BADGE", badges_min=3, badge_name="Dynamo"),
+
+    # Phase 1: Game Initialization
+    MilestoneRule("INTRO_CUTSCENE_COMPLETE", location=("MOVING_VAN",)),
+    MilestoneRule("PLAYER_NAME_SET", name_set=True),
+
+    # Phase 2: Tutorial & Starting Town
+    MilestoneRule("PLAYER_HOUSE_ENTERED", location=("LITTLEROOT TOWN BRENDANS HOUSE 1F",)),
+    MilestoneRule("PLAYER_BEDROOM", location=("LITTLEROOT TOWN BRENDANS HOUSE 2F",)),
+    MilestoneRule("RIVAL_HOUSE", location=("LITTLEROOT TOWN MAYS HOUSE 1F",)),
+    MilestoneRule("RIVAL_BEDROOM", location=("LITTLEROOT TOWN MAYS HOUSE 2F",)),
+
+    # Phase 3: Professor Birch & Starter
+    MilestoneRule("ROUTE_101", location=("ROUTE_101", "ROUTE 101")),
+    MilestoneRule("STARTER_CHOSEN", starter=True),
+    MilestoneRule("BIRCH_LAB_VISITED", location=("LITTLEROOT TOWN PROFESSOR BIRCHS LAB",)),
+
+    # Phase 4: Early Route Progression
+    MilestoneRule("ROUTE_103", location=("ROUTE_103", "ROUTE 103"), requires=("ROUTE_101", "STARTER_CHOSEN")),
+    MilestoneRule("RECEIVED_POKEDEX", location=("LITTLEROOT TOWN PROFESSOR BIRCHS LAB",), requires=("ROUTE_103",)),
+
+    # Phase 5: Route 102 & Petalburg
+    MilestoneRule("ROUTE_102", location=("ROUTE_102", "ROUTE 102"), requires=("RECEIVED_POKEDEX",)),
+    # Meeting Dad happens in Petalburg Gym, the explanation follows in the same gym
+    MilestoneRule("DAD_FIRST_MEETING", location=("PETALBURG CITY GYM", "PETALBURG_CITY_GYM"),
+                  requires=("PETALBURG_CITY",)),
+    MilestoneRule("GYM_EXPLANATION", location=("PETALBURG CITY GYM", "PETALBURG_CITY_GYM"),
+                  requires=("DAD_FIRST_MEETING",)),
+
+    # Phase 6: Road to Rustboro City
+    MilestoneRule("ROUTE_104_SOUTH", location=("ROUTE_104", "ROUTE 104"), requires=("PETALBURG_CITY",)),
+    MilestoneRule("MR_BRINEY_MET", requires=("ROUTE_104_SOUTH",)),
+    MilestoneRule("PETALBURG_WOODS", location=("PETALBURG_WOODS", "PETALBURG WOODS"), requires=("ROUTE_104_SOUTH",)),
+    # The grunt fight is in Petalburg Woods; reaching the woods is treated as defeating the grunt
+    MilestoneRule("TEAM_AQUA_GRUNT_DEFEATED", requires=("PETALBURG_WOODS",)),
+    MilestoneRule("DEVON_GOODS_OBTAINED", requires=("TEAM_AQUA_GRUNT_DEFEATED",)),
+    MilestoneRule("ROUTE_104_NORTH", location=("ROUTE_104", "ROUTE 104"),
+                  requires=("PETALBURG_WOODS", "DEVON_GOODS_OBTAINED")),
+
+    # Rustboro City
+    MilestoneRule("DEVON_CORP_VISITED", location=("DEVON",), requires=("RUSTBORO_CITY",)),
+    MilestoneRule("DEVON_GOODS_DELIVERED", requires=("DEVON_CORP_VISITED",)),
+    MilestoneRule("LETTER_RECEIVED", requires=("DEVON_GOODS_DELIVERED",)),
+    MilestoneRule("POKEBALLS_PURCHASED", requires=("RUSTBORO_CITY",)),
+
+    # Phase 7: First Gym Challenge
+    MilestoneRule("RUSTBORO_GYM_ENTERED", location=("RUSTBORO_GYM", "RUSTBORO CITY GYM"), requires=("RUSTBORO_CITY",)),
+    MilestoneRule("GYM_TRAINERS_DEFEATED", requires=("RUSTBORO_GYM_ENTERED",)),
+    MilestoneRule("ROXANNE_BATTLE_STARTED", requires=("GYM_TRAINERS_DEFEATED",)),
+    MilestoneRule("ROXANNE_DEFEATED", requires=("STONE_BADGE",)),
+    MilestoneRule("TM_ROCK_TOMB_RECEIVED", requires=("ROXANNE_DEFEATED",)),
+    # Complete after getting the Stone Badge and leaving the gym
+    MilestoneRule("FIRST_GYM_COMPLETE", not_location=("GYM",), requires=("STONE_BADGE",)),
+]
+
+# Milestones checked on every update, in evaluation order
+TRACKED_MILESTONES: Tuple[str, ...] = (
+    # Phase 1: Game Initialization
+    "GAME_RUNNING", "PLAYER_NAME_SET", "INTRO_CUTSCENE_COMPLETE",
+
+    # Phase 2: Tutorial & Starting Town
+    "LITTLEROOT_TOWN", "PLAYER_HOUSE_ENTERED", "PLAYER_BEDROOM",
+    "RIVAL_HOUSE", "RIVAL_BEDROOM",
+
+    # Phase 3: Professor Birch & Starter
+    "ROUTE_101", "STARTER_CHOSEN", "BIRCH_LAB_VISITED",
+
+    # Phase 4: Rival
+    "OLDALE_TOWN", "ROUTE_103", "RECEIVED_POKEDEX",
+
+    # Phase 5: Route 102 & Petalburg
+    "ROUTE_102", "PETALBURG_CITY", "DAD_FIRST_MEETING", "GYM_EXPLANATION",
+
+    # Phase 6: Road to Rustboro City
+    "ROUTE_104_SOUTH", "PETALBURG_WOODS", "TEAM_AQUA_GRUNT_DEFEATED",
+    "ROUTE_104_NORTH", "RUSTBORO_CITY",
+
+    # Phase 7: First Gym Challenge
+    "RUSTBORO_GYM_ENTERED", "ROXANNE_DEFEATED", "FIRST_GYM_COMPLETE",
+)
+
+# Names that mean the player has not picked a name yet
+DEFAULT_PLAYER_NAMES = ("", "UNKNOWN", "PLAYER")
+
+
+def extract_state_fields(game_state: Dict[str, Any]) -> Dict[str, Any]:
+    """Pull the fields milestone rules read out of a comprehensive state"""
+    player = game_state.get("player", {})
+    return {
+        LOCATION: str(player.get("location", "")).upper(),
+        NAME: player.get("name", ""),
+        PARTY: player.get("party", []),
+        BADGES: game_state.get("game", {}).get("badges", []),
+    }
+
+
+def compile_rule(rule: MilestoneRule) -> Callable[[Dict[str, Any], Callable[[str], bool]], bool]:
+    """
+    Compile a rule into a predicate(fields, is_completed) -> bool.
+
+    Only the checks the rule uses end up in the closure, cheapest first.
+    """
+    checks: List[Callable[[Dict[str, Any], Callable[[str], bool]], bool]] = []
+
+    if rule.always:
+        return lambda fields, is_completed: True
+    if rule.requires:
+        requires = rule.requires
+        checks.append(lambda fields, is_completed: all(is_completed(m) for m in requires))
+    if rule.location:
+        substrings = rule.location
+        checks.append(lambda fields, is_completed: any(s in fields[LOCATION] for s in substrings))
+    if rule.not_location:
+        excluded = rule.not_location
+        checks.append(lambda fields, is_completed: not any(s in fields[LOCATION] for s in excluded))
+    if rule.name_set:
+        def name_is_set(fields, is_completed):
+            name = fields[NAME]
+            return bool(name) and str(name).strip() not in DEFAULT_PLAYER_NAMES
+        checks.append(name_is_set)
+    if rule.party_min:
+        party_min = rule.party_min
+        checks.append(lambda fields, is_completed: len(fields[PARTY]) >= party_min)
+    if rule.starter:
+        checks.append(lambda fields, is_completed: len(fields[PARTY]) >= 1 and any(
+            p.get("species_name", "").strip() for p in fields[PARTY]))
+    if rule.badges_min:
+        badges_min, badge_name = rule.badges_min, rule.badge_name
+
+        def has_badges(fields, is_completed):
+            badges = fields[BADGES]
+            if isinstance(badges, list):
+                return len(badges) >= badges_min or (
+                    badge_name is not None and any(badge_name in str(b) for b in badges))
+            if isinstance(badges, int):
+                return badges >= badges_min
+            return False
+        checks.append(has_badges)
+
+    if len(checks) == 1:
+        return checks[0]
+    return lambda fields, is_completed: all(check(fields, is_completed) for check in checks)
+
+
+class MilestoneRuleEngine:
+    """Evaluates compiled milestone rules against state deltas"""
+
+    def __init__(self, rules: Sequence[MilestoneRule] = MILESTONE_RULES,
+                 tracked: Sequence[str] = TRACKED_MILESTONES):
+        """
+        Args:
+            rules: Milestone rule table
+            tracked: Milestone ids evaluated on update, in order
+        """
+        self.rules: Dict[str, MilestoneRule] = {rule.milestone_id: rule for rule in rules}
+        unknown = [m for m in tracked if m not in self.rules]
+        if unknown:
+            raise ValueError(f"Tracked milestones without a rule: {unknown}")
+        self.tracked: Tuple[str, ...] = tuple(tracked)
+        self._order = {milestone_id: i for i, milestone_id in enumerate(self.tracked)}
+        self._predicates = {m: compile_rule(rule) for m, rule in self.rules.items()}
+
+        # Trigger index: state field / milestone -> tracked rules to re-evaluate when it changes
+        self._by_field: Dict[str, List[str]] = {field: [] for field in STATE_FIELDS}
+        self._by_milestone: Dict[str, List[str]] = {}
+        for milestone_id in self.tracked:
+            rule = self.rules[milestone_id]
+            for field in rule.triggers:
+                self._by_field[field].append(milestone_id)
+            # A rule also depends on its own completion (it may be reset)
+            for dependency in rule.requires + (milestone_id,):
+                self._by_milestone.setdefault(dependency, []).append(milestone_id)
+        self._watched = tuple(self._by_milestone)
+        # Updates come from the game loop (RAM watch) and from /state requests
+        self._lock = threading.Lock()
+
+        self.reset()
+
+    def reset(self):
+        """Forget the previous state so the next update evaluates every rule"""
+        self._last_fields: Optional[Dict[str, Any]] = None
+        self._last_completed: Optional[FrozenSet[str]] = None
+        self._pending: set = set()  # Rules to re-evaluate on the next update
+        self.evaluations = 0
+
+    def check(self, milestone_id: str, game_state: Dict[str, Any], is_completed: Callable[[str], bool]) -> bool:
+        """Evaluate a single milestone rule against a full state"""
+        predicate = self._predicates.get(milestone_id)
+        if predicate is None or not game_state:
+            return False
+        try:
+            return bool(predicate(extract_state_fields(game_state), is_completed))
+        except Exception as e:
+            logger.warning(f"Error checking milestone condition {milestone_id}: {e}")
+            return False
+
+    def update(self, game_state: Dict[str, Any], tracker, timestamp: Optional[float] = None,
+               frame: Optional[int] = None) -> List[str]:
+        """
+        Evaluate the rules affected by the change since the last update and mark
+        newly reached milestones on the tracker.
+
+        Args:
+            game_state: Comprehensive (or reduced) state with player/game sections
+            tracker: MilestoneTracker to read and mark completions on
+            timestamp, frame: When the state was observed, recorded on completions
+
+        Returns:
+            Milestone ids completed by this update, in order
+        """
+        with self._lock:
+            return self._update(game_state, tracker, timestamp, frame)
+
+    def _update(self, game_state, tracker, timestamp, frame) -> List[str]:
+        is_completed = tracker.is_completed
+        completed_now = frozenset(m for m in self._watched if is_completed(m))
+
+        fields = None
+        if game_state:
+            try:
+                fields = extract_state_fields(game_state)
+            except Exception as e:
+                logger.warning(f"Error reading milestone fields from state: {e}")
+
+        if fields is None:
+            # Without a usable state only unconditional rules can fire
+            dirty = {m for m in self.tracked if self.rules[m].always}
+        else:
+            if self._last_fields is None or self._last_completed is None:
+                dirty = set(self.tracked)
+            else:
+                dirty = set()
+                for field in STATE_FIELDS:
+                    if fields[field] != self._last_fields[field]:
+                        dirty.update(self._by_field[field])
+                for milestone_id in completed_now.symmetric_difference(self._last_completed):
+                    dirty.update(self._by_milestone.get(milestone_id, ()))
+            dirty.update(self._pending)
+            self._pending = set()
+            self._last_fields = fields
+
+        newly_completed = []
+        for milestone_id in self.tracked:
+            if milestone_id not in dirty or is_completed(milestone_id):
+                continue
+            self.evaluations += 1
+            try:
+                reached = self._predicates[milestone_id](fields, is_completed)
+            except Exception as e:
+                logger.warning(f"Error checking milestone condition {milestone_id}: {e}")
+                reached = False
+            if not reached:
+                continue
+
+            if timestamp is None and frame is None:
+                tracker.mark_completed(milestone_id)
+            else:
+                tracker.mark_completed(milestone_id, timestamp, frame=frame)
+            newly_completed.append(milestone_id)
+            # Later rules that depend on this milestone are evaluated in this pass,
+            # earlier ones on the next update
+            for dependent in self._by_milestone.get(milestone_id, ()):
+                if self._order[dependent] > self._order[milestone_id]:
+                    dirty.add(dependent)
+                elif fields is not None:
+                    self._pending.add(dependent)
+
+        if fields is not None:
+            self._last_completed = frozenset(m for m in self._watched if is_completed(m))
+        return newly_completed
@@ -0,0 +1,264 @@
+"""
+Write-behind persistence for milestone progress.
+
+MilestoneStore keeps milestone writes off the game thread. Every change is queued
+as a small event; a background writer appends batches of events to an append-only
+log next to the snapshot file and periodically compacts them into a new snapshot
+(written atomically, after which the log is truncated). After a crash the last
+snapshot plus a replay of the log gives back every milestone that was recorded.
+
+Events are idempotent (set / delete / clear / replace per milestone id), so
+replaying a log over a snapshot that already contains it is harmless.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = '1.0'
+
+
+def event_log_path(snapshot_path: str) -> str:
+    """Event log that belongs to a snapshot file (milestones.json -> milestones.events.jsonl)"""
+    root, _ = os.path.splitext(snapshot_path)
+    return f"{root}.events.jsonl"
+
+
+def apply_event(milestones: Dict[str, dict], event: Dict[str, Any]):
+    """Apply one logged event to a milestones dict in place"""
+    op = event.get('op')
+    if op == 'complete':
+        milestones[event['id']] = event['data']
+    elif op == 'reset':
+        milestones.pop(event['id'], None)
+    elif op == 'reset_all':
+        milestones.clear()
+    elif op == 'replace':
+        milestones.clear()
+        milestones.update(event['milestones'])
+    else:
+        logger.warning(f"Unknown milestone event: {op}")
+
+
+def write_snapshot(path: str, milestones: Dict[str, dict]):
+    """Atomically write a milestone snapshot in the MilestoneTracker file format"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = {
+        'milestones': milestones,
+        'last_updated': time.time(),
+        'version': SNAPSHOT_VERSION
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Dict[str, dict]:
+    """Milestones from a snapshot file, or {} if it does not exist"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f).get('milestones', {})
+
+
+def replay_event_log(path: str, milestones: Dict[str, dict]) -> int:
+    """Replay an event log onto milestones; returns the number of events applied"""
+    if not os.path.exists(path):
+        return 0
+    applied = 0
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn write from a crash, everything before it is still valid
+                logger.warning(f"Skipping unreadable milestone event in {path}")
+                continue
+            apply_event(milestones, event)
+            applied += 1
+    return applied
+
+
+class MilestoneStore:
+    """Batched, crash-safe milestone persistence with a background writer thread"""
+
+    def __init__(self, path: str, compact_every: int = 32):
+        """
+        Args:
+            path: Snapshot file (the milestones_progress.json format)
+            compact_every: Logged events after which the writer compacts into a new snapshot
+        """
+        self.path = path
+        self.log_path = event_log_path(path)
+        self.compact_every = compact_every
+
+        self._queue: "queue.Queue[Tuple]" = queue.Queue()
+        self._replica: Dict[str, dict] = {}  # Writer-thread copy of the milestones
+        self._events_since_snapshot = 0
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._closed = False
+
+        self.events_written = 0
+        self.snapshots_written = 0
+        atexit.register(self.close)
+
+    # Game thread API ---------------------------------------------------------
+
+    def load(self) -> Dict[str, dict]:
+        """Snapshot plus replayed event log; also seeds the writer's copy"""
+        self.flush()
+        milestones = read_snapshot(self.path)
+        replayed = replay_event_log(self.log_path, milestones)
+        if replayed:
+            logger.info(f"Recovered {replayed} milestone events from {self.log_path}")
+        self._submit(('seed', {key: dict(value) for key, value in milestones.items()}, replayed))
+        self.flush()
+        return milestones
+
+    def record_completed(self, milestone_id: str, data: dict):
+        self._record({'op': 'complete', 'id': milestone_id, 'data': dict(data)})
+
+    def record_reset(self, milestone_id: str):
+        self._record({'op': 'reset', 'id': milestone_id})
+
+    def record_reset_all(self):
+        self._record({'op': 'reset_all'})
+
+    def record_replace(self, milestones: Dict[str, dict]):
+        """Replace all progress (e.g. after loading a state's milestones)"""
+        self._record({'op': 'replace', 'milestones': {key: dict(value) for key, value in milestones.items()}})
+
+    def export(self, path: str, milestones: Dict[str, dict]):
+        """Write a copy of milestones to another snapshot file in the background"""
+        self._submit(('export', path, {key: dict(value) for key, value in milestones.items()}))
+
+    def flush(self):
+        """Block until every queued change is on disk and compacted into the snapshot"""
+        if self._thread is None:
+            return
+        self._submit(('compact',))
+        self._queue.join()
+
+    def close(self):
+        """Flush and stop the writer thread"""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(('stop',))
+            self._thread.join(timeout=5)
+            self._thread = None
+        atexit.unregister(self.close)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending': self._queue.unfinished_tasks,
+            'events_written': self.events_written,
+            'snapshots_written': self.snapshots_written,
+        }
+
+    def _record(self, event: Dict[str, Any]):
+        self._submit(('event', event))
+
+    def _submit(self, item: Tuple):
+        if self._closed:
+            logger.warning(f"Milestone store {self.path} is closed, dropping {item[0]}")
+            return
+        self._ensure_writer()
+        self._queue.put(item)
+
+    def _ensure_writer(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer_loop, name="milestone-writer", daemon=True)
+                self._thread.start()
+
+    # Writer thread -----------------------------------------------------------
+
+    def _writer_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            try:
+                stop = self._process_batch(batch)
+            except Exception as e:
+                logger.warning(f"Error persisting milestones to {self.path}: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _process_batch(self, batch: List[Tuple]) -> bool:
+        events = []
+        stop = False
+        compact = False
+        for item in batch:
+            kind = item[0]
+            if kind == 'event':
+                events.append(item[1])
+            elif kind == 'seed':
+                # Events replayed at load time are already in the log
+                self._append_events(events)
+                events = []
+                self._replica = item[1]
+                self._events_since_snapshot = item[2]
+            elif kind == 'export':
+                self._append_events(events)
+                events = []
+                write_snapshot(item[1], item[2])
+            elif kind == 'compact':
+                compact = True
+            elif kind == 'stop':
+                compact = stop = True
+
+        self._append_events(events)
+        if self._events_since_snapshot and (compact or self._events_since_snapshot >= self.compact_every):
+            self._compact()
+        return stop
+
+    def _append_events(self, events: List[Dict[str, Any]]):
+        if not events:
+            return
+        directory = os.path.dirname(self.log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.log_path, 'a') as f:
+            f.write(''.join(json.dumps(event) + '\n' for event in events))
+            f.flush()
+            os.fsync(f.fileno())
+        for event in events:
+            apply_event(self._replica, event)
+        self._events_since_snapshot += len(events)
+        self.events_written += len(events)
+
+    def _compact(self):
+        write_snapshot(self.path, self._replica)
+        # A crash between these two steps only replays events the snapshot already has
+        with open(self.log_path, 'w'):
+            pass
+        self._events_since_snapshot = 0
+        self.snapshots_written += 1
+        logger.debug(f"Compacted milestone log into {self.path}")
@@ -0,0 +1,258 @@
+"""
+Beam search over emulator savestates.
+
+SearchPlanner expands candidate button macros from the current state by running
+them through EmeraldEmulator.run_frame_with_buttons, scores the resulting RAM
+state against an objective and keeps the best `beam_width` states per depth.
+Every branch starts from an in-memory snapshot (EmeraldEmulator.snapshot), and
+the emulator is restored when planning ends, with milestone detection
+suspended throughout.
+
+The server plans on a search clone (plan_from_live_state): the live state is
+copied into a second headless core under the game's lock, and the search runs
+there while the game loop keeps going, so simulated frames never reach the
+video, frame cache, map stitcher or milestone log.
+
+Objectives:
+    coordinate  reach target (x, y) on the current map (within tolerance)
+    warp        leave the current map (optionally via the warp tile at target)
+    milestone   complete milestone_id according to the milestone rules
+    dialogue    advance (or close) the dialogue currently on screen
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ram_features import RAM_FEATURE_DTYPE, read_ram_features
+
+logger = logging.getLogger(__name__)
+
+# Same pacing as the server's action queue (ACTION_HOLD_FRAMES / ACTION_RELEASE_DELAY)
+DEFAULT_HOLD_FRAMES = 12
+DEFAULT_RELEASE_FRAMES = 24
+
+MOVEMENT_MACROS: Tuple[Tuple[str, ...], ...] = (("UP",), ("DOWN",), ("LEFT",), ("RIGHT",))
+DIALOGUE_MACROS: Tuple[Tuple[str, ...], ...] = (("A",), ("B",), ("UP",), ("DOWN",))
+DEFAULT_MACROS: Tuple[Tuple[str, ...], ...] = MOVEMENT_MACROS + (("A",),)
+
+OBJECTIVE_TYPES = ("coordinate", "warp", "milestone", "dialogue")
+
+REACHED_BONUS = 1000.0
+STEP_PENALTY = 0.01  # Prefer shorter plans among equal scores
+
+
+@dataclass
+class PlanObjective:
+    """What the planner is trying to achieve"""
+    kind: str
+    target: Optional[Tuple[int, int]] = None
+    milestone_id: Optional[str] = None
+    tolerance: int = 0
+
+    def __post_init__(self):
+        if self.kind not in OBJECTIVE_TYPES:
+            raise ValueError(f"Unknown objective type: {self.kind} (expected one of {', '.join(OBJECTIVE_TYPES)})")
+        if self.kind == "coordinate" and self.target is None:
+            raise ValueError("coordinate objectives need a target")
+        if self.kind == "milestone" and not self.milestone_id:
+            raise ValueError("milestone objectives need a milestone_id")
+        if self.target is not None:
+            self.target = (int(self.target[0]), int(self.target[1]))
+
+
+@dataclass
+class PlanResult:
+    """Best macro sequence found"""
+    buttons: List[str]
+    score: float
+    reached: bool
+    expanded: int
+    seconds: float
+
+    def to_dict(self) -> Dict:
+        return {
+            "buttons": self.buttons,
+            "score": self.score,
+            "reached": self.reached,
+            "expanded": self.expanded,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+@dataclass
+class _Node:
+    handle: object
+    buttons: List[str]
+    score: float
+    reached: bool
+    key: Tuple = field(default=())
+
+
+class SearchPlanner:
+    """Beam search over button macros from the emulator's current state"""
+
+    def __init__(self, emulator, macros: Optional[Sequence[Sequence[str]]] = None, beam_width: int = 8,
+                 max_depth: int = 6, hold_frames: int = DEFAULT_HOLD_FRAMES,
+                 release_frames: int = DEFAULT_RELEASE_FRAMES):
+        """
+        Args:
+            emulator: Initialized EmeraldEmulator
+            macros: Candidate button sequences expanded at each depth (default per objective)
+            beam_width: States kept per depth
+            max_depth: Maximum number of macros in a plan
+            hold_frames: Frames each button is held
+            release_frames: Frames after each release
+        """
+        self.emulator = emulator
+        self.macros = [tuple(macro) for macro in macros] if macros else None
+        self.beam_width = beam_width
+        self.max_depth = max_depth
+        self.hold_frames = hold_frames
+        self.release_frames = release_frames
+
+    # Observation and scoring -------------------------------------------------
+
+    def _features(self) -> np.ndarray:
+        record = np.zeros((), dtype=RAM_FEATURE_DTYPE)
+        read_ram_features(self.emulator.read_memory, self.emulator.memory_reader.addresses, record,
+                          self.emulator.frame_count)
+        return record
+
+    def _dialogue_text(self) -> str:
+        return (self.emulator.memory_reader.read_dialog() or "").strip()
+
+    def _milestone_state(self) -> Dict:
+        reader = self.emulator.memory_reader
+        return {
+            "player": {
+                "location": reader.read_location(),
+                "name": reader.read_player_name(),
+                "party": [{"species_name": p.species_name} for p in reader.read_party_pokemon()],
+            },
+            "game": {"badges": reader.read_badges()},
+        }
+
+    def _observe(self, objective: PlanObjective, root: Dict) -> Tuple[float, bool, Tuple]:
+        """(score, reached, dedup key) for the current emulator state"""
+        features = self._features()
+        map_id = (int(features['map_bank']), int(features['map_number']))
+        position = (int(features['player_x']), int(features['player_y']))
+        key = (map_id, position)
+
+        if objective.kind == "coordinate":
+            if map_id != root["map"]:
+                return -REACHED_BONUS, False, key  # Walked through a warp by accident
+            distance = abs(position[0] - objective.target[0]) + abs(position[1] - objective.target[1])
+            return -float(distance), distance <= objective.tolerance, key
+
+        if objective.kind == "warp":
+            if map_id != root["map"]:
+                return REACHED_BONUS, True, key
+            if objective.target is None:
+                return 0.0, False, key
+            return -float(abs(position[0] - objective.target[0]) + abs(position[1] - objective.target[1])), False, key
+
+        if objective.kind == "milestone":
+            engine = self.emulator.milestone_engine
+            tracker = self.emulator.milestone_tracker
+            reached = engine.check(objective.milestone_id, self._milestone_state(), tracker.is_completed)
+            return (REACHED_BONUS if reached else 0.0), reached, key
+
+        # dialogue
+        text = self._dialogue_text()
+        key = key + (text,)
+        if text != root["dialogue"]:
+            return (2.0 if not text else 1.0), True, key
+        return 0.0, False, key
+
+    # Search ------------------------------------------------------------------
+
+    def _run_macro(self, macro: Sequence[str]):
+        for button in macro:
+            for _ in range(self.hold_frames):
+                self.emulator.run_frame_with_buttons([button])
+            for _ in range(self.release_frames):
+                self.emulator.run_frame_with_buttons([])
+
+    def _default_macros(self, objective: PlanObjective) -> List[Tuple[str, ...]]:
+        if self.macros:
+            return self.macros
+        if objective.kind == "dialogue":
+            return list(DIALOGUE_MACROS)
+        if objective.kind in ("coordinate", "warp"):
+            return list(MOVEMENT_MACROS)
+        return list(DEFAULT_MACROS)
+
+    def plan(self, objective: PlanObjective) -> PlanResult:
+        """Search from the current state; the emulator is back at that state on return"""
+        start = time.perf_counter()
+        env = self.emulator
+        pool_nodes: List[_Node] = []
+        expanded = 0
+        macros = self._default_macros(objective)
+
+        with env.lookahead() as root_handle:
+            features = self._features()
+            root = {
+                "map": (int(features['map_bank']), int(features['map_number'])),
+                "dialogue": self._dialogue_text() if objective.kind == "dialogue" else "",
+            }
+            root_score, root_reached, root_key = self._observe(objective, root)
+            best = _Node(root_handle, [], root_score, root_reached, root_key)
+            beam = [] if root_reached else [best]
+            seen = {root_key}
+            try:
+                for depth in range(1, self.max_depth + 1):
+                    if not beam:
+                        break
+                    children: List[_Node] = []
+                    for node in beam:
+                        for macro in macros:
+                            env.restore(node.handle)
+                            self._run_macro(macro)
+                            expanded += 1
+                            score, reached, key = self._observe(objective, root)
+                            if key in seen and not reached:
+                                continue  # Blocked move or a state another branch already reached
+                            seen.add(key)
+                            child = _Node(env.snapshot(), node.buttons + list(macro),
+                                          score - STEP_PENALTY * depth, reached, key)
+                            children.append(child)
+                            pool_nodes.append(child)
+
+                    children.sort(key=lambda n: (n.reached, n.score), reverse=True)
+                    if children and (children[0].reached or children[0].score > best.score):
+                        best = children[0]
+                    if best.reached:
+                        break
+                    beam = children[:self.beam_width]
+            finally:
+                # Free the arena slots used by this search
+                for node in pool_nodes:
+                    env.snapshot_pool.discard(node.handle)
+
+        result = PlanResult(best.buttons, best.score, best.reached, expanded, time.perf_counter() - start)
+        logger.info(f"Planner ({objective.kind}): {result.buttons} reached={result.reached} "
+                    f"expanded={expanded} in {result.seconds:.2f}s")
+        return result
+
+
+def plan_from_live_state(live_emulator, search_emulator, objective: PlanObjective, live_lock,
+                         **planner_options) -> PlanResult:
+    """
+    Plan from the live game's current state on a separate search emulator.
+
+    Only the state capture holds live_lock (the lock the game loop steps under);
+    the search itself never touches live_emulator.
+    """
+    with live_lock:
+        state = live_emulator.save_state()
+        frame_count = live_emulator.frame_count
+    if state is None:
+        raise RuntimeError("Could not capture the live emulator state")
+    search_emulator.sync_from_state(state, frame_count)
+    return SearchPlanner(search_emulator, **planner_options).plan(objective)
@@ -0,0 +1,104 @@
+"""
+Per-frame RAM watchpoints for Pokemon Emerald.
+
+RamWatcher snapshots a handful of small RAM fields (map bank/number, party count,
+badge and system flag bytes, player name) after every frame and diffs them as raw
+bytes. Only when one of them changes does the emulator decode the full values and
+run the milestone rules, so milestones are stamped with the exact frame they
+happened on instead of waiting for a polling thread.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RamWatch:
+    """
+    One watched RAM field.
+
+    Attributes:
+        name: Field name reported in change events
+        address: Absolute address, or offset from the pointer target when pointer is set
+        size: Number of bytes to snapshot
+        pointer: Address of a u32 pointer to dereference first (DMA-relocated save blocks)
+    """
+    name: str
+    address: int
+    size: int
+    pointer: Optional[int] = None
+
+
+@dataclass
+class RamChange:
+    """A watched field that changed on a given frame"""
+    name: str
+    frame: int
+    old: Optional[bytes]
+    new: bytes
+
+
+def milestone_watches(addresses) -> List[RamWatch]:
+    """Watch list covering every input of the milestone rules"""
+    system_flags_offset = addresses.SAVE_BLOCK1_FLAGS_OFFSET + addresses.SYSTEM_FLAGS_START // 8
+    return [
+        RamWatch("map", addresses.MAP_BANK, 2),  # Bank and number are adjacent bytes
+        RamWatch("party_count", addresses.PARTY_COUNT, 1),
+        RamWatch("badges", addresses.PLAYER_BADGES, 1),
+        # Badge and visited-town system flags (first 32 system flags)
+        RamWatch("system_flags", system_flags_offset, 4, pointer=addresses.SAVE_BLOCK1_PTR),
+        RamWatch("player_name", 0, 8, pointer=addresses.SAVE_BLOCK2_PTR),
+    ]
+
+
+class RamWatcher:
+    """Snapshots watched RAM fields each frame and reports the ones that changed"""
+
+    def __init__(self, read_memory: Callable[[int, int], bytes], watches: Sequence[RamWatch]):
+        """
+        Args:
+            read_memory: Callable (address, size) -> bytes
+            watches: Fields to snapshot
+        """
+        self._read_memory = read_memory
+        self.watches: Tuple[RamWatch, ...] = tuple(watches)
+        self._snapshot: Dict[str, Optional[bytes]] = {watch.name: None for watch in self.watches}
+        self.frames_polled = 0
+        self.changes_seen = 0
+
+    def _read_watch(self, watch: RamWatch) -> bytes:
+        address = watch.address
+        if watch.pointer is not None:
+            base = int.from_bytes(bytes(self._read_memory(watch.pointer, 4)), byteorder='little')
+            if base == 0:
+                return b""  # Save block not allocated yet
+            address += base
+        return bytes(self._read_memory(address, watch.size))
+
+    def snapshot(self) -> Dict[str, Optional[bytes]]:
+        """Last seen raw bytes of every watched field"""
+        return dict(self._snapshot)
+
+    def reset(self):
+        """Forget the snapshot (e.g. after loading a state) so every field reports as changed"""
+        self._snapshot = {watch.name: None for watch in self.watches}
+
+    def poll(self, frame: int) -> List[RamChange]:
+        """Read every watched field and return the ones that differ from the last poll"""
+        self.frames_polled += 1
+        changes = []
+        for watch in self.watches:
+            try:
+                value = self._read_watch(watch)
+            except Exception as e:
+                logger.debug(f"RAM watch {watch.name} failed: {e}")
+                continue
+            old = self._snapshot[watch.name]
+            if value != old:
+                self._snapshot[watch.name] = value
+                changes.append(RamChange(watch.name, frame, old, value))
+        self.changes_seen += len(changes)
+        return changes
@@ -0,0 +1,187 @@
+"""
+Headless max-speed rollouts.
+
+A rollout runs a button script on a bare core (see vector_env.HeadlessCore) with no
+frame pacing, screenshots, OCR or map stitching, and can fork from in-memory
+savestate snapshots. It is the building block for fast regression replays and
+search-based planning.
+
+Script syntax (comma or whitespace separated):
+    A            press A (held hold_frames, then released release_frames)
+    A+B          press A and B together
+    UP*4         press UP four times
+    WAIT:30      advance 30 frames with no keys held
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ram_features import RAM_FEATURE_DTYPE, buttons_to_mask, read_ram_features
+
+logger = logging.getLogger(__name__)
+
+# Same pacing as the server's action queue (ACTION_HOLD_FRAMES / ACTION_RELEASE_DELAY)
+DEFAULT_HOLD_FRAMES = 12
+DEFAULT_RELEASE_FRAMES = 24
+
+# Where bare state names are looked up
+STATE_DIRS = ("Emerald-GBAdvance", os.path.join("tests", "states"))
+
+# (key mask, frames) pairs
+Segment = Tuple[int, int]
+
+
+def parse_script(script: str, hold_frames: int = DEFAULT_HOLD_FRAMES,
+                 release_frames: int = DEFAULT_RELEASE_FRAMES) -> List[Segment]:
+    """Compile a button script to (key mask, frames) segments"""
+    segments: List[Segment] = []
+    for token in script.replace(',', ' ').split():
+        token = token.strip().upper()
+        if token.startswith("WAIT:"):
+            frames = int(token[len("WAIT:"):])
+            if frames > 0:
+                segments.append((0, frames))
+            continue
+
+        repeat = 1
+        if '*' in token:
+            token, count = token.split('*', 1)
+            repeat = int(count)
+        mask = buttons_to_mask(token.split('+'))
+        for _ in range(repeat):
+            segments.append((mask, hold_frames))
+            if release_frames > 0:
+                segments.append((0, release_frames))
+    return segments
+
+
+def load_recorded_script(path: str) -> str:
+    """
+    Button script from a recording.
+
+    Accepts an llm_logs session (.jsonl, the "action" entries are replayed in order)
+    or a plain text file in script syntax. Raises ValueError when there is nothing to replay.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if not path.endswith('.jsonl'):
+            script = f.read()
+            if not script.strip():
+                raise ValueError(f"No actions found in {path}")
+            return script
+        actions = []
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get('type') == 'action' and entry.get('action'):
+                actions.append(str(entry['action']))
+    if not actions:
+        raise ValueError(f"No actions found in {path} (agents log them as \"action\" entries)")
+    return ", ".join(actions)
+
+
+def resolve_state_path(name: str) -> str:
+    """State file path; bare names are looked up in Emerald-GBAdvance/ and tests/states/"""
+    candidates = [name]
+    if not name.endswith('.state'):
+        candidates.append(name + '.state')
+    for candidate in list(candidates):
+        candidates.extend(os.path.join(directory, candidate) for directory in STATE_DIRS)
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    raise FileNotFoundError(f"State not found: {name} (searched {', '.join(STATE_DIRS)})")
+
+
+@dataclass
+class RolloutResult:
+    """Outcome of one rollout"""
+    frames: int
+    seconds: float
+    features: np.ndarray  # RAM_FEATURE_DTYPE record at the end of the rollout
+    state: Optional[bytes] = None
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.seconds if self.seconds > 0 else float('inf')
+
+
+@dataclass
+class RolloutStats:
+    """Totals across every rollout a runner has executed"""
+    rollouts: int = 0
+    frames: int = 0
+    seconds: float = 0.0
+    forks: int = 0
+    fork_seconds: float = 0.0
+    per_rollout_fps: List[float] = field(default_factory=list)
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+
+class RolloutRunner:
+    """Runs button segments on one headless core as fast as it will go"""
+
+    def __init__(self, core, addresses):
+        """
+        Args:
+            core: HeadlessCore (run, load_state, save_state, read_memory, frame_count)
+            addresses: MemoryAddresses for the RAM feature reads
+        """
+        self.core = core
+        self.addresses = addresses
+        self.stats = RolloutStats()
+
+    def snapshot(self) -> bytes:
+        """In-memory savestate to fork from"""
+        start = time.perf_counter()
+        state = self.core.save_state()
+        self.stats.forks += 1
+        self.stats.fork_seconds += time.perf_counter() - start
+        return state
+
+    def features(self) -> np.ndarray:
+        record = np.zeros((), dtype=RAM_FEATURE_DTYPE)
+        read_ram_features(self.core.read_memory, self.addresses, record, self.core.frame_count)
+        return record
+
+    def run(self, segments: Iterable[Segment], start_state: Optional[bytes] = None,
+            keep_state: bool = False) -> RolloutResult:
+        """
+        Execute segments, optionally after restoring a snapshot.
+
+        Args:
+            segments: (key mask, frames) pairs from parse_script
+            start_state: Snapshot to fork from (None continues from the current state)
+            keep_state: Return the final savestate in the result
+        """
+        if start_state is not None:
+            self.core.load_state(start_state)
+        frames = 0
+        start = time.perf_counter()
+        for mask, count in segments:
+            self.core.run(mask, count)
+            frames += count
+        self.core.run(0, 0)  # Release keys
+        seconds = time.perf_counter() - start
+
+        result = RolloutResult(frames, seconds, self.features(), self.core.save_state() if keep_state else None)
+        self.stats.rollouts += 1
+        self.stats.frames += frames
+        self.stats.seconds += seconds
+        self.stats.per_rollout_fps.append(result.fps)
+        return result
+
+    def run_branches(self, root: bytes, branches: Sequence[Sequence[Segment]],
+                     keep_state: bool = False) -> List[RolloutResult]:
+        """Run every branch from the same snapshot"""
+        return [self.run(branch, start_state=root, keep_state=keep_state) for branch in branches]
@@ -0,0 +1,160 @@
+"""
+In-memory savestate pool.
+
+SnapshotPool preallocates one arena of fixed-size raw state buffers and lets the
+core serialize straight into it, so taking or restoring a snapshot is a single
+memcpy-sized call with no Python bytes objects, files, milestone copies or map
+grid copies. Snapshots are immutable once written: handles can be shared freely
+between search branches (forking is free), and a new snapshot always goes to a
+fresh slot. When the arena is full the least recently used unpinned slot is
+reused, which invalidates the handles that pointed at it.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # ~650 Emerald savestates
+
+
+class SnapshotEvictedError(KeyError):
+    """The snapshot's slot was reused after it fell out of the LRU"""
+
+
+class SnapshotPoolFull(RuntimeError):
+    """Every slot is pinned, so nothing can be evicted"""
+
+
+@dataclass(frozen=True)
+class SnapshotHandle:
+    """Reference to a snapshot in a SnapshotPool"""
+    slot: int
+    generation: int
+    frame: Optional[int] = None  # Emulator frame counter when the snapshot was taken
+
+
+class SnapshotPool:
+    """Bounded LRU arena of raw savestates"""
+
+    def __init__(self, state_size: int, save_into: Callable[[np.ndarray], bool],
+                 load_from: Callable[[np.ndarray], bool], max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            state_size: Bytes per raw savestate
+            save_into: Serializes the current state into a writable uint8 buffer, returns success
+            load_from: Loads the state from a uint8 buffer, returns success
+            max_bytes: Arena size; capacity is max_bytes // state_size (at least 1)
+        """
+        self.state_size = state_size
+        self.capacity = max(1, max_bytes // state_size)
+        self._save_into = save_into
+        self._load_from = load_from
+
+        self._arena = np.zeros((self.capacity, state_size), dtype=np.uint8)
+        self._generations = [0] * self.capacity
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self._lru: "OrderedDict[int, None]" = OrderedDict()  # Used slots, oldest first
+        self._pinned: Dict[int, int] = {}  # slot -> pin count
+        self._lock = threading.RLock()
+
+        self._stats = {'snapshots': 0, 'restores': 0, 'evictions': 0}
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        for slot in self._lru:
+            if slot not in self._pinned:
+                del self._lru[slot]
+                self._generations[slot] += 1
+                self._stats['evictions'] += 1
+                return slot
+        raise SnapshotPoolFull(f"All {self.capacity} snapshot slots are pinned")
+
+    def _slot(self, handle: SnapshotHandle) -> int:
+        if handle.slot >= self.capacity or self._generations[handle.slot] != handle.generation \
+                or handle.slot not in self._lru:
+            raise SnapshotEvictedError(f"Snapshot in slot {handle.slot} was evicted")
+        return handle.slot
+
+    def snapshot(self, frame: Optional[int] = None, pin: bool = False) -> SnapshotHandle:
+        """Serialize the current state into a free (or least recently used) slot"""
+        with self._lock:
+            slot = self._allocate()
+            if not self._save_into(self._arena[slot]):
+                self._free.append(slot)
+                raise RuntimeError("Core failed to save state")
+            self._lru[slot] = None
+            handle = SnapshotHandle(slot, self._generations[slot], frame)
+            if pin:
+                self._pinned[slot] = 1
+            self._stats['snapshots'] += 1
+            return handle
+
+    def restore(self, handle: SnapshotHandle):
+        """Load a snapshot back into the core"""
+        with self._lock:
+            slot = self._slot(handle)
+            self._lru.move_to_end(slot)
+            if not self._load_from(self._arena[slot]):
+                raise RuntimeError(f"Core failed to load snapshot from slot {slot}")
+            self._stats['restores'] += 1
+
+    def is_valid(self, handle: SnapshotHandle) -> bool:
+        with self._lock:
+            try:
+                self._slot(handle)
+                return True
+            except SnapshotEvictedError:
+                return False
+
+    def pin(self, handle: SnapshotHandle):
+        """Keep a snapshot (e.g. a search root) from being evicted"""
+        with self._lock:
+            slot = self._slot(handle)
+            self._pinned[slot] = self._pinned.get(slot, 0) + 1
+
+    def unpin(self, handle: SnapshotHandle):
+        with self._lock:
+            slot = self._slot(handle)
+            count = self._pinned.get(slot, 0) - 1
+            if count > 0:
+                self._pinned[slot] = count
+            else:
+                self._pinned.pop(slot, None)
+
+    def discard(self, handle: SnapshotHandle):
+        """Free a snapshot's slot immediately"""
+        with self._lock:
+            try:
+                slot = self._slot(handle)
+            except SnapshotEvictedError:
+                return
+            del self._lru[slot]
+            self._pinned.pop(slot, None)
+            self._generations[slot] += 1
+            self._free.append(slot)
+
+    def to_bytes(self, handle: SnapshotHandle) -> bytes:
+        """Copy a snapshot out (e.g. to write it to disk)"""
+        with self._lock:
+            return self._arena[self._slot(handle)].tobytes()
+
+    def clear(self):
+        """Invalidate every handle"""
+        with self._lock:
+            for slot in self._lru:
+                self._generations[slot] += 1
+            self._lru.clear()
+            self._pinned.clear()
+            self._free = list(range(self.capacity - 1, -1, -1))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, in_use=len(self._lru), pinned=len(self._pinned), capacity=self.capacity,
+                        arena_bytes=self._arena.nbytes)
@@ -0,0 +1,276 @@
+"""
+Vectorized Pokemon Emerald environment: N mGBA cores in one process.
+
+VectorEmeraldEnv loads the ROM once and runs N independent cores in lockstep. Each
+step takes one key mask per core and returns batched frames, shape (N, 160, 240, 3),
+plus a RAM_FEATURE_DTYPE record per core. Cores can be reset individually from
+savestate bytes.
+
+mGBA is called through cffi, which releases the GIL while C code runs, so cores are
+stepped on a thread pool and throughput scales with the number of cores per
+process. None of the single-game machinery (frame capture thread, memory reader,
+milestones, map stitcher) is attached to these cores.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import mgba.core
+import mgba.log
+import mgba.image
+from mgba._pylib import ffi, lib
+
+from .memory_reader import MemoryAddresses
+from .ram_features import RAM_FEATURE_DTYPE, actions_to_masks, read_ram_features
+
+logger = logging.getLogger(__name__)
+
+# GBA screen size, used to size observation buffers before any core is loaded
+GBA_WIDTH = 240
+GBA_HEIGHT = 160
+
+Actions = Union[np.ndarray, Sequence[int], Sequence[Sequence[str]]]
+
+
+class HeadlessCore:
+    """One bare mGBA core with its video buffer and zero-copy memory views (no game-state machinery)"""
+
+    def __init__(self, rom_bytes: bytes, tmp_dir: Path):
+        # Each core gets its own ROM copy so save files never collide
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_gba = tmp_dir / "rom.gba"
+        tmp_gba.write_bytes(rom_bytes)
+
+        self.core = mgba.core.load_path(str(tmp_gba))
+        if self.core is None:
+            raise ValueError(f"Failed to load GBA file: {tmp_gba}")
+        self.core.autoload_save()
+        self.core.reset()
+
+        self.width, self.height = self.core.desired_video_dimensions()
+        self.video_buffer = mgba.image.Image(self.width, self.height)
+        self.core.set_video_buffer(self.video_buffer)
+        self.core.reset()  # Reset after setting video buffer
+
+        self.frame_count = 0
+        self._regions = {}
+
+    def read_memory(self, address: int, size: int = 1) -> bytes:
+        """Read memory through a cached view of the region (no per-frame block copy)"""
+        region_id = address >> lib.BASE_OFFSET
+        region = self._regions.get(region_id)
+        if region is None:
+            mem_core = self.core.memory.u8._core
+            size_out = ffi.new("size_t *")
+            ptr = ffi.cast("uint8_t *", mem_core.getMemoryBlock(mem_core, region_id, size_out))
+            region = ffi.buffer(ptr, size_out[0])
+            self._regions[region_id] = region
+        address &= len(region) - 1
+        return region[address:address + size]
+
+    def run(self, key_mask: int, frames: int):
+        self.core.set_keys(raw=int(key_mask))
+        for _ in range(frames):
+            self.core.run_frame()
+        self.frame_count += frames
+
+    def copy_frame(self, out: np.ndarray):
+        """Copy the current frame into an (H, W, 3) uint8 array"""
+        buffer = self.video_buffer
+        pixels = np.frombuffer(ffi.buffer(buffer.buffer), dtype=np.uint8)
+        if pixels.size == buffer.stride * self.height * 4:
+            # 32-bit XBGR8888: bytes are R, G, B, X
+            out[...] = pixels.reshape(self.height, buffer.stride, 4)[:, :self.width, :3]
+        else:
+            out[...] = np.asarray(buffer.to_pil().convert("RGB"))
+
+    def observe(self, frame_out: np.ndarray, features_out, addresses):
+        """Write the current frame and RAM features into caller-owned arrays"""
+        self.copy_frame(frame_out)
+        try:
+            read_ram_features(self.read_memory, addresses, features_out, self.frame_count)
+        except Exception as e:
+            logger.debug(f"Failed to read RAM features: {e}")
+
+    def load_state(self, state_bytes: bytes):
+        self.core.load_raw_state(bytes(state_bytes))
+        self.core.set_keys(raw=0)
+        self.frame_count = 0
+
+    def reset(self):
+        self.core.reset()
+        self.frame_count = 0
+
+    def save_state(self) -> bytes:
+        raw_data = self.core.save_raw_state()
+        if hasattr(raw_data, 'buffer'):
+            return bytes(raw_data.buffer)
+        return bytes(raw_data)
+
+
+class VectorEmeraldEnv:
+    """N Pokemon Emerald cores stepped in lockstep with batched observations"""
+
+    def __init__(self, rom_path: str, num_envs: int, num_threads: Optional[int] = None,
+                 initial_state: Optional[bytes] = None):
+        """
+        Args:
+            rom_path: Path to the Emerald ROM
+            num_envs: Number of cores
+            num_threads: Worker threads for stepping (default: min(num_envs, CPU count))
+            initial_state: Savestate bytes that reset() restores (default: power-on)
+        """
+        if num_envs < 1:
+            raise ValueError("num_envs must be at least 1")
+        self.rom_path = rom_path
+        self.num_envs = num_envs
+        self.num_threads = num_threads or min(num_envs, os.cpu_count() or 1)
+        self.initial_state = initial_state
+        self.addresses = MemoryAddresses()
+
+        self.width = GBA_WIDTH
+        self.height = GBA_HEIGHT
+        self._slots: List[HeadlessCore] = []
+        self._tmp_dir = None
+        self._executor = None
+        self.frames = None
+        self.features = None
+
+    def initialize(self):
+        """Load the ROM into every core"""
+        try:
+            # Prevents relentless spamming to stdout by libmgba.
+            mgba.log.silence()
+
+            rom_bytes = Path(self.rom_path).read_bytes()
+            self._tmp_dir = Path(tempfile.mkdtemp())
+            self._slots = [HeadlessCore(rom_bytes, self._tmp_dir / f"core_{i}") for i in range(self.num_envs)]
+            self.width, self.height = self._slots[0].width, self._slots[0].height
+
+            self.frames = np.zeros((self.num_envs, self.height, self.width, 3), dtype=np.uint8)
+            self.features = np.zeros(self.num_envs, dtype=RAM_FEATURE_DTYPE)
+            if self.num_threads > 1:
+                self._executor = ThreadPoolExecutor(max_workers=self.num_threads,
+                                                    thread_name_prefix="emerald-core")
+            if self.initial_state is not None:
+                self.load_state(self.initial_state)
+            self._observe(range(self.num_envs))
+            logger.info(f"Vector env initialized with {self.num_envs} cores ({self.num_threads} threads)")
+        except Exception as e:
+            self.close()
+            raise RuntimeError(f"Failed to initialize vector env: {e}")
+
+    def close(self):
+        """Release cores, threads and temporary ROM copies"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._slots = []
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
+    def __enter__(self):
+        self.initialize()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _check_initialized(self):
+        if not self._slots:
+            raise RuntimeError("Vector env not initialized")
+
+    def _indices(self, indices: Optional[Iterable[int]]) -> List[int]:
+        if indices is None:
+            return list(range(self.num_envs))
+        indices = [int(i) for i in indices]
+        for i in indices:
+            if not 0 <= i < self.num_envs:
+                raise IndexError(f"Core index {i} out of range for {self.num_envs} cores")
+        return indices
+
+    def key_masks(self, actions: Actions) -> np.ndarray:
+        """Normalize actions (key masks or per-core button lists) to a (N,) uint16 array"""
+        return actions_to_masks(actions, self.num_envs)
+
+    def _map(self, fn, indices: List[int]):
+        if self._executor is None or len(indices) == 1:
+            for i in indices:
+                fn(i)
+        else:
+            # Propagate the first worker exception
+            for _ in self._executor.map(fn, indices):
+                pass
+
+    def _observe_one(self, i: int):
+        self._slots[i].observe(self.frames[i], self.features[i], self.addresses)
+
+    def _observe(self, indices: Iterable[int]):
+        self._map(self._observe_one, list(indices))
+
+    def step(self, actions: Actions, frames: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hold each core's keys for `frames` frames, then observe.
+
+        Args:
+            actions: (N,) key masks (see ram_features.buttons_to_mask) or N button lists
+            frames: Frames to advance every core
+
+        Returns:
+            (frames, features): (N, H, W, 3) uint8 and (N,) RAM_FEATURE_DTYPE arrays.
+            Both are reused between steps; copy them to keep a history.
+        """
+        self._check_initialized()
+        masks = self.key_masks(actions)
+
+        def step_one(i: int):
+            self._slots[i].run(masks[i], frames)
+            self._observe_one(i)
+
+        self._map(step_one, list(range(self.num_envs)))
+        return self.frames, self.features
+
+    def load_state(self, state_bytes: Union[bytes, Sequence[bytes]], indices: Optional[Iterable[int]] = None):
+        """Load savestate bytes into the given cores (one state for all, or one per index)"""
+        self._check_initialized()
+        indices = self._indices(indices)
+        if isinstance(state_bytes, (bytes, bytearray)):
+            states = [state_bytes] * len(indices)
+        else:
+            states = list(state_bytes)
+            if len(states) != len(indices):
+                raise ValueError(f"Got {len(states)} states for {len(indices)} cores")
+
+        for i, state in zip(indices, states):
+            self._slots[i].load_state(state)
+        self._observe(indices)
+
+    def reset(self, indices: Optional[Iterable[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Reset cores to the initial state (or power-on when none was given)"""
+        self._check_initialized()
+        indices = self._indices(indices)
+        if self.initial_state is not None:
+            self.load_state(self.initial_state, indices)
+        else:
+            for i in indices:
+                self._slots[i].reset()
+            self._observe(indices)
+        return self.frames, self.features
+
+    def save_state(self, index: int) -> bytes:
+        """Savestate bytes of one core"""
+        self._check_initialized()
+        return self._slots[self._indices([index])[0]].save_state()
+
+    def read_memory(self, index: int, address: int, size: int = 1) -> bytes:
+        """Read memory from one core"""
+        self._check_initialized()
+        return self._slots[self._indices([index])[0]].read_memory(address, size)
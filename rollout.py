@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Headless max-speed rollout runner.
+
+Loads a .state, replays a scripted or recorded button sequence with no pacing,
+screenshots, OCR or map stitching, and reports frames per second. Branches are
+forked from an in-memory snapshot taken after the main script.
+
+Examples:
+    python rollout.py --load-state simple_test --script "A*3, WAIT:60, UP*4"
+    python rollout.py --load-state tests/states/house.state --actions llm_logs/llm_log_X.jsonl
+    python rollout.py --load-state start --script "A*5" --branch "UP*4" --branch "DOWN*4" --repeat 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import mgba.log
+
+from pokemon_env.memory_reader import MemoryAddresses
+from pokemon_env.rollout import (
+    DEFAULT_HOLD_FRAMES,
+    DEFAULT_RELEASE_FRAMES,
+    RolloutRunner,
+    load_recorded_script,
+    parse_script,
+    resolve_state_path,
+)
+from pokemon_env.vector_env import HeadlessCore
+
+
+def describe(features) -> str:
+    return (f"map {int(features['map_bank'])}:{int(features['map_number'])} "
+            f"pos ({int(features['player_x'])}, {int(features['player_y'])}) "
+            f"party {int(features['party_count'])} badges {int(features['badges']):08b} "
+            f"battle {bool(features['in_battle'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless max-speed rollouts from a savestate")
+    parser.add_argument("--rom", type=str, default="Emerald-GBAdvance/rom.gba",
+                       help="Path to ROM file")
+    parser.add_argument("--load-state", type=str, required=True,
+                       help="State file, or a name in Emerald-GBAdvance/ or tests/states/")
+    parser.add_argument("--script", type=str, default="",
+                       help='Button script, e.g. "A*3, WAIT:60, UP+B"')
+    parser.add_argument("--actions", type=str,
+                       help="Recorded actions: llm_logs .jsonl or a text file in script syntax")
+    parser.add_argument("--branch", action="append", default=[],
+                       help="Script forked from the snapshot after the main script (repeatable)")
+    parser.add_argument("--repeat", type=int, default=1,
+                       help="Replay the main script this many times from the loaded state")
+    parser.add_argument("--hold-frames", type=int, default=DEFAULT_HOLD_FRAMES,
+                       help="Frames each press is held")
+    parser.add_argument("--release-frames", type=int, default=DEFAULT_RELEASE_FRAMES,
+                       help="Frames after each release")
+    parser.add_argument("--save-state", type=str,
+                       help="Write the state at the end of the main script")
+    args = parser.parse_args()
+
+    state_path = resolve_state_path(args.load_state)
+    script = args.script
+    if args.actions:
+        script = ", ".join(part for part in (load_recorded_script(args.actions), script) if part)
+    segments = parse_script(script, args.hold_frames, args.release_frames)
+    branches = [parse_script(branch, args.hold_frames, args.release_frames) for branch in args.branch]
+
+    mgba.log.silence()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        core = HeadlessCore(Path(args.rom).read_bytes(), Path(tmp_dir))
+        runner = RolloutRunner(core, MemoryAddresses())
+        root = Path(state_path).read_bytes()
+        print(f"📂 Loaded {state_path}: {len(segments)} segments, {sum(f for _, f in segments)} frames per replay")
+
+        wall_start = time.perf_counter()
+        main_result = None
+        for _ in range(max(1, args.repeat)):
+            main_result = runner.run(segments, start_state=root, keep_state=True)
+        print(f"▶️  Main script: {main_result.frames} frames, {main_result.fps:,.0f} FPS -> {describe(main_result.features)}")
+
+        if args.save_state:
+            with open(args.save_state, 'wb') as f:
+                f.write(main_result.state)
+            print(f"💾 Saved final state to {args.save_state}")
+
+        if branches:
+            fork = main_result.state
+            for i, result in enumerate(runner.run_branches(fork, branches)):
+                print(f"🌿 Branch {i}: {result.frames} frames, {result.fps:,.0f} FPS -> {describe(result.features)}")
+
+        stats = runner.stats
+        wall = time.perf_counter() - wall_start
+        print(f"📊 {stats.rollouts} rollouts, {stats.frames:,} frames in {stats.seconds:.2f}s "
+              f"({stats.fps:,.0f} FPS emulated, {stats.frames / wall if wall > 0 else 0:,.0f} FPS wall)")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,17 +10,38 @@ import time
 import argparse
 import subprocess
 import signal
-import weave
 from datetime import datetime
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from utils.startup_profile import mark
+from utils import telemetry
+from utils.http_transport import get_http_client
 from server.client import run_multiprocess_client
 
-# WandB weave
-weave.init(
-        project_name="pokeagent-challenge-llm"
-    )
+mark("imports")
+
+SERVER_START_TIMEOUT = 30.0  # Seconds to wait for the server's /health endpoint
+TELEMETRY_WAIT_TIMEOUT = 10.0  # Seconds the client waits for weave so the session trace is recorded
+
+
+def wait_for_server(port, process=None, timeout=SERVER_START_TIMEOUT):
+    """Poll /health until the server answers; False on timeout or if the process exits"""
+    http = get_http_client()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            print(f"❌ Server exited with code {process.returncode}")
+            return False
+        try:
+            if http.get(f"http://localhost:{port}/health", timeout=1).status_code == 200:
+                mark("server ready")
+                return True
+        except Exception:
+            pass
+        time.sleep(0.1)
+    print(f"⚠️ Server did not answer /health within {timeout:.0f}s")
+    return False
 
 def start_server(args):
     """Start the server process with appropriate arguments"""
@@ -51,6 +72,8 @@ def start_server(args):
     
     if args.no_ocr:
         server_cmd.append("--no-ocr")
+    elif args.ocr_workers > 0:
+        server_cmd.extend(["--ocr-workers", str(args.ocr_workers)])
     
     # Server always runs headless - display handled by client
     
@@ -63,8 +86,10 @@ def start_server(args):
             bufsize=1
         )
         print(f"✅ Server started with PID {server_process.pid}")
-        print("⏳ Waiting 3 seconds for server to initialize...")
-        time.sleep(3)
+        print("⏳ Waiting for server to initialize...")
+        if not wait_for_server(args.port, server_process):
+            server_process.terminate()
+            return None
         
         return server_process
         
@@ -89,7 +114,6 @@ def start_frame_server():
         return None
 
 
-@weave.op(name=f"agent_baseline_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}")
 def main():
     """Main entry point for the Pokemon Agent"""
     parser = argparse.ArgumentParser(description="Pokemon Emerald AI Agent")
@@ -113,6 +137,48 @@ def main():
                        help="Model name to use")
     parser.add_argument("--simple", action="store_true", 
                        help="Simple mode: direct frame->action without 4-module architecture")
+    parser.add_argument("--concurrent-modules", action="store_true", 
+                       help="Four-module mode: run perception concurrently with memory + planning (async VLM clients)")
+    parser.add_argument("--search-planner", action="store_true", 
+                       help="Simple mode: ask the server's savestate search planner for navigation paths")
+    parser.add_argument("--stream-actions", action="store_true", 
+                       help="Simple mode: stream VLM responses and send the actions as soon as the ACTION block is generated")
+    parser.add_argument("--prompt-token-budget", type=int, default=None, 
+                       help="Simple mode: token target for step prompts, trimming low-priority sections (default: per model, 0 = unlimited)")
+    parser.add_argument("--vlm-cache", action="store_true", 
+                       help="Serve repeated VLM queries from .pokeagent_cache/vlm_cache.sqlite")
+    parser.add_argument("--vlm-cache-ttl", type=float, default=None, 
+                       help="Seconds before a cached VLM response expires (default: never)")
+    parser.add_argument("--vlm-cache-image-hash", choices=["exact", "perceptual"], default="exact", 
+                       help="Key images on exact pixels or a perceptual hash")
+    parser.add_argument("--image-resize", type=str, default="native", 
+                       help="Frame size sent to the VLM: native, auto (largest free upscale for the model) or a scale factor")
+    parser.add_argument("--image-encoding", choices=["png", "palette", "webp", "jpeg"], default="png", 
+                       help="Frame encoding for VLM calls (palette is lossless 8-bit PNG)")
+    parser.add_argument("--image-quality", type=int, default=85, 
+                       help="Quality for webp/jpeg frame encoding")
+    parser.add_argument("--http-pool-size", type=int, default=20, 
+                       help="Max pooled keep-alive connections for VLM APIs and the game server")
+    parser.add_argument("--http-timeout", type=float, default=120.0, 
+                       help="Read timeout in seconds for VLM API requests")
+    parser.add_argument("--no-http2", action="store_true", 
+                       help="Disable HTTP/2 for VLM API connections")
+    parser.add_argument("--vlm-retry-deadline", type=float, default=90.0, 
+                       help="Total seconds a VLM call may spend on retries before giving up")
+    parser.add_argument("--vlm-hedge-percentile", type=float, default=None, 
+                       help="Send a duplicate VLM request when a call is slower than this latency percentile (e.g. 0.95)")
+    parser.add_argument("--fallback-backend", type=str, default=None, 
+                       help="Backend to fail over to while the primary keeps failing (circuit breaker)")
+    parser.add_argument("--fallback-model-name", type=str, default=None, 
+                       help="Model for --fallback-backend (default: --model-name)")
+    parser.add_argument("--local-device", type=str, default="auto", 
+                       help="Device for --backend local (auto, cuda, cpu, ...)")
+    parser.add_argument("--local-prefix-cache", action="store_true", 
+                       help="Local backend: reuse the KV cache of the static prompt prefix across steps")
+    parser.add_argument("--local-batch-size", type=int, default=1, 
+                       help="Local backend: batch up to N concurrent queries into one generate() call")
+    parser.add_argument("--local-batch-window-ms", type=float, default=5.0, 
+                       help="Local backend: how long to collect queries for a batch")
     
     # Operation modes
     parser.add_argument("--headless", action="store_true", 
@@ -127,9 +193,17 @@ def main():
                        help="Record video of the gameplay")
     parser.add_argument("--no-ocr", action="store_true", 
                        help="Disable OCR dialogue detection")
+    parser.add_argument("--ocr-workers", type=int, default=0, 
+                       help="Run OCR in N background processes so it never blocks the emulator (0 = synchronous)")
+    parser.add_argument("--no-telemetry", action="store_true", 
+                       help="Skip Weave/W&B tracing (weave is never imported)")
     
     args = parser.parse_args()
     
+    # WandB weave, initialized in the background while the server starts
+    if not args.no_telemetry:
+        telemetry.init_telemetry(project_name="pokeagent-challenge-llm")
+    
     print("=" * 60)
     print("🎮 Pokemon Emerald AI Agent")
     print("=" * 60)
@@ -154,8 +228,8 @@ def main():
             print("   python -m server.app --port", args.port)
             if args.load_state:
                 print(f"   (Add --load-state {args.load_state} to server command)")
-            print("\n⏳ Waiting 3 seconds for manual server startup...")
-            time.sleep(3)
+            print("\n⏳ Waiting for manual server startup...")
+            wait_for_server(args.port)
         
         # Display configuration
         print("\n🤖 Agent Configuration:")
@@ -165,8 +239,12 @@ def main():
             print("   Mode: Simple (direct frame->action)")
         else:
             print("   Mode: Four-module architecture")
+            if args.concurrent_modules:
+                print("   Modules: concurrent")
         if args.no_ocr:
             print("   OCR: Disabled")
+        if args.no_telemetry:
+            print("   Telemetry: Disabled")
         if args.record:
             print("   Recording: Enabled")
         
@@ -176,8 +254,11 @@ def main():
         print("\n🚀 Starting client...")
         print("-" * 60)
         
-        # Run the client
-        success = run_multiprocess_client(server_port=args.port, args=args)
+        # Run the client as one weave op; op() resolves on this single call, so finish init first
+        if not args.no_telemetry and not telemetry.wait_for_telemetry(timeout=TELEMETRY_WAIT_TIMEOUT):
+            print(f"⚠️ Telemetry not ready after {TELEMETRY_WAIT_TIMEOUT:.0f}s; the session is not traced as one op")
+        run_client = telemetry.op(name=f"agent_baseline_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}")(run_multiprocess_client)
+        success = run_client(server_port=args.port, args=args)
         
         return 0 if success else 1
         
@@ -31,6 +31,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Local application imports
 from pokemon_env.emulator import EmeraldEmulator
+from pokemon_env.planner import PlanObjective, plan_from_live_state
 from utils.anticheat import AntiCheatTracker
 
 # Set up logging - reduced verbosity for multiprocess mode
@@ -80,10 +81,8 @@ frame_cache_counter = 0
 obs_lock = threading.Lock()
 step_lock = threading.Lock()
 memory_lock = threading.Lock()  # New lock for memory operations to prevent race conditions
-
-# Background milestone processing
-state_update_thread = None
-state_update_running = False
+search_env = None  # Headless clone of env that /plan searches on (created on first plan)
+planner_lock = threading.Lock()  # One search at a time on search_env
 
 # Button mapping removed - handled by client
 
@@ -227,6 +226,14 @@ app.add_middleware(
 class ActionRequest(BaseModel):
     buttons: list = []  # List of button names: A, B, SELECT, START, UP, DOWN, LEFT, RIGHT
 
+class PlanRequest(BaseModel):
+    objective: str  # coordinate, warp, milestone or dialogue
+    target: list = None  # [x, y] for coordinate (and optionally warp) objectives
+    milestone_id: str = None
+    tolerance: int = 0
+    beam_width: int = 8
+    max_depth: int = 6
+
 class GameStateResponse(BaseModel):
     screenshot_base64: str
     step_number: int
@@ -244,50 +251,11 @@ class ComprehensiveStateResponse(BaseModel):
     status: str
     action_queue_length: int = 0
 
-def periodic_milestone_updater():
-    """Lightweight background thread that only updates milestones occasionally"""
-    global state_update_running
-    
-    last_milestone_update = 0
-    
-    while state_update_running and running:
-        try:
-            current_time = time.time()
-            
-            # Update milestones only every 5 seconds (much less frequent)
-            if current_time - last_milestone_update >= 5.0:
-                if env and env.memory_reader:
-                    try:
-                        # Use lightweight state for milestone updates only
-                        basic_state = {
-                            "player": {
-                                "money": env.get_money(),
-                                "party_size": len(env.get_party_pokemon() or []),
-                                "position": env.get_coordinates()
-                            },
-                            "map": {
-                                "location": env.get_location()
-                            }
-                        }
-                        env.check_and_update_milestones(basic_state)
-                        last_milestone_update = current_time
-                        logger.debug("Lightweight milestone update completed")
-                    except Exception as e:
-                        logger.debug(f"Milestone update failed: {e}")
-            
-            # Sleep for 1 second between checks
-            time.sleep(1.0)
-            
-        except Exception as e:
-            logger.error(f"Error in milestone updater: {e}")
-            time.sleep(5.0)  # Wait longer on error
-
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully"""
-    global running, state_update_running
+    global running
     print(f"\nReceived signal {signum}, shutting down gracefully...")
     running = False
-    state_update_running = False
     cleanup_video_recording()
     if env:
         env.stop()
@@ -304,6 +272,8 @@ def setup_environment(skip_initial_state=False):
         
         env = EmeraldEmulator(rom_path=rom_path)
         env.initialize()
+        # Milestones are detected from per-frame RAM watchpoints in the game loop
+        env.enable_milestone_watch()
         
         # Initialize AntiCheat tracker for submission logging
         anticheat_tracker = AntiCheatTracker()
@@ -726,7 +696,8 @@ async def take_action(request: ActionRequest):
                         
                         # Sync LLM logger's cumulative metrics back to latest_metrics
                         # This ensures token usage and costs from LLM interactions are displayed
-                        cumulative_metrics_to_sync = ["total_tokens", "prompt_tokens", "completion_tokens", "total_cost", "total_llm_calls", "total_run_time"]
+                        cumulative_metrics_to_sync = ["total_tokens", "prompt_tokens", "completion_tokens", "total_cost", "total_llm_calls", "total_run_time",
+                                                      "cache_hits", "cache_misses", "cache_hit_rate"]
                         for metric_key in cumulative_metrics_to_sync:
                             if metric_key in llm_logger.cumulative_metrics:
                                 latest_metrics[metric_key] = llm_logger.cumulative_metrics[metric_key]
@@ -813,6 +784,34 @@ async def take_action(request: ActionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/plan")
+def plan_actions(request: PlanRequest):
+    """Search in-memory savestates for a button plan toward an objective (on a clone; the game keeps running)"""
+    global search_env
+    if env is None:
+        raise HTTPException(status_code=400, detail="Emulator not initialized")
+    
+    try:
+        objective = PlanObjective(request.objective, target=request.target,
+                                  milestone_id=request.milestone_id, tolerance=request.tolerance)
+    except (ValueError, TypeError, IndexError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        with planner_lock:
+            if search_env is None:
+                search_env = env.create_search_clone()
+            result = plan_from_live_state(env, search_env, objective, memory_lock,
+                                          beam_width=request.beam_width, max_depth=request.max_depth)
+    except Exception as e:
+        logger.error(f"Planning failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    response = result.to_dict()
+    # Plans start from the current state; queued actions have not run yet
+    response["queued_actions"] = len(action_queue)
+    return response
+
 @app.get("/queue_status")
 async def get_queue_status():
     """Get action queue status"""
@@ -1859,8 +1858,6 @@ def main():
     """Main function"""
     import argparse
     
-    global state_update_running, state_update_thread
-    
     # Set up signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -1871,6 +1868,7 @@ def main():
     parser.add_argument("--load-state", type=str, help="Load a saved state file on startup")
     parser.add_argument("--record", action="store_true", help="Record video of the gameplay")
     parser.add_argument("--no-ocr", action="store_true", help="Disable OCR dialogue detection")
+    parser.add_argument("--ocr-workers", type=int, default=0, help="Run OCR in N background processes (0 = synchronous)")
     # Server always runs headless - display handled by client
     
     args = parser.parse_args()
@@ -1945,6 +1943,9 @@ def main():
         if env and env.memory_reader:
             env.memory_reader._dialog_detection_enabled = False
             print("🚫 All dialogue detection disabled (--no-ocr flag)")
+    elif args.ocr_workers > 0 and env and env.memory_reader:
+        if env.memory_reader.enable_async_ocr(max_workers=args.ocr_workers):
+            print(f"🧵 Async OCR enabled with {args.ocr_workers} worker processes")
     
     # Load state if specified
     if args.load_state:
@@ -2020,11 +2021,6 @@ def main():
             print(f"Failed to load state from {args.load_state}: {e}")
             print("Continuing with fresh game state...")
     
-    # Start lightweight milestone updater thread
-    state_update_running = True
-    state_update_thread = threading.Thread(target=periodic_milestone_updater, daemon=True)
-    state_update_thread.start()
-    
     # Start FastAPI server in background thread
     server_thread = threading.Thread(target=run_fastapi_server, args=(args.port,), daemon=True)
     server_thread.start()
@@ -2042,6 +2038,7 @@ def main():
     print("  /status - Server status")
     print("  /screenshot - Current screenshot")
     print("  /action - Take action (POST)")
+    print("  /plan - Search for a button plan toward an objective (POST)")
     print("  /state - Comprehensive game state (visual + memory data)")
     print("  /agent - Agent thinking status")
     print("  /milestones - Current milestones achieved")
@@ -2064,7 +2061,6 @@ def main():
         # Cleanup
         global running
         running = False
-        state_update_running = False
         if env:
             env.stop()
         print("Server stopped")
@@ -2080,6 +2076,7 @@ def init_for_multiprocess():
         load_state = os.environ.get("LOAD_STATE")
         record_video = os.environ.get("RECORD_VIDEO") == "1"
         no_ocr = os.environ.get("NO_OCR") == "1"
+        ocr_workers = int(os.environ.get("OCR_WORKERS", "0"))
         
         print(f"🔧 Initializing server for multiprocess mode...")
         print(f"   ROM: {rom_path}")
@@ -2093,6 +2090,7 @@ def init_for_multiprocess():
             
             env = EmeraldEmulator(rom_path=rom_path)
             env.initialize()
+            env.enable_milestone_watch()
             
             # Initialize video recording if requested
             init_video_recording(record_video)
@@ -2101,6 +2099,9 @@ def init_for_multiprocess():
             if no_ocr and env and env.memory_reader:
                 env.memory_reader._dialog_detection_enabled = False
                 print("🚫 All dialogue detection disabled (--no-ocr flag)")
+            elif ocr_workers > 0 and env and env.memory_reader:
+                if env.memory_reader.enable_async_ocr(max_workers=ocr_workers):
+                    print(f"🧵 Async OCR enabled with {ocr_workers} worker processes")
             
             # Load state if specified
             if load_state:
@@ -2132,12 +2133,6 @@ def init_for_multiprocess():
                     print(f"❌ Failed to load state from {load_state}: {e}")
                     print("   Continuing with fresh game state...")
             
-            # Start lightweight milestone updater thread
-            global state_update_running, state_update_thread
-            state_update_running = True
-            state_update_thread = threading.Thread(target=periodic_milestone_updater, daemon=True)
-            state_update_thread.start()
-            
             print("✅ Server initialized successfully for multiprocess mode")
             
         except Exception as e:
@@ -8,9 +8,8 @@ import sys
 import time
 import base64
 import io
-import requests
+import httpx
 from PIL import Image
-import weave
 
 # Display-related imports (conditionally used)
 try:
@@ -24,7 +23,9 @@ except ImportError:
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agent import Agent
+from utils.http_transport import get_http_client
 from utils.state_formatter import format_state_for_llm
+from utils.startup_profile import mark, report_first_action
 
 
 def update_display_with_status(screen, font, mode, step_count, additional_info="", frame_surface=None):
@@ -73,7 +74,30 @@ def run_multiprocess_client(server_port=8000, args=None):
     
     # Initialize the agent (it handles VLM, simple vs 4-module, etc internally)
     agent = Agent(args)
+    mark("agent ready")
     print(f"✅ Agent initialized")
+    
+    # Pooled keep-alive connections to the server (configured by the agent from args)
+    http = get_http_client()
+    
+    # With --stream-actions the agent hands over its actions while the VLM is still
+    # generating; post them right away and skip the normal post for that step
+    early_posts = {}
+    
+    def post_early_actions(buttons):
+        try:
+            response = http.post(f"{server_url}/action", json={"buttons": buttons}, timeout=5)
+        except httpx.HTTPError as e:
+            print(f"⚡ Early action post failed, will retry after the step: {e}")
+            return
+        if response.status_code != 200:
+            print(f"⚡ Early action post failed (server error: {response.status_code}), will retry after the step")
+            return
+        # Only accepted posts stand in for the post after the step
+        early_posts['response'], early_posts['buttons'] = response, list(buttons)
+        report_first_action()
+    
+    agent.set_early_action_callback(post_early_actions)
     print(f"🎮 Client connected to server at {server_url}")
     
     # Display setup
@@ -90,7 +114,7 @@ def run_multiprocess_client(server_port=8000, args=None):
     else:
         mode = "AGENT"
     
-    last_agent_time = time.time()
+    last_agent_time = 0.0  # AUTO mode takes its first step right away
     step_count = 0
     
     # Initialize pygame if not headless
@@ -119,7 +143,7 @@ def run_multiprocess_client(server_port=8000, args=None):
             if auto_state_timer and time.time() >= auto_state_timer:
                 print("🔍 Auto-displaying comprehensive state in manual mode...")
                 try:
-                    response = requests.get(f"{server_url}/state", timeout=5)
+                    response = http.get(f"{server_url}/state", timeout=5)
                     if response.status_code == 200:
                         state_data = response.json()
                         print("=" * 80)
@@ -161,13 +185,14 @@ def run_multiprocess_client(server_port=8000, args=None):
                         # Manual agent step
                         elif event.key == pygame.K_SPACE and mode in ("AGENT", "AUTO"):
                             # Force an agent step
-                            response = requests.get(f"{server_url}/state", timeout=5)
+                            response = http.get(f"{server_url}/state", timeout=5)
                             if response.status_code == 200:
                                 state_data = response.json()
                                 screenshot_base64 = state_data.get("visual", {}).get("screenshot_base64", "")
                                 if screenshot_base64:
                                     img_data = base64.b64decode(screenshot_base64)
                                     screenshot = Image.open(io.BytesIO(img_data))
+                                    mark("first state")
                                     game_state = {
                                         'frame': screenshot,
                                         'player': state_data.get('player', {}),
@@ -179,6 +204,7 @@ def run_multiprocess_client(server_port=8000, args=None):
                                         'status': state_data.get('status', ''),
                                         'action_queue_length': state_data.get('action_queue_length', 0)
                                     }
+                                    early_posts.clear()
                                     result = agent.step(game_state)
                                     
                                     # Handle different result formats
@@ -206,16 +232,21 @@ def run_multiprocess_client(server_port=8000, args=None):
                                     
                                     if buttons:
                                         try:
-                                            response = requests.post(
-                                                f"{server_url}/action",
-                                                json={"buttons": buttons},
-                                                timeout=5
-                                            )
+                                            response = None
+                                            if early_posts.get('buttons') == buttons:
+                                                response = early_posts['response']  # Already sent mid-stream
+                                            if response is None:
+                                                response = http.post(
+                                                    f"{server_url}/action",
+                                                    json={"buttons": buttons},
+                                                    timeout=5
+                                                )
                                             if response.status_code == 200:
+                                                report_first_action()
                                                 print(f"🎮 Agent: {action_str} (sent successfully)")
                                             else:
                                                 print(f"🎮 Agent: {action_str} (server error: {response.status_code})")
-                                        except requests.exceptions.RequestException as e:
+                                        except httpx.HTTPError as e:
                                             print(f"🎮 Agent: {action_str} (connection error: {e})")
                                         step_count += 1
                                         print(f"🎮 Step {step_count}: {action_str}")
@@ -247,7 +278,7 @@ def run_multiprocess_client(server_port=8000, args=None):
                                 # Save state
                                 print("💾 Saving state...")
                                 try:
-                                    response = requests.post(f"{server_url}/save_state", 
+                                    response = http.post(f"{server_url}/save_state", 
                                                            json={"filepath": ".pokeagent_cache/manual_save.state"}, 
                                                            timeout=5)
                                     if response.status_code == 200:
@@ -260,7 +291,7 @@ def run_multiprocess_client(server_port=8000, args=None):
                                 # Load state
                                 print("📂 Loading state...")
                                 try:
-                                    response = requests.post(f"{server_url}/load_state", 
+                                    response = http.post(f"{server_url}/load_state", 
                                                            json={"filepath": ".pokeagent_cache/manual_save.state"}, 
                                                            timeout=5)
                                     if response.status_code == 200:
@@ -273,7 +304,7 @@ def run_multiprocess_client(server_port=8000, args=None):
                                 # Display comprehensive state (what LLM sees)
                                 print("🔍 Getting comprehensive state...")
                                 try:
-                                    response = requests.get(f"{server_url}/state", timeout=5)
+                                    response = http.get(f"{server_url}/state", timeout=5)
                                     if response.status_code == 200:
                                         state_data = response.json()
                                         print("=" * 80)
@@ -293,7 +324,7 @@ def run_multiprocess_client(server_port=8000, args=None):
                             if action:
                                 # Send manual action to server using the same endpoint as agent actions
                                 try:
-                                    response = requests.post(
+                                    response = http.post(
                                         f"{server_url}/action",
                                         json={"buttons": [action]},
                                         timeout=2
@@ -302,12 +333,12 @@ def run_multiprocess_client(server_port=8000, args=None):
                                         print(f"🎮 Manual: {action} (sent successfully)")
                                     else:
                                         print(f"🎮 Manual: {action} (server error: {response.status_code})")
-                                except requests.exceptions.RequestException as e:
+                                except httpx.HTTPError as e:
                                     print(f"🎮 Manual: {action} (connection error: {e})")
                 
                 # Update display
                 try:
-                    response = requests.get(f"{server_url}/screenshot", timeout=0.5)
+                    response = http.get(f"{server_url}/screenshot", timeout=0.5)
                     if response.status_code == 200:
                         frame_data = response.json().get("screenshot_base64", "")
                         if frame_data:
@@ -331,18 +362,19 @@ def run_multiprocess_client(server_port=8000, args=None):
                 if current_time - last_agent_time > 3.0:  # Every 3 seconds
                     # Check if action queue is ready
                     try:
-                        queue_response = requests.get(f"{server_url}/queue_status", timeout=1)
+                        queue_response = http.get(f"{server_url}/queue_status", timeout=1)
                         if queue_response.status_code == 200:
                             queue_status = queue_response.json()
                             if queue_status.get("queue_empty", False):
                                 # Get state and process
-                                response = requests.get(f"{server_url}/state", timeout=5)
+                                response = http.get(f"{server_url}/state", timeout=5)
                                 if response.status_code == 200:
                                     state_data = response.json()
                                     screenshot_base64 = state_data.get("visual", {}).get("screenshot_base64", "")
                                     if screenshot_base64:
                                         img_data = base64.b64decode(screenshot_base64)
                                         screenshot = Image.open(io.BytesIO(img_data))
+                                        mark("first state")
                                         
                                         game_state = {
                                             'frame': screenshot,
@@ -356,6 +388,7 @@ def run_multiprocess_client(server_port=8000, args=None):
                                             'action_queue_length': state_data.get('action_queue_length', 0)
                                         }
                                         
+                                        early_posts.clear()
                                         result = agent.step(game_state)
 
                                         # Handle different result formats
@@ -383,12 +416,17 @@ def run_multiprocess_client(server_port=8000, args=None):
                                         # Send action if we have buttons
                                         if buttons:
                                             try:
-                                                response = requests.post(
-                                                    f"{server_url}/action",
-                                                    json={"buttons": buttons},
-                                                    timeout=5
-                                                )
+                                                response = None
+                                                if early_posts.get('buttons') == buttons:
+                                                    response = early_posts['response']  # Already sent mid-stream
+                                                if response is None:
+                                                    response = http.post(
+                                                        f"{server_url}/action",
+                                                        json={"buttons": buttons},
+                                                        timeout=5
+                                                    )
                                                 if response.status_code == 200:
+                                                    report_first_action()
                                                     step_count += 1
                                                     print(f"🎮 Agent: {action_str} (sent successfully)")
                                                     print(f"🎮 Step {step_count}: {action_str}")
@@ -401,7 +439,7 @@ def run_multiprocess_client(server_port=8000, args=None):
                                                             from utils.llm_logger import get_llm_logger
                                                             client_llm_logger = get_llm_logger()
                                                             if client_llm_logger:
-                                                                sync_response = requests.post(
+                                                                sync_response = http.post(
                                                                     f"{server_url}/sync_llm_metrics",
                                                                     json={"cumulative_metrics": client_llm_logger.cumulative_metrics},
                                                                     timeout=5
@@ -413,14 +451,14 @@ def run_multiprocess_client(server_port=8000, args=None):
                                                             print(f"⚠️ LLM metrics sync error: {e}")
                                                         
                                                         # Save game state checkpoint
-                                                        checkpoint_response = requests.post(
+                                                        checkpoint_response = http.post(
                                                             f"{server_url}/checkpoint",
                                                             json={"step_count": step_count},
                                                             timeout=10
                                                         )
                                                         
                                                         # Save agent history to checkpoint_llm.txt
-                                                        history_response = requests.post(
+                                                        history_response = http.post(
                                                             f"{server_url}/save_agent_history",
                                                             timeout=5
                                                         )
@@ -430,11 +468,11 @@ def run_multiprocess_client(server_port=8000, args=None):
                                                                 print(f"💾 Checkpoint and history saved at step {step_count}")
                                                         else:
                                                             print(f"⚠️ Save failed - Checkpoint: {checkpoint_response.status_code}, History: {history_response.status_code}")
-                                                    except requests.exceptions.RequestException as e:
+                                                    except httpx.HTTPError as e:
                                                         print(f"⚠️ Checkpoint/history save error: {e}")
                                                 else:
                                                     print(f"🎮 Agent: {action_str} (server error: {response.status_code})")
-                                            except requests.exceptions.RequestException as e:
+                                            except httpx.HTTPError as e:
                                                 print(f"🎮 Agent: {action_str} (connection error: {e})")
                     except Exception as e:
                         print(f"❌ AUTO mode error: {e}")
@@ -453,6 +491,7 @@ def run_multiprocess_client(server_port=8000, args=None):
             time.sleep(2)
     
     # Cleanup
+    agent.close()
     if not headless and PYGAME_AVAILABLE:
         pygame.quit()
     
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests for the micro-batching scheduler in front of the local model.
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import llm_logger
+from utils.batch_scheduler import MicroBatcher
+from utils.llm_logger import LLMLogger
+from utils.vlm import LocalHuggingFaceBackend
+
+
+def test_concurrent_requests_share_batches():
+    batch_sizes = []
+
+    def run_batch(prompts):
+        batch_sizes.append(len(prompts))
+        time.sleep(0.05)  # One "generate" call, whatever the batch size
+        return [prompt.upper() for prompt in prompts]
+
+    batcher = MicroBatcher(run_batch, max_batch_size=4, window_ms=20)
+    prompts = [f"prompt {i}" for i in range(8)]
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(batcher.submit, prompts))
+    elapsed = time.monotonic() - start
+    batcher.close()
+
+    assert results == [prompt.upper() for prompt in prompts]  # Each caller gets its own reply
+    assert max(batch_sizes) <= 4
+    assert len(batch_sizes) < len(prompts)
+    assert elapsed < 8 * 0.05  # Faster than running them one by one
+    assert batcher.stats()['requests'] == 8
+
+
+def test_batch_errors_reach_every_caller():
+    started = threading.Event()
+
+    def run_batch(prompts):
+        started.set()
+        raise RuntimeError("CUDA out of memory")
+
+    batcher = MicroBatcher(run_batch, max_batch_size=2, window_ms=1)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        batcher.submit("prompt")
+    assert started.is_set()
+    batcher.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.submit("late")
+
+
+def test_close_finishes_queued_requests_and_fails_the_rest():
+    release = threading.Event()
+
+    def run_batch(prompts):
+        release.wait(5)
+        return [prompt.upper() for prompt in prompts]
+
+    batcher = MicroBatcher(run_batch, max_batch_size=1, window_ms=1)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        first = pool.submit(batcher.submit, "first")
+        queued = pool.submit(batcher.submit, "queued")
+        while batcher._queue.qsize() < 1:  # "first" is running, "queued" waits
+            time.sleep(0.01)
+        closing = pool.submit(batcher.close)
+        while batcher._queue.qsize() < 2:
+            time.sleep(0.01)
+        # A request that got past the closed check just before close()
+        late = Future()
+        batcher._queue.put(("late", late))
+        release.set()
+        closing.result(timeout=5)
+
+        assert first.result(timeout=5) == "FIRST"
+        assert queued.result(timeout=5) == "QUEUED"  # Queued before close(): still answered
+        with pytest.raises(RuntimeError, match="closed"):
+            late.result(timeout=5)
+    assert batcher._queue.empty()
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.submit("after close")
+
+
+class CharProcessor:
+    """Character-level stand-in for a Hugging Face processor (left padding with id 0)"""
+
+    def __init__(self, torch):
+        self.torch = torch
+        self.tokenizer = SimpleNamespace(pad_token_id=0, eos_token_id=None)
+
+    def __call__(self, text, images=None, padding=False, return_tensors="pt"):
+        rows = [[1 + ord(char) % 60 for char in prompt] for prompt in text]
+        width = max(len(row) for row in rows)
+        return {
+            "input_ids": self.torch.tensor([[0] * (width - len(row)) + row for row in rows]),
+            "attention_mask": self.torch.tensor([[0] * (width - len(row)) + [1] * len(row) for row in rows]),
+        }
+
+    def batch_decode(self, token_ids, skip_special_tokens=True):
+        return [" ".join(str(int(token)) for token in row if token) for row in token_ids]
+
+    def decode(self, token_ids, skip_special_tokens=True):
+        return self.batch_decode([token_ids])[0]
+
+
+def tiny_local_backend(torch, transformers):
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                                      num_attention_heads=4, num_key_value_heads=4, max_position_embeddings=128,
+                                      bos_token_id=None, eos_token_id=None, pad_token_id=0)
+    backend = LocalHuggingFaceBackend.__new__(LocalHuggingFaceBackend)
+    backend.model_name = "tiny-llama"
+    backend.torch = torch
+    backend.model = transformers.LlamaForCausalLM(config).eval()
+    backend.processor = CharProcessor(torch)
+    backend._generate_lock = threading.Lock()
+    backend.sampling_params = {"max_new_tokens": 6, "do_sample": False}
+    return backend
+
+
+def test_batched_generate_matches_unbatched_generate():
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    backend = tiny_local_backend(torch, transformers)
+
+    requests = [("PERCEPTION: describe the frame", None), ("PLAN", None), ("ACTION: pick a button now", None)]
+    unbatched = [backend._generate_batch([request])[0] for request in requests]
+
+    batcher = MicroBatcher(backend._generate_batch, max_batch_size=4, window_ms=200)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        batched = list(pool.map(batcher.submit, requests))
+    batcher.close()
+
+    assert batcher.stats()['largest_batch'] > 1
+    assert batched == unbatched
+    assert all(len(result.split()) == 6 for result in batched)
+    # Token counts leave out the left padding of the shorter prompts
+    assert [result.token_usage for result in batched] == [
+        {"prompt_tokens": len(prompt), "completion_tokens": 6, "total_tokens": len(prompt) + 6} for prompt, _ in requests]
+
+
+def test_local_generate_logs_token_usage(monkeypatch, tmp_path):
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    backend = tiny_local_backend(torch, transformers)
+    session_logger = LLMLogger(str(tmp_path / "llm_logs"))
+    monkeypatch.setattr(llm_logger, "_llm_logger", session_logger)
+
+    prompt = "PLAN: go north"
+    result = backend._generate_response(backend.processor(text=[prompt]), prompt, "planning")
+
+    assert result.token_usage == {"prompt_tokens": len(prompt), "completion_tokens": 6, "total_tokens": len(prompt) + 6}
+    metrics = session_logger.get_cumulative_metrics()
+    assert metrics["prompt_tokens"] == len(prompt)
+    assert metrics["completion_tokens"] == 6
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
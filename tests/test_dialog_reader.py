@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-first dialog reader using a fake RAM image.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pokemon_env.dialog_reader import DialogReader, decode_text_buffer
+from pokemon_env.emerald_utils import EmeraldCharmap
+
+BASE = 0x02000000
+
+ADDRESSES = SimpleNamespace(
+    G_STRING_VAR1=0x02021cc4, G_STRING_VAR2=0x02021dc4, G_STRING_VAR3=0x02021ec4,
+    G_STRING_VAR4=0x02021fc4, G_DISPLAYED_STRING_BATTLE=0x02022e2c,
+    G_BATTLE_TEXT_BUFF1=0x02022f58, G_BATTLE_TEXT_BUFF2=0x02022f68, G_BATTLE_TEXT_BUFF3=0x02022f78,
+    TEXT_BUFFER_1=0x02021F18, TEXT_BUFFER_2=0x02021F20, TEXT_BUFFER_3=0x02021F28, TEXT_BUFFER_4=0x02021F30,
+    TEXT_PRINTERS=0x020201B0, TEXT_PRINTER_SIZE=0x24, TEXT_PRINTER_WINDOW_OFFSET=0x04,
+    TEXT_PRINTER_ACTIVE_OFFSET=0x1B, TEXT_PRINTER_STATE_OFFSET=0x1C,
+    SCRIPT_CONTEXT_GLOBAL=0x02037A58, SCRIPT_CONTEXT_IMMEDIATE=0x02037A6C, SCRIPT_MODE_OFFSET=0x00,
+    MSG_IS_SIGNPOST=0x020370BC, MSG_BOX_CANCELABLE=0x020370BD,
+    DIALOG_STATE=0x020370B8, OVERWORLD_FREEZE=0x02022B4C,
+)
+
+
+def _encode(text):
+    """Encode ASCII text with the Emerald charmap, terminated by 0xFF"""
+    charmap = EmeraldCharmap.charmap
+    return bytes(charmap.index(char) for char in text) + b"\xff"
+
+
+class FakeMemory:
+    """EWRAM image with a read counter"""
+
+    def __init__(self):
+        self.data = bytearray(b"\xff" * 0x40000)
+        self.reads = 0
+
+    def write(self, address, payload):
+        offset = address - BASE
+        self.data[offset:offset + len(payload)] = payload
+
+    def read(self, address, size):
+        self.reads += 1
+        offset = address - BASE
+        return bytes(self.data[offset:offset + size])
+
+
+def test_decode_text_buffer_stops_at_terminator():
+    """Decoding uses the charmap table and stops at 0xFF."""
+    assert decode_text_buffer(_encode("Hello MAY!") + _encode("junk")) == "Hello MAY!"
+    assert decode_text_buffer(b"") == ""
+
+
+def test_read_text_prefers_longest_buffer_and_caches_by_checksum():
+    """The longest meaningful buffer wins and unchanged buffers are not decoded again."""
+    memory = FakeMemory()
+    memory.write(ADDRESSES.G_STRING_VAR4, _encode("Welcome to the world of POKeMON!"))
+    memory.write(ADDRESSES.G_STRING_VAR1, _encode("MAY"))
+    reader = DialogReader(memory.read, ADDRESSES)
+
+    assert reader.read_text() == "Welcome to the world of POKeMON!"
+    misses = reader.cache_misses
+    assert reader.read_text() == "Welcome to the world of POKeMON!"
+    assert reader.cache_misses == misses
+
+    memory.write(ADDRESSES.G_STRING_VAR4, _encode("A new message appears here"))
+    assert reader.read_text() == "A new message appears here"
+    # Only buffers overlapping gStringVar4 are decoded again
+    assert misses < reader.cache_misses < misses + len(reader.text_buffers)
+
+
+def test_signals_report_box_from_printer_or_script_flags():
+    """An active text printer or a running script means a box is expected."""
+    memory = FakeMemory()
+    for address in (ADDRESSES.SCRIPT_CONTEXT_GLOBAL, ADDRESSES.SCRIPT_CONTEXT_IMMEDIATE,
+                    ADDRESSES.MSG_IS_SIGNPOST, ADDRESSES.MSG_BOX_CANCELABLE,
+                    ADDRESSES.DIALOG_STATE, ADDRESSES.OVERWORLD_FREEZE):
+        memory.write(address, b"\x00")
+    printer = bytearray(ADDRESSES.TEXT_PRINTER_SIZE)
+    memory.write(ADDRESSES.TEXT_PRINTERS, bytes(printer))
+    reader = DialogReader(memory.read, ADDRESSES)
+
+    signals = reader.read_signals()
+    assert signals.printer_valid
+    assert not signals.box_expected
+
+    printer[ADDRESSES.TEXT_PRINTER_ACTIVE_OFFSET] = 1
+    memory.write(ADDRESSES.TEXT_PRINTERS, bytes(printer))
+    assert reader.read_signals().box_expected
+
+    printer[ADDRESSES.TEXT_PRINTER_ACTIVE_OFFSET] = 0
+    memory.write(ADDRESSES.TEXT_PRINTERS, bytes(printer))
+    memory.write(ADDRESSES.SCRIPT_CONTEXT_GLOBAL, b"\x01")
+    assert reader.read_signals().box_expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for the multi-process emulator pool (state round trips, worker restarts and shutdown).
+"""
+
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pokemon_env.emulator_pool import EmulatorPool, WorkerError
+
+CRASH_MASK = 0x3FF  # Every button at once kills the worker process
+HANG_MASK = 0x300  # L+R never answers
+
+
+def frame_state(frame):
+    return frame.to_bytes(4, "little")
+
+
+class FakeCore:
+    """Runs in the worker process; its whole state is the frame counter"""
+
+    def __init__(self, rom_bytes, tmp_dir):
+        self.frame_count = 0
+
+    def run(self, key_mask, frames):
+        if key_mask == CRASH_MASK:
+            os._exit(1)
+        if key_mask == HANG_MASK:
+            time.sleep(60)
+        self.frame_count += frames
+
+    def observe(self, frame_out, features_out, addresses):
+        frame_out[...] = self.frame_count % 256
+        features_out['frame'] = self.frame_count
+
+    def load_state(self, state):
+        if state == b"bad":
+            raise ValueError("corrupt savestate")
+        self.frame_count = int.from_bytes(state, "little")
+
+    def reset(self):
+        self.frame_count = 0
+
+    def save_state(self):
+        return frame_state(self.frame_count)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    rom = tmp_path / "rom.gba"
+    rom.write_bytes(b"\0" * 16)
+    pool = EmulatorPool(str(rom), num_workers=2, initial_state=frame_state(5), timeout=20.0,
+                        core_factory=FakeCore)
+    pool.initialize()
+    yield pool
+    pool.close()
+
+
+def test_states_move_between_workers_and_reset_restores_them(pool):
+    assert pool.features['frame'].tolist() == [5, 5]
+
+    frames, features = pool.step([0, 0], frames=3)
+    assert features['frame'].tolist() == [8, 8]
+    assert int(frames[0].max()) == 8  # Observations are written to shared memory
+
+    state = pool.save_state(0)
+    pool.step([0, 0], frames=2)
+    pool.load_state(state, indices=[1])
+    assert pool.features['frame'].tolist() == [10, 8]
+
+    # Worker 0 returns to the initial state, worker 1 to the state it was given
+    _, features = pool.reset()
+    assert features['frame'].tolist() == [5, 8]
+
+
+def test_failed_workers_are_restarted_from_their_reset_state(pool):
+    pool.load_state(frame_state(40), indices=[1])
+
+    _, features = pool.step([0, CRASH_MASK])
+    assert pool.restarted.tolist() == [False, True]
+    assert features['frame'].tolist() == [6, 40]
+
+    pool.step_async([HANG_MASK, 0])
+    _, features = pool.step_wait(timeout=0.5)
+    assert pool.restarted.tolist() == [True, False]
+    assert pool.restarts.tolist() == [1, 1]
+    assert features['frame'].tolist() == [5, 41]
+
+    # A rejected command raises without restarting the worker
+    with pytest.raises(WorkerError, match="corrupt savestate"):
+        pool.load_state(b"bad", indices=[0])
+    pool.step([0, 0])
+    assert pool.restarts.tolist() == [1, 1]
+    assert pool.features['frame'].tolist() == [6, 42]
+
+
+def test_rejected_state_does_not_become_the_reset_state(pool):
+    pool.load_state(frame_state(40), indices=[1])
+    with pytest.raises(WorkerError, match="corrupt savestate") as excinfo:
+        pool.load_state([frame_state(30), b"bad"])
+    assert excinfo.value.workers == [1]
+
+    _, features = pool.reset()
+    assert features['frame'].tolist() == [30, 40]
+
+    # A crashed worker boots back into its last accepted state
+    _, features = pool.step([0, CRASH_MASK])
+    assert pool.restarted.tolist() == [False, True]
+    assert features['frame'].tolist() == [31, 40]
+
+
+def test_every_reply_is_read_when_a_restart_fails(pool):
+    pool._reset_states[0] = b"bad"  # Worker 0 cannot boot again
+    with pytest.raises(RuntimeError, match="worker 0 failed to restart: Worker 0: ValueError: corrupt savestate"):
+        pool.step([CRASH_MASK, 0])
+
+    # Worker 1's reply to the failed step was consumed; it now answers this command
+    pool._reset_states[0] = frame_state(5)
+    pool._restart_worker(0, "test")
+    _, features = pool.step([0, 0], frames=2)
+    assert features['frame'].tolist() == [7, 8]
+    assert not pool._conns[1].poll(0.2)  # No reply left over for the next command
+
+
+def test_close_stops_workers_and_releases_shared_memory(pool):
+    processes = list(pool._processes)
+    shm_name = pool._shm.name
+
+    pool.close()
+
+    assert not any(process.is_alive() for process in processes)
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=shm_name)
+    with pytest.raises(RuntimeError, match="not initialized"):
+        pool.step([0, 0])
+    pool.close()  # Closing twice is harmless
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the glyph-template dialogue text reader using a synthetic bitmap font.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.glyph_reader import GlyphTextReader
+
+CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ!?.,'"
+DESCENDERS = set("gjpqy,")
+
+
+def _make_font(seed=0):
+    """Random but distinct 6-10px wide glyph bitmaps, descenders drop 2 rows"""
+    rng = np.random.default_rng(seed)
+    font = {}
+    for char in CHARS:
+        width = int(rng.integers(3, 7))
+        bitmap = rng.random((10, width)) > 0.5
+        bitmap[0, :] = True
+        bitmap[-1, :] = True
+        bitmap[:, 0] = True
+        font[char] = bitmap
+    return font
+
+
+def _render(font, lines, height=36, width=224):
+    """Render lines of text into an ink mask with 1px letter and 5px word gaps"""
+    mask = np.zeros((height, width), dtype=bool)
+    for line_idx, line in enumerate(lines):
+        x = 2
+        baseline_top = 2 + line_idx * 16
+        for word in line.split():
+            for char in word:
+                bitmap = font[char]
+                top = baseline_top + (2 if char in DESCENDERS else 0)
+                mask[top:top + bitmap.shape[0], x:x + bitmap.shape[1]] = bitmap
+                x += bitmap.shape[1] + 1
+            x += 5
+    return mask
+
+
+def test_learn_then_read_round_trip():
+    """Glyphs learned from one frame decode a different frame with the same font."""
+    font = _make_font()
+    reader = GlyphTextReader()
+
+    screen = ["Hello there, welcome", "to the world of POKeMON!"]
+    known_text = "Prologue text. " + " ".join(screen) + " More text follows."
+    assert reader.learn(_render(font, screen), known_text) > 0
+
+    # A frame that only uses learned characters reads back exactly
+    assert reader.read(_render(font, ["welcome to the", "world there"])) == "welcome to the world there"
+
+
+def test_unknown_glyph_returns_none():
+    """Any glyph missing from the atlas makes the reader defer to Tesseract."""
+    font = _make_font()
+    reader = GlyphTextReader()
+    reader.learn(_render(font, ["abc def"]), "abc def")
+
+    assert reader.read(_render(font, ["abc xyz"])) is None
+    assert GlyphTextReader().read(_render(font, ["abc"])) is None
+
+
+def test_ambiguous_alignment_is_skipped():
+    """Frames whose word lengths match several places in the text teach nothing."""
+    font = _make_font()
+    reader = GlyphTextReader()
+    assert reader.learn(_render(font, ["abc"]), "abc def") == 0
+    assert len(reader) == 0
+
+
+def test_atlas_save_and_load(tmp_path):
+    """The atlas survives a JSON round trip."""
+    font = _make_font()
+    reader = GlyphTextReader()
+    reader.learn(_render(font, ["Pokemon trainer"]), "Pokemon trainer")
+
+    atlas_path = str(tmp_path / "atlas.json")
+    reader.save(atlas_path)
+    loaded = GlyphTextReader.load(atlas_path)
+
+    assert len(loaded) == len(reader)
+    assert loaded.read(_render(font, ["trainer Pokemon"])) == "trainer Pokemon"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
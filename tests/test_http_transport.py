@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared pooled HTTP transport against a local stand-in server.
+"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import http_transport
+
+httpx = pytest.importorskip("httpx")
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        payload = json.dumps({"echo": json.loads(body or b"null")}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    httpd.connections = set()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    http_transport.close_http_clients()
+
+
+def test_requests_reuse_one_connection(server):
+    url = f"http://127.0.0.1:{server.server_address[1]}/action"
+    client = http_transport.get_http_client()
+    assert http_transport.get_http_client() is client
+
+    for i in range(5):
+        response = client.post(url, json={"buttons": ["A"] * i}, timeout=5)
+        assert response.status_code == 200
+        assert response.json() == {"echo": {"buttons": ["A"] * i}}
+    assert len(server.connections) == 1
+
+
+def test_configure_rebuilds_shared_client(server):
+    old = http_transport.get_http_client()
+    try:
+        config = http_transport.configure_http_transport(max_connections=4, timeout=None)
+        assert config.max_connections == 4
+        assert config.timeout == http_transport.HTTPTransportConfig.timeout  # None leaves a setting alone
+        assert http_transport.get_http_client() is not old
+        assert old.is_closed
+    finally:
+        http_transport.configure_http_transport(max_connections=http_transport.HTTPTransportConfig.max_connections)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
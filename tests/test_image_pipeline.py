@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared VLM image pipeline.
+"""
+
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.vlm import ImagePipeline, estimate_image_tokens
+
+
+def _frame():
+    # GBA-like frame: a handful of flat colors
+    frame = np.zeros((160, 240, 3), dtype=np.uint8)
+    frame[:, :120] = (248, 208, 136)
+    frame[40:80] = (56, 120, 48)
+    frame[100:110, 10:200] = (255, 255, 255)
+    return frame
+
+
+def test_auto_resize_is_token_neutral_per_model():
+    pipeline = ImagePipeline(resize="auto")
+    assert pipeline.target_size(240, 160, "gpt-4o") == (480, 320)
+    assert pipeline.target_size(240, 160, "gemini-2.5-flash") == (720, 480)
+    assert pipeline.target_size(240, 160, "claude-sonnet") == (240, 160)
+    assert pipeline.target_size(240, 160, "some-local-model") == (240, 160)
+    assert estimate_image_tokens(480, 320, "gpt-4o") == estimate_image_tokens(240, 160, "gpt-4o")
+
+    capped = ImagePipeline(resize=4.0, max_tokens=300)
+    width, height = capped.target_size(240, 160, "claude-sonnet")
+    assert estimate_image_tokens(width, height, "claude-sonnet") <= 300
+
+    with pytest.raises(ValueError):
+        ImagePipeline(encoding="gif")
+
+
+def test_frames_are_encoded_once_and_palette_png_is_lossless():
+    pipeline = ImagePipeline(resize=2.0, encoding="palette")
+    frame = _frame()
+    first = pipeline.encode(frame, "gpt-4o")
+    second = pipeline.encode(Image.fromarray(frame), "gpt-4o")
+    assert second is first
+    assert pipeline.stats['encodes'] == 1
+
+    assert (first.width, first.height) == (480, 320) and first.mime_type == "image/png"
+    decoded = np.asarray(Image.open(BytesIO(first.data)).convert("RGB"))
+    assert np.array_equal(decoded[::2, ::2], frame)
+    assert first.data_url.startswith("data:image/png;base64,")
+
+    webp = ImagePipeline(encoding="webp", quality=70).encode(frame)
+    assert webp.mime_type == "image/webp" and Image.open(BytesIO(webp.data)).size == (240, 160)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for the lookup-table map grid formatter.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pokemon_env.enums import MetatileBehavior
+from utils.map_formatter import format_map_for_llm, format_map_grid, format_tile_to_symbol, generate_dynamic_legend
+
+WALL = (1023, MetatileBehavior.NORMAL, 1, 0)
+FLOOR = (5, MetatileBehavior.NORMAL, 0, 0)
+
+
+def test_tile_symbols_follow_behavior_rules():
+    """Behavior names, collision and the invalid tile id map to the documented symbols."""
+    assert format_tile_to_symbol(FLOOR) == "."
+    assert format_tile_to_symbol((5, MetatileBehavior.NORMAL, 1, 0)) == "#"
+    assert format_tile_to_symbol((1023, MetatileBehavior.NON_ANIMATED_DOOR, 0, 0)) == "#"
+    assert format_tile_to_symbol((5, MetatileBehavior.NON_ANIMATED_DOOR, 0, 0)) == "D"
+    assert format_tile_to_symbol((5, int(MetatileBehavior.TALL_GRASS))) == "~"
+    assert format_tile_to_symbol((5, 9999, 0, 0)) == "#"
+    assert format_tile_to_symbol((5,)) == "."
+
+
+def test_grid_places_player_npcs_and_trims_wall_rows():
+    """Player sits at the center, NPCs are placed relative to it and extra wall rows are trimmed."""
+    raw_tiles = [[WALL] * 5 for _ in range(3)] + [[FLOOR] * 5 for _ in range(3)] + [[WALL] * 5 for _ in range(3)]
+    npcs = [{'current_x': 11, 'current_y': 10, 'trainer_type': 1},
+            {'current_x': 9, 'current_y': 11, 'trainer_type': 0},
+            {'current_x': 50, 'current_y': 50, 'trainer_type': 0}]
+
+    grid = format_map_grid(raw_tiles, "South", npcs, (10, 10))
+    assert grid == [
+        ["#"] * 5,
+        ["."] * 5,
+        [".", ".", "P", "@", "."],
+        [".", "N", ".", ".", "."],
+        ["#"] * 5,
+    ]
+    assert format_map_for_llm(raw_tiles, "South", npcs, {'x': 10, 'y': 10}).splitlines()[2] == ". . P @ ."
+    assert "NPCs: N=NPC, @=Trainer" in generate_dynamic_legend(grid)
+    assert len(format_map_grid(raw_tiles, "South", npcs, (10, 10), trim_padding=False)) == 9
+
+
+def test_ragged_rows_keep_their_lengths():
+    """Short rows are rendered at their own length."""
+    raw_tiles = [[FLOOR] * 3, [FLOOR] * 2, [FLOOR]]
+    assert format_map_grid(raw_tiles) == [[".", ".", "."], [".", "P"], ["."]]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
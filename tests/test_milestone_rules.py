@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled milestone rule engine.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pokemon_env.milestone_rules import MilestoneRule, MilestoneRuleEngine
+
+
+class FakeTracker:
+    """Minimal stand-in for MilestoneTracker"""
+
+    def __init__(self):
+        self.completed = []
+
+    def is_completed(self, milestone_id):
+        return milestone_id in self.completed
+
+    def mark_completed(self, milestone_id):
+        self.completed.append(milestone_id)
+
+
+def _state(location, party=(), name="MAY"):
+    return {'player': {'location': location, 'name': name, 'party': list(party)}, 'game': {'badges': []}}
+
+
+def test_prerequisites_complete_in_order_within_one_update():
+    """A milestone completed in an update unlocks later rules in the same update."""
+    engine = MilestoneRuleEngine()
+    tracker = FakeTracker()
+
+    assert engine.update(_state("LITTLEROOT TOWN"), tracker) == [
+        "GAME_RUNNING", "PLAYER_NAME_SET", "LITTLEROOT_TOWN"]
+    assert engine.update(_state("OLDALE TOWN"), tracker) == ["OLDALE_TOWN"]
+    # Petalburg needs both towns, both are now done
+    assert engine.update(_state("PETALBURG CITY"), tracker) == ["PETALBURG_CITY"]
+
+
+def test_unchanged_state_evaluates_nothing():
+    """Rules are only evaluated when a field they read or a prerequisite changes."""
+    engine = MilestoneRuleEngine()
+    tracker = FakeTracker()
+    engine.update(_state("LITTLEROOT TOWN"), tracker)
+
+    evaluations = engine.evaluations
+    assert engine.update(_state("LITTLEROOT TOWN"), tracker) == []
+    assert engine.evaluations == evaluations
+
+    # A party change only touches party rules, plus ROUTE_103 which requires the starter
+    assert engine.update(_state("LITTLEROOT TOWN", party=[{'species_name': 'TREECKO'}]), tracker) == [
+        "STARTER_CHOSEN"]
+    assert engine.evaluations == evaluations + 2
+
+
+def test_custom_rule_table_and_validation():
+    """New milestones are added as table entries; tracked ids must have a rule."""
+    rules = [
+        MilestoneRule("DEWFORD_TOWN", location=("DEWFORD",)),
+        MilestoneRule("KNUCKLE_BADGE", badges_min=2, badge_name="Knuckle"),
+    ]
+    engine = MilestoneRuleEngine(rules, tracked=("DEWFORD_TOWN", "KNUCKLE_BADGE"))
+    tracker = FakeTracker()
+    state = _state("DEWFORD TOWN")
+    state['game']['badges'] = ["Knuckle Badge"]
+    assert engine.update(state, tracker) == ["DEWFORD_TOWN", "KNUCKLE_BADGE"]
+
+    with pytest.raises(ValueError):
+        MilestoneRuleEngine(rules, tracked=("MISSING",))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
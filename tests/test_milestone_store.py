@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for write-behind milestone persistence and crash recovery.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pokemon_env.milestone_store import MilestoneStore, event_log_path
+
+
+def test_events_are_batched_and_compacted(tmp_path):
+    """Queued events land in the log and are folded into an atomic snapshot on flush."""
+    path = str(tmp_path / "milestones_progress.json")
+    store = MilestoneStore(path, compact_every=1000)
+    store.record_completed("GAME_RUNNING", {'completed': True, 'timestamp': 1.0})
+    store.record_completed("LITTLEROOT_TOWN", {'completed': True, 'timestamp': 2.0})
+    store.record_reset("GAME_RUNNING")
+    store.flush()
+
+    with open(path) as f:
+        data = json.load(f)
+    assert list(data['milestones']) == ["LITTLEROOT_TOWN"]
+    assert data['version'] == '1.0'
+    assert Path(event_log_path(path)).read_text() == ""
+    assert store.stats()['events_written'] == 3
+    store.close()
+
+
+def test_crash_is_recovered_from_the_event_log(tmp_path):
+    """Events after the last snapshot are replayed; a torn final line is ignored."""
+    path = str(tmp_path / "milestones_progress.json")
+    store = MilestoneStore(path)
+    store.record_completed("GAME_RUNNING", {'completed': True, 'timestamp': 1.0})
+    store.flush()
+
+    # Simulate a crash: events appended to the log but never compacted
+    with open(event_log_path(path), 'a') as f:
+        f.write(json.dumps({'op': 'complete', 'id': 'OLDALE_TOWN', 'data': {'completed': True}}) + "\n")
+        f.write('{"op": "complete", "id": "ROUTE')
+
+    recovered = MilestoneStore(path).load()
+    assert sorted(recovered) == ["GAME_RUNNING", "OLDALE_TOWN"]
+
+
+def test_export_writes_a_consistent_copy(tmp_path):
+    """Exports snapshot the milestones as they were when queued."""
+    store = MilestoneStore(str(tmp_path / "milestones_progress.json"))
+    milestones = {'GAME_RUNNING': {'completed': True}}
+    target = tmp_path / "save_milestones.json"
+    store.export(str(target), milestones)
+    milestones['OLDALE_TOWN'] = {'completed': True}
+    store.close()
+
+    assert list(json.loads(target.read_text())['milestones']) == ["GAME_RUNNING"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
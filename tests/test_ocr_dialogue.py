@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Unit tests for OCR dialogue helpers that don't need a running emulator.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import ocr_dialogue
+from utils.ocr_dialogue import OCRDialogueDetector, OCRResultCache
+
+
+def _dialogue_frame():
+    """Create a 240x160 frame with a white dialogue box and gray text pixels"""
+    frame = np.zeros((160, 240, 3), dtype=np.uint8)
+    frame[104:160, :] = [255, 255, 255]
+    frame[120:130, 20:200:3] = [99, 99, 99]
+    return frame
+
+
+def test_cache_key_depends_on_pixels():
+    """Identical regions share a key, any pixel change produces a new one."""
+    frame = _dialogue_frame()
+    key_a = OCRResultCache.make_key(frame[116:152, 8:232])
+    key_b = OCRResultCache.make_key(frame.copy()[116:152, 8:232])
+    assert key_a == key_b
+
+    frame[130, 50] = [0, 0, 0]
+    assert OCRResultCache.make_key(frame[116:152, 8:232]) != key_a
+    assert OCRResultCache.make_key(frame[116:152, 8:232], "psm6") != OCRResultCache.make_key(frame[116:152, 8:232], "psm11")
+
+
+def test_cache_lru_eviction_and_counters():
+    """The cache evicts least recently used entries and counts hits/misses."""
+    cache = OCRResultCache(max_entries=2)
+    cache.put("a", "HELLO")
+    cache.put("b", None)
+    assert cache.get("a") == (True, "HELLO")
+    cache.put("c", "WORLD")  # evicts "b"
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (True, "WORLD")
+
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['size'] == 2
+
+
+def test_region_ocr_runs_once_per_identical_region(monkeypatch):
+    """Tesseract is only invoked once for a pixel-identical text box."""
+    calls = []
+
+    class FakeTesseract:
+        @staticmethod
+        def image_to_string(image, config=""):
+            calls.append(config)
+            return "Hello there!"
+
+    monkeypatch.setattr(ocr_dialogue, "pytesseract", FakeTesseract, raising=False)
+
+    detector = OCRDialogueDetector()
+    frame = _dialogue_frame()
+    for _ in range(5):
+        text = detector._extract_text_from_region(frame, OCRDialogueDetector.OCR_TEXT_COORDS)
+        assert text == "Hello there!"
+
+    assert len(calls) == 1
+    assert detector.get_cache_stats()['hits'] == 4
+
+
+def test_dialogue_box_visible_accepts_pil_and_numpy():
+    """Vectorized visibility check gives the same answer for PIL and ndarray input."""
+    from PIL import Image
+
+    detector = OCRDialogueDetector()
+    frame = _dialogue_frame()
+    frame[120:140, 100:140:3] = [99, 99, 99]
+    assert detector.is_dialogue_box_visible(frame)
+    assert detector.is_dialogue_box_visible(Image.fromarray(frame))
+
+    overworld = np.full((160, 240, 3), [100, 150, 100], dtype=np.uint8)
+    assert not detector.is_dialogue_box_visible(overworld)
+    assert not detector.is_dialogue_box_visible(None)
+
+
+def test_color_mask_matches_per_color_distance():
+    """The palette mask equals the per-color Euclidean distance check."""
+    detector = OCRDialogueDetector()
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+    image[::4, ::4] = [99, 99, 99]
+
+    expected = np.zeros(image.shape[:2], dtype=bool)
+    for color in detector.DIALOGUE_TEXT_COLORS:
+        expected |= np.sqrt(np.sum((image - np.array(color)) ** 2, axis=2)) <= detector.COLOR_TOLERANCE
+
+    assert np.array_equal(detector._create_dialogue_color_mask(image), expected)
+
+
+def test_ocr_executor_coalesces_and_bounds_requests():
+    """Duplicate crops share one future and a full queue drops new crops."""
+    from utils.ocr_worker import OCRExecutor
+
+    executor = OCRExecutor(max_workers=1, max_pending=1)
+    try:
+        roi = _dialogue_frame()[116:152, 8:232]
+        first = executor.submit(roi, "--psm 6", key="same", channel="dialogue")
+        duplicate = executor.submit(roi, "--psm 6", key="same", channel="dialogue")
+        assert first is duplicate
+
+        if not first.done():
+            assert executor.submit(roi, "--psm 6", key="other") is None
+            assert executor.stats()['dropped'] == 1
+
+        first.exception(timeout=60)  # Wait for the worker regardless of tesseract availability
+        deadline = time.time() + 5
+        while executor.stats()['pending'] and time.time() < deadline:
+            time.sleep(0.01)  # Done callbacks run just after the future resolves
+        stats = executor.stats()
+        assert stats['submitted'] == 1
+        assert stats['coalesced'] == 1
+        assert stats['completed'] + stats['failed'] == 1
+    finally:
+        executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
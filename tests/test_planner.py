@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tests for the savestate beam search planner.
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pokemon_env.planner import PlanObjective, SearchPlanner, plan_from_live_state
+
+ADDRESSES = SimpleNamespace(
+    MAP_BANK=0x00,
+    SAVESTATE_OBJECT_POINTER=0x10,
+    SAVESTATE_PLAYER_X_OFFSET=0x00,
+    PARTY_COUNT=0x02,
+    PLAYER_BADGES=0x03,
+    IN_BATTLE_BIT_ADDR=0x04,
+    IN_BATTLE_BITMASK=0x02,
+)
+STEPS = {"UP": (0, -1), "DOWN": (0, 1), "LEFT": (-1, 0), "RIGHT": (1, 0)}
+
+
+class FakePool:
+    def __init__(self):
+        self.states = {}
+        self.discarded = 0
+
+    def discard(self, handle):
+        self.discarded += 1
+        self.states.pop(handle, None)
+
+
+class FakeEmulator:
+    """Grid world: a direction moves one tile when released; walls block; (9, 9) warps to map 1"""
+
+    def __init__(self, walls=()):
+        self.memory = bytearray(0x80)
+        self.memory[0x10:0x14] = (0x40).to_bytes(4, "little")
+        self.walls = set(walls)
+        self.frame_count = 0
+        self.memory_reader = SimpleNamespace(addresses=ADDRESSES)
+        self.snapshot_pool = FakePool()
+        self._held = None
+        self._next_handle = 0
+
+    def position(self):
+        return (int.from_bytes(self.memory[0x40:0x42], "little"), int.from_bytes(self.memory[0x42:0x44], "little"))
+
+    def set_position(self, x, y):
+        self.memory[0x40:0x44] = x.to_bytes(2, "little") + y.to_bytes(2, "little")
+
+    def read_memory(self, address, size=1):
+        return bytes(self.memory[address:address + size])
+
+    def run_frame_with_buttons(self, buttons):
+        self.frame_count += 1
+        if buttons:
+            self._held = buttons[0]
+        elif self._held in STEPS:
+            x, y = self.position()
+            dx, dy = STEPS[self._held]
+            if (x + dx, y + dy) not in self.walls and x + dx >= 0 and y + dy >= 0:
+                self.set_position(x + dx, y + dy)
+                if (x + dx, y + dy) == (9, 9):
+                    self.memory[0x01] = 1
+            self._held = None
+
+    def snapshot(self, pin=False):
+        handle = self._next_handle
+        self._next_handle += 1
+        self.snapshot_pool.states[handle] = (bytes(self.memory), self.frame_count)
+        return handle
+
+    def restore(self, handle):
+        memory, self.frame_count = self.snapshot_pool.states[handle]
+        self.memory[:] = memory
+        self._held = None
+
+    def save_state(self):
+        return bytes(self.memory)
+
+    def sync_from_state(self, state, frame_count=None):
+        self.memory[:] = state
+        self._held = None
+        if frame_count is not None:
+            self.frame_count = frame_count
+
+    @contextmanager
+    def lookahead(self):
+        root = self.snapshot(pin=True)
+        try:
+            yield root
+        finally:
+            self.restore(root)
+            self.snapshot_pool.discard(root)
+
+
+def _planner(emulator, **kwargs):
+    return SearchPlanner(emulator, hold_frames=1, release_frames=1, **kwargs)
+
+
+def test_plan_routes_around_walls_and_restores_the_game():
+    emulator = FakeEmulator(walls={(1, 0), (1, 1)})
+    result = _planner(emulator, max_depth=6).plan(PlanObjective("coordinate", target=(2, 0)))
+
+    assert result.reached
+    assert len(result.buttons) == 6  # Down twice, across twice, back up twice
+    assert result.buttons.count("RIGHT") == 2 and result.buttons.count("DOWN") == 2
+    assert emulator.position() == (0, 0)
+    assert emulator.snapshot_pool.states == {}
+
+
+def test_warp_objective_and_unreachable_targets():
+    emulator = FakeEmulator()
+    emulator.set_position(7, 9)
+    result = _planner(emulator).plan(PlanObjective("warp", target=(9, 9)))
+    assert result.reached and result.buttons == ["RIGHT", "RIGHT"]
+
+    boxed_in = FakeEmulator(walls={(1, 0), (0, 1)})
+    result = _planner(boxed_in).plan(PlanObjective("coordinate", target=(5, 5)))
+    assert not result.reached and result.buttons == []
+
+    with pytest.raises(ValueError):
+        PlanObjective("coordinate")
+
+
+class SlowFakeEmulator(FakeEmulator):
+    """Search clone slow enough for the game loop to run while it plans"""
+
+    def run_frame_with_buttons(self, buttons):
+        time.sleep(0.0005)
+        super().run_frame_with_buttons(buttons)
+
+
+def test_plan_on_clone_runs_concurrently_with_the_game_loop():
+    live = FakeEmulator()
+    live.set_position(3, 3)
+    clone = SlowFakeEmulator()
+    lock = threading.Lock()
+    stop = threading.Event()
+    seen_positions = set()
+
+    def game_loop():
+        while not stop.is_set():
+            with lock:
+                live.run_frame_with_buttons([])
+            seen_positions.add(live.position())
+
+    loop = threading.Thread(target=game_loop)
+    loop.start()
+    try:
+        time.sleep(0.01)
+        frames_before = live.frame_count
+        result = plan_from_live_state(live, clone, PlanObjective("coordinate", target=(5, 3)), lock,
+                                      hold_frames=1, release_frames=1)
+        frames_during = live.frame_count - frames_before
+    finally:
+        stop.set()
+        loop.join()
+
+    assert result.reached and result.buttons == ["RIGHT", "RIGHT"]
+    assert frames_during > 0  # The game kept running while the clone searched
+    assert seen_positions == {(3, 3)}  # No simulated position ever reached the live game
+    assert clone.position() == (3, 3)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the local-model prompt prefix KV cache (CPU, tiny randomly initialized model).
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.prefix_cache import PromptPrefixCache, common_prefix_length
+
+
+def test_common_prefix_length():
+    assert common_prefix_length([1, 2, 3, 4], [1, 2, 9]) == 2
+    assert common_prefix_length([1, 2], [1, 2, 3]) == 2
+    assert common_prefix_length([], [1]) == 0
+
+
+def test_cached_prefix_matches_full_prefill():
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                                      num_attention_heads=4, num_key_value_heads=4, max_position_embeddings=128)
+    model = transformers.LlamaForCausalLM(config).eval()
+    cache = PromptPrefixCache(model, min_prefix_tokens=16)
+    static = list(range(1, 41))
+
+    def generate(suffix):
+        input_ids = torch.tensor([static + suffix])
+        kwargs = dict(attention_mask=torch.ones_like(input_ids), max_new_tokens=5, do_sample=False)
+        past_key_values = cache.past_key_values_for(input_ids, "cpu")
+        plain = model.generate(input_ids, **kwargs)
+        if past_key_values is None:
+            return None, plain
+        return model.generate(input_ids, past_key_values=past_key_values, **kwargs), plain
+
+    assert generate([50, 51])[0] is None  # Nothing to share with yet
+    for suffix in ([52, 53, 54], [55]):
+        cached, plain = generate(suffix)
+        assert torch.equal(cached, plain)
+    assert cache.stats()['prefills'] == 1
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['reused_tokens'] == 2 * len(static)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for fitting prompts to a token budget by section priority
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import llm_logger
+from utils.llm_logger import LLMLogger, log_llm_prompt_budget
+from utils.prompt_budget import PromptBudget, prompt_budget_for_model
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_lowest_priority_sections_are_reduced_first():
+    history = "\n".join(f"step {i} moved" for i in range(20))  # 60 words
+    budget = PromptBudget(max_tokens=90, count_tokens=count_words)
+    budget.add_required("instructions", " ".join(["rule"] * 40))
+    budget.add("state", "player at 3 4 facing north", priority=90, header="STATE:")
+    budget.add("history", history, priority=30, header="HISTORY:", keep="tail")
+    budget.add("notes", " ".join(["note"] * 20), priority=10, min_tokens=25)
+
+    fitted = budget.fit()
+
+    assert fitted.original_tokens == 128
+    assert fitted.estimated_tokens <= 90
+    assert fitted.sections["notes"]["action"] == "dropped"
+    assert fitted.sections["history"]["action"] == "truncated"
+    assert fitted.sections["state"]["action"] == "kept"
+    assert fitted.trimmed == ["history", "notes"]
+    # The newest history lines survive and the required section is untouched
+    assert "step 19 moved" in fitted.text and "step 0 moved" not in fitted.text
+    assert "lines trimmed" in fitted.text
+    assert fitted.text.count("rule") == 40
+
+
+def test_summary_is_used_when_it_fits():
+    budget = PromptBudget(max_tokens=30, count_tokens=count_words)
+    budget.add_required("instructions", " ".join(["rule"] * 20))
+    budget.add("objectives", " ".join(["objective"] * 30), header="OBJECTIVES:", summary="find the lab")
+
+    fitted = budget.fit()
+
+    assert fitted.sections["objectives"]["action"] == "summarized"
+    assert fitted.text.endswith("OBJECTIVES:\nfind the lab")
+
+
+def test_unlimited_budget_and_model_targets():
+    budget = PromptBudget(max_tokens=0, count_tokens=count_words)
+    budget.add("history", "a b c", priority=1)
+    assert budget.fit().trimmed == []
+
+    assert prompt_budget_for_model("gpt-4o-mini") < prompt_budget_for_model("gpt-4o")
+    assert prompt_budget_for_model("Qwen/Qwen2-VL-2B-Instruct", backend="local") < prompt_budget_for_model("gemini-2.5-flash")
+
+
+def test_budget_report_includes_backend_token_counts(monkeypatch, tmp_path):
+    session_logger = LLMLogger(str(tmp_path / "llm_logs"))
+    monkeypatch.setattr(llm_logger, "_llm_logger", session_logger)
+
+    log_llm_prompt_budget("simple_mode", {"max_tokens": 100, "estimated_tokens": 90, "trimmed": ["history"]},
+                          {"prompt_tokens": 1234, "completion_tokens": 5})
+
+    with open(session_logger.log_file) as f:
+        entries = [json.loads(line) for line in f]
+    entry = entries[-1]
+    assert entry["type"] == "prompt_budget"
+    assert entry["prompt_tokens"] == 1234
+    assert entry["budget"]["trimmed"] == ["history"]
+    assert session_logger.get_cumulative_metrics()["prompt_trims"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
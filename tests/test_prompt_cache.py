@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-hashed prompt section cache in the state formatter.
+"""
+
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import state_formatter
+from utils.state_formatter import clear_prompt_cache, format_state_for_llm, get_prompt_cache_stats
+
+
+def _state(dialog_text="Hello there!"):
+    return {
+        'player': {
+            'name': 'MAY',
+            'position': {'x': 5, 'y': 5},
+            'party': [{'species_name': 'TREECKO', 'level': 5, 'current_hp': 20, 'max_hp': 20, 'status': 'OK'}],
+        },
+        'game': {
+            'game_state': 'dialog',
+            'is_in_battle': False,
+            'dialog_text': dialog_text,
+            'dialogue_detected': {'has_dialogue': True, 'confidence': 0.9},
+        },
+        'map': {'tiles': [[(1, 0, 0, 0)] * 3] * 3, 'player_coords': {'x': 5, 'y': 5}},
+    }
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_formatter, 'MAP_STITCHER_CACHE_FILE', str(tmp_path / 'missing.json'))
+    clear_prompt_cache()
+    yield
+    clear_prompt_cache()
+
+
+def test_same_state_is_formatted_once():
+    """Repeated calls on an equal state share one formatted result."""
+    first = format_state_for_llm(_state())
+    misses = get_prompt_cache_stats()['misses']
+
+    assert format_state_for_llm(copy.deepcopy(_state())) == first
+    assert get_prompt_cache_stats()['misses'] == misses
+
+
+def test_changed_section_is_rebuilt_and_others_reused():
+    """Only the sections whose inputs changed are formatted again."""
+    format_state_for_llm(_state())
+    before = get_prompt_cache_stats()
+
+    formatted = format_state_for_llm(_state(dialog_text="Bye now!"))
+    after = get_prompt_cache_stats()
+
+    assert "Text: Bye now!" in formatted
+    # New whole-state and game-state entries; party and map sections are hits
+    assert after['misses'] - before['misses'] == 2
+    assert after['hits'] - before['hits'] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the fixed-layout RAM features used by the batched environments.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pokemon_env.ram_features import RAM_FEATURE_DTYPE, actions_to_masks, buttons_to_mask, read_ram_features
+
+
+class Addresses:
+    MAP_BANK = 0x100
+    SAVESTATE_OBJECT_POINTER = 0x200
+    SAVESTATE_PLAYER_X_OFFSET = 0x00
+    PARTY_COUNT = 0x110
+    PLAYER_BADGES = 0x120
+    IN_BATTLE_BIT_ADDR = 0x130
+    IN_BATTLE_BITMASK = 0x02
+
+
+def test_features_are_filled_in_place():
+    """Each record is filled from raw reads, following the save block pointer."""
+    memory = bytearray(0x1000)
+    memory[0x100:0x102] = b"\x00\x09"
+    memory[0x200:0x204] = (0x400).to_bytes(4, "little")
+    memory[0x400:0x404] = (7).to_bytes(2, "little") + (12).to_bytes(2, "little")
+    memory[0x110] = 1
+    memory[0x120] = 0b1
+    memory[0x130] = 0x02
+
+    features = np.zeros(2, dtype=RAM_FEATURE_DTYPE)
+    read_ram_features(lambda address, size: bytes(memory[address:address + size]), Addresses, features[1], frame=42)
+
+    assert features[0]['frame'] == 0
+    assert features[1].tolist() == (42, 0, 9, 7, 12, 1, 1, 1)
+
+
+def test_buttons_to_mask_uses_gba_key_bits():
+    assert buttons_to_mask(["A", "up"]) == 0x41
+    assert buttons_to_mask([]) == 0
+    with pytest.raises(ValueError):
+        buttons_to_mask(["turbo"])
+
+
+def test_actions_accept_masks_or_button_lists():
+    assert actions_to_masks([0x01, ["b", "left"]], 2).tolist() == [0x01, 0x22]
+    assert actions_to_masks(np.array([3, 4]), 2).dtype == np.uint16
+    with pytest.raises(ValueError):
+        actions_to_masks([0], 2)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
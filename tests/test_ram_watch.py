@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-frame RAM watchpoints used for milestone detection.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pokemon_env.ram_watch import RamWatch, RamWatcher
+
+BASE = 0x02000000
+POINTER = 0x02000100
+
+
+class FakeMemory:
+    def __init__(self):
+        self.data = bytearray(0x1000)
+
+    def write(self, address, payload):
+        self.data[address - BASE:address - BASE + len(payload)] = payload
+
+    def read(self, address, size):
+        return bytes(self.data[address - BASE:address - BASE + size])
+
+
+def _watcher(memory):
+    return RamWatcher(memory.read, [
+        RamWatch("map", BASE + 0x10, 2),
+        RamWatch("name", 0x4, 3, pointer=POINTER),
+    ])
+
+
+def test_first_poll_reports_everything_then_only_changes():
+    """Every field is new on the first frame; later frames report only real changes."""
+    memory = FakeMemory()
+    memory.write(BASE + 0x10, b"\x00\x09")
+    watcher = _watcher(memory)
+
+    assert [c.name for c in watcher.poll(frame=1)] == ["map", "name"]
+    assert watcher.poll(frame=2) == []
+
+    memory.write(BASE + 0x11, b"\x0a")
+    changes = watcher.poll(frame=3)
+    assert [(c.name, c.frame, c.old, c.new) for c in changes] == [("map", 3, b"\x00\x09", b"\x00\x0a")]
+
+
+def test_pointer_fields_follow_the_save_block():
+    """Pointer watches read relative to the current pointer target."""
+    memory = FakeMemory()
+    watcher = _watcher(memory)
+    watcher.poll(frame=1)
+
+    # Save block allocated: the name is read from the new location
+    memory.write(POINTER, (BASE + 0x200).to_bytes(4, "little"))
+    memory.write(BASE + 0x204, b"MAY")
+    changes = watcher.poll(frame=2)
+    assert [(c.name, c.old, c.new) for c in changes] == [("name", b"", b"MAY")]
+
+    watcher.reset()
+    assert [c.name for c in watcher.poll(frame=3)] == ["map", "name"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
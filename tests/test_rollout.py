@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the headless rollout runner (script parsing and snapshot forking).
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent.simple import SimpleAgent
+from pokemon_env.rollout import RolloutRunner, load_recorded_script, parse_script
+from utils import llm_logger
+from utils.vlm import VLM, VLMBackend
+
+
+class Addresses:
+    MAP_BANK = 0x00
+    SAVESTATE_OBJECT_POINTER = 0x10
+    SAVESTATE_PLAYER_X_OFFSET = 0x00
+    PARTY_COUNT = 0x02
+    PLAYER_BADGES = 0x03
+    IN_BATTLE_BIT_ADDR = 0x04
+    IN_BATTLE_BITMASK = 0x02
+
+
+RESPONSES = [
+    "ANALYSIS: Bedroom.\nACTION: RIGHT, RIGHT\nREASONING: The stairs are to the right.",
+    "ANALYSIS: At the stairs.\nACTION: UP\nREASONING: Go down the stairs.",
+]
+
+
+class ScriptedBackend(VLMBackend):
+    """Answers with RESPONSES in order"""
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+        self.responses = iter(RESPONSES)
+
+    def get_query(self, img, text, module_name="Unknown"):
+        return next(self.responses)
+
+    def get_text_query(self, text, module_name="Unknown"):
+        return next(self.responses)
+
+
+class FakeCore:
+    """Counts frames per key mask; the savestate is just the frame counter"""
+
+    def __init__(self):
+        self.memory = bytearray(0x20)
+        self.frame_count = 0
+        self.pressed = []
+
+    def run(self, key_mask, frames):
+        self.frame_count += frames
+        if frames:
+            self.pressed.append((key_mask, frames))
+
+    def read_memory(self, address, size=1):
+        return bytes(self.memory[address:address + size])
+
+    def save_state(self):
+        return self.frame_count.to_bytes(4, "little")
+
+    def load_state(self, state):
+        self.frame_count = int.from_bytes(state, "little")
+
+
+def test_parse_script_expands_repeats_chords_and_waits():
+    segments = parse_script("A, UP*2 A+B WAIT:30", hold_frames=2, release_frames=1)
+    assert segments == [
+        (0x01, 2), (0, 1),
+        (0x40, 2), (0, 1), (0x40, 2), (0, 1),
+        (0x03, 2), (0, 1),
+        (0, 30),
+    ]
+    with pytest.raises(ValueError):
+        parse_script("JUMP")
+
+
+def test_branches_fork_from_the_same_snapshot():
+    core = FakeCore()
+    runner = RolloutRunner(core, Addresses)
+    main = runner.run(parse_script("A", 2, 2), keep_state=True)
+    assert main.frames == 4
+
+    results = runner.run_branches(main.state, [[(0x40, 10)], [(0x80, 20)]])
+    assert [int(r.features['frame']) for r in results] == [14, 24]
+    assert runner.stats.rollouts == 3
+    assert runner.stats.frames == 34
+
+
+def test_recorded_llm_logs_session_replays_the_agent_actions(monkeypatch, tmp_path):
+    session_logger = llm_logger.LLMLogger(str(tmp_path / "llm_logs"))
+    monkeypatch.setattr(llm_logger, "_llm_logger", session_logger)
+    monkeypatch.setitem(VLM.BACKENDS, "scripted", ScriptedBackend)
+    agent = SimpleAgent(VLM(model_name="test-model", backend="scripted"))
+    monkeypatch.setattr(agent, "_update_server_metrics", lambda: None)
+
+    frame = Image.new("RGB", (240, 160))
+    game_state = {"player": {"position": {"x": 3, "y": 4}}, "map": {}}
+    for _ in RESPONSES:
+        agent.process_step(frame, game_state)
+
+    script = load_recorded_script(session_logger.log_file)
+    assert script == "RIGHT, RIGHT, UP"
+    assert parse_script(script, hold_frames=1, release_frames=0) == [(0x10, 1), (0x10, 1), (0x40, 1)]
+
+
+def test_recording_without_actions_is_rejected(tmp_path):
+    session_logger = llm_logger.LLMLogger(str(tmp_path / "llm_logs"))
+    session_logger.log_interaction("gemini_simple_mode", "prompt", "ACTION: A", duration=0.1)
+    with pytest.raises(ValueError):
+        load_recorded_script(session_logger.log_file)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
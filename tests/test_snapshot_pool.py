@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory savestate pool.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pokemon_env.snapshot_pool import SnapshotEvictedError, SnapshotPool, SnapshotPoolFull
+
+STATE_SIZE = 16
+
+
+class FakeCore:
+    """A core whose whole state is one byte repeated"""
+
+    def __init__(self):
+        self.value = 0
+
+    def save_into(self, buffer):
+        buffer[:] = self.value
+        return True
+
+    def load_from(self, buffer):
+        self.value = int(buffer[0])
+        return True
+
+
+def _pool(core, capacity):
+    return SnapshotPool(STATE_SIZE, core.save_into, core.load_from, max_bytes=STATE_SIZE * capacity)
+
+
+def test_restore_and_shared_handles():
+    """Restoring a snapshot brings the state back; a handle can be restored any number of times."""
+    core = FakeCore()
+    pool = _pool(core, capacity=4)
+    core.value = 7
+    root = pool.snapshot(frame=100)
+    for branch in (1, 2, 3):
+        pool.restore(root)
+        assert core.value == 7
+        core.value = branch
+    assert root.frame == 100
+    assert pool.to_bytes(root) == bytes([7] * STATE_SIZE)
+    assert pool.stats()['restores'] == 3
+
+
+def test_lru_eviction_skips_pinned_and_recent_snapshots():
+    core = FakeCore()
+    pool = _pool(core, capacity=2)
+    root = pool.snapshot(pin=True)
+    core.value = 1
+    first = pool.snapshot()
+    core.value = 2
+    second = pool.snapshot()  # Evicts `first`, never the pinned root
+
+    assert pool.is_valid(root) and pool.is_valid(second)
+    with pytest.raises(SnapshotEvictedError):
+        pool.restore(first)
+    assert pool.stats()['evictions'] == 1
+
+    pool.pin(second)
+    with pytest.raises(SnapshotPoolFull):
+        pool.snapshot()
+
+    pool.unpin(second)
+    pool.discard(root)
+    assert not pool.is_valid(root)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
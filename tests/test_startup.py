@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for deferred telemetry and the time-to-first-action report
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import startup_profile, telemetry
+
+
+class FakeWeave:
+    def __init__(self):
+        self.traced = []
+
+    def op(self, name=None):
+        def decorator(func):
+            def traced(*args, **kwargs):
+                self.traced.append(name or func.__name__)
+                return func(*args, **kwargs)
+            return traced
+        return decorator
+
+
+def test_op_traces_only_after_telemetry_is_initialized(monkeypatch):
+    monkeypatch.setattr(telemetry, "_weave", None)
+
+    @telemetry.op()
+    def double(x):
+        return 2 * x
+
+    @telemetry.op(name="named")
+    async def triple(x):
+        return 3 * x
+
+    assert double(2) == 4
+    assert asyncio.run(triple(2)) == 6
+
+    weave = FakeWeave()
+    monkeypatch.setattr(telemetry, "_weave", weave)
+    assert telemetry.telemetry_enabled()
+    assert double(3) == 6
+    assert asyncio.run(triple(3)) == 9
+    assert weave.traced == ["double", "named"]
+
+
+def test_first_action_report_prints_once(monkeypatch, capsys):
+    monkeypatch.setattr(startup_profile, "_marks", [])
+    monkeypatch.setattr(startup_profile, "_reported", False)
+
+    startup_profile.mark("imports")
+    startup_profile.mark("agent ready")
+    startup_profile.mark("imports")  # Later marks of a phase are ignored
+
+    assert startup_profile.report_first_action()
+    assert not startup_profile.report_first_action()
+
+    labels = [label for label, _ in startup_profile.get_marks()]
+    assert labels == ["imports", "agent ready", "first action"]
+    output = capsys.readouterr().out
+    assert output.count("Time to first action") == 1
+    assert "agent ready" in output
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for streamed VLM responses and early action extraction.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent.simple import SimpleAgent, StreamingActionParser
+from utils import llm_logger
+from utils.vlm import VLM, VLMBackend, VLMResponse
+from utils.vlm_cache import VLMResponseCache
+
+RESPONSE = (
+    "ANALYSIS: Standing in the bedroom, stairs to the right.\n"
+    "OBJECTIVES: None\n"
+    "PLAN: Head downstairs.\n"
+    "ACTION:\n"
+    "RIGHT\n"
+    "RIGHT\n"
+    "\n"
+    "REASONING: The stairs are two tiles right and both tiles are WALKABLE in the movement preview."
+)
+
+
+class ChunkedBackend(VLMBackend):
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+        self.streams = 0
+
+    def get_query(self, img, text, module_name="Unknown"):
+        return RESPONSE
+
+    def get_text_query(self, text, module_name="Unknown"):
+        return RESPONSE
+
+    def stream_query(self, img, text, module_name="Unknown"):
+        self.streams += 1
+        for i in range(0, len(RESPONSE), 7):
+            yield RESPONSE[i:i + 7]
+
+
+class BrokenStreamBackend(ChunkedBackend):
+    """Drops the connection partway through the REASONING"""
+
+    def stream_query(self, img, text, module_name="Unknown"):
+        yield RESPONSE[:RESPONSE.index("both tiles")]
+        raise ConnectionError("stream reset")
+
+
+class UsageStreamBackend(ChunkedBackend):
+    """Ends the stream with the token counts, like the OpenAI and Gemini backends"""
+
+    def stream_query(self, img, text, module_name="Unknown"):
+        yield from super().stream_query(img, text, module_name)
+        yield VLMResponse("", {"prompt_tokens": 1234, "completion_tokens": 56, "total_tokens": 1290})
+
+
+@pytest.fixture
+def session_logger(monkeypatch, tmp_path):
+    session = llm_logger.LLMLogger(str(tmp_path / "logs"))
+    monkeypatch.setattr(llm_logger, '_llm_logger', session)
+    return session
+
+
+def test_parser_emits_actions_before_stream_ends():
+    parser = StreamingActionParser()
+    emitted_at = None
+    for i in range(0, len(RESPONSE), 7):
+        actions = parser.feed(RESPONSE[i:i + 7])
+        if actions:
+            emitted_at = i
+            break
+    assert actions == ['RIGHT', 'RIGHT']
+    assert emitted_at < RESPONSE.index("REASONING:")
+    assert parser.feed("more text\n") is None  # Emits once
+
+    # "A" in the plan must not count; an ACTION block that ends the stream is flushed by finish()
+    parser = StreamingActionParser()
+    assert parser.feed("PLAN: press A to talk\nACTION: B") is None
+    assert parser.finish() == ['B']
+
+
+@pytest.mark.parametrize("response", [
+    RESPONSE,
+    "ACTION:\nUP\nRIGHT",
+    "PLAN: press A\nACTION: UP\nRIGHT, RIGHT\nREASONING: clear path",
+    "ACTION: go\nLEFT\n\nREASONING: press B later",
+])
+def test_parser_matches_structured_response_parsing(monkeypatch, response):
+    monkeypatch.setitem(VLM.BACKENDS, 'chunked', ChunkedBackend)
+    agent = SimpleAgent(VLM(model_name="test-model", backend="chunked"))
+    expected, _ = agent._parse_structured_response(response)
+
+    parser = StreamingActionParser()
+    streamed = None
+    for i in range(0, len(response), 3):
+        streamed = streamed or parser.feed(response[i:i + 3])
+    streamed = streamed or parser.finish()
+    assert streamed == expected
+
+
+def test_only_streaming_prompts_put_the_action_before_the_reasoning(monkeypatch):
+    monkeypatch.setitem(VLM.BACKENDS, 'chunked', ChunkedBackend)
+
+    def instructions(stream_responses):
+        agent = SimpleAgent(VLM(model_name="test-model", backend="chunked"), stream_responses=stream_responses)
+        prompt = agent._build_prompt("", "", "", "", "", "", "", "overworld", (1, 2), []).text
+        return prompt[prompt.index("PLAN:"):prompt.index("PATHFINDING RULES")]
+
+    assert instructions(False).index("REASONING:") < instructions(False).index("ACTION:")
+    assert instructions(True).index("ACTION:") < instructions(True).index("REASONING:")
+
+
+def test_stream_failure_after_early_actions_keeps_them(monkeypatch, session_logger):
+    monkeypatch.setitem(VLM.BACKENDS, 'broken', BrokenStreamBackend)
+    agent = SimpleAgent(VLM(model_name="test-model", backend="broken"), stream_responses=True)
+    posted = []
+    agent.early_action_callback = posted.append
+
+    response, early_actions = agent._query_vlm(np.zeros((160, 240, 3), dtype=np.uint8), "prompt")
+    assert early_actions == ['RIGHT', 'RIGHT']
+    assert posted == [['RIGHT', 'RIGHT']]  # Posted once; the step returns the same buttons
+    assert response.startswith("ANALYSIS:")
+
+
+def test_streamed_response_carries_the_backend_token_usage(monkeypatch, session_logger):
+    monkeypatch.setitem(VLM.BACKENDS, 'usage', UsageStreamBackend)
+    agent = SimpleAgent(VLM(model_name="test-model", backend="usage"), stream_responses=True)
+
+    response, _ = agent._query_vlm(np.zeros((160, 240, 3), dtype=np.uint8), "prompt")
+    assert response == RESPONSE
+    assert response.token_usage["prompt_tokens"] == 1234
+
+
+def test_vlm_stream_query_caches_full_response(monkeypatch, tmp_path, session_logger):
+    monkeypatch.setitem(VLM.BACKENDS, 'chunked', ChunkedBackend)
+    vlm = VLM(model_name="test-model", backend="chunked", cache=VLMResponseCache(str(tmp_path / "cache.sqlite")))
+    frame = np.zeros((160, 240, 3), dtype=np.uint8)
+
+    assert "".join(vlm.stream_query(frame, "prompt", "simple_mode")) == RESPONSE
+    cached = list(vlm.stream_query(frame, "prompt", "simple_mode"))
+    assert cached == [RESPONSE]
+    assert vlm.backend.streams == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the async VLM query API.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import llm_logger
+from utils.vlm import VLM, VLMBackend, _GeminiQueryBackend, retry_with_exponential_backoff_async
+
+QUERY_SECONDS = 0.2
+
+
+class SlowSyncBackend(VLMBackend):
+    """Backend without an async client: the base class runs it in worker threads"""
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    def get_query(self, img, text, module_name="Unknown"):
+        time.sleep(QUERY_SECONDS)
+        return f"image:{text}"
+
+    def get_text_query(self, text, module_name="Unknown"):
+        time.sleep(QUERY_SECONDS)
+        if text == "fail":
+            raise RuntimeError("backend down")
+        return f"text:{text}"
+
+
+@pytest.fixture
+def vlm(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_logger, '_llm_logger', llm_logger.LLMLogger(str(tmp_path)))
+    monkeypatch.setitem(VLM.BACKENDS, 'slow', SlowSyncBackend)
+    return VLM(model_name="test-model", backend="slow")
+
+
+def test_async_queries_overlap(vlm):
+    async def run():
+        return await asyncio.gather(
+            vlm.get_query_async(None, "look", "PERCEPTION"),
+            vlm.get_text_query_async("plan", "PLANNING"),
+            vlm.get_text_query_async("act", "ACTION"),
+        )
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert results == ["image:look", "text:plan", "text:act"]
+    assert elapsed < 2 * QUERY_SECONDS
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(vlm.get_text_query_async("fail"))
+
+
+def test_async_retry_backs_off_then_succeeds():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("rate limited")
+        return "ok"
+
+    retried = retry_with_exponential_backoff_async(flaky, initial_delay=0.001)
+    assert asyncio.run(retried()) == "ok"
+    assert len(attempts) == 3
+
+    always_failing = retry_with_exponential_backoff_async(flaky, initial_delay=0.001, max_retries=0,
+                                                          errors=(ZeroDivisionError,))
+    attempts.clear()
+    with pytest.raises(ConnectionError):
+        asyncio.run(always_failing())
+
+
+def test_gemini_backends_must_implement_the_generate_hooks():
+    class IncompleteGemini(_GeminiQueryBackend):
+        def _image_part(self, img):
+            return img
+
+    with pytest.raises(TypeError, match="_call_generate_content"):
+        IncompleteGemini()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
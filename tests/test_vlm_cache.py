@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed VLM response cache.
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import llm_logger
+from utils.vlm import VLM, ImagePipeline, VLMBackend, _GeminiQueryBackend
+from utils.vlm_cache import VLMResponseCache, image_fingerprint
+
+
+class CountingBackend(VLMBackend):
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+        self.calls = 0
+
+    def get_query(self, img, text, module_name="Unknown"):
+        self.calls += 1
+        return f"reply {self.calls}"
+
+    def get_text_query(self, text, module_name="Unknown"):
+        self.calls += 1
+        return f"reply {self.calls}"
+
+
+class ImageRejectingGemini(_GeminiQueryBackend):
+    """Gemini query flow whose image calls fail, so image queries get the text-only fallback"""
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+        self.calls = 0
+
+    def _image_part(self, img):
+        return self._encode_image(img)
+
+    def _call_generate_content(self, content_parts):
+        self.calls += 1
+        if len(content_parts) > 1:
+            raise RuntimeError("image rejected")
+        return SimpleNamespace(text=f"text reply {self.calls}", candidates=[])
+
+    async def _call_generate_content_async(self, content_parts):
+        return self._call_generate_content(content_parts)
+
+    def _stream_generate_content(self, content_parts):
+        yield self._call_generate_content(content_parts)
+
+
+@pytest.fixture
+def session_logger(monkeypatch, tmp_path):
+    session = llm_logger.LLMLogger(str(tmp_path / "logs"))
+    monkeypatch.setattr(llm_logger, '_llm_logger', session)
+    return session
+
+
+def _frame(value=0):
+    frame = np.zeros((160, 240, 3), dtype=np.uint8)
+    frame[:80] = 200
+    frame[0, 0] = value
+    return frame
+
+
+def test_cache_persists_to_disk_and_expires(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = VLMResponseCache(path, max_memory_entries=1)
+    first = cache.make_key("openai", "gpt-4o", "prompt", _frame())
+    second = cache.make_key("openai", "gpt-4o", "prompt", _frame(1))
+    assert first != second
+    assert first != cache.make_key("openai", "gpt-4o", "prompt", _frame(), {"temperature": 0.7})
+
+    cache.put(first, "UP")
+    cache.put(second, "DOWN")  # Pushes the first key out of the memory LRU
+    assert cache.get(first) == "UP"
+    assert cache.stats()['disk_hits'] == 1
+    cache.close()
+
+    reopened = VLMResponseCache(path, ttl_seconds=0.05)
+    assert reopened.get(second) == "DOWN"
+    time.sleep(0.1)
+    assert reopened.get(second) is None
+    stats = reopened.stats()
+    assert stats['expired'] == 1 and stats['disk_entries'] == 1
+
+    # Perceptual keys ignore single-pixel noise
+    assert image_fingerprint(_frame(), "perceptual") == image_fingerprint(_frame(3), "perceptual")
+    assert image_fingerprint(_frame(), "exact") != image_fingerprint(_frame(3), "exact")
+
+
+def test_vlm_serves_repeated_queries_from_cache(monkeypatch, tmp_path, session_logger):
+    monkeypatch.setitem(VLM.BACKENDS, 'counting', CountingBackend)
+    vlm = VLM(model_name="test-model", backend="counting", cache=VLMResponseCache(str(tmp_path / "cache.sqlite")))
+
+    assert vlm.get_query(_frame(), "what now?", "ACTION") == "reply 1"
+    assert vlm.get_query(_frame(), "what now?", "ACTION") == "reply 1"
+    assert vlm.get_text_query("what now?", "ACTION") == "reply 2"
+    assert vlm.backend.calls == 2
+
+    metrics = session_logger.get_cumulative_metrics()
+    assert metrics['cache_hits'] == 1 and metrics['cache_misses'] == 2
+    assert metrics['cache_hit_rate'] == pytest.approx(1 / 3)
+    assert metrics['total_llm_calls'] == 0  # The fake backend logs nothing; cached replays are not calls
+
+
+def test_text_only_fallback_is_not_cached_under_the_image_key(monkeypatch, tmp_path, session_logger):
+    monkeypatch.setitem(VLM.BACKENDS, 'gemini-test', ImageRejectingGemini)
+    vlm = VLM(model_name="gemini-test", backend="gemini-test", cache=VLMResponseCache(None))
+
+    assert vlm.get_query(_frame(), "what now?", "ACTION") == "text reply 2"
+    assert vlm.get_query(_frame(), "what now?", "ACTION") == "text reply 4"  # Asked again, not replayed
+    assert "".join(vlm.stream_query(_frame(), "what now?", "ACTION")) == "text reply 6"
+    assert vlm.cache.stats()['stores'] == 0
+
+
+def test_image_keys_depend_on_the_image_pipeline(monkeypatch, session_logger):
+    monkeypatch.setitem(VLM.BACKENDS, 'counting', CountingBackend)
+    cache = VLMResponseCache(None)
+    native = VLM(model_name="test-model", backend="counting", cache=cache)
+    palette = VLM(model_name="test-model", backend="counting", cache=cache,
+                  image_pipeline=ImagePipeline(resize="auto", encoding="palette"))
+
+    assert native.get_query(_frame(), "what now?", "ACTION") == "reply 1"
+    assert palette.get_query(_frame(), "what now?", "ACTION") == "reply 1"  # Its own backend; not the cached reply
+    assert palette.backend.calls == 1
+    assert native.get_text_query("plan?", "PLANNING") == "reply 2"
+    assert palette.get_text_query("plan?", "PLANNING") == "reply 2"  # Text prompts do not depend on it
+    assert palette.backend.calls == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
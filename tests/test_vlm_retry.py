@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the VLM retry policy, hedged requests and circuit-breaker failover.
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import llm_logger
+from utils.vlm import VLM, VLMBackend
+from utils.vlm_cache import VLMResponseCache
+from utils.http_transport import get_http_config
+from utils.vlm import _request_timeout
+from utils.vlm_retry import CircuitBreaker, LatencyTracker, RetryBudgetExceeded, RetryPolicy, remaining_deadline
+
+
+class APIStatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class Flaky:
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class DownBackend(VLMBackend):
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+        self.calls = 0
+
+    def get_query(self, img, text, module_name="Unknown"):
+        self.calls += 1
+        raise APIStatusError(503)
+
+    def get_text_query(self, text, module_name="Unknown"):
+        return self.get_query(None, text, module_name)
+
+
+class BackupBackend(DownBackend):
+    def get_query(self, img, text, module_name="Unknown"):
+        self.calls += 1
+        return "backup reply"
+
+
+def test_retries_only_transient_errors_within_deadline():
+    policy = RetryPolicy(initial_delay=0.01, jitter=False, deadline=1.0)
+
+    flaky = Flaky(APIStatusError(429, {"retry-after-ms": "50"}), ConnectionError("reset"))
+    start = time.monotonic()
+    assert policy.call(flaky) == "ok"
+    assert flaky.calls == 3
+    assert time.monotonic() - start >= 0.05  # Waited as long as the server asked
+
+    bad_request = Flaky(APIStatusError(400))
+    with pytest.raises(APIStatusError):
+        policy.call(bad_request)
+    assert bad_request.calls == 1
+
+    # A Retry-After beyond the remaining budget fails right away instead of sleeping
+    with pytest.raises(RetryBudgetExceeded):
+        policy.call(Flaky(APIStatusError(503, {"retry-after": "30"})))
+
+
+def test_request_timeout_is_capped_by_the_remaining_deadline():
+    assert remaining_deadline() is None
+    assert _request_timeout().read == get_http_config().timeout
+
+    timeouts = []
+
+    def attempt():
+        timeouts.append(_request_timeout())
+        if len(timeouts) == 1:
+            time.sleep(0.2)
+            raise ConnectionError("reset")
+        return "ok"
+
+    policy = RetryPolicy(initial_delay=0.01, jitter=False, deadline=2.0)
+    assert policy.call(attempt) == "ok"
+    assert timeouts[0].read <= 2.0
+    assert timeouts[1].read <= 1.8  # The retry only gets what is left of the deadline
+    assert timeouts[1].connect <= timeouts[1].read
+    assert remaining_deadline() is None  # Reset once the call returns
+
+
+def test_hedged_request_beats_slow_primary():
+    tracker = LatencyTracker()
+    for _ in range(5):
+        tracker.record(0.02)
+    policy = RetryPolicy(hedge_percentile=0.9, hedge_min_samples=5)
+    calls = []
+
+    def query():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(1.0)  # Stuck first request
+            return "slow"
+        return "fast"
+
+    start = time.monotonic()
+    assert policy.call(query, tracker=tracker) == "fast"
+    assert time.monotonic() - start < 0.5
+    assert len(calls) == 2
+
+
+def test_circuit_breaker_fails_over_to_secondary(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_logger, '_llm_logger', llm_logger.LLMLogger(str(tmp_path / "logs")))
+    monkeypatch.setitem(VLM.BACKENDS, 'down', DownBackend)
+    monkeypatch.setitem(VLM.BACKENDS, 'backup', BackupBackend)
+    vlm = VLM(model_name="test-model", backend="down", fallback_backend="backup",
+              retry_policy=RetryPolicy(max_retries=0), circuit_breaker=CircuitBreaker(failure_threshold=2),
+              cache=VLMResponseCache(None))
+
+    for _ in range(4):
+        assert vlm.get_text_query("what now?", "ACTION") == "backup reply"
+    assert vlm.backend.calls == 2  # Circuit opened after two failures
+    assert vlm.circuit_breaker.state == "open"
+    assert vlm.cache.stats()['stores'] == 0  # Fallback replies are not cached under the primary's key
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+"""
+Micro-batching scheduler for a shared local model.
+
+Callers (agent modules running concurrently, or several agents/emulators
+sharing one LocalHuggingFaceBackend) submit single requests and block for
+their result. A worker thread collects requests for up to window_ms after the
+first one arrives (or until max_batch_size are waiting), hands them to
+run_batch as one list and dispatches the results back in order, so a padded
+batch goes through one generate() call instead of queueing serially.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+
+class MicroBatcher:
+    """Groups concurrent submit() calls into batches for run_batch"""
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 8,
+                 window_ms: float = 5.0, name: str = "batch"):
+        """
+        Args:
+            run_batch: Maps a list of requests to a list of results (same order and length)
+            max_batch_size: Largest batch handed to run_batch
+            window_ms: How long to wait for more requests after the first one arrives
+            name: Worker thread name
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = window_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats = {'batches': 0, 'requests': 0, 'largest_batch': 0}
+        self._stats_lock = threading.Lock()
+        # Orders submit() against close(), so nothing is queued after _CLOSE
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=f"{name}-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, request: Any) -> Any:
+        """Queue a request and wait for its result (exceptions from run_batch are re-raised)"""
+        future = Future()
+        with self._submit_lock:
+            if self._closed or not self._worker.is_alive():
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put((request, future))
+        return future.result()
+
+    def _collect(self, first) -> tuple:
+        """(batch, closing) starting with the first queued request"""
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _CLOSE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        try:
+            self._serve()
+        finally:
+            self._fail_queued()
+
+    def _serve(self):
+        closing = False
+        while not closing:
+            first = self._queue.get()
+            if first is _CLOSE:
+                break
+            batch, closing = self._collect(first)
+            requests = [request for request, _ in batch]
+            try:
+                results = self.run_batch(requests)
+                if len(results) != len(requests):
+                    raise RuntimeError(f"run_batch returned {len(results)} results for {len(requests)} requests")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+
+            with self._stats_lock:
+                self._stats['batches'] += 1
+                self._stats['requests'] += len(batch)
+                self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+            logger.debug(f"Ran a batch of {len(batch)} requests")
+
+    def _fail_queued(self):
+        """Fail whatever is still queued once the worker stops, so no caller waits forever"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _CLOSE:
+                item[1].set_exception(RuntimeError("MicroBatcher is closed"))
+
+    def close(self):
+        """Finish the requests queued so far, fail any left behind and stop the worker"""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_CLOSE)
+        self._worker.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            batches = self._stats['batches']
+            return dict(self._stats, mean_batch=self._stats['requests'] / batches if batches else 0.0)
@@ -0,0 +1,313 @@
+"""
+Glyph-template text reader for Pokemon Emerald dialogue boxes.
+
+Emerald renders dialogue with a fixed bitmap font at fixed positions, so once
+each glyph bitmap has been seen it can be recognised by exact lookup instead of
+running Tesseract. The reader works on a boolean "ink" mask of the dialogue text
+region: it splits the mask into lines (row projection) and glyphs (column
+projection), and looks each glyph up in a font atlas.
+
+The atlas is learned from frames whose text is already known, e.g. the dialogue
+states in tests/states where the RAM dialogue buffer gives the ground truth:
+
+    python -m utils.glyph_reader --rom Emerald-GBAdvance/rom.gba tests/states/dialog*.state
+"""
+
+import argparse
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ATLAS_PATH = os.path.join(".pokeagent_cache", "glyph_atlas.json")
+
+# A glyph is (offset of its bottom row from the line baseline, bitmap)
+Glyph = Tuple[int, np.ndarray]
+
+
+def _ink_runs(ink: np.ndarray) -> List[Tuple[int, int]]:
+    """Return [start, end) index pairs of consecutive True values in a 1D array"""
+    padded = np.concatenate(([False], ink, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+class GlyphTextReader:
+    """Template-matching reader for the fixed dialogue font"""
+
+    LINE_GAP_MERGE = 2      # Ink row runs closer than this belong to the same line
+    DEFAULT_SPACE_GAP = 4   # Blank columns that separate words (refined while learning)
+    MAX_MISMATCH = 2        # Pixels a glyph may differ from its template for a fuzzy match
+
+    def __init__(self):
+        self.space_gap = self.DEFAULT_SPACE_GAP
+        self._exact: Dict[Tuple[int, Tuple[int, int], bytes], str] = {}
+        self._by_shape: Dict[Tuple[Tuple[int, int], bytes], set] = {}
+        self._templates: Dict[Tuple[int, int], List[Tuple[np.ndarray, str]]] = {}
+        # Gap widths seen inside and between words, used to calibrate space_gap
+        self._max_letter_gap = 0
+        self._min_word_gap = None
+
+    def __len__(self):
+        return len(self._exact)
+
+    # ------------------------------------------------------------------ #
+    # Segmentation
+    # ------------------------------------------------------------------ #
+
+    def segment(self, ink_mask: np.ndarray) -> List[List[List[Glyph]]]:
+        """
+        Split an ink mask into lines -> words -> glyphs.
+
+        Args:
+            ink_mask: 2D boolean array, True where a text pixel is drawn
+
+        Returns:
+            List of lines, each a list of words, each a list of (dy, bitmap) glyphs
+        """
+        ink_mask = np.asarray(ink_mask, dtype=bool)
+        lines = []
+        for top, bottom in self._line_bands(ink_mask):
+            band = ink_mask[top:bottom]
+            runs = _ink_runs(band.any(axis=0))
+            if not runs:
+                continue
+
+            # Tight vertical crop of every glyph, bottoms measured from the band top
+            glyphs = []
+            for start, end in runs:
+                column = band[:, start:end]
+                rows = np.flatnonzero(column.any(axis=1))
+                glyphs.append((rows[-1], column[rows[0]:rows[-1] + 1]))
+
+            # Baseline is the most common glyph bottom (descenders are the minority)
+            baseline = int(np.bincount([bottom_row for bottom_row, _ in glyphs]).argmax())
+
+            words, current = [], []
+            for i, (bottom_row, bitmap) in enumerate(glyphs):
+                if i and runs[i][0] - runs[i - 1][1] >= self.space_gap:
+                    words.append(current)
+                    current = []
+                current.append((int(bottom_row) - baseline, bitmap))
+            words.append(current)
+            lines.append(words)
+        return lines
+
+    def _line_bands(self, ink_mask: np.ndarray) -> List[Tuple[int, int]]:
+        """Find [top, bottom) row bands that hold one line of text each"""
+        bands = []
+        for top, bottom in _ink_runs(ink_mask.any(axis=1)):
+            if bands and top - bands[-1][1] <= self.LINE_GAP_MERGE:
+                bands[-1] = (bands[-1][0], bottom)
+            else:
+                bands.append((top, bottom))
+        return bands
+
+    @staticmethod
+    def _shape_key(bitmap: np.ndarray) -> Tuple[Tuple[int, int], bytes]:
+        return bitmap.shape, np.packbits(bitmap).tobytes()
+
+    # ------------------------------------------------------------------ #
+    # Reading
+    # ------------------------------------------------------------------ #
+
+    def read(self, ink_mask: np.ndarray) -> Optional[str]:
+        """
+        Decode the text in an ink mask.
+
+        Returns:
+            The text with lines and words joined by single spaces, or None if the
+            mask is empty or contains a glyph that is not in the atlas (so the
+            caller can fall back to Tesseract).
+        """
+        if not self._exact:
+            return None
+
+        words = []
+        for line in self.segment(ink_mask):
+            for word in line:
+                chars = []
+                for dy, bitmap in word:
+                    char = self._match_glyph(dy, bitmap)
+                    if char is None:
+                        return None
+                    chars.append(char)
+                words.append("".join(chars))
+
+        return " ".join(words) if words else None
+
+    def _match_glyph(self, dy: int, bitmap: np.ndarray) -> Optional[str]:
+        """Exact lookup first, then shape-only lookup, then nearest template"""
+        shape_key = self._shape_key(bitmap)
+        char = self._exact.get((dy,) + shape_key)
+        if char is not None:
+            return char
+
+        candidates = self._by_shape.get(shape_key)
+        if candidates and len(candidates) == 1:
+            return next(iter(candidates))
+
+        templates = self._templates.get(bitmap.shape)
+        if not templates:
+            return None
+        stacked = np.stack([template for template, _ in templates])
+        mismatches = (stacked != bitmap).sum(axis=(1, 2))
+        best = int(mismatches.argmin())
+        if mismatches[best] <= self.MAX_MISMATCH:
+            return templates[best][1]
+        return None
+
+    # ------------------------------------------------------------------ #
+    # Learning
+    # ------------------------------------------------------------------ #
+
+    def learn(self, ink_mask: np.ndarray, known_text: str) -> int:
+        """
+        Add the glyphs of a frame to the atlas using text known to be on screen.
+
+        The on-screen words are aligned to a run of words in `known_text` (which
+        may be longer, e.g. the full RAM dialogue buffer) by their glyph counts.
+        Frames that cannot be aligned unambiguously are skipped.
+
+        Returns:
+            Number of new glyphs added to the atlas
+        """
+        lines = self.segment(ink_mask)
+        screen_words = [word for line in lines for word in line]
+        text_words = known_text.split()
+        if not screen_words or not text_words:
+            return 0
+
+        lengths = [len(word) for word in screen_words]
+        alignments = {
+            " ".join(text_words[i:i + len(lengths)])
+            for i in range(len(text_words) - len(lengths) + 1)
+            if [len(word) for word in text_words[i:i + len(lengths)]] == lengths
+        }
+        if len(alignments) != 1:
+            logger.debug(f"Glyph atlas: could not align {len(screen_words)} screen words to known text")
+            return 0
+
+        matched_words = alignments.pop().split()
+        added = 0
+        for glyphs, word in zip(screen_words, matched_words):
+            for (dy, bitmap), char in zip(glyphs, word):
+                added += self.add_glyph(char, dy, bitmap)
+
+        self._calibrate_space_gap(ink_mask)
+        return added
+
+    def add_glyph(self, char: str, dy: int, bitmap: np.ndarray) -> int:
+        """Register a single glyph template, returns 1 if it was new"""
+        bitmap = np.asarray(bitmap, dtype=bool)
+        shape_key = self._shape_key(bitmap)
+        key = (int(dy),) + shape_key
+        if key in self._exact:
+            return 0
+        self._exact[key] = char
+        self._by_shape.setdefault(shape_key, set()).add(char)
+        self._templates.setdefault(bitmap.shape, []).append((bitmap, char))
+        return 1
+
+    def _calibrate_space_gap(self, ink_mask: np.ndarray):
+        """Tighten space_gap between the widest letter gap and narrowest word gap seen"""
+        for top, bottom in self._line_bands(np.asarray(ink_mask, dtype=bool)):
+            runs = _ink_runs(ink_mask[top:bottom].any(axis=0))
+            for (_, prev_end), (start, _) in zip(runs, runs[1:]):
+                gap = start - prev_end
+                if gap >= self.space_gap:
+                    self._min_word_gap = gap if self._min_word_gap is None else min(self._min_word_gap, gap)
+                else:
+                    self._max_letter_gap = max(self._max_letter_gap, gap)
+
+        if self._min_word_gap is not None and self._max_letter_gap < self._min_word_gap - 1:
+            self.space_gap = (self._max_letter_gap + self._min_word_gap + 1) // 2
+
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+
+    def save(self, path: str = DEFAULT_ATLAS_PATH):
+        """Save the atlas as JSON"""
+        glyphs = [
+            {'char': char, 'dy': dy, 'shape': list(shape), 'bits': bits.hex()}
+            for (dy, shape, bits), char in self._exact.items()
+        ]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'version': 1, 'space_gap': self.space_gap, 'glyphs': glyphs}, f, indent=1)
+        logger.info(f"Saved glyph atlas with {len(glyphs)} glyphs to {path}")
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_ATLAS_PATH) -> "GlyphTextReader":
+        """Load an atlas saved with save(); returns an empty reader if the file is missing"""
+        reader = cls()
+        if not os.path.exists(path):
+            return reader
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            reader.space_gap = data.get('space_gap', cls.DEFAULT_SPACE_GAP)
+            for glyph in data.get('glyphs', []):
+                height, width = glyph['shape']
+                bits = np.frombuffer(bytes.fromhex(glyph['bits']), dtype=np.uint8)
+                bitmap = np.unpackbits(bits, count=height * width).astype(bool).reshape(height, width)
+                reader.add_glyph(glyph['char'], glyph['dy'], bitmap)
+            logger.info(f"Loaded glyph atlas with {len(reader)} glyphs from {path}")
+        except Exception as e:
+            logger.warning(f"Failed to load glyph atlas from {path}: {e}")
+            reader = cls()
+        return reader
+
+
+def build_atlas_from_states(rom_path: str, state_paths: List[str], atlas_path: str = DEFAULT_ATLAS_PATH,
+                            settle_frames: int = 0) -> GlyphTextReader:
+    """
+    Build a glyph atlas from savestates that show a dialogue box.
+
+    Each state is loaded, the dialogue text is read from RAM as ground truth and
+    the glyphs on screen are aligned against it.
+    """
+    from pokemon_env.emulator import EmeraldEmulator
+    from utils.ocr_dialogue import OCRDialogueDetector
+
+    emulator = EmeraldEmulator(rom_path, headless=True, sound=False)
+    emulator.initialize()
+    detector = OCRDialogueDetector()
+    reader = GlyphTextReader.load(atlas_path)
+
+    for state_path in state_paths:
+        with open(state_path, 'rb') as f:
+            emulator.load_state(state_bytes=f.read())
+        emulator.tick(settle_frames)
+
+        screenshot = emulator.get_screenshot()
+        known_text = emulator.memory_reader.read_dialog()
+        if screenshot is None or not known_text or not detector.is_dialogue_box_visible(screenshot):
+            logger.info(f"{state_path}: no dialogue on screen, skipped")
+            continue
+
+        added = reader.learn(detector.text_ink_mask(np.array(screenshot)), known_text)
+        logger.info(f"{state_path}: learned {added} new glyphs ({len(reader)} total)")
+
+    reader.save(atlas_path)
+    return reader
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the dialogue glyph atlas from savestates")
+    parser.add_argument("states", nargs="+", help="Savestate files showing dialogue boxes")
+    parser.add_argument("--rom", default="Emerald-GBAdvance/rom.gba", help="Path to the Emerald ROM")
+    parser.add_argument("--atlas", default=DEFAULT_ATLAS_PATH, help="Output atlas path")
+    parser.add_argument("--settle-frames", type=int, default=0, help="Frames to run after loading each state")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    atlas = build_atlas_from_states(args.rom, args.states, args.atlas, args.settle_frames)
+    print(f"Glyph atlas: {len(atlas)} glyphs, space gap {atlas.space_gap}px -> {args.atlas}")
@@ -0,0 +1,117 @@
+"""
+Shared HTTP transport for VLM backends and calls to the game server.
+
+Every OpenAI-compatible backend (OpenAI, OpenRouter, Ollama) and the client loop
+send their requests through pooled httpx clients, so an agent step reuses
+keep-alive connections instead of paying TCP (and TLS) setup for each request.
+HTTP/2 is negotiated with TLS endpoints when the optional h2 package is
+installed (pip install "httpx[http2]"); plain-HTTP endpoints such as the local
+game server stay on keep-alive HTTP/1.1.
+
+The synchronous client is shared by the whole process. Async clients are bound
+to the event loop that first uses them, so each async backend gets its own
+(pooled) client with the same limits.
+"""
+
+import importlib.util
+import logging
+import threading
+from dataclasses import dataclass, replace
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HTTPTransportConfig:
+    """Pool size, keep-alive and timeouts shared by every HTTP client"""
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0  # Seconds an idle connection stays open
+    connect_timeout: float = 5.0
+    timeout: float = 120.0  # Read/write/pool timeout (long VLM generations)
+    http2: bool = True
+
+
+_config = HTTPTransportConfig()
+_sync_client = None
+_lock = threading.Lock()
+
+
+def configure_http_transport(**overrides) -> HTTPTransportConfig:
+    """
+    Update the transport settings (fields of HTTPTransportConfig).
+
+    Call before creating the VLM; the shared client is rebuilt on next use.
+    """
+    global _config
+    with _lock:
+        _config = replace(_config, **{k: v for k, v in overrides.items() if v is not None})
+        _close_sync_client()
+    return _config
+
+
+def get_http_config() -> HTTPTransportConfig:
+    return _config
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _client_kwargs(config: HTTPTransportConfig) -> dict:
+    import httpx
+
+    http2 = config.http2 and _http2_available()
+    if config.http2 and not http2:
+        logger.info("h2 not installed; using keep-alive HTTP/1.1 (pip install \"httpx[http2]\" for HTTP/2)")
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        "timeout": http_timeout(config),
+    }
+
+
+def http_timeout(config: HTTPTransportConfig = None, limit: Optional[float] = None):
+    """httpx.Timeout for the configured connect/read timeouts (also passed to the OpenAI SDK), each capped at limit"""
+    import httpx
+
+    config = config or _config
+    if limit is None:
+        return httpx.Timeout(config.timeout, connect=config.connect_timeout)
+    return httpx.Timeout(min(config.timeout, limit), connect=min(config.connect_timeout, limit))
+
+
+def get_http_client():
+    """Process-wide pooled httpx.Client"""
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            import httpx
+
+            _sync_client = httpx.Client(**_client_kwargs(_config))
+        return _sync_client
+
+
+def new_async_http_client():
+    """Pooled httpx.AsyncClient with the shared settings (one per event loop user)"""
+    import httpx
+
+    return httpx.AsyncClient(**_client_kwargs(_config))
+
+
+def _close_sync_client():
+    global _sync_client
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+
+
+def close_http_clients():
+    """Close the shared client's connections"""
+    with _lock:
+        _close_sync_client()
@@ -40,7 +40,11 @@ class LLMLogger:
             "total_cost": 0.0,
             "total_actions": 0,
             "start_time": time.time(),
-            "total_llm_calls": 0
+            "total_llm_calls": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "cache_hit_rate": 0.0,
+            "prompt_trims": 0
         }
         
         # Model pricing (per 1K tokens) - can be updated based on actual pricing
@@ -98,8 +102,9 @@ class LLMLogger:
         
         self._write_log_entry(log_entry)
         
-        # Update cumulative metrics
-        self.cumulative_metrics["total_llm_calls"] += 1
+        # Update cumulative metrics (responses served from the VLM cache cost no call)
+        if not (metadata or {}).get("cached"):
+            self.cumulative_metrics["total_llm_calls"] += 1
         
         # Track token usage if available
         if metadata and "token_usage" in metadata:
@@ -184,6 +189,42 @@ class LLMLogger:
         self._write_log_entry(log_entry)
         logger.error(f"LLM {interaction_type.upper()} ERROR: {error}")
     
+    def log_prompt_budget(self, interaction_type: str, budget_report: Dict[str, Any],
+                          token_usage: Optional[Dict[str, Any]] = None):
+        """Log how a prompt was fitted to its token budget
+        
+        Args:
+            interaction_type: Type of interaction the prompt was built for
+            budget_report: Estimated tokens per section and what was trimmed (BudgetedPrompt.report())
+            token_usage: Token counts the backend reported for the call, to compare with the estimate
+        """
+        log_entry = {
+            "timestamp": datetime.now().isoformat(),
+            "type": "prompt_budget",
+            "interaction_type": interaction_type,
+            "budget": budget_report,
+            "prompt_tokens": (token_usage or {}).get("prompt_tokens")
+        }
+        
+        self._write_log_entry(log_entry)
+        if budget_report.get("trimmed"):
+            self.cumulative_metrics["prompt_trims"] = self.cumulative_metrics.get("prompt_trims", 0) + 1
+            logger.info(f"Prompt for {interaction_type} trimmed to {budget_report.get('estimated_tokens')} tokens: "
+                        f"{', '.join(budget_report['trimmed'])}")
+    
+    def log_cache_lookup(self, interaction_type: str, hit: bool):
+        """Count a VLM response cache lookup
+        
+        Args:
+            interaction_type: Type of interaction that was looked up
+            hit: Whether the response came from the cache
+        """
+        key = "cache_hits" if hit else "cache_misses"
+        self.cumulative_metrics[key] = self.cumulative_metrics.get(key, 0) + 1
+        lookups = self.cumulative_metrics.get("cache_hits", 0) + self.cumulative_metrics.get("cache_misses", 0)
+        self.cumulative_metrics["cache_hit_rate"] = self.cumulative_metrics.get("cache_hits", 0) / lookups
+        logger.debug(f"VLM cache {'hit' if hit else 'miss'} for {interaction_type}")
+    
     def log_step_start(self, step: int, step_type: str = "agent_step"):
         """Log the start of an agent step
         
@@ -500,6 +541,45 @@ def log_llm_interaction(interaction_type: str, prompt: str, response: str,
     logger = get_llm_logger()
     logger.log_interaction(interaction_type, prompt, response, metadata, duration, model_info)
 
+def log_llm_cache_lookup(interaction_type: str, hit: bool):
+    """Convenience function to count a VLM response cache lookup
+    
+    Args:
+        interaction_type: Type of interaction that was looked up
+        hit: Whether the response came from the cache
+    """
+    logger = get_llm_logger()
+    logger.log_cache_lookup(interaction_type, hit)
+
+def log_llm_prompt_budget(interaction_type: str, budget_report: Dict[str, Any],
+                          token_usage: Optional[Dict[str, Any]] = None):
+    """Convenience function to log how a prompt was fitted to its token budget
+    
+    Args:
+        interaction_type: Type of interaction the prompt was built for
+        budget_report: Estimated tokens per section and what was trimmed
+        token_usage: Token counts the backend reported for this prompt's call (VLMResponse.token_usage)
+    """
+    logger = get_llm_logger()
+    logger.log_prompt_budget(interaction_type, budget_report, token_usage)
+
+def log_llm_action(actions, step: int, reasoning: Optional[str] = None):
+    """Convenience function to log the buttons an agent step chose
+    
+    The "action" entries are what pokemon_env.rollout replays from an llm_logs session.
+    
+    Args:
+        actions: Button name or list of button names
+        step: Agent step number
+        reasoning: Reasoning behind the action
+    """
+    if isinstance(actions, (list, tuple)):
+        actions = ", ".join(str(action) for action in actions)
+    if not actions:
+        return
+    logger = get_llm_logger()
+    logger.log_action(str(actions), step, reasoning)
+
 def log_llm_error(interaction_type: str, prompt: str, error: str, 
                  metadata: Optional[Dict[str, Any]] = None):
     """Convenience function to log an LLM error
@@ -5,47 +5,32 @@ Centralized Map Formatting Utility
 Single source of truth for all map formatting across the codebase.
 """
 
+import numpy as np
+
 from pokemon_env.enums import MetatileBehavior
 
 
-def format_tile_to_symbol(tile):
-    """
-    Convert a single tile to its display symbol.
-    
-    Args:
-        tile: Tuple of (tile_id, behavior, collision, elevation)
-        
-    Returns:
-        str: Single character symbol representing the tile
-    """
-    if len(tile) >= 4:
-        tile_id, behavior, collision, _ = tile  # elevation not used
-    elif len(tile) >= 2:
-        tile_id, behavior = tile[:2]
-        collision = 0
-    else:
-        tile_id = tile[0] if tile else 0
-        behavior = MetatileBehavior.NORMAL
-        collision = 0
-    
-    # Convert behavior to symbol using unified logic
+def _behavior_name(behavior):
+    """Resolve a behavior enum/int to its MetatileBehavior name ("UNKNOWN" if it has none)"""
     if hasattr(behavior, 'name'):
-        behavior_name = behavior.name
-    elif isinstance(behavior, int):
+        return behavior.name
+    if isinstance(behavior, int):
         try:
-            behavior_enum = MetatileBehavior(behavior)
-            behavior_name = behavior_enum.name
+            return MetatileBehavior(behavior).name
         except ValueError:
-            behavior_name = "UNKNOWN"
-    else:
-        behavior_name = "UNKNOWN"
-    
-    # Map to symbol - SINGLE SOURCE OF TRUTH
-    # tile_id 1023 (0x3FF) is ALWAYS invalid/out-of-bounds
-    if tile_id == 1023:
-        return "#"  # Always show as blocked/wall
-    elif behavior_name == "NORMAL":
-        return "." if collision == 0 else "#"
+            return "UNKNOWN"
+    return "UNKNOWN"
+
+
+def _behavior_symbol(behavior_name):
+    """
+    Map a behavior name to its symbol - SINGLE SOURCE OF TRUTH.
+
+    NORMAL is reported as "." here; the collision bit decides between "." and "#"
+    for NORMAL tiles, and tile_id 1023 always wins as "#".
+    """
+    if behavior_name == "NORMAL":
+        return "."
     elif "DOOR" in behavior_name:
         return "D"
     elif "STAIRS" in behavior_name or "WARP" in behavior_name:
@@ -100,6 +85,200 @@ def format_tile_to_symbol(tile):
         return "#"
 
 
+def format_tile_to_symbol(tile):
+    """
+    Convert a single tile to its display symbol.
+    
+    Args:
+        tile: Tuple of (tile_id, behavior, collision, elevation)
+        
+    Returns:
+        str: Single character symbol representing the tile
+    """
+    if len(tile) >= 4:
+        tile_id, behavior, collision, _ = tile  # elevation not used
+    elif len(tile) >= 2:
+        tile_id, behavior = tile[:2]
+        collision = 0
+    else:
+        tile_id = tile[0] if tile else 0
+        behavior = MetatileBehavior.NORMAL
+        collision = 0
+    
+    # tile_id 1023 (0x3FF) is ALWAYS invalid/out-of-bounds
+    if tile_id == 1023:
+        return "#"  # Always show as blocked/wall
+    behavior_name = _behavior_name(behavior)
+    if behavior_name == "NORMAL" and collision != 0:
+        return "#"
+    return _behavior_symbol(behavior_name)
+
+
+# Symbol codes used by the NumPy rendering pipeline (index -> symbol)
+SYMBOLS = (
+    "#", ".", "D", "S", "W", "~", "PC", "T", "B", "?", "F", "C", "=", "t",
+    "↓", "→", "←", "↑", "↗", "↖", "↘", "↙", "J", "P", "N", "@",
+)
+_SYMBOL_CODES = {symbol: code for code, symbol in enumerate(SYMBOLS)}
+_SYMBOL_ARRAY = np.array(SYMBOLS, dtype=object)
+_WALL = _SYMBOL_CODES["#"]
+_PLAYER = _SYMBOL_CODES["P"]
+_NPC = _SYMBOL_CODES["N"]
+_TRAINER = _SYMBOL_CODES["@"]
+_WALKABLE_CODES = np.array([_SYMBOL_CODES[s] for s in ('.', 'P', 'D', 'N', 'T', 'S')])
+_INVALID_TILE_ID = 1023
+
+# Behavior value -> symbol code, built once from _behavior_symbol (metatile behaviors are u8)
+_BEHAVIOR_LUT = np.array(
+    [_SYMBOL_CODES[_behavior_symbol(_behavior_name(value))]
+     for value in range(max(256, max(MetatileBehavior) + 1))],
+    dtype=np.uint8,
+)
+
+
+def _tile_codes(raw_tiles):
+    """
+    Convert raw tiles to a 2D array of symbol codes.
+
+    Rectangular grids of numeric tuples go through the behavior lookup table in one
+    pass; anything else (ragged rows, non-numeric fields) falls back to
+    format_tile_to_symbol per tile, padding short rows with walls.
+
+    Returns:
+        (codes, row_lengths): uint8 array (rows x max width) and an array of each
+        row's real length, or None for row_lengths when the grid is rectangular
+    """
+    try:
+        tiles = np.asarray(raw_tiles, dtype=np.int64)
+    except (ValueError, TypeError, OverflowError):
+        tiles = None
+
+    if tiles is not None and tiles.ndim == 3:
+        fields = tiles.shape[2]
+        tile_ids = tiles[:, :, 0] if fields else np.zeros(tiles.shape[:2], dtype=np.int64)
+        if fields >= 2:
+            behaviors = tiles[:, :, 1]
+            in_table = (behaviors >= 0) & (behaviors < len(_BEHAVIOR_LUT))
+            codes = np.where(in_table, _BEHAVIOR_LUT[np.where(in_table, behaviors, 0)], _WALL).astype(np.uint8)
+        else:
+            behaviors = np.zeros_like(tile_ids)
+            codes = np.full(tile_ids.shape, _SYMBOL_CODES["."], dtype=np.uint8)
+        if fields >= 4:
+            # Only NORMAL tiles use the collision bit
+            codes[(behaviors == MetatileBehavior.NORMAL) & (tiles[:, :, 2] != 0)] = _WALL
+        codes[tile_ids == _INVALID_TILE_ID] = _WALL
+        return codes, None
+
+    row_lengths = [len(row) for row in raw_tiles]
+    width = max(row_lengths)
+    codes = np.full((len(raw_tiles), width), _WALL, dtype=np.uint8)
+    for y, row in enumerate(raw_tiles):
+        codes[y, :len(row)] = [_SYMBOL_CODES[format_tile_to_symbol(tile)] for tile in row]
+    if all(length == width for length in row_lengths):
+        return codes, None
+    return codes, np.array(row_lengths)
+
+
+def _npc_grid_positions(npcs, player_coords, center_x, center_y, width, height):
+    """Convert NPC world coordinates to (grid_y, grid_x, npc) inside the view"""
+    positions = []
+    try:
+        # Handle both tuple and dict formats for player_coords
+        if isinstance(player_coords, dict):
+            player_abs_x = player_coords.get('x', 0)
+            player_abs_y = player_coords.get('y', 0)
+        else:
+            player_abs_x, player_abs_y = player_coords
+        
+        # Ensure coordinates are integers
+        player_abs_x = int(player_abs_x) if player_abs_x is not None else 0
+        player_abs_y = int(player_abs_y) if player_abs_y is not None else 0
+        
+        for npc in npcs:
+            # NPCs have absolute world coordinates, convert to relative grid position
+            npc_abs_x = npc.get('current_x', 0)
+            npc_abs_y = npc.get('current_y', 0)
+            npc_abs_x = int(npc_abs_x) if npc_abs_x is not None else 0
+            npc_abs_y = int(npc_abs_y) if npc_abs_y is not None else 0
+            
+            # Player is at the center of the view
+            grid_x = center_x + npc_abs_x - player_abs_x
+            grid_y = center_y + npc_abs_y - player_abs_y
+            if 0 <= grid_x < width and 0 <= grid_y < height:
+                positions.append((grid_y, grid_x, npc))
+                
+    except (ValueError, TypeError) as e:
+        # If coordinate conversion fails, skip NPC positioning
+        print(f"Warning: Failed to convert coordinates for NPC positioning: {e}")
+        print(f"  player_coords: {player_coords}")
+        if npcs:
+            print(f"  npc coords: {[(npc.get('current_x'), npc.get('current_y')) for npc in npcs]}")
+        return []
+    
+    return positions
+
+
+def _trim_wall_rows(codes):
+    """Row slice that drops all-wall padding beyond the first wall row at top and bottom"""
+    wall_rows = (codes == _WALL).all(axis=1)
+    height = len(wall_rows)
+    # There is walkable content, so at least one row is not all walls
+    top_wall_rows = int(np.argmin(wall_rows))
+    bottom_wall_rows = int(np.argmin(wall_rows[::-1]))
+    start = max(top_wall_rows - 1, 0)
+    stop = height - max(bottom_wall_rows - 1, 0)
+    return slice(start, stop)
+
+
+def render_map_codes(raw_tiles, npcs=None, player_coords=None, trim_padding=True):
+    """
+    Render raw tiles into a 2D array of symbol codes (index into SYMBOLS).
+
+    Tiles go through a behavior lookup table, NPCs and the player are scattered on
+    top, and all-wall padding rows are trimmed with row reductions.
+
+    Returns:
+        (codes, row_lengths): see _tile_codes; row_lengths is None for rectangular grids
+    """
+    codes, row_lengths = _tile_codes(raw_tiles)
+    height, width = codes.shape
+    center_y = height // 2
+    center_x = len(raw_tiles[0]) // 2
+    
+    if npcs and player_coords:
+        positions = _npc_grid_positions(npcs, player_coords, center_x, center_y, len(raw_tiles[0]), height)
+        # Later NPCs on the same tile win, as with the old per-position lookup
+        placed = {(y, x): npc for y, x, npc in positions}
+        if placed:
+            ys, xs = np.array(list(placed), dtype=np.intp).T
+            codes[ys, xs] = [_TRAINER if npc.get('trainer_type', 0) > 0 else _NPC for npc in placed.values()]
+    
+    # Always use P for player at the center of the view
+    if center_x < width:
+        codes[center_y, center_x] = _PLAYER
+    if row_lengths is not None:
+        # Nothing is drawn past the end of a short row
+        codes[np.arange(width) >= row_lengths[:, None]] = _WALL
+    
+    # Trim padding if requested - but keep room boundaries!
+    if trim_padding and np.isin(codes, _WALKABLE_CODES).any():
+        # Only trim extra all-wall rows beyond the first wall layer; sides are kept
+        rows = _trim_wall_rows(codes)
+        codes = codes[rows]
+        if row_lengths is not None:
+            row_lengths = row_lengths[rows]
+    
+    return codes, row_lengths
+
+
+def _codes_to_grid(codes, row_lengths=None):
+    """Convert a code array back to a 2D list of symbol strings"""
+    grid = _SYMBOL_ARRAY[codes].tolist()
+    if row_lengths is not None:
+        grid = [row[:length] for row, length in zip(grid, row_lengths.tolist())]
+    return grid
+
+
 def format_map_grid(raw_tiles, player_facing="South", npcs=None, player_coords=None, trim_padding=True):
     """
     Format raw tile data into a traversability grid with NPCs.
@@ -116,126 +295,7 @@ def format_map_grid(raw_tiles, player_facing="South", npcs=None, player_coords=N
     if not raw_tiles or len(raw_tiles) == 0:
         return []
     
-    grid = []
-    center_y = len(raw_tiles) // 2
-    center_x = len(raw_tiles[0]) // 2
-    
-    # Player is always at the center of the 15x15 grid view
-    # but we need the actual player coordinates for NPC positioning
-    player_map_x = center_x  # Grid position (always 7,7 in 15x15)
-    player_map_y = center_y
-    
-    # Always use P for player instead of direction arrows
-    player_symbol = "P"
-    
-    # Create NPC position lookup (convert to relative grid coordinates)
-    npc_positions = {}
-    if npcs and player_coords:
-        try:
-            # Handle both tuple and dict formats for player_coords
-            if isinstance(player_coords, dict):
-                player_abs_x = player_coords.get('x', 0)
-                player_abs_y = player_coords.get('y', 0)
-            else:
-                player_abs_x, player_abs_y = player_coords
-            
-            # Ensure coordinates are integers
-            player_abs_x = int(player_abs_x) if player_abs_x is not None else 0
-            player_abs_y = int(player_abs_y) if player_abs_y is not None else 0
-            
-            for npc in npcs:
-                # NPCs have absolute world coordinates, convert to relative grid position
-                npc_abs_x = npc.get('current_x', 0)
-                npc_abs_y = npc.get('current_y', 0)
-                
-                # Ensure NPC coordinates are integers
-                npc_abs_x = int(npc_abs_x) if npc_abs_x is not None else 0
-                npc_abs_y = int(npc_abs_y) if npc_abs_y is not None else 0
-                
-                # Calculate offset from player in absolute coordinates
-                offset_x = npc_abs_x - player_abs_x
-                offset_y = npc_abs_y - player_abs_y
-                
-                # Convert offset to grid position (player is at center)
-                grid_x = center_x + offset_x
-                grid_y = center_y + offset_y
-                
-                # Check if NPC is within our grid view
-                if 0 <= grid_x < len(raw_tiles[0]) and 0 <= grid_y < len(raw_tiles):
-                    npc_positions[(grid_y, grid_x)] = npc
-                    
-        except (ValueError, TypeError) as e:
-            # If coordinate conversion fails, skip NPC positioning
-            print(f"Warning: Failed to convert coordinates for NPC positioning: {e}")
-            print(f"  player_coords: {player_coords}")
-            if npcs:
-                print(f"  npc coords: {[(npc.get('current_x'), npc.get('current_y')) for npc in npcs]}")
-            npc_positions = {}
-    
-    for y, row in enumerate(raw_tiles):
-        grid_row = []
-        for x, tile in enumerate(row):
-            if y == center_y and x == center_x:
-                # Player position
-                grid_row.append(player_symbol)
-            elif (y, x) in npc_positions:
-                # NPC position - use NPC symbol
-                npc = npc_positions[(y, x)]
-                # Use different symbols for different NPC types
-                if npc.get('trainer_type', 0) > 0:
-                    grid_row.append("@")  # Trainer
-                else:
-                    grid_row.append("N")  # Regular NPC
-            else:
-                # Regular tile
-                symbol = format_tile_to_symbol(tile)
-                grid_row.append(symbol)
-        grid.append(grid_row)
-    
-    # Trim padding if requested - but keep room boundaries!
-    if trim_padding and len(grid) > 0:
-        # First pass: Remove obvious padding (rows/columns that are ALL walls with no variation)
-        # But we need to be careful to keep actual room walls
-        
-        # Check if we have any content in the middle
-        has_walkable = False
-        for row in grid:
-            if any(cell in ['.', 'P', 'D', 'N', 'T', 'S'] for cell in row):
-                has_walkable = True
-                break
-        
-        if has_walkable:
-            # Only trim extra padding beyond the first wall layer
-            # Count consecutive wall rows from top
-            top_wall_rows = 0
-            for row in grid:
-                if all(cell == '#' for cell in row):
-                    top_wall_rows += 1
-                else:
-                    break
-            
-            # Remove extra top padding but keep one wall row
-            while top_wall_rows > 1 and len(grid) > 1:
-                grid.pop(0)
-                top_wall_rows -= 1
-            
-            # Count consecutive wall rows from bottom
-            bottom_wall_rows = 0
-            for row in reversed(grid):
-                if all(cell == '#' for cell in row):
-                    bottom_wall_rows += 1
-                else:
-                    break
-            
-            # Remove extra bottom padding but keep one wall row
-            while bottom_wall_rows > 1 and len(grid) > 1:
-                grid.pop()
-                bottom_wall_rows -= 1
-            
-            # Similar for left/right but be more conservative
-            # Don't trim sides if we have doors or other features in the walls
-    
-    return grid
+    return _codes_to_grid(*render_map_codes(raw_tiles, npcs, player_coords, trim_padding))
 
 
 def format_map_for_display(raw_tiles, player_facing="South", title="Map", npcs=None, player_coords=None):
@@ -331,12 +391,9 @@ def generate_dynamic_legend(grid):
         return ""
     
     symbol_legend = get_symbol_legend()
-    symbols_used = set()
     
     # Collect all unique symbols in the grid
-    for row in grid:
-        for symbol in row:
-            symbols_used.add(symbol)
+    symbols_used = set().union(*grid)
     
     # Build legend for used symbols
     legend_lines = ["Legend:"]
@@ -389,8 +446,4 @@ def format_map_for_llm(raw_tiles, player_facing="South", npcs=None, player_coord
     grid = format_map_grid(raw_tiles, player_facing, npcs, player_coords)
     
     # Simple grid format for LLM
-    lines = []
-    for row in grid:
-        lines.append(" ".join(row))
-    
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(map(" ".join, grid))
\ No newline at end of file
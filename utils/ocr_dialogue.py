@@ -8,7 +8,14 @@ import numpy as np
 from PIL import Image
 from typing import Optional, List, Tuple
 import re
+import hashlib
 import logging
+import os
+import threading
+from collections import OrderedDict
+
+from utils.glyph_reader import GlyphTextReader, DEFAULT_ATLAS_PATH
+from utils.ocr_worker import OCRExecutor
 
 try:
     import pytesseract
@@ -19,6 +26,92 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+
+def _palette_distance_sq(image: np.ndarray, palette) -> np.ndarray:
+    """
+    Squared RGB distance from every pixel to every palette color.
+
+    Uses the ||p||^2 - 2p.c + ||c||^2 expansion so the work is a single
+    (pixels x 3) @ (3 x colors) matrix product instead of a Python loop.
+    All terms are integers below 2^24, so float32 keeps the result exact.
+
+    Returns:
+        Array of shape image.shape[:2] + (len(palette),)
+    """
+    pixels = image.reshape(-1, 3).astype(np.float32)
+    colors = np.asarray(palette, dtype=np.float32).reshape(-1, 3)
+    dist_sq = (pixels * pixels).sum(axis=1, keepdims=True) - 2.0 * (pixels @ colors.T)
+    dist_sq += (colors * colors).sum(axis=1)
+    return dist_sq.reshape(image.shape[:2] + (len(colors),))
+
+
+def _palette_match_mask(image: np.ndarray, palette, tolerance: float) -> np.ndarray:
+    """Boolean mask of pixels within `tolerance` (RGB distance) of any palette color"""
+    return _palette_distance_sq(image, palette).min(axis=2) <= tolerance * tolerance
+
+
+class OCRResultCache:
+    """
+    Content-addressed LRU cache for OCR results.
+
+    Dialogue boxes stay pixel-identical for many frames while the player reads,
+    so results are keyed on a hash of the cropped region pixels (plus the OCR
+    config) and Tesseract is never run twice on the same text box.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(region: np.ndarray, tag: str = "") -> str:
+        """Build a cache key from the raw pixels of a cropped region"""
+        region = np.ascontiguousarray(region)
+        digest = hashlib.blake2b(region.tobytes(), digest_size=16)
+        digest.update(repr((region.shape, region.dtype.str, tag)).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Optional[str]]:
+        """Return (hit, value) for a key, refreshing its LRU position on hit"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: str, value: Optional[str]):
+        """Store a result, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached results and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Get hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
 class OCRDialogueDetector:
     """OCR-based dialogue detection for Pokemon Emerald"""
     
@@ -94,6 +187,16 @@ class OCRDialogueDetector:
     # How much of the dialogue box should be background color to consider it "active"
     DIALOGUE_BOX_BACKGROUND_THRESHOLD = 0.4  # 40% of dialogue area should be box color (mostly off-white background)
     
+    # Teal border colors of the dialogue window frame
+    DIALOGUE_BORDER_COLORS = [
+        (66, 181, 132),   # Main teal border color from debug analysis
+        (24, 165, 107),   # Secondary border color  
+        (57, 140, 49),    # Darker border variant
+        (0, 255, 156),    # Bright border accent
+        (115, 198, 165)   # Light border variant
+    ]
+    DIALOGUE_BORDER_TOLERANCE = 20  # Tolerance for border color matching
+    
     # Battle text area (different position)
     BATTLE_TEXT_COORDS = {
         'x': 8,
@@ -109,6 +212,9 @@ class OCRDialogueDetector:
         self.debug_color_detection = False  # Set to True for color debugging
         self.use_full_frame_scan = False  # Set to True to enable full-frame scanning (may pick up noise)
         self.skip_dialogue_box_detection = False  # Set to True to temporarily bypass dialogue box detection
+        self.ocr_cache = OCRResultCache()  # Identical regions are only OCR'd once
+        self.glyph_reader = GlyphTextReader.load()  # Fast template-matching reader, Tesseract is the fallback
+        self.ocr_executor = None  # Background OCR pool, see enable_async_ocr()
         
     def detect_dialogue_from_screenshot(self, screenshot: Image.Image) -> Optional[str]:
         """
@@ -121,17 +227,25 @@ class OCRDialogueDetector:
         Returns:
             Detected dialogue text or None if no text found
         """
-        if not OCR_AVAILABLE:
+        if not OCR_AVAILABLE and not len(self.glyph_reader):
             return None
             
         try:
             screenshot_np = np.array(screenshot)
             
             # STEP 1: Check if dialogue box is actually visible (unless bypassed)
-            if not self.skip_dialogue_box_detection and not self.is_dialogue_box_visible(screenshot):
+            if not self.skip_dialogue_box_detection and not self.is_dialogue_box_visible(screenshot_np):
                 logger.debug("No dialogue box detected - skipping OCR")
                 return None
             
+            # Glyph templates read the fixed font in microseconds, no Tesseract needed
+            glyph_text = self.read_text_with_glyphs(screenshot_np)
+            if glyph_text:
+                return glyph_text
+            
+            if not OCR_AVAILABLE:
+                return None
+            
             # STEP 2: Primary dialogue box area (most common) - use tighter text coordinates
             dialogue_text = self._extract_text_from_region(
                 screenshot_np, 
@@ -168,6 +282,29 @@ class OCRDialogueDetector:
             logger.debug(f"OCR dialogue detection failed: {e}")
             return None
     
+    def text_ink_mask(self, image_np: np.ndarray) -> np.ndarray:
+        """Boolean mask of dialogue text pixels inside the OCR text area (unscaled)"""
+        coords = self.OCR_TEXT_COORDS
+        roi = image_np[coords['y']:coords['y'] + coords['height'], coords['x']:coords['x'] + coords['width']]
+        if len(roi.shape) != 3:
+            return np.zeros(roi.shape[:2], dtype=bool)
+        return self._create_dialogue_color_mask(roi[:, :, :3])
+    
+    def read_text_with_glyphs(self, image_np: np.ndarray) -> Optional[str]:
+        """
+        Read dialogue text by matching glyphs against the font atlas.
+        
+        Returns:
+            Validated text, or None if the atlas is empty or any glyph is unknown
+        """
+        if not len(self.glyph_reader):
+            return None
+        
+        text = self.glyph_reader.read(self.text_ink_mask(image_np))
+        if not text:
+            return None
+        return self._validate_and_clean_text(text)
+    
     def _extract_text_from_full_frame(self, screenshot: Image.Image) -> Optional[str]:
         """
         Extract text from the entire screenshot using OCR
@@ -177,6 +314,11 @@ class OCRDialogueDetector:
             # Convert PIL to numpy array
             screenshot_np = np.array(screenshot)
             
+            cache_key = self.ocr_cache.make_key(screenshot_np, "full_frame")
+            hit, cached_text = self.ocr_cache.get(cache_key)
+            if hit:
+                return cached_text
+            
             # Preprocess the entire frame for better OCR
             processed_frame = self._preprocess_full_frame_for_ocr(screenshot_np)
             
@@ -191,6 +333,7 @@ class OCRDialogueDetector:
             cleaned_text = self._clean_full_frame_text(full_text)
             
             if cleaned_text:
+                self.ocr_cache.put(cache_key, cleaned_text)
                 return cleaned_text
                 
             # If that fails, try with different PSM mode
@@ -198,7 +341,9 @@ class OCRDialogueDetector:
             alt_text = pytesseract.image_to_string(processed_frame, config=alt_config)
             alt_cleaned = self._clean_full_frame_text(alt_text)
             
-            return alt_cleaned if alt_cleaned else None
+            result = alt_cleaned if alt_cleaned else None
+            self.ocr_cache.put(cache_key, result)
+            return result
             
         except Exception as e:
             logger.debug(f"Full frame OCR failed: {e}")
@@ -341,15 +486,31 @@ class OCRDialogueDetector:
         
         roi = image_np[y1:y2, x1:x2]
         
-        # Preprocessing for better OCR accuracy
-        roi = self._preprocess_for_ocr(roi)
-        
         # OCR configuration optimized for Pokemon Emerald text
         custom_config = r'--oem 3 --psm 6'
         
+        # Skip Tesseract entirely if this exact region was already read
+        cache_key = self.ocr_cache.make_key(roi, custom_config)
+        hit, cached_text = self.ocr_cache.get(cache_key)
+        if hit:
+            return cached_text
+        
+        # In async mode never wait on Tesseract - use the latest finished result for this region
+        if self.ocr_executor is not None:
+            channel = f"region:{x1},{y1},{x2},{y2}"
+            future = self.ocr_executor.submit(roi, custom_config, cache_key, channel,
+                                              self.DIALOGUE_TEXT_COLORS, self.COLOR_TOLERANCE)
+            if future is not None and future.done() and future.exception() is None:
+                return future.result()
+            return self.ocr_executor.latest(channel) or ""
+        
+        # Preprocessing for better OCR accuracy
+        roi = self._preprocess_for_ocr(roi)
+        
         # Extract text
-        text = pytesseract.image_to_string(roi, config=custom_config)
-        return text.strip()
+        text = pytesseract.image_to_string(roi, config=custom_config).strip()
+        self.ocr_cache.put(cache_key, text)
+        return text
     
     def _preprocess_for_ocr(self, roi: np.ndarray) -> np.ndarray:
         """Preprocess image region using Pokemon-specific dialogue color matching"""
@@ -391,51 +552,39 @@ class OCRDialogueDetector:
         if len(image.shape) != 3:
             return np.zeros(image.shape[:2], dtype=bool)
         
-        mask = np.zeros(image.shape[:2], dtype=bool)
-        matched_pixels_per_color = []
-        
-        # Check each dialogue color
-        for i, target_color in enumerate(self.DIALOGUE_TEXT_COLORS):
-            # Calculate color distance for all pixels
-            color_diff = np.sqrt(np.sum((image - target_color) ** 2, axis=2))
-            
-            # Add pixels within tolerance to mask
-            color_mask = (color_diff <= self.COLOR_TOLERANCE)
-            mask |= color_mask
-            
-            # Debug information
-            if self.debug_color_detection:
-                matched_count = np.sum(color_mask)
-                matched_pixels_per_color.append(matched_count)
+        # Distance of every pixel to every dialogue color in one pass
+        within_tolerance = _palette_distance_sq(image, self.DIALOGUE_TEXT_COLORS) <= self.COLOR_TOLERANCE ** 2
+        mask = within_tolerance.any(axis=2)
         
         # Log color detection results for debugging
-        if self.debug_color_detection and any(matched_pixels_per_color):
-            total_matched = np.sum(mask)
-            logger.debug(f"Color matching: {total_matched} pixels matched dialogue colors")
-            for i, count in enumerate(matched_pixels_per_color):
-                if count > 0:
-                    color = self.DIALOGUE_TEXT_COLORS[i]
-                    logger.debug(f"  Color {color}: {count} pixels")
+        if self.debug_color_detection:
+            matched_pixels_per_color = within_tolerance.sum(axis=(0, 1))
+            if matched_pixels_per_color.any():
+                logger.debug(f"Color matching: {int(mask.sum())} pixels matched dialogue colors")
+                for color, count in zip(self.DIALOGUE_TEXT_COLORS, matched_pixels_per_color):
+                    if count > 0:
+                        logger.debug(f"  Color {color}: {int(count)} pixels")
         
         return mask
     
-    def is_dialogue_box_visible(self, screenshot: Image.Image) -> bool:
+    def is_dialogue_box_visible(self, screenshot) -> bool:
         """
-        Check if a dialogue box is actually visible by looking for green horizontal border lines.
-        Searches for the characteristic green lines above and below the dialogue text.
+        Check if a dialogue box is actually visible by looking for the light box
+        background with dark gray text in the center of the dialogue region.
+        Fully vectorized so it is cheap enough to run every frame.
         
         Args:
-            screenshot: PIL Image of the game screen
+            screenshot: PIL Image or RGB numpy array of the game screen
             
         Returns:
             True if dialogue box is detected, False otherwise
         """
-        if not screenshot:
+        if screenshot is None:
             return False
         
         try:
             # Convert to numpy array
-            image_np = np.array(screenshot)
+            image_np = np.asarray(screenshot)
             if len(image_np.shape) != 3:
                 return False
             
@@ -444,128 +593,16 @@ class OCRDialogueDetector:
             # Extend the search area to catch top and bottom borders
             extended_region = image_np[
                 max(0, coords['y'] - 5):min(image_np.shape[0], coords['y'] + coords['height'] + 5),
-                coords['x']:coords['x'] + coords['width']
+                coords['x']:coords['x'] + coords['width'],
+                :3
             ]
             
             if extended_region.size == 0:
                 return False
             
-            # Look for horizontal border lines using actual dialogue border colors
-            border_colors = [
-                (66, 181, 132),   # Main teal border color from debug analysis
-                (24, 165, 107),   # Secondary border color  
-                (57, 140, 49),    # Darker border variant
-                (0, 255, 156),    # Bright border accent
-                (115, 198, 165)   # Light border variant
-            ]
-            border_tolerance = 20  # Tolerance for color matching
-            
-            # Check each row for horizontal border lines
-            border_line_rows = []
-            height, width = extended_region.shape[:2]
-            
-            for row_idx in range(height):
-                row_pixels = extended_region[row_idx]
-                
-                # Count border color pixels in this row
-                border_pixels_in_row = 0
-                for pixel in row_pixels:
-                    # Check if pixel matches any of the border colors
-                    for border_color in border_colors:
-                        color_diff = np.sqrt(np.sum((pixel - np.array(border_color)) ** 2))
-                        if color_diff <= border_tolerance:
-                            border_pixels_in_row += 1
-                            break  # Don't double-count pixels
-                
-                # If significant portion of row has border colors, it's likely a border line
-                border_percentage = border_pixels_in_row / width
-                if border_percentage > 0.2:  # 20% of row width has border colors (lower threshold)
-                    border_line_rows.append(row_idx)
-            
-            # VERY strict detection to avoid false positives from environment colors
-            
-            # Require many border lines for robust detection
-            has_sufficient_border_lines = len(border_line_rows) >= 5  # Need at least 5 border lines
-            
-            # MUST have top AND bottom border lines (no exceptions for false positive prevention)
-            has_top_and_bottom_lines = False
-            if len(border_line_rows) >= 3:
-                # Check if we have lines at different heights (top and bottom)
-                min_line = min(border_line_rows)
-                max_line = max(border_line_rows)
-                if max_line - min_line > 15:  # Lines must be at least 15 pixels apart (very strict)
-                    has_top_and_bottom_lines = True
-            
-            # Additional check: look for proper dialogue box pattern (rectangular border)
-            has_rectangular_pattern = False
-            if len(border_line_rows) >= 5:
-                # Check if we have border lines spread across the dialogue region
-                height_quarter = height // 4
-                top_lines = [r for r in border_line_rows if r < height_quarter]
-                middle_lines = [r for r in border_line_rows if height_quarter <= r <= 3 * height_quarter]
-                bottom_lines = [r for r in border_line_rows if r > 3 * height_quarter]
-                
-                # Must have lines in top AND bottom, and some in middle for a proper box
-                if len(top_lines) >= 2 and len(bottom_lines) >= 2 and len(middle_lines) >= 1:
-                    has_rectangular_pattern = True
-            
-            # Extra check: ensure lines are actually horizontal (consistent across width)
-            has_proper_horizontal_lines = False
-            if len(border_line_rows) >= 3:
-                # Check that border lines extend across significant width (not just scattered pixels)
-                proper_lines = 0
-                for row_idx in border_line_rows[:10]:  # Check first 10 lines
-                    row_pixels = extended_region[row_idx]
-                    border_pixels_in_row = 0
-                    for pixel in row_pixels:
-                        for border_color in border_colors:
-                            color_diff = np.sqrt(np.sum((pixel - np.array(border_color)) ** 2))
-                            if color_diff <= border_tolerance:
-                                border_pixels_in_row += 1
-                                break
-                    
-                    # Line must span at least 50% of width to be considered a proper horizontal line
-                    if border_pixels_in_row / width > 0.5:
-                        proper_lines += 1
-                
-                if proper_lines >= 3:  # Need at least 3 proper horizontal lines
-                    has_proper_horizontal_lines = True
-            
-            # Log detection results
-            if self.debug_color_detection:
-                logger.debug(f"Border line detection: Found {len(border_line_rows)} border horizontal lines")
-                logger.debug(f"Line rows: {border_line_rows[:5]}")  # Show first 5
-                logger.debug(f"Has sufficient lines (≥5): {has_sufficient_border_lines}")
-                logger.debug(f"Has top+bottom lines (≥15px apart): {has_top_and_bottom_lines}")
-                logger.debug(f"Has rectangular pattern: {has_rectangular_pattern}")
-                logger.debug(f"Has proper horizontal lines (≥50% width): {has_proper_horizontal_lines}")
-            
-            # Final check: look for actual dialogue box background (light/white area inside borders)
-            has_dialogue_background = False
-            if len(border_line_rows) >= 3:
-                # Check middle area for dialogue background colors (light colors)
-                middle_start = height // 4
-                middle_end = 3 * height // 4
-                middle_region = extended_region[middle_start:middle_end, width//4:3*width//4]
-                
-                if middle_region.size > 0:
-                    # Look for light background colors typical of dialogue boxes
-                    light_pixels = 0
-                    total_pixels = middle_region.size // 3  # Divide by 3 for RGB
-                    
-                    for pixel in middle_region.reshape(-1, 3):
-                        # Light colors: high brightness (sum of RGB > 400) or white-ish
-                        brightness = np.sum(pixel)
-                        if brightness > 400 or (pixel[0] > 200 and pixel[1] > 200 and pixel[2] > 200):
-                            light_pixels += 1
-                    
-                    light_percentage = light_pixels / total_pixels
-                    if light_percentage > 0.3:  # At least 30% of middle area should be light (dialogue background)
-                        has_dialogue_background = True
-            
-            # Log all criteria
+            # Border line analysis is diagnostic only, so skip it unless debugging
             if self.debug_color_detection:
-                logger.debug(f"Has dialogue background (light area): {has_dialogue_background}")
+                self._log_border_line_analysis(extended_region)
             
             # Use simplified detection method to avoid false positives
             # Check for white background in center area
@@ -580,17 +617,13 @@ class OCRDialogueDetector:
             
             if center_area.size > 0:
                 # Count white/light pixels (dialogue background)
-                light_mask = (center_area[:,:,0] > 200) & (center_area[:,:,1] > 200) & (center_area[:,:,2] > 200)
-                light_percentage = np.sum(light_mask) / light_mask.size
+                light_percentage = (center_area > 200).all(axis=2).mean()
                 
                 # Count text-like colors (dark gray)
-                text_mask = ((center_area[:,:,0] > 80) & (center_area[:,:,0] < 130) & 
-                            (center_area[:,:,1] > 80) & (center_area[:,:,1] < 130) &
-                            (center_area[:,:,2] > 80) & (center_area[:,:,2] < 130))
-                text_percentage = np.sum(text_mask) / text_mask.size
+                text_percentage = ((center_area > 80) & (center_area < 130)).all(axis=2).mean()
                 
                 # Simple, robust criteria
-                is_visible = light_percentage > 0.3 and text_percentage > 0.02
+                is_visible = bool(light_percentage > 0.3 and text_percentage > 0.02)
                 
                 if self.debug_color_detection:
                     logger.debug(f"Simplified detection - Light bg: {light_percentage:.1%}, Text: {text_percentage:.1%}")
@@ -598,8 +631,7 @@ class OCRDialogueDetector:
                 is_visible = False
             
             if self.debug_color_detection:
-                logger.debug(f"Dialogue box {'VISIBLE' if is_visible else 'NOT VISIBLE'} "
-                           f"(found {len(border_line_rows)} border lines)")
+                logger.debug(f"Dialogue box {'VISIBLE' if is_visible else 'NOT VISIBLE'}")
             
             return is_visible
             
@@ -607,6 +639,85 @@ class OCRDialogueDetector:
             logger.debug(f"Dialogue box detection error: {e}")
             return False
     
+    def _find_border_line_rows(self, region: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find rows of a region that look like horizontal dialogue border lines.
+        
+        Returns:
+            (indices of rows with >20% border pixels, per-row border pixel fraction)
+        """
+        border_mask = _palette_match_mask(region, self.DIALOGUE_BORDER_COLORS, self.DIALOGUE_BORDER_TOLERANCE)
+        row_fraction = border_mask.mean(axis=1)
+        return np.flatnonzero(row_fraction > 0.2), row_fraction
+    
+    def _log_border_line_analysis(self, extended_region: np.ndarray):
+        """Log the border line criteria for the dialogue region (debug only)"""
+        height, width = extended_region.shape[:2]
+        border_line_rows, row_fraction = self._find_border_line_rows(extended_region)
+        num_lines = len(border_line_rows)
+        
+        # Require many border lines for robust detection
+        has_sufficient_border_lines = num_lines >= 5
+        
+        # Top and bottom lines must be at least 15 pixels apart
+        has_top_and_bottom_lines = num_lines >= 3 and int(border_line_rows[-1] - border_line_rows[0]) > 15
+        
+        # Border lines spread across top, middle and bottom of the region
+        has_rectangular_pattern = False
+        if num_lines >= 5:
+            height_quarter = height // 4
+            top_lines = np.count_nonzero(border_line_rows < height_quarter)
+            bottom_lines = np.count_nonzero(border_line_rows > 3 * height_quarter)
+            middle_lines = num_lines - top_lines - bottom_lines
+            has_rectangular_pattern = top_lines >= 2 and bottom_lines >= 2 and middle_lines >= 1
+        
+        # Lines must span at least 50% of the width to be proper horizontal lines
+        has_proper_horizontal_lines = (
+            num_lines >= 3 and np.count_nonzero(row_fraction[border_line_rows[:10]] > 0.5) >= 3
+        )
+        
+        # Light background (brightness > 400 or white-ish) in the middle of the box
+        has_dialogue_background = False
+        if num_lines >= 3:
+            middle_region = extended_region[height // 4:3 * height // 4, width // 4:3 * width // 4]
+            if middle_region.size > 0:
+                light = (middle_region.sum(axis=2, dtype=np.int32) > 400) | (middle_region > 200).all(axis=2)
+                has_dialogue_background = light.mean() > 0.3
+        
+        logger.debug(f"Border line detection: Found {num_lines} border horizontal lines")
+        logger.debug(f"Line rows: {border_line_rows[:5].tolist()}")  # Show first 5
+        logger.debug(f"Has sufficient lines (≥5): {has_sufficient_border_lines}")
+        logger.debug(f"Has top+bottom lines (≥15px apart): {has_top_and_bottom_lines}")
+        logger.debug(f"Has rectangular pattern: {has_rectangular_pattern}")
+        logger.debug(f"Has proper horizontal lines (≥50% width): {has_proper_horizontal_lines}")
+        logger.debug(f"Has dialogue background (light area): {has_dialogue_background}")
+    
+    def enable_async_ocr(self, max_workers: int = 2, max_pending: int = 4) -> bool:
+        """
+        Run region OCR in a background process pool so callers never block on Tesseract.
+        
+        Returns:
+            True if the executor was started
+        """
+        if not OCR_AVAILABLE:
+            logger.warning("Cannot enable async OCR - pytesseract not available")
+            return False
+        self.disable_async_ocr()
+        self.ocr_executor = OCRExecutor(max_workers=max_workers, max_pending=max_pending,
+                                        result_cache=self.ocr_cache)
+        logger.info(f"Async OCR enabled with {max_workers} worker processes")
+        return True
+    
+    def disable_async_ocr(self):
+        """Stop the background OCR pool and go back to synchronous OCR"""
+        if self.ocr_executor is not None:
+            self.ocr_executor.shutdown()
+            self.ocr_executor = None
+    
+    def get_cache_stats(self) -> dict:
+        """Get OCR result cache hit/miss statistics"""
+        return self.ocr_cache.stats()
+    
     def enable_color_debug(self, enabled: bool = True):
         """Enable/disable color detection debugging"""
         self.debug_color_detection = enabled
@@ -746,6 +857,8 @@ class OCRDialogueDetector:
             
             # Add new colors to the existing list
             self.DIALOGUE_TEXT_COLORS.extend(new_colors[:5])
+            # Cached results were produced with the old color mask
+            self.ocr_cache.clear()
         else:
             logger.info("No new dialogue colors found to add")
     
@@ -823,23 +936,15 @@ class OCRDialogueDetector:
         print(f"Green tolerance: ±{green_tolerance}")
         
         # Analyze each row
-        green_line_rows = []
-        for row_idx in range(height):
-            row_pixels = extended_region[row_idx]
-            
-            green_pixels_in_row = 0
-            for pixel in row_pixels:
-                color_diff = np.sqrt(np.sum((pixel - green_border_color) ** 2))
-                if color_diff <= green_tolerance:
-                    green_pixels_in_row += 1
-            
-            green_percentage = green_pixels_in_row / width
-            if green_percentage > 0.3:  # 30% threshold
-                green_line_rows.append({
-                    'row': row_idx,
-                    'green_pixels': green_pixels_in_row,
-                    'percentage': green_percentage * 100
-                })
+        green_counts = _palette_match_mask(extended_region[:, :, :3], [green_border_color], green_tolerance).sum(axis=1)
+        green_line_rows = [
+            {
+                'row': int(row_idx),
+                'green_pixels': int(green_counts[row_idx]),
+                'percentage': green_counts[row_idx] / width * 100
+            }
+            for row_idx in np.flatnonzero(green_counts / width > 0.3)  # 30% threshold
+        ]
         
         print(f"Found {len(green_line_rows)} green horizontal lines:")
         for line_info in green_line_rows[:5]:  # Show first 5
@@ -1013,7 +1118,7 @@ class OCRDialogueDetector:
 
 def create_ocr_detector() -> Optional[OCRDialogueDetector]:
     """Factory function to create OCR detector if available"""
-    if OCR_AVAILABLE:
+    if OCR_AVAILABLE or os.path.exists(DEFAULT_ATLAS_PATH):
         return OCRDialogueDetector()
     else:
         logger.warning("OCR not available - install pytesseract and tesseract-ocr system package")
@@ -0,0 +1,147 @@
+"""
+Background OCR executor for dialogue region crops.
+
+Tesseract runs as a subprocess and can take tens of milliseconds per region, so
+calling it from get_comprehensive_state blocks the emulator thread. OCRExecutor
+moves preprocessing + Tesseract into a process pool: callers submit region crops
+and get futures back, duplicate crops share one in-flight request, and the state
+reader can use the latest completed result for a region instead of waiting.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Per-process detector used by the pool workers (created on first use)
+_worker_detector = None
+
+
+def _ocr_region_worker(roi: np.ndarray, config: str, text_colors: Optional[Sequence] = None,
+                       color_tolerance: Optional[float] = None) -> str:
+    """Preprocess a region crop and OCR it (runs inside a worker process)"""
+    global _worker_detector
+    import pytesseract
+    from utils.ocr_dialogue import OCRDialogueDetector
+
+    if _worker_detector is None:
+        _worker_detector = OCRDialogueDetector()
+    # Keep the worker's color mask in sync with the detector that submitted the crop
+    if text_colors is not None:
+        _worker_detector.DIALOGUE_TEXT_COLORS = list(text_colors)
+    if color_tolerance is not None:
+        _worker_detector.COLOR_TOLERANCE = color_tolerance
+
+    processed = _worker_detector._preprocess_for_ocr(roi)
+    return pytesseract.image_to_string(processed, config=config).strip()
+
+
+class OCRExecutor:
+    """Process pool with a bounded queue and request coalescing for region OCR"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 4, result_cache=None, mp_context=None):
+        """
+        Args:
+            max_workers: Number of OCR worker processes
+            max_pending: Maximum in-flight requests; new crops are dropped when full
+            result_cache: Optional OCRResultCache that completed results are stored in
+            mp_context: Optional multiprocessing context for the pool
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_cache = result_cache
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+        self._inflight: Dict[str, Future] = {}
+        self._latest: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, roi: np.ndarray, config: str, key: str, channel: Optional[str] = None,
+               text_colors: Optional[Sequence] = None, color_tolerance: Optional[float] = None) -> Optional[Future]:
+        """
+        Queue a region crop for OCR.
+
+        Args:
+            roi: Raw (unprocessed) region crop
+            config: Tesseract config string
+            key: Content key of the crop, identical keys share one request
+            channel: Name of the screen region, used to track its latest result
+            text_colors, color_tolerance: Color mask settings for preprocessing
+
+        Returns:
+            Future resolving to the OCR text, or None if the queue is full
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            if len(self._inflight) >= self.max_pending:
+                self.dropped += 1
+                return None
+
+            future = self._pool.submit(_ocr_region_worker, np.ascontiguousarray(roi), config,
+                                       text_colors, color_tolerance)
+            self._inflight[key] = future
+            self.submitted += 1
+
+        future.add_done_callback(lambda done: self._on_done(key, channel, done))
+        return future
+
+    def _on_done(self, key: str, channel: Optional[str], future: Future):
+        """Record a finished request and publish its result"""
+        with self._lock:
+            self._inflight.pop(key, None)
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                self.failed += 1
+                logger.debug(f"Background OCR failed: {error}")
+                return
+            text = future.result()
+            self.completed += 1
+            if channel is not None:
+                self._latest[channel] = text
+
+        if self.result_cache is not None:
+            self.result_cache.put(key, text)
+
+    def latest(self, channel: str) -> Optional[str]:
+        """Latest completed OCR text for a screen region, if any"""
+        with self._lock:
+            return self._latest.get(channel)
+
+    def clear_latest(self):
+        """Forget the latest results (e.g. after loading a different state)"""
+        with self._lock:
+            self._latest.clear()
+
+    def stats(self) -> dict:
+        """Get executor counters for monitoring"""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'pending': len(self._inflight),
+                'max_pending': self.max_pending,
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+                'completed': self.completed,
+                'failed': self.failed,
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Stop the worker processes, cancelling queued requests"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            self._inflight.clear()
@@ -0,0 +1,108 @@
+"""
+KV cache reuse for the static prefix of local model prompts.
+
+Agent prompts start with long sections that are identical from step to step
+(the system prompt and each module's instructions). PromptPrefixCache keeps
+the token ids of the previous prompt. Once two prompts share a leading run of
+at least min_prefix_tokens, that prefix is prefilled once into a DynamicCache.
+Every later prompt that starts with it gets a copy of those past_key_values, so
+generate() only encodes the per-step suffix.
+
+Only text-only prompts are eligible: VLM generate() implementations drop
+pixel_values once the cache is non-empty, so an image in the suffix would be
+silently ignored.
+"""
+
+import copy
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_PREFIX_TOKENS = 64
+DEFAULT_MAX_PREFIXES = 4
+
+
+def common_prefix_length(a, b) -> int:
+    """Number of leading token ids two 1-D id sequences share"""
+    n = min(len(a), len(b))
+    for i in range(n):
+        if int(a[i]) != int(b[i]):
+            return i
+    return n
+
+
+class PromptPrefixCache:
+    """Prefilled past_key_values for recurring prompt prefixes of one model"""
+
+    def __init__(self, model, min_prefix_tokens: int = DEFAULT_MIN_PREFIX_TOKENS,
+                 max_prefixes: int = DEFAULT_MAX_PREFIXES):
+        """
+        Args:
+            model: Loaded transformers model (causal LM or image-text-to-text)
+            min_prefix_tokens: Shortest shared prefix worth caching
+            max_prefixes: Prefixes kept (LRU); each module's prompt has its own
+        """
+        import torch
+        from transformers import DynamicCache
+
+        self.model = model
+        self.min_prefix_tokens = min_prefix_tokens
+        self.max_prefixes = max_prefixes
+        self._torch = torch
+        self._cache_class = DynamicCache
+        self._prefixes: "OrderedDict[Tuple[int, ...], object]" = OrderedDict()  # prefix ids -> DynamicCache
+        self._last_ids: Optional[Tuple[int, ...]] = None
+        self._stats = {'hits': 0, 'misses': 0, 'prefills': 0, 'reused_tokens': 0}
+
+    def _best_prefix(self, ids: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+        best = None
+        for prefix in self._prefixes:
+            # Leave at least one token for generate() to encode
+            if len(prefix) < len(ids) and ids[:len(prefix)] == prefix and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return best
+
+    def _prefill(self, prefix: Tuple[int, ...], device):
+        cache = self._cache_class()
+        with self._torch.no_grad():
+            self.model(input_ids=self._torch.tensor([prefix], device=device), past_key_values=cache, use_cache=True)
+        self._prefixes[prefix] = cache
+        while len(self._prefixes) > self.max_prefixes:
+            self._prefixes.popitem(last=False)
+        self._stats['prefills'] += 1
+        logger.info(f"Cached KV for a {len(prefix)}-token prompt prefix")
+
+    def past_key_values_for(self, input_ids, device):
+        """
+        Copy of the cached KV prefix for a (1, seq_len) prompt, or None for a full prefill.
+
+        The copy can be passed to generate() together with the full input_ids;
+        generate() skips the tokens the cache already covers.
+        """
+        ids = tuple(int(t) for t in input_ids[0])
+        prefix = self._best_prefix(ids)
+
+        if prefix is None and self._last_ids is not None:
+            # A prompt sharing a long prefix with the previous one: prefill that prefix once
+            shared = common_prefix_length(ids, self._last_ids)
+            if shared >= self.min_prefix_tokens:
+                prefix = ids[:min(shared, len(ids) - 1)]
+                self._prefill(prefix, device)
+        self._last_ids = ids
+
+        if prefix is None:
+            self._stats['misses'] += 1
+            return None
+        self._prefixes.move_to_end(prefix)
+        self._stats['hits'] += 1
+        self._stats['reused_tokens'] += len(prefix)
+        return copy.deepcopy(self._prefixes[prefix])
+
+    def clear(self):
+        self._prefixes.clear()
+        self._last_ids = None
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats, prefixes=len(self._prefixes))
@@ -0,0 +1,210 @@
+"""
+Token budget for agent prompts.
+
+Prompt size drives VLM latency and cost per step. PromptBudget collects the
+sections of a prompt in order, each with a priority and a tokenizer-estimated
+cost. When the total is over the model's target, the lowest-priority sections
+are reduced first: swapped for their summary (a shorter form supplied by the
+caller), truncated line by line from their less useful end, or dropped.
+Required sections (instructions, response format) are never touched.
+
+Token counts come from the local model's tokenizer, tiktoken when installed, or
+a characters-per-token estimate. Image tokens are not counted; the targets are
+for the text part of the prompt.
+"""
+
+import importlib.util
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 3.5  # Conservative for prompts full of coordinates, symbols and map grids
+DEFAULT_PROMPT_BUDGET = 6000
+LOCAL_PROMPT_BUDGET = 3000  # Small local models, where prefill dominates the step time
+
+# Text token targets by model name (first substring match wins)
+MODEL_PROMPT_BUDGETS = (
+    ("gpt-4o-mini", 6000),
+    ("gpt-4o", 8000),
+    ("gemini-2.5-pro", 12000),
+    ("gemini", 8000),
+    ("claude", 8000),
+)
+
+
+def prompt_budget_for_model(model_name: Optional[str], backend: Optional[str] = None) -> int:
+    """Default prompt token target for a model"""
+    if backend == "local":
+        return LOCAL_PROMPT_BUDGET
+    name = (model_name or "").lower()
+    for key, budget in MODEL_PROMPT_BUDGETS:
+        if key in name:
+            return budget
+    return DEFAULT_PROMPT_BUDGET
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def make_token_counter(model_name: Optional[str] = None, tokenizer=None) -> Callable[[str], int]:
+    """
+    Token counting function for a model.
+
+    Args:
+        model_name: Used to pick a tiktoken encoding
+        tokenizer: A Hugging Face tokenizer (local backend); counts exactly
+    """
+    if tokenizer is not None and hasattr(tokenizer, "encode"):
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    if importlib.util.find_spec("tiktoken") is not None:
+        try:
+            import tiktoken
+
+            try:
+                encoding = tiktoken.encoding_for_model(model_name or "")
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:  # e.g. the BPE file cannot be downloaded
+            logger.info(f"tiktoken unavailable ({e}); estimating {CHARS_PER_TOKEN} characters per token")
+    return estimate_tokens
+
+
+@dataclass
+class PromptSection:
+    """One part of a prompt"""
+    name: str
+    body: str
+    priority: int = 50  # Higher priorities are reduced last
+    header: str = ""  # Kept together with the body while the section survives
+    keep: str = "head"  # Which end survives truncation: "head" or "tail" (e.g. recent history)
+    summary: Optional[str] = None  # Shorter stand-in tried before truncating
+    required: bool = False
+    min_tokens: int = 16  # Dropped instead of truncated below this
+
+    def render(self, body: Optional[str] = None) -> str:
+        body = self.body if body is None else body
+        return f"{self.header}\n{body}" if self.header else body
+
+
+@dataclass
+class BudgetedPrompt:
+    """A prompt fitted to a budget, with what was done to each section"""
+    text: str
+    max_tokens: int
+    estimated_tokens: int  # After trimming
+    original_tokens: int
+    sections: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def trimmed(self) -> List[str]:
+        return [name for name, info in self.sections.items() if info["action"] != "kept"]
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "max_tokens": self.max_tokens,
+            "estimated_tokens": self.estimated_tokens,
+            "original_tokens": self.original_tokens,
+            "trimmed": self.trimmed,
+            "sections": self.sections,
+        }
+
+
+class PromptBudget:
+    """Builds a prompt from prioritized sections within max_tokens"""
+
+    def __init__(self, max_tokens: int, count_tokens: Callable[[str], int] = estimate_tokens,
+                 separator: str = "\n\n"):
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+        self.separator = separator
+        self.sections: List[PromptSection] = []
+
+    def add(self, name: str, body: str, priority: int = 50, **options) -> Optional[PromptSection]:
+        """Append a section (options: fields of PromptSection); empty bodies are skipped"""
+        if not body or not body.strip():
+            return None
+        section = PromptSection(name=name, body=body, priority=priority, **options)
+        self.sections.append(section)
+        return section
+
+    def add_required(self, name: str, body: str) -> Optional[PromptSection]:
+        return self.add(name, body, required=True)
+
+    def fit(self) -> BudgetedPrompt:
+        """Reduce the lowest-priority sections until the prompt fits (or only required ones are left)"""
+        texts = {s.name: s.render() for s in self.sections}
+        costs = {name: self.count_tokens(text) for name, text in texts.items()}
+        info = {s.name: {"priority": None if s.required else s.priority, "tokens": costs[s.name], "kept_tokens": costs[s.name],
+                         "action": "kept"} for s in self.sections}
+        original = total = sum(costs.values())
+
+        # Lowest priority first; on ties, later sections first
+        order = sorted(((i, s) for i, s in enumerate(self.sections) if not s.required),
+                       key=lambda item: (item[1].priority, -item[0]))
+        for _, section in order:
+            if total <= self.max_tokens or self.max_tokens <= 0:
+                break
+            target = costs[section.name] - (total - self.max_tokens)
+            text, action = self._reduce(section, target)
+            cost = self.count_tokens(text) if text else 0
+            total += cost - costs[section.name]
+            texts[section.name], costs[section.name] = text, cost
+            info[section.name].update(kept_tokens=cost, action=action)
+
+        if total > self.max_tokens > 0:
+            logger.warning(f"Prompt is {total} tokens after trimming; required sections exceed the {self.max_tokens}-token budget")
+        prompt = self.separator.join(texts[s.name] for s in self.sections if texts[s.name])
+        return BudgetedPrompt(text=prompt, max_tokens=self.max_tokens, estimated_tokens=total,
+                              original_tokens=original, sections=info)
+
+    def _reduce(self, section: PromptSection, target: int):
+        """(text, action) for a section cut down to about target tokens"""
+        if section.summary:
+            summarized = section.render(section.summary)
+            if self.count_tokens(summarized) <= target:
+                return summarized, "summarized"
+        if target < section.min_tokens:
+            return "", "dropped"
+        truncated = self._truncate(section, target)
+        if truncated is None:
+            return "", "dropped"
+        return truncated, "truncated"
+
+    def _truncate(self, section: PromptSection, target: int) -> Optional[str]:
+        lines = section.body.splitlines()
+        if section.keep == "tail":
+            lines.reverse()
+        budget = target - self.count_tokens(section.render(f"... ({len(lines)} lines trimmed)"))
+        kept = []
+        for line in lines:
+            budget -= self.count_tokens(line) + 1
+            if budget < 0:
+                break
+            kept.append(line)
+        if not kept:
+            return self._truncate_chars(section, target)
+        marker = f"... ({len(lines) - len(kept)} lines trimmed)"
+        if section.keep == "tail":
+            kept.reverse()
+            return section.render("\n".join([marker] + kept))
+        return section.render("\n".join(kept + [marker]))
+
+    def _truncate_chars(self, section: PromptSection, target: int) -> Optional[str]:
+        """Longest single-line cut of the body that fits (for one long line such as an action list)"""
+        body = section.body.replace("\n", " ")
+        low, high = 0, len(body)
+        while low < high:
+            mid = (low + high + 1) // 2
+            cut = "..." + body[-mid:] if section.keep == "tail" else body[:mid] + "..."
+            if self.count_tokens(section.render(cut)) <= target:
+                low = mid
+            else:
+                high = mid - 1
+        if low == 0:
+            return None
+        return section.render("..." + body[-low:] if section.keep == "tail" else body[:low] + "...")
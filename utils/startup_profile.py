@@ -0,0 +1,114 @@
+"""
+Startup timing: checkpoints from process start to the first action.
+
+run.py and the client call mark() at each startup phase; the first action the
+server accepts prints the time-to-first-action breakdown once, e.g.
+
+    ⏱️ Time to first action: 6.82s (imports 0.35s, server ready 2.10s, agent ready 2.95s, first state 3.02s, first action 6.82s)
+
+Run as a module to profile cold imports of the client stack per agent mode
+(each in a fresh interpreter) and check them against a budget:
+
+    python -m utils.startup_profile --budget 1.5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+_start = time.perf_counter()
+_marks: List[Tuple[str, float]] = []
+_lock = threading.Lock()
+_reported = False
+
+# Imports each agent mode needs before it can act (weave only with telemetry)
+IMPORT_TARGETS = {
+    'client': ['server.client'],
+    'simple': ['agent', 'agent.simple'],
+    'four-module': ['agent', 'agent.perception', 'agent.planning', 'agent.memory', 'agent.action'],
+    'telemetry': ['weave'],
+}
+
+
+def elapsed() -> float:
+    """Seconds since this module was first imported (about process start for run.py)"""
+    return time.perf_counter() - _start
+
+
+def mark(label: str) -> float:
+    """Record a startup checkpoint (only the first mark of each label counts)"""
+    now = elapsed()
+    with _lock:
+        if all(existing != label for existing, _ in _marks):
+            _marks.append((label, now))
+    return now
+
+
+def get_marks() -> List[Tuple[str, float]]:
+    with _lock:
+        return list(_marks)
+
+
+def format_report() -> str:
+    marks = get_marks()
+    if not marks:
+        return "⏱️ No startup checkpoints recorded"
+    phases = ", ".join(f"{label} {seconds:.2f}s" for label, seconds in marks)
+    return f"⏱️ Time to first action: {marks[-1][1]:.2f}s ({phases})"
+
+
+def report_first_action() -> bool:
+    """Mark the first accepted action and print the startup breakdown; False after the first call"""
+    global _reported
+    with _lock:
+        if _reported:
+            return False
+        _reported = True
+    mark("first action")
+    print(format_report())
+    return True
+
+
+def _time_import(modules: List[str], cwd: str) -> float:
+    code = (
+        "import sys, time; sys.path.insert(0, '.'); t = time.perf_counter()\n"
+        f"for name in {modules!r}: __import__(name)\n"
+        "print(time.perf_counter() - t)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        last_line = (result.stderr.strip().splitlines() or ["unknown error"])[-1]
+        raise ImportError(last_line)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Profile cold import time of the agent client stack")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Fail if importing any agent mode takes longer than this many seconds")
+    parser.add_argument("--targets", nargs="+", choices=list(IMPORT_TARGETS), default=list(IMPORT_TARGETS),
+                        help="Which import sets to time")
+    args = parser.parse_args()
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    over_budget = []
+    for target in args.targets:
+        try:
+            seconds = _time_import(IMPORT_TARGETS[target], repo_root)
+        except ImportError as e:
+            print(f"   {target:<12} not importable: {e}")
+            continue
+        status = ""
+        if args.budget is not None and target != 'telemetry' and seconds > args.budget:
+            over_budget.append(target)
+            status = f"  ❌ over {args.budget:.2f}s budget"
+        print(f"   {target:<12} {seconds:6.2f}s{status}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,8 +6,10 @@ Converts comprehensive game state objects to formatted text for LLM prompts and
 Centralizes all state formatting logic for consistency across agent modules.
 """
 
+import hashlib
 import json
 import logging
+import threading
 import numpy as np
 from PIL import Image
 from utils.map_formatter import format_map_grid, format_map_for_llm, generate_dynamic_legend, format_tile_to_symbol
@@ -25,19 +27,113 @@ LAST_LOCATION = None
 LAST_TRANSITION = None  # Stores transition coordinates
 MAP_STITCHER_SAVE_CALLBACK = None  # Callback to save map stitcher when location connections change
 MAP_STITCHER_INSTANCE = None  # Reference to the MapStitcher instance
+MAP_STITCHER_CACHE_FILE = '.pokeagent_cache/map_stitcher_data.json'
+
+
+def _content_hash(*parts):
+    """Stable digest of JSON-like data (objects without a JSON form hash by repr)"""
+    try:
+        payload = json.dumps(parts, sort_keys=True, default=repr)
+    except (TypeError, ValueError):
+        payload = repr(parts)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _map_stitcher_cache_stamp():
+    """(mtime_ns, size) of the MapStitcher cache file, None if it does not exist"""
+    try:
+        stat = os.stat(MAP_STITCHER_CACHE_FILE)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class PromptSectionCache:
+    """
+    Content-hash keyed cache for formatted prompt sections.
+
+    Every agent module formats the same state within a step, and most sections
+    (party, map, game state) are unchanged between steps. Each section keeps its
+    last few results keyed by a digest of exactly the inputs it reads.
+    """
+
+    def __init__(self, entries_per_section=4):
+        self.entries_per_section = entries_per_section
+        self._sections = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, section, key, build):
+        """Return the cached value for (section, key), building and storing it on a miss"""
+        with self._lock:
+            entries = self._sections.setdefault(section, {})
+            if key in entries:
+                self.hits += 1
+                value = entries.pop(key)
+                entries[key] = value  # Mark as most recently used
+                return value
+            self.misses += 1
+
+        value = build()
+        with self._lock:
+            entries = self._sections.setdefault(section, {})
+            entries[key] = value
+            while len(entries) > self.entries_per_section:
+                entries.pop(next(iter(entries)))
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._sections.clear()
+
+    def stats(self):
+        """Get cache statistics for monitoring"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'sections': {name: len(entries) for name, entries in self._sections.items()},
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+_PROMPT_CACHE = PromptSectionCache()
+
+
+def get_prompt_cache_stats():
+    """Get hit/miss statistics of the prompt section cache"""
+    return _PROMPT_CACHE.stats()
+
+
+def clear_prompt_cache():
+    """Drop all cached prompt sections (e.g. after loading a different state)"""
+    _PROMPT_CACHE.clear()
+
+
+def _cached_parts(section, key_parts, build):
+    """Cache a list of context lines for a section, returns a fresh list"""
+    return list(_PROMPT_CACHE.get_or_build(section, _content_hash(*key_parts), lambda: tuple(build())))
+
 
 def _get_location_connections_from_cache():
     """Read location connections from MapStitcher's cache file"""
     try:
-        cache_file = '.pokeagent_cache/map_stitcher_data.json'
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r') as f:
-                data = json.load(f)
-                return data.get('location_connections', {})
+        stamp = _map_stitcher_cache_stamp()
+        if stamp is not None:
+            # Only re-read the file when it changed on disk
+            return _PROMPT_CACHE.get_or_build('location_connections', stamp, _read_location_connections)
     except Exception as e:
         print(f"🗺️ DEBUG: Failed to read location connections from cache: {e}")
     return {}
 
+
+def _read_location_connections():
+    with open(MAP_STITCHER_CACHE_FILE, 'r') as f:
+        data = json.load(f)
+        return data.get('location_connections', {})
+
 def detect_dialogue_on_frame(screenshot_base64=None, frame_array=None):
     """
     Detect if dialogue is visible on the game frame by analyzing the lower portion.
@@ -323,7 +419,22 @@ def _format_state_summary(state_data):
 def _format_state_detailed(state_data, include_debug_info=False, include_npcs=True):
     """
     Internal function to create detailed multi-line state format for LLM prompts.
+
+    The whole result is memoized on a digest of the state, so every agent module
+    formatting the same state within a step shares one result.
     """
+    key_state = {k: v for k, v in state_data.items() if k != 'visual'}
+    visual = state_data.get('visual')
+    if include_debug_info and isinstance(visual, dict):
+        # Debug info only reports the resolution and screenshot size
+        key_state['visual'] = (visual.get('resolution'), len(visual.get('screenshot_base64') or ''),
+                               'screenshot_base64' in visual)
+    key = _content_hash(key_state, include_debug_info, include_npcs, _map_stitcher_cache_stamp())
+    return _PROMPT_CACHE.get_or_build(
+        'state', key, lambda: _build_state_detailed(state_data, include_debug_info, include_npcs))
+
+def _build_state_detailed(state_data, include_debug_info=False, include_npcs=True):
+    """Assemble the detailed state text from (cached) sections."""
     context_parts = []
     
     # Check both player and game sections for data
@@ -451,7 +562,7 @@ def _format_state_detailed(state_data, include_debug_info=False, include_npcs=Tr
         
         # Party information (important for switching decisions)
         context_parts.append("\n=== PARTY STATUS ===")
-        party_context = _format_party_info(player_data, game_data)
+        party_context = _format_party_info_cached(player_data, game_data)
         context_parts.extend(party_context)
         
         # Trainer info if available
@@ -486,15 +597,22 @@ def _format_state_detailed(state_data, include_debug_info=False, include_npcs=Tr
             context_parts.append(f"Money: ${money}")
         
         # Pokemon Party (check both player and game sections)
-        party_context = _format_party_info(player_data, game_data)
+        party_context = _format_party_info_cached(player_data, game_data)
         context_parts.extend(party_context)
 
         # Map/Location information with traversability (NOT shown in battle)
-        map_context = _format_map_info(state_data.get('map', {}), player_data, include_debug_info, include_npcs, state_data)
+        map_info = state_data.get('map', {})
+        map_context = _cached_parts(
+            'map',
+            (_map_info_key(map_info), player_data.get('location'), player_data.get('position'),
+             include_debug_info, include_npcs, _map_stitcher_cache_stamp()),
+            lambda: _format_map_info(map_info, player_data, include_debug_info, include_npcs, state_data))
         context_parts.extend(map_context)
 
         # Game state information (including dialogue if not in battle)
-        game_context = _format_game_state(game_data, state_data)
+        game_context = _cached_parts(
+            'game', (game_data, player_data.get('position'), _map_info_key(map_info)),
+            lambda: _format_game_state(game_data, state_data))
         context_parts.extend(game_context)
     
     # Debug information if requested (shown in both modes)
@@ -603,6 +721,19 @@ def _format_party_info(player_data, game_data):
     
     return context_parts
 
+def _format_party_info_cached(player_data, game_data):
+    """_format_party_info memoized on the party data it reads."""
+    party_data = player_data.get('party') or game_data.get('party')
+    return _cached_parts('party', (party_data,), lambda: _format_party_info(player_data, game_data))
+
+def _map_info_key(map_info):
+    """Hashable view of map_info (a live MapStitcher instance is keyed by identity)"""
+    if not isinstance(map_info, dict) or '_map_stitcher_instance' not in map_info:
+        return map_info
+    key = {k: v for k, v in map_info.items() if k != '_map_stitcher_instance'}
+    key['_map_stitcher_instance'] = id(map_info['_map_stitcher_instance'])
+    return key
+
 def _format_map_info(map_info, player_data=None, include_debug_info=False, include_npcs=True, full_state_data=None):
     """Format map and traversability information using MapStitcher."""
     context_parts = []
@@ -748,11 +879,14 @@ def _format_world_map_display(stitched_data, full_state_data=None):
         return []
 
 def _get_map_stitcher_instance():
-    """Get the MapStitcher instance - always reload from cache for multiprocess compatibility"""
+    """Get the MapStitcher instance - reloaded whenever the cache file changes"""
     from utils.map_stitcher import MapStitcher
-    # Always create fresh instance to read latest cache
-    # This is needed because server and client run in different processes
-    return MapStitcher()
+    # Server and client run in different processes, so the cache file is the source of
+    # truth; an instance is only reused while the file is unchanged on disk
+    stamp = _map_stitcher_cache_stamp()
+    if stamp is None:
+        return MapStitcher()
+    return _PROMPT_CACHE.get_or_build('map_stitcher', stamp, MapStitcher)
 
 def save_persistent_world_map(file_path=None):
     """Deprecated - MapStitcher handles all persistence now"""
@@ -770,6 +904,7 @@ def clear_persistent_world_map():
     CURRENT_LOCATION = None
     LAST_LOCATION = None
     LAST_TRANSITION = None
+    clear_prompt_cache()
     # Clear MapStitcher data if instance exists
     if MAP_STITCHER_INSTANCE:
         MAP_STITCHER_INSTANCE.map_areas.clear()
@@ -0,0 +1,106 @@
+"""
+Optional Weave (W&B) tracing.
+
+Importing weave and running weave.init() (login and project lookup over the
+network) used to happen at import time of run.py, before arguments were even
+parsed. Now weave is only imported once init_telemetry() is called, and by
+default that happens on a background thread, so it overlaps server startup and
+VLM initialization instead of delaying the first action.
+
+Functions decorated with telemetry.op() run untraced until weave is ready, and
+always with --no-telemetry.
+"""
+
+import functools
+import inspect
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROJECT_NAME = "pokeagent-challenge-llm"
+
+_weave = None  # weave module once weave.init() has returned
+_init_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def _init_weave(project_name: str):
+    global _weave
+    try:
+        import weave
+
+        weave.init(project_name=project_name)
+    except ImportError:
+        logger.warning("weave is not installed; running without telemetry")
+        return
+    except Exception as e:
+        print(f"⚠️ Weave initialization failed, running without telemetry: {e}")
+        return
+    _weave = weave
+    logger.info(f"Weave telemetry initialized for project {project_name}")
+
+
+def init_telemetry(project_name: str = DEFAULT_PROJECT_NAME, background: bool = True) -> Optional[threading.Thread]:
+    """
+    Start weave tracing (once per process).
+
+    Args:
+        project_name: W&B project the traces go to
+        background: Initialize on a daemon thread and return it instead of blocking
+    """
+    global _init_thread
+    with _lock:
+        if _init_thread is not None or _weave is not None:
+            return _init_thread
+        if not background:
+            _init_weave(project_name)
+            return None
+        _init_thread = threading.Thread(target=_init_weave, args=(project_name,), name="weave-init", daemon=True)
+        _init_thread.start()
+        return _init_thread
+
+
+def wait_for_telemetry(timeout: Optional[float] = None) -> bool:
+    """Block until a background init finishes (or timeout); True if tracing is active"""
+    thread = _init_thread
+    if thread is not None:
+        thread.join(timeout)
+    return telemetry_enabled()
+
+
+def telemetry_enabled() -> bool:
+    return _weave is not None
+
+
+def op(name: Optional[str] = None):
+    """
+    Drop-in for @weave.op() that does not import weave.
+
+    The function is wrapped with weave.op on its first call after telemetry is
+    initialized; before that (or without telemetry) it is called directly.
+    """
+    def decorator(func):
+        traced = None
+
+        def resolve():
+            nonlocal traced
+            if _weave is None:
+                return func
+            if traced is None:
+                traced = _weave.op(name=name)(func) if name else _weave.op()(func)
+            return traced
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await resolve()(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return resolve()(*args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -1,50 +1,334 @@
 from io import BytesIO
 from PIL import Image
 import os
+import asyncio
 import base64
-import random
+import functools
+import math
+import threading
 import time
 import logging
 from abc import ABC, abstractmethod
-from typing import Union, List, Dict, Any, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Union, List, Dict, Any, Iterator, Optional
 import numpy as np
 
 # Set up module logging
 logger = logging.getLogger(__name__)
 
 # Import LLM logger
-from utils.llm_logger import log_llm_interaction, log_llm_error
+from utils.llm_logger import log_llm_interaction, log_llm_error, log_llm_cache_lookup
+from utils.vlm_cache import VLMResponseCache, image_fingerprint
+from utils.http_transport import get_http_client, http_timeout, new_async_http_client
+from utils.batch_scheduler import MicroBatcher
+from utils.prefix_cache import DEFAULT_MIN_PREFIX_TOKENS, PromptPrefixCache
+from utils.vlm_retry import DEFAULT_RETRY_POLICY, CircuitBreaker, LatencyTracker, RetryPolicy, remaining_deadline
+
+# Retry decorators for backend methods. The policy comes from the backend instance
+# (VLMBackend.retry_policy) and its `errors` are retried on top of the transient
+# errors RetryPolicy recognizes. Passing backoff settings (the original keyword
+# arguments) builds a fixed policy instead; `errors` then limits what is retried.
+def _decorator_policy(initial_delay, exponential_base, jitter, max_retries, errors) -> Optional[RetryPolicy]:
+    overrides = {k: v for k, v in dict(initial_delay=initial_delay, exponential_base=exponential_base, jitter=jitter,
+                                       max_retries=max_retries, retry_on=errors).items() if v is not None}
+    return RetryPolicy(**overrides) if overrides else None
+
+def _call_settings(fixed_policy: Optional[RetryPolicy], name: str, hedge: bool, args: tuple) -> tuple:
+    """(policy, backend-specific retryable errors, latency tracker) for one call"""
+    owner = args[0] if args and isinstance(args[0], VLMBackend) else None
+    policy = fixed_policy or (owner.retry_policy if owner is not None else DEFAULT_RETRY_POLICY)
+    if owner is None:
+        return policy, (), None
+    tracker = None
+    if hedge:
+        trackers = owner.__dict__.setdefault('_call_latencies', {})
+        tracker = trackers.setdefault(name, LatencyTracker())
+    return policy, owner.errors, tracker
 
-# Define the retry decorator with exponential backoff
 def retry_with_exponential_backoff(
-    func,
-    initial_delay: float = 1,
-    exponential_base: float = 2,
-    jitter: bool = True,
-    max_retries: int = 10,
-    errors: tuple = (Exception,),
+    func=None,
+    initial_delay: float = None,
+    exponential_base: float = None,
+    jitter: bool = None,
+    max_retries: int = None,
+    errors: tuple = None,
+    hedge: bool = True,
 ):
-    """Retry a function with exponential backoff."""
+    """Retry a function with exponential backoff (hedge=False for calls that open streams)."""
+    if func is None:
+        return lambda f: retry_with_exponential_backoff(f, initial_delay, exponential_base, jitter, max_retries,
+                                                        errors, hedge)
+    fixed_policy = _decorator_policy(initial_delay, exponential_base, jitter, max_retries, errors)
+    
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        num_retries = 0
-        delay = initial_delay
-        while True:
-            try:
-                return func(*args, **kwargs)
-            except errors as e:
-                num_retries += 1
-                if num_retries > max_retries:
-                    raise Exception(f"Maximum number of retries ({max_retries}) exceeded.")
-                # Increase the delay with exponential factor and random jitter
-                delay *= exponential_base * (1 + jitter * random.random())
-                time.sleep(delay)
-            except Exception as e:
-                raise e
+        policy, extra, tracker = _call_settings(fixed_policy, func.__name__, hedge, args)
+        return policy.call(func, args, kwargs, extra, tracker)
+    return wrapper
+
+def retry_with_exponential_backoff_async(
+    func=None,
+    initial_delay: float = None,
+    exponential_base: float = None,
+    jitter: bool = None,
+    max_retries: int = None,
+    errors: tuple = None,
+    hedge: bool = True,
+):
+    """Coroutine version of retry_with_exponential_backoff (sleeps without blocking the event loop)."""
+    if func is None:
+        return lambda f: retry_with_exponential_backoff_async(f, initial_delay, exponential_base, jitter, max_retries,
+                                                              errors, hedge)
+    fixed_policy = _decorator_policy(initial_delay, exponential_base, jitter, max_retries, errors)
+    
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        policy, extra, tracker = _call_settings(fixed_policy, func.__name__, hedge, args)
+        return await policy.call_async(func, args, kwargs, extra, tracker)
     return wrapper
 
+def _request_timeout():
+    """Timeout for one SDK request: the HTTP timeouts, capped by what is left of the retry deadline"""
+    return http_timeout(limit=remaining_deadline())
+
+def _to_pil_image(img: Union[Image.Image, np.ndarray]) -> Image.Image:
+    """Accept both PIL Images and numpy arrays"""
+    if hasattr(img, 'convert'):  # It's a PIL Image
+        return img
+    elif hasattr(img, 'shape'):  # It's a numpy array
+        return Image.fromarray(img)
+    else:
+        raise ValueError(f"Unsupported image type: {type(img)}")
+
+IMAGE_ENCODINGS = ("png", "palette", "webp", "jpeg")
+RESIZE_POLICIES = ("native", "auto")
+
+def estimate_image_tokens(width: int, height: int, model_name: str) -> Optional[int]:
+    """
+    Approximate input tokens an image costs with a given model (None when unknown).
+    
+    gemini:           258 for images up to 384x384, else 258 per 768x768 tile
+    gpt/o-series:     85 + 170 per 512x512 tile after fitting 2048 and a 768 short side
+    claude:           width * height / 750
+    """
+    name = model_name.lower()
+    if 'gemini' in name:
+        if width <= 384 and height <= 384:
+            return 258
+        return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+    if 'claude' in name:
+        return math.ceil(width * height / 750)
+    if any(x in name for x in ('gpt', 'o3', 'o4')):
+        scale = min(1.0, 2048 / max(width, height))
+        w, h = width * scale, height * scale
+        if min(w, h) > 768:
+            shrink = 768 / min(w, h)
+            w, h = w * shrink, h * shrink
+        return 85 + 170 * math.ceil(w / 512) * math.ceil(h / 512)
+    return None
+
+@dataclass
+class EncodedImage:
+    """An image encoded once for every backend that needs it"""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    _base64: Optional[str] = field(default=None, repr=False)
+    
+    @property
+    def base64(self) -> str:
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode('utf-8')
+        return self._base64
+    
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.base64}"
+
+class ImagePipeline:
+    """
+    Shared frame preprocessing for VLM calls: resize, then encode.
+    
+    Resize policies:
+        native      send the frame as is (240x160 for the GBA)
+        auto        largest integer upscale (up to max_upscale) that costs no more
+                    tokens than the native frame with the target model, e.g. 2x for
+                    GPT-4o (one 512 tile) and 3x for Gemini (one 768 tile)
+        <float>     fixed scale factor
+    max_tokens additionally halves the frame until its token estimate fits.
+    
+    Encodings: png, palette (lossless 8-bit PNG when the frame has at most 256
+    colors, which GBA frames usually do), webp or jpeg (lossy, at quality).
+    
+    Results are cached by frame content, so the modules of one agent step that
+    send the same frame pay for resizing and encoding once.
+    """
+    
+    def __init__(self, resize: Union[str, float] = "native", encoding: str = "png", quality: int = 85,
+                 max_upscale: int = 3, max_tokens: Optional[int] = None, cache_size: int = 8):
+        if isinstance(resize, str) and resize not in RESIZE_POLICIES:
+            resize = float(resize)  # Allow "2" / "0.5" from the command line
+        if not isinstance(resize, str) and resize <= 0:
+            raise ValueError(f"Resize factor must be positive, got {resize}")
+        if encoding not in IMAGE_ENCODINGS:
+            raise ValueError(f"Unknown image encoding: {encoding} (expected one of {', '.join(IMAGE_ENCODINGS)})")
+        self.resize = resize
+        self.encoding = encoding
+        self.quality = quality
+        self.max_upscale = max_upscale
+        self.max_tokens = max_tokens
+        self.cache_size = cache_size
+        
+        self._cache: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'encodes': 0, 'hits': 0}
+    
+    def settings(self) -> Dict[str, Any]:
+        """Settings that change what the model sees; part of the response cache key for image queries"""
+        return {"resize": self.resize, "encoding": self.encoding, "quality": self.quality,
+                "max_upscale": self.max_upscale, "max_tokens": self.max_tokens}
+    
+    def target_size(self, width: int, height: int, model_name: str = "") -> tuple:
+        """Output size for a width x height frame sent to model_name"""
+        if self.resize == "native":
+            scale = 1.0
+        elif self.resize == "auto":
+            scale = 1.0
+            native_tokens = estimate_image_tokens(width, height, model_name)
+            if native_tokens is not None:
+                for factor in range(self.max_upscale, 1, -1):
+                    if estimate_image_tokens(width * factor, height * factor, model_name) <= native_tokens:
+                        scale = float(factor)
+                        break
+        else:
+            scale = float(self.resize)
+        
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        if self.max_tokens is not None:
+            while size[0] > 16 and size[1] > 16:
+                tokens = estimate_image_tokens(size[0], size[1], model_name)
+                if tokens is None or tokens <= self.max_tokens:
+                    break
+                size = (size[0] // 2, size[1] // 2)
+        return size
+    
+    def _cached(self, key: tuple, build):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._cache[key]
+        value = build()
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+    
+    def prepare(self, img: Union[Image.Image, np.ndarray], model_name: str = "") -> Image.Image:
+        """Resized PIL image (for backends that take images rather than bytes)"""
+        image = _to_pil_image(img)
+        size = self.target_size(image.width, image.height, model_name)
+        if size == image.size:
+            return image
+        
+        def build():
+            # Nearest keeps pixel-art edges sharp when upscaling
+            resample = Image.NEAREST if size[0] >= image.width else Image.BOX
+            return image.resize(size, resample)
+        return self._cached(("prepare", image_fingerprint(image), size), build)
+    
+    def encode(self, img: Union[Image.Image, np.ndarray], model_name: str = "") -> EncodedImage:
+        """Resized and encoded image, cached by frame content"""
+        image = _to_pil_image(img)
+        size = self.target_size(image.width, image.height, model_name)
+        key = ("encode", image_fingerprint(image), size, self.encoding, self.quality)
+        
+        def build():
+            self.stats['encodes'] += 1
+            return self._encode(self.prepare(image, model_name) if size != image.size else image)
+        return self._cached(key, build)
+    
+    def _encode(self, image: Image.Image) -> EncodedImage:
+        buffered = BytesIO()
+        mime_type = "image/png"
+        if self.encoding == "palette":
+            rgb = image.convert("RGB")
+            if rgb.getcolors(256) is not None:
+                rgb.quantize(colors=256, method=Image.MEDIANCUT, dither=Image.Dither.NONE).save(buffered, format="PNG", optimize=True)
+            else:
+                rgb.save(buffered, format="PNG")  # Too many colors for a lossless palette
+        elif self.encoding == "webp":
+            image.convert("RGB").save(buffered, format="WEBP", quality=self.quality)
+            mime_type = "image/webp"
+        elif self.encoding == "jpeg":
+            image.convert("RGB").save(buffered, format="JPEG", quality=self.quality)
+            mime_type = "image/jpeg"
+        else:
+            image.save(buffered, format="PNG")
+        return EncodedImage(buffered.getvalue(), mime_type, image.width, image.height)
+
+# Used by backends that were not given a pipeline explicitly
+DEFAULT_IMAGE_PIPELINE = ImagePipeline()
+
+class VLMResponse(str):
+    """
+    A backend reply with the token counts the backend reported for that call.
+    
+    The usage travels with the reply (rather than through shared logger state) so
+    concurrent calls cannot pick up each other's counts. Streams end with an empty
+    VLMResponse piece carrying the usage.
+    """
+    
+    def __new__(cls, text: str, token_usage: Optional[Dict[str, Any]] = None):
+        response = super().__new__(cls, text)
+        response.token_usage = token_usage or None
+        return response
+
+def _image_messages(image: EncodedImage, text: str) -> List[Dict[str, Any]]:
+    """OpenAI-style chat messages with the encoded image inlined as base64"""
+    return [{
+        "role": "user",
+        "content": [
+            {"type": "text", "text": text},
+            {"type": "image_url", "image_url": {"url": image.data_url}}
+        ]
+    }]
+
+def _text_messages(text: str) -> List[Dict[str, Any]]:
+    return [{
+        "role": "user",
+        "content": [{"type": "text", "text": text}]
+    }]
+
+def _iter_chat_stream(stream, usage_out: Optional[List[Any]] = None) -> Iterator[str]:
+    """Text deltas of an OpenAI-style streamed chat completion (usage chunks go to usage_out)"""
+    for chunk in stream:
+        if usage_out is not None and getattr(chunk, 'usage', None):
+            usage_out.append(chunk.usage)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
 class VLMBackend(ABC):
     """Abstract base class for VLM backends"""
     
+    # Generation settings that change the response; part of the response cache key
+    sampling_params: Dict[str, Any] = {}
+    
+    # Resizing/encoding shared by every module; VLM installs its own pipeline
+    image_pipeline: ImagePipeline = DEFAULT_IMAGE_PIPELINE
+    
+    # Retry/deadline/hedging policy for the decorated API calls; VLM installs its own policy
+    retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY
+    
+    # Backend-specific exception types that are always retried
+    errors: tuple = ()
+    
+    def _encode_image(self, img: Union[Image.Image, np.ndarray]) -> EncodedImage:
+        return self.image_pipeline.encode(img, getattr(self, 'model_name', ''))
+    
     @abstractmethod
     def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
         """Process an image and text prompt"""
@@ -55,13 +339,25 @@ class VLMBackend(ABC):
         """Process a text-only prompt"""
         pass
 
+    async def get_query_async(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
+        """Async image query; backends without an async client run get_query in a worker thread"""
+        return await asyncio.to_thread(self.get_query, img, text, module_name)
+
+    async def get_text_query_async(self, text: str, module_name: str = "Unknown") -> str:
+        """Async text-only query; backends without an async client run get_text_query in a worker thread"""
+        return await asyncio.to_thread(self.get_text_query, text, module_name)
+
+    def stream_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> Iterator[str]:
+        """Yield an image query's response as it is generated; backends without streaming yield it whole"""
+        yield self.get_query(img, text, module_name)
+
 class OpenAIBackend(VLMBackend):
     """OpenAI API backend"""
     
     def __init__(self, model_name: str, **kwargs):
         try:
             import openai
-            from openai import OpenAI
+            from openai import AsyncOpenAI, OpenAI
         except ImportError:
             raise ImportError("OpenAI package not found. Install with: pip install openai")
         
@@ -71,7 +367,11 @@ class OpenAIBackend(VLMBackend):
         if not self.api_key:
             raise ValueError("Error: OpenAI API key is missing! Set OPENAI_API_KEY environment variable.")
         
-        self.client = OpenAI(api_key=self.api_key)
+        # Retries are left to the retry policy (SDK retries would multiply its attempts)
+        self.client = OpenAI(api_key=self.api_key, http_client=get_http_client(), timeout=http_timeout(),
+                             max_retries=0)
+        self.async_client = AsyncOpenAI(api_key=self.api_key, http_client=new_async_http_client(),
+                                        timeout=http_timeout(), max_retries=0)
         self.errors = (openai.RateLimitError,)
     
     @retry_with_exponential_backoff
@@ -79,112 +379,134 @@ class OpenAIBackend(VLMBackend):
         """Calls the completions.create method with exponential backoff."""
         return self.client.chat.completions.create(
             model=self.model_name,
-            messages=messages
+            messages=messages,
+            timeout=_request_timeout()
         )
     
+    @retry_with_exponential_backoff_async
+    async def _call_completion_async(self, messages):
+        """Awaits the async completions.create method with exponential backoff."""
+        return await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            timeout=_request_timeout()
+        )
+    
+    @retry_with_exponential_backoff(hedge=False)
+    def _open_stream(self, messages):
+        """Opens a streamed completion (with a final usage chunk) with exponential backoff."""
+        return self.client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=_request_timeout()
+        )
+    
+    def _handle_response(self, response, text: str, module_name: str, start_time: float, has_image: bool) -> str:
+        """Extract the reply and log the interaction"""
+        result = response.choices[0].message.content
+        token_usage = self._log_interaction(result, getattr(response, 'usage', None), text, module_name, start_time, has_image)
+        return VLMResponse(result, token_usage)
+    
+    def _log_interaction(self, result: str, usage, text: str, module_name: str, start_time: float,
+                         has_image: bool) -> Dict[str, Any]:
+        duration = time.time() - start_time
+        
+        # Extract token usage if available
+        token_usage = {}
+        if usage is not None:
+            token_usage = {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens
+            }
+        
+        # Log the interaction
+        log_llm_interaction(
+            interaction_type=f"openai_{module_name}",
+            prompt=text,
+            response=result,
+            duration=duration,
+            metadata={"model": self.model_name, "backend": "openai", "has_image": has_image, "token_usage": token_usage},
+            model_info={"model": self.model_name, "backend": "openai"}
+        )
+        return token_usage
+    
+    def _handle_error(self, e: Exception, text: str, module_name: str, start_time: float, has_image: bool):
+        duration = time.time() - start_time
+        log_llm_error(
+            interaction_type=f"openai_{module_name}",
+            prompt=text,
+            error=str(e),
+            metadata={"model": self.model_name, "backend": "openai", "duration": duration, "has_image": has_image}
+        )
+        logger.error(f"OpenAI API error: {e}")
+    
     def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
         """Process an image and text prompt using OpenAI API"""
         start_time = time.time()
-        
-        # Handle both PIL Images and numpy arrays
-        if hasattr(img, 'convert'):  # It's a PIL Image
-            image = img
-        elif hasattr(img, 'shape'):  # It's a numpy array
-            image = Image.fromarray(img)
-        else:
-            raise ValueError(f"Unsupported image type: {type(img)}")
-        
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        image_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
-        
-        messages = [{
-            "role": "user",
-            "content": [
-                {"type": "text", "text": text},
-                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}}
-            ]
-        }]
+        messages = _image_messages(self._encode_image(img), text)
         
         try:
             response = self._call_completion(messages)
-            result = response.choices[0].message.content
-            duration = time.time() - start_time
-            
-            # Extract token usage if available
-            token_usage = {}
-            if hasattr(response, 'usage'):
-                token_usage = {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                }
-            
-            # Log the interaction
-            log_llm_interaction(
-                interaction_type=f"openai_{module_name}",
-                prompt=text,
-                response=result,
-                duration=duration,
-                metadata={"model": self.model_name, "backend": "openai", "has_image": True, "token_usage": token_usage},
-                model_info={"model": self.model_name, "backend": "openai"}
-            )
-            
-            return result
+            return self._handle_response(response, text, module_name, start_time, has_image=True)
         except Exception as e:
-            duration = time.time() - start_time
-            log_llm_error(
-                interaction_type=f"openai_{module_name}",
-                prompt=text,
-                error=str(e),
-                metadata={"model": self.model_name, "backend": "openai", "duration": duration, "has_image": True}
-            )
-            logger.error(f"OpenAI API error: {e}")
+            self._handle_error(e, text, module_name, start_time, has_image=True)
             raise
     
     def get_text_query(self, text: str, module_name: str = "Unknown") -> str:
         """Process a text-only prompt using OpenAI API"""
         start_time = time.time()
-        
-        messages = [{
-            "role": "user",
-            "content": [{"type": "text", "text": text}]
-        }]
+        messages = _text_messages(text)
         
         try:
             response = self._call_completion(messages)
-            result = response.choices[0].message.content
-            duration = time.time() - start_time
-            
-            # Extract token usage if available
-            token_usage = {}
-            if hasattr(response, 'usage'):
-                token_usage = {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                }
-            
-            # Log the interaction
-            log_llm_interaction(
-                interaction_type=f"openai_{module_name}",
-                prompt=text,
-                response=result,
-                duration=duration,
-                metadata={"model": self.model_name, "backend": "openai", "has_image": False, "token_usage": token_usage},
-                model_info={"model": self.model_name, "backend": "openai"}
-            )
-            
-            return result
+            return self._handle_response(response, text, module_name, start_time, has_image=False)
         except Exception as e:
-            duration = time.time() - start_time
-            log_llm_error(
-                interaction_type=f"openai_{module_name}",
-                prompt=text,
-                error=str(e),
-                metadata={"model": self.model_name, "backend": "openai", "duration": duration, "has_image": False}
-            )
-            logger.error(f"OpenAI API error: {e}")
+            self._handle_error(e, text, module_name, start_time, has_image=False)
+            raise
+    
+    def stream_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> Iterator[str]:
+        """Stream an image query's response from the OpenAI API"""
+        start_time = time.time()
+        messages = _image_messages(self._encode_image(img), text)
+        pieces, usage = [], []
+        
+        try:
+            for piece in _iter_chat_stream(self._open_stream(messages), usage):
+                pieces.append(piece)
+                yield piece
+        except Exception as e:
+            self._handle_error(e, text, module_name, start_time, has_image=True)
+            raise
+        token_usage = self._log_interaction("".join(pieces), usage[-1] if usage else None, text, module_name, start_time,
+                                            has_image=True)
+        if token_usage:
+            yield VLMResponse("", token_usage)
+    
+    async def get_query_async(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
+        """Process an image and text prompt using the async OpenAI client"""
+        start_time = time.time()
+        messages = _image_messages(self._encode_image(img), text)
+        
+        try:
+            response = await self._call_completion_async(messages)
+            return self._handle_response(response, text, module_name, start_time, has_image=True)
+        except Exception as e:
+            self._handle_error(e, text, module_name, start_time, has_image=True)
+            raise
+    
+    async def get_text_query_async(self, text: str, module_name: str = "Unknown") -> str:
+        """Process a text-only prompt using the async OpenAI client"""
+        start_time = time.time()
+        messages = _text_messages(text)
+        
+        try:
+            response = await self._call_completion_async(messages)
+            return self._handle_response(response, text, module_name, start_time, has_image=False)
+        except Exception as e:
+            self._handle_error(e, text, module_name, start_time, has_image=False)
             raise
 
 class OpenRouterBackend(VLMBackend):
@@ -192,7 +514,7 @@ class OpenRouterBackend(VLMBackend):
     
     def __init__(self, model_name: str, **kwargs):
         try:
-            from openai import OpenAI
+            from openai import AsyncOpenAI, OpenAI
         except ImportError:
             raise ImportError("OpenAI package not found. Install with: pip install openai")
         
@@ -205,6 +527,16 @@ class OpenRouterBackend(VLMBackend):
         self.client = OpenAI(
             base_url="https://openrouter.ai/api/v1",
             api_key=self.api_key,
+            http_client=get_http_client(),
+            timeout=http_timeout(),
+            max_retries=0,  # Retries are left to the retry policy
+        )
+        self.async_client = AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=self.api_key,
+            http_client=new_async_http_client(),
+            timeout=http_timeout(),
+            max_retries=0,
         )
     
     @retry_with_exponential_backoff
@@ -212,39 +544,38 @@ class OpenRouterBackend(VLMBackend):
         """Calls the completions.create method with exponential backoff."""
         return self.client.chat.completions.create(
             model=self.model_name,
-            messages=messages
+            messages=messages,
+            timeout=_request_timeout()
         )
     
-    def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
-        """Process an image and text prompt using OpenRouter API"""
-        # Handle both PIL Images and numpy arrays
-        if hasattr(img, 'convert'):  # It's a PIL Image
-            image = img
-        elif hasattr(img, 'shape'):  # It's a numpy array
-            image = Image.fromarray(img)
-        else:
-            raise ValueError(f"Unsupported image type: {type(img)}")
-        
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        image_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
-        
-        messages = [{
-            "role": "user",
-            "content": [
-                {"type": "text", "text": text},
-                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}}
-            ]
-        }]
-        
-        # Log the prompt
+    @retry_with_exponential_backoff_async
+    async def _call_completion_async(self, messages):
+        """Awaits the async completions.create method with exponential backoff."""
+        return await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            timeout=_request_timeout()
+        )
+    
+    def _log_prompt(self, text: str, module_name: str, query_type: str):
         prompt_preview = text[:2000] + "..." if len(text) > 2000 else text
-        logger.info(f"[{module_name}] OPENROUTER VLM IMAGE QUERY:")
+        logger.info(f"[{module_name}] OPENROUTER VLM {query_type} QUERY:")
         logger.info(f"[{module_name}] PROMPT: {prompt_preview}")
-        
-        response = self._call_completion(messages)
-        result = response.choices[0].message.content
-        
+    
+    @retry_with_exponential_backoff(hedge=False)
+    def _open_stream(self, messages):
+        """Opens a streamed completion with exponential backoff."""
+        return self.client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            stream=True,
+            timeout=_request_timeout()
+        )
+    
+    def _handle_response(self, response, module_name: str) -> str:
+        return self._log_result(response.choices[0].message.content, module_name)
+    
+    def _log_result(self, result: str, module_name: str) -> str:
         # Log the response
         result_preview = result[:1000] + "..." if len(result) > 1000 else result
         logger.info(f"[{module_name}] RESPONSE: {result_preview}")
@@ -252,32 +583,46 @@ class OpenRouterBackend(VLMBackend):
         
         return result
     
+    def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
+        """Process an image and text prompt using OpenRouter API"""
+        messages = _image_messages(self._encode_image(img), text)
+        self._log_prompt(text, module_name, "IMAGE")
+        return self._handle_response(self._call_completion(messages), module_name)
+    
     def get_text_query(self, text: str, module_name: str = "Unknown") -> str:
         """Process a text-only prompt using OpenRouter API"""
-        messages = [{
-            "role": "user",
-            "content": [{"type": "text", "text": text}]
-        }]
-        
-        # Log the prompt
-        prompt_preview = text[:2000] + "..." if len(text) > 2000 else text
-        logger.info(f"[{module_name}] OPENROUTER VLM TEXT QUERY:")
-        logger.info(f"[{module_name}] PROMPT: {prompt_preview}")
-        
-        response = self._call_completion(messages)
-        result = response.choices[0].message.content
-        
-        # Log the response
-        result_preview = result[:1000] + "..." if len(result) > 1000 else result
-        logger.info(f"[{module_name}] RESPONSE: {result_preview}")
-        logger.info(f"[{module_name}] ---")
-        
-        return result
+        messages = _text_messages(text)
+        self._log_prompt(text, module_name, "TEXT")
+        return self._handle_response(self._call_completion(messages), module_name)
+    
+    def stream_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> Iterator[str]:
+        """Stream an image query's response from the OpenRouter API"""
+        messages = _image_messages(self._encode_image(img), text)
+        self._log_prompt(text, module_name, "IMAGE")
+        pieces = []
+        for piece in _iter_chat_stream(self._open_stream(messages)):
+            pieces.append(piece)
+            yield piece
+        self._log_result("".join(pieces), module_name)
+    
+    async def get_query_async(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
+        """Process an image and text prompt using the async OpenRouter client"""
+        messages = _image_messages(self._encode_image(img), text)
+        self._log_prompt(text, module_name, "IMAGE")
+        return self._handle_response(await self._call_completion_async(messages), module_name)
+    
+    async def get_text_query_async(self, text: str, module_name: str = "Unknown") -> str:
+        """Process a text-only prompt using the async OpenRouter client"""
+        messages = _text_messages(text)
+        self._log_prompt(text, module_name, "TEXT")
+        return self._handle_response(await self._call_completion_async(messages), module_name)
 
 class LocalHuggingFaceBackend(VLMBackend):
     """Local HuggingFace transformers backend with bitsandbytes optimization"""
     
-    def __init__(self, model_name: str, device: str = "auto", load_in_4bit: bool = False, **kwargs):
+    def __init__(self, model_name: str, device: str = "auto", load_in_4bit: bool = False,
+                 prefix_cache: bool = False, min_prefix_tokens: int = DEFAULT_MIN_PREFIX_TOKENS,
+                 batch_size: int = 1, batch_window_ms: float = 5.0, **kwargs):
         try:
             import torch
             from transformers import AutoProcessor, AutoModelForImageTextToText, BitsAndBytesConfig
@@ -288,6 +633,9 @@ class LocalHuggingFaceBackend(VLMBackend):
         self.model_name = model_name
         self.device = device
         self.torch = torch
+        # The async API runs queries in worker threads; one generate() at a time per model
+        self._generate_lock = threading.Lock()
+        self.sampling_params = {"max_new_tokens": 1024, "do_sample": True, "temperature": 0.7}
         
         logger.info(f"Loading local VLM model: {model_name}")
         
@@ -309,7 +657,8 @@ class LocalHuggingFaceBackend(VLMBackend):
                 model_name,
                 quantization_config=quantization_config,
                 device_map=device if device != "auto" else "auto",
-                torch_dtype=torch.float16 if not load_in_4bit else None,
+                # float16 matmuls are slow or unsupported on CPU
+                torch_dtype=None if load_in_4bit else (torch.float32 if device == "cpu" else torch.float16),
                 trust_remote_code=True
             )
             
@@ -321,38 +670,116 @@ class LocalHuggingFaceBackend(VLMBackend):
         except Exception as e:
             logger.error(f"Failed to load model {model_name}: {e}")
             raise
+        
+        # Prefilled KV for the static prompt prefix (system prompt + module instructions)
+        self.prefix_cache = PromptPrefixCache(self.model, min_prefix_tokens) if prefix_cache else None
+        if self.prefix_cache is not None:
+            logger.info(f"Prompt prefix KV cache enabled (prefixes of {min_prefix_tokens}+ tokens)")
+        
+        # Concurrent queries (modules, parallel agents) are padded into one generate() call;
+        # image and text-only prompts share batches, so perception and planning run together
+        self._batcher = None
+        if batch_size > 1:
+            tokenizer = self.processor.tokenizer
+            tokenizer.padding_side = "left"  # Decoder-only generation continues from the right edge
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            self._batcher = MicroBatcher(self._generate_batch, batch_size, batch_window_ms, name="local-vlm")
+            logger.info(f"Batching up to {batch_size} local queries per generate() ({batch_window_ms}ms window)")
+    
+    def _model_device(self):
+        if hasattr(self.model, 'device'):
+            return self.model.device
+        elif hasattr(self.model, 'module') and hasattr(self.model.module, 'device'):
+            return self.model.module.device
+        return next(self.model.parameters()).device
+    
+    @staticmethod
+    def _to_device(inputs: Dict[str, Any], device) -> Dict[str, Any]:
+        """Move tensor inputs to the model's device"""
+        return {k: v.to(device) if hasattr(v, 'to') else v for k, v in inputs.items()}
+    
+    def _log_interaction(self, result: "VLMResponse", text: str, module_name: str, start_time: float, has_image: bool):
+        log_llm_interaction(
+            interaction_type=f"local_{module_name}",
+            prompt=text,
+            response=result,
+            duration=time.time() - start_time,
+            metadata={"model": self.model_name, "backend": "local", "has_image": has_image,
+                      "token_usage": result.token_usage},
+            model_info={"model": self.model_name, "backend": "local"}
+        )
+        
+        # Log the response
+        result_preview = result[:1000] + "..." if len(result) > 1000 else result
+        logger.info(f"[{module_name}] RESPONSE: {result_preview}")
+        logger.info(f"[{module_name}] ---")
+    
+    @staticmethod
+    def _token_usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+    
+    def _generate_batch(self, requests: List[tuple]) -> List["VLMResponse"]:
+        """One padded generate() over (formatted prompt, image or None) requests; runs on the batcher thread"""
+        texts = [formatted for formatted, _ in requests]
+        # The processor matches images to the image placeholders of the prompts in order
+        images = [image for _, image in requests if image is not None]
+        inputs = self.processor(text=texts, images=images or None, padding=True, return_tensors="pt")
+        
+        with self._generate_lock, self.torch.no_grad():
+            inputs_on_device = self._to_device(inputs, self._model_device())
+            generated_ids = self.model.generate(
+                **inputs_on_device,
+                **self.sampling_params,
+                pad_token_id=self.processor.tokenizer.pad_token_id
+            )
+        
+        # Left padding puts every prompt at the same width; the rest is generated text
+        new_tokens = generated_ids[:, inputs_on_device['input_ids'].shape[1]:]
+        # Token counts per row leave out the padding
+        prompt_tokens = inputs['attention_mask'].sum(dim=-1).tolist()
+        completion_tokens = (new_tokens != self.processor.tokenizer.pad_token_id).sum(dim=-1).tolist()
+        results = self.processor.batch_decode(new_tokens, skip_special_tokens=True)
+        return [VLMResponse(result.strip(), self._token_usage(prompt, completion))
+                for result, prompt, completion in zip(results, prompt_tokens, completion_tokens)]
+    
+    def _generate_batched(self, formatted_text: str, image, text: str, module_name: str) -> "VLMResponse":
+        """Queue one prompt for the next batch and wait for its reply"""
+        start_time = time.time()
+        prompt_preview = text[:2000] + "..." if len(text) > 2000 else text
+        logger.info(f"[{module_name}] LOCAL HF VLM QUERY (batched):")
+        logger.info(f"[{module_name}] PROMPT: {prompt_preview}")
+        
+        result = self._batcher.submit((formatted_text, image))
+        self._log_interaction(result, text, module_name, start_time, has_image=image is not None)
+        return result
     
-    def _generate_response(self, inputs: Dict[str, Any], text: str, module_name: str) -> str:
-        """Generate response using the local model"""
+    def _generate_response(self, inputs: Dict[str, Any], text: str, module_name: str,
+                           reuse_prefix: bool = False, has_image: bool = False) -> "VLMResponse":
+        """Generate response using the local model (reuse_prefix: text-only prompts may use the prefix cache)"""
         try:
+            start_time = time.time()
             
             # Log the prompt
             prompt_preview = text[:2000] + "..." if len(text) > 2000 else text
             logger.info(f"[{module_name}] LOCAL HF VLM QUERY:")
             logger.info(f"[{module_name}] PROMPT: {prompt_preview}")
             
-            with self.torch.no_grad():
+            with self._generate_lock, self.torch.no_grad():
                 # Ensure all inputs are on the correct device
-                if hasattr(self.model, 'device'):
-                    device = self.model.device
-                elif hasattr(self.model, 'module') and hasattr(self.model.module, 'device'):
-                    device = self.model.module.device
-                else:
-                    device = next(self.model.parameters()).device
+                device = self._model_device()
+                inputs_on_device = self._to_device(inputs, device)
                 
-                # Move inputs to device if needed
-                inputs_on_device = {}
-                for k, v in inputs.items():
-                    if hasattr(v, 'to'):
-                        inputs_on_device[k] = v.to(device)
-                    else:
-                        inputs_on_device[k] = v
+                # Only the tokens after a cached prefix are encoded
+                if reuse_prefix and self.prefix_cache is not None:
+                    past_key_values = self.prefix_cache.past_key_values_for(inputs_on_device['input_ids'], device)
+                    if past_key_values is not None:
+                        inputs_on_device['past_key_values'] = past_key_values
                 
                 generated_ids = self.model.generate(
                     **inputs_on_device,
-                    max_new_tokens=1024,
-                    do_sample=True,
-                    temperature=0.7,
+                    **self.sampling_params,
                     pad_token_id=self.processor.tokenizer.eos_token_id
                 )
                 
@@ -364,12 +791,13 @@ class LocalHuggingFaceBackend(VLMBackend):
                     result = generated_text.split(text)[-1].strip()
                 else:
                     result = generated_text.strip()
+                
+                # generate() returns the prompt followed by the new tokens
+                prompt_tokens = inputs_on_device['input_ids'].shape[-1]
+                token_usage = self._token_usage(prompt_tokens, generated_ids.shape[-1] - prompt_tokens)
             
-            # Log the response
-            result_preview = result[:1000] + "..." if len(result) > 1000 else result
-            logger.info(f"[{module_name}] RESPONSE: {result_preview}")
-            logger.info(f"[{module_name}] ---")
-            
+            result = VLMResponse(result, token_usage)
+            self._log_interaction(result, text, module_name, start_time, has_image)
             return result
             
         except Exception as e:
@@ -378,13 +806,8 @@ class LocalHuggingFaceBackend(VLMBackend):
     
     def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
         """Process an image and text prompt using local HuggingFace model"""
-        # Handle both PIL Images and numpy arrays
-        if hasattr(img, 'convert'):  # It's a PIL Image
-            image = img
-        elif hasattr(img, 'shape'):  # It's a numpy array
-            image = Image.fromarray(img)
-        else:
-            raise ValueError(f"Unsupported image type: {type(img)}")
+        # The processor takes PIL images; only the resize policy applies
+        image = self.image_pipeline.prepare(img, self.model_name)
         
         # Prepare messages with proper chat template format
         messages = [
@@ -396,9 +819,11 @@ class LocalHuggingFaceBackend(VLMBackend):
         ]
         formatted_text = self.processor.apply_chat_template(
             messages, tokenize=False, add_generation_prompt=True)
+        if self._batcher is not None:
+            return self._generate_batched(formatted_text, image, text, module_name)
         inputs = self.processor(text=formatted_text, images=image, return_tensors="pt")
         
-        return self._generate_response(inputs, text, module_name)
+        return self._generate_response(inputs, text, module_name, has_image=True)
     
     def get_text_query(self, text: str, module_name: str = "Unknown") -> str:
         """Process a text-only prompt using local HuggingFace model"""
@@ -408,59 +833,54 @@ class LocalHuggingFaceBackend(VLMBackend):
         ]
         formatted_text = self.processor.apply_chat_template(
             messages, tokenize=False, add_generation_prompt=True)
+        if self._batcher is not None:
+            # Rows of a batch have different prefixes, so the prefix KV cache is not used here
+            return self._generate_batched(formatted_text, None, text, module_name)
         inputs = self.processor(text=formatted_text, return_tensors="pt")
         
-        return self._generate_response(inputs, text, module_name)
+        return self._generate_response(inputs, text, module_name, reuse_prefix=True)
 
 class LegacyOllamaBackend(VLMBackend):
     """Legacy Ollama backend for backward compatibility"""
     
     def __init__(self, model_name: str, port: int = 8010, **kwargs):
         try:
-            from openai import OpenAI
+            from openai import AsyncOpenAI, OpenAI
         except ImportError:
             raise ImportError("OpenAI package not found. Install with: pip install openai")
         
         self.model_name = model_name
         self.port = port
-        self.client = OpenAI(api_key='', base_url=f'http://localhost:{port}/v1')
+        # Retries are left to the retry policy (SDK retries would multiply its attempts)
+        self.client = OpenAI(api_key='', base_url=f'http://localhost:{port}/v1',
+                             http_client=get_http_client(), timeout=http_timeout(), max_retries=0)
+        self.async_client = AsyncOpenAI(api_key='', base_url=f'http://localhost:{port}/v1',
+                                        http_client=new_async_http_client(), timeout=http_timeout(), max_retries=0)
     
     @retry_with_exponential_backoff
     def _call_completion(self, messages):
         """Calls the completions.create method with exponential backoff."""
         return self.client.chat.completions.create(
             model=self.model_name,
-            messages=messages
+            messages=messages,
+            timeout=_request_timeout()
         )
     
-    def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
-        """Process an image and text prompt using legacy Ollama backend"""
-        # Handle both PIL Images and numpy arrays
-        if hasattr(img, 'convert'):  # It's a PIL Image
-            image = img
-        elif hasattr(img, 'shape'):  # It's a numpy array
-            image = Image.fromarray(img)
-        else:
-            raise ValueError(f"Unsupported image type: {type(img)}")
-        
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        image_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
-        
-        messages = [{
-            "role": "user",
-            "content": [
-                {"type": "text", "text": text},
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
-            ]
-        }]
-        
-        # Log the prompt
+    @retry_with_exponential_backoff_async
+    async def _call_completion_async(self, messages):
+        """Awaits the async completions.create method with exponential backoff."""
+        return await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            timeout=_request_timeout()
+        )
+    
+    def _log_prompt(self, text: str, module_name: str, query_type: str):
         prompt_preview = text[:2000] + "..." if len(text) > 2000 else text
-        logger.info(f"[{module_name}] OLLAMA VLM IMAGE QUERY:")
+        logger.info(f"[{module_name}] OLLAMA VLM {query_type} QUERY:")
         logger.info(f"[{module_name}] PROMPT: {prompt_preview}")
-        
-        response = self._call_completion(messages)
+    
+    def _handle_response(self, response, module_name: str) -> str:
         result = response.choices[0].message.content
         
         # Log the response
@@ -470,29 +890,204 @@ class LegacyOllamaBackend(VLMBackend):
         
         return result
     
+    def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
+        """Process an image and text prompt using legacy Ollama backend"""
+        messages = _image_messages(self._encode_image(img), text)
+        self._log_prompt(text, module_name, "IMAGE")
+        return self._handle_response(self._call_completion(messages), module_name)
+    
     def get_text_query(self, text: str, module_name: str = "Unknown") -> str:
         """Process a text-only prompt using legacy Ollama backend"""
-        messages = [{
-            "role": "user",
-            "content": [{"type": "text", "text": text}]
-        }]
-        
-        # Log the prompt
+        messages = _text_messages(text)
+        self._log_prompt(text, module_name, "TEXT")
+        return self._handle_response(self._call_completion(messages), module_name)
+    
+    async def get_query_async(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
+        """Process an image and text prompt using the async Ollama client"""
+        messages = _image_messages(self._encode_image(img), text)
+        self._log_prompt(text, module_name, "IMAGE")
+        return self._handle_response(await self._call_completion_async(messages), module_name)
+    
+    async def get_text_query_async(self, text: str, module_name: str = "Unknown") -> str:
+        """Process a text-only prompt using the async Ollama client"""
+        messages = _text_messages(text)
+        self._log_prompt(text, module_name, "TEXT")
+        return self._handle_response(await self._call_completion_async(messages), module_name)
+
+# Gemini finish_reason when the safety filter blocks a response
+GEMINI_SAFETY_FINISH_REASON = 12
+GEMINI_SAFETY_RESPONSE = "I cannot analyze this content due to safety restrictions. I'll proceed with a basic action: press 'A' to continue."
+GEMINI_ERROR_RESPONSE = "I encountered an error processing the request. I'll proceed with a basic action: press 'A' to continue."
+
+class FallbackResponse(VLMResponse):
+    """A reply to a different query than the one asked (e.g. text-only after an image query failed); never cached"""
+
+def _as_fallback(reply: str) -> FallbackResponse:
+    return FallbackResponse(reply, getattr(reply, 'token_usage', None))
+
+def _gemini_safety_blocked(response) -> bool:
+    """Check for safety filter or content policy issues"""
+    if hasattr(response, 'candidates') and response.candidates:
+        candidate = response.candidates[0]
+        return hasattr(candidate, 'finish_reason') and candidate.finish_reason == GEMINI_SAFETY_FINISH_REASON
+    return False
+
+class _GeminiQueryBackend(VLMBackend):
+    """
+    Query flow shared by the Gemini backends: image queries fall back to text-only
+    when the safety filter triggers or the call fails, and text queries return a
+    safe default response instead of raising.
+    """
+    
+    @abstractmethod
+    def _image_part(self, img: Union[Image.Image, np.ndarray]):
+        """Encoded image as a Gemini content part"""
+        pass
+    
+    @abstractmethod
+    def _call_generate_content(self, content_parts):
+        """Generate a response for content parts (with retries)"""
+        pass
+    
+    @abstractmethod
+    async def _call_generate_content_async(self, content_parts):
+        """Awaitable _call_generate_content"""
+        pass
+    
+    def _record_interaction(self, response, result: str, text: str, module_name: str, duration: float,
+                            has_image: bool) -> Optional[Dict[str, Any]]:
+        """Hook for backends that log interactions to the LLM logger; returns the token usage"""
+        return None
+    
+    def _log_prompt(self, text: str, module_name: str, query_type: str):
         prompt_preview = text[:2000] + "..." if len(text) > 2000 else text
-        logger.info(f"[{module_name}] OLLAMA VLM TEXT QUERY:")
+        logger.info(f"[{module_name}] GEMINI VLM {query_type} QUERY:")
         logger.info(f"[{module_name}] PROMPT: {prompt_preview}")
-        
-        response = self._call_completion(messages)
-        result = response.choices[0].message.content
+    
+    @abstractmethod
+    def _stream_generate_content(self, content_parts):
+        """Iterator over response chunks for content parts"""
+        pass
+    
+    def _handle_response(self, response, text: str, module_name: str, start_time: float, has_image: bool) -> str:
+        return self._log_result(response, response.text, text, module_name, start_time, has_image)
+    
+    def _log_result(self, response, result: str, text: str, module_name: str, start_time: float, has_image: bool) -> str:
+        token_usage = self._record_interaction(response, result, text, module_name, time.time() - start_time, has_image)
         
         # Log the response
         result_preview = result[:1000] + "..." if len(result) > 1000 else result
         logger.info(f"[{module_name}] RESPONSE: {result_preview}")
         logger.info(f"[{module_name}] ---")
         
-        return result
+        return VLMResponse(result, token_usage)
+    
+    def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
+        """Process an image and text prompt using Gemini API"""
+        start_time = time.time()
+        try:
+            content_parts = [text, self._image_part(img)]
+            self._log_prompt(text, module_name, "IMAGE")
+            response = self._call_generate_content(content_parts)
+            if _gemini_safety_blocked(response):
+                logger.warning(f"[{module_name}] Gemini safety filter triggered (finish_reason=12). Trying text-only fallback.")
+                return _as_fallback(self.get_text_query(text, module_name))
+            return self._handle_response(response, text, module_name, start_time, has_image=True)
+        except Exception as e:
+            logger.error(f"Error in Gemini image query: {e}")
+            # Try text-only fallback for any Gemini error
+            try:
+                logger.info(f"[{module_name}] Attempting text-only fallback due to error: {e}")
+                return _as_fallback(self.get_text_query(text, module_name))
+            except Exception as fallback_error:
+                logger.error(f"[{module_name}] Text-only fallback also failed: {fallback_error}")
+                raise e
+    
+    def get_text_query(self, text: str, module_name: str = "Unknown") -> str:
+        """Process a text-only prompt using Gemini API"""
+        start_time = time.time()
+        try:
+            self._log_prompt(text, module_name, "TEXT")
+            response = self._call_generate_content([text])
+            if _gemini_safety_blocked(response):
+                logger.warning(f"[{module_name}] Gemini safety filter triggered (finish_reason=12). Returning default response.")
+                return GEMINI_SAFETY_RESPONSE
+            return self._handle_response(response, text, module_name, start_time, has_image=False)
+        except Exception as e:
+            logger.error(f"Error in Gemini text query: {e}")
+            logger.warning(f"[{module_name}] Returning default response due to error: {e}")
+            return GEMINI_ERROR_RESPONSE
+    
+    def stream_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> Iterator[str]:
+        """
+        Stream an image query's response from the Gemini API.
+        
+        If the safety filter or an error stops the stream before any text arrived,
+        the text-only fallback of get_query is yielded instead.
+        """
+        start_time = time.time()
+        pieces = []
+        last_chunk = None
+        try:
+            content_parts = [text, self._image_part(img)]
+            self._log_prompt(text, module_name, "IMAGE")
+            for chunk in self._stream_generate_content(content_parts):
+                last_chunk = chunk
+                if _gemini_safety_blocked(chunk):
+                    logger.warning(f"[{module_name}] Gemini safety filter triggered (finish_reason=12) while streaming.")
+                    break
+                if chunk.text:
+                    pieces.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            logger.error(f"Error in Gemini streamed image query: {e}")
+            if pieces:
+                raise
+        
+        if not pieces:
+            logger.info(f"[{module_name}] Nothing streamed; attempting text-only fallback")
+            yield _as_fallback(self.get_text_query(text, module_name))
+            return
+        result = self._log_result(last_chunk, "".join(pieces), text, module_name, start_time, has_image=True)
+        if result.token_usage:
+            yield VLMResponse("", result.token_usage)
+    
+    async def get_query_async(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
+        """Process an image and text prompt using the async Gemini client"""
+        start_time = time.time()
+        try:
+            content_parts = [text, self._image_part(img)]
+            self._log_prompt(text, module_name, "IMAGE")
+            response = await self._call_generate_content_async(content_parts)
+            if _gemini_safety_blocked(response):
+                logger.warning(f"[{module_name}] Gemini safety filter triggered (finish_reason=12). Trying text-only fallback.")
+                return _as_fallback(await self.get_text_query_async(text, module_name))
+            return self._handle_response(response, text, module_name, start_time, has_image=True)
+        except Exception as e:
+            logger.error(f"Error in Gemini image query: {e}")
+            try:
+                logger.info(f"[{module_name}] Attempting text-only fallback due to error: {e}")
+                return _as_fallback(await self.get_text_query_async(text, module_name))
+            except Exception as fallback_error:
+                logger.error(f"[{module_name}] Text-only fallback also failed: {fallback_error}")
+                raise e
+    
+    async def get_text_query_async(self, text: str, module_name: str = "Unknown") -> str:
+        """Process a text-only prompt using the async Gemini client"""
+        start_time = time.time()
+        try:
+            self._log_prompt(text, module_name, "TEXT")
+            response = await self._call_generate_content_async([text])
+            if _gemini_safety_blocked(response):
+                logger.warning(f"[{module_name}] Gemini safety filter triggered (finish_reason=12). Returning default response.")
+                return GEMINI_SAFETY_RESPONSE
+            return self._handle_response(response, text, module_name, start_time, has_image=False)
+        except Exception as e:
+            logger.error(f"Error in Gemini text query: {e}")
+            logger.warning(f"[{module_name}] Returning default response due to error: {e}")
+            return GEMINI_ERROR_RESPONSE
 
-class VertexBackend(VLMBackend):
+class VertexBackend(_GeminiQueryBackend):
     """Google Gemini API with Vertex backend"""
     
     def __init__(self, model_name: str, **kwargs):
@@ -513,15 +1108,9 @@ class VertexBackend(VLMBackend):
         
         logger.info(f"Gemini backend initialized with model: {model_name}")
     
-    def _prepare_image(self, img: Union[Image.Image, np.ndarray]) -> Image.Image:
-        """Prepare image for Gemini API"""
-        # Handle both PIL Images and numpy arrays
-        if hasattr(img, 'convert'):  # It's a PIL Image
-            return img
-        elif hasattr(img, 'shape'):  # It's a numpy array
-            return Image.fromarray(img)
-        else:
-            raise ValueError(f"Unsupported image type: {type(img)}")
+    def _image_part(self, img: Union[Image.Image, np.ndarray]):
+        image = self._encode_image(img)
+        return self.genai.types.Part.from_bytes(data=image.data, mime_type=image.mime_type)
     
     @retry_with_exponential_backoff
     def _call_generate_content(self, content_parts):
@@ -532,84 +1121,24 @@ class VertexBackend(VLMBackend):
         )
         return response
     
-    def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
-        """Process an image and text prompt using Gemini API"""
-        try:
-            image = self._prepare_image(img)
-            
-            # Prepare content for Gemini
-            content_parts = [text, image]
-            
-            # Log the prompt
-            prompt_preview = text[:2000] + "..." if len(text) > 2000 else text
-            logger.info(f"[{module_name}] GEMINI VLM IMAGE QUERY:")
-            logger.info(f"[{module_name}] PROMPT: {prompt_preview}")
-            
-            # Generate response
-            response = self._call_generate_content(content_parts)
-            
-            # Check for safety filter or content policy issues
-            if hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
-                if hasattr(candidate, 'finish_reason') and candidate.finish_reason == 12:
-                    logger.warning(f"[{module_name}] Gemini safety filter triggered (finish_reason=12). Trying text-only fallback.")
-                    # Fallback to text-only query
-                    return self.get_text_query(text, module_name)
-            
-            result = response.text
-            
-            # Log the response
-            result_preview = result[:1000] + "..." if len(result) > 1000 else result
-            logger.info(f"[{module_name}] RESPONSE: {result_preview}")
-            logger.info(f"[{module_name}] ---")
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error in Gemini image query: {e}")
-            # Try text-only fallback for any Gemini error
-            try:
-                logger.info(f"[{module_name}] Attempting text-only fallback due to error: {e}")
-                return self.get_text_query(text, module_name)
-            except Exception as fallback_error:
-                logger.error(f"[{module_name}] Text-only fallback also failed: {fallback_error}")
-                raise e
+    @retry_with_exponential_backoff(hedge=False)
+    def _stream_generate_content(self, content_parts):
+        """Opens a generate_content_stream iterator with exponential backoff."""
+        return self.client.models.generate_content_stream(
+            model='gemini-2.5-flash',
+            contents=content_parts
+        )
     
-    def get_text_query(self, text: str, module_name: str = "Unknown") -> str:
-        """Process a text-only prompt using Gemini API"""
-        try:
-            # Log the prompt
-            prompt_preview = text[:2000] + "..." if len(text) > 2000 else text
-            logger.info(f"[{module_name}] GEMINI VLM TEXT QUERY:")
-            logger.info(f"[{module_name}] PROMPT: {prompt_preview}")
-            
-            # Generate response
-            response = self._call_generate_content([text])
-            
-            # Check for safety filter or content policy issues
-            if hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
-                if hasattr(candidate, 'finish_reason') and candidate.finish_reason == 12:
-                    logger.warning(f"[{module_name}] Gemini safety filter triggered (finish_reason=12). Returning default response.")
-                    return "I cannot analyze this content due to safety restrictions. I'll proceed with a basic action: press 'A' to continue."
-            
-            result = response.text
-            
-            # Log the response
-            result_preview = result[:1000] + "..." if len(result) > 1000 else result
-            logger.info(f"[{module_name}] RESPONSE: {result_preview}")
-            logger.info(f"[{module_name}] ---")
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error in Gemini text query: {e}")
-            # Return a safe default response
-            logger.warning(f"[{module_name}] Returning default response due to error: {e}")
-            return "I encountered an error processing the request. I'll proceed with a basic action: press 'A' to continue."
+    @retry_with_exponential_backoff_async
+    async def _call_generate_content_async(self, content_parts):
+        """Awaits the async (client.aio) generate_content method with exponential backoff."""
+        return await self.client.aio.models.generate_content(
+            model='gemini-2.5-flash',
+            contents=content_parts
+        )
 
 
-class GeminiBackend(VLMBackend):
+class GeminiBackend(_GeminiQueryBackend):
     """Google Gemini API backend"""
     
     def __init__(self, model_name: str, **kwargs):
@@ -633,15 +1162,9 @@ class GeminiBackend(VLMBackend):
         
         logger.info(f"Gemini backend initialized with model: {model_name}")
     
-    def _prepare_image(self, img: Union[Image.Image, np.ndarray]) -> Image.Image:
-        """Prepare image for Gemini API"""
-        # Handle both PIL Images and numpy arrays
-        if hasattr(img, 'convert'):  # It's a PIL Image
-            return img
-        elif hasattr(img, 'shape'):  # It's a numpy array
-            return Image.fromarray(img)
-        else:
-            raise ValueError(f"Unsupported image type: {type(img)}")
+    def _image_part(self, img: Union[Image.Image, np.ndarray]):
+        image = self._encode_image(img)
+        return {"mime_type": image.mime_type, "data": image.data}
     
     @retry_with_exponential_backoff
     def _call_generate_content(self, content_parts):
@@ -650,125 +1173,38 @@ class GeminiBackend(VLMBackend):
         response.resolve()
         return response
     
-    def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
-        """Process an image and text prompt using Gemini API"""
-        start_time = time.time()
-        try:
-            image = self._prepare_image(img)
-            
-            # Prepare content for Gemini
-            content_parts = [text, image]
-            
-            # Log the prompt
-            prompt_preview = text[:2000] + "..." if len(text) > 2000 else text
-            logger.info(f"[{module_name}] GEMINI VLM IMAGE QUERY:")
-            logger.info(f"[{module_name}] PROMPT: {prompt_preview}")
-            
-            # Generate response
-            response = self._call_generate_content(content_parts)
-            
-            # Check for safety filter or content policy issues
-            if hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
-                if hasattr(candidate, 'finish_reason') and candidate.finish_reason == 12:
-                    logger.warning(f"[{module_name}] Gemini safety filter triggered (finish_reason=12). Trying text-only fallback.")
-                    # Fallback to text-only query
-                    return self.get_text_query(text, module_name)
-            
-            result = response.text
-            duration = time.time() - start_time
-            
-            # Extract token usage if available
-            token_usage = {}
-            if hasattr(response, 'usage_metadata'):
-                usage = response.usage_metadata
-                token_usage = {
-                    "prompt_tokens": getattr(usage, 'prompt_token_count', 0),
-                    "completion_tokens": getattr(usage, 'candidates_token_count', 0),
-                    "total_tokens": getattr(usage, 'total_token_count', 0)
-                }
-            
-            # Log the interaction
-            log_llm_interaction(
-                interaction_type=f"gemini_{module_name}",
-                prompt=text,
-                response=result,
-                duration=duration,
-                metadata={"model": self.model_name, "backend": "gemini", "has_image": True, "token_usage": token_usage},
-                model_info={"model": self.model_name, "backend": "gemini"}
-            )
-            
-            # Log the response
-            result_preview = result[:1000] + "..." if len(result) > 1000 else result
-            logger.info(f"[{module_name}] RESPONSE: {result_preview}")
-            logger.info(f"[{module_name}] ---")
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error in Gemini image query: {e}")
-            # Try text-only fallback for any Gemini error
-            try:
-                logger.info(f"[{module_name}] Attempting text-only fallback due to error: {e}")
-                return self.get_text_query(text, module_name)
-            except Exception as fallback_error:
-                logger.error(f"[{module_name}] Text-only fallback also failed: {fallback_error}")
-                raise e
+    @retry_with_exponential_backoff(hedge=False)
+    def _stream_generate_content(self, content_parts):
+        """Opens a streamed generate_content call with exponential backoff."""
+        return self.model.generate_content(content_parts, stream=True)
     
-    def get_text_query(self, text: str, module_name: str = "Unknown") -> str:
-        """Process a text-only prompt using Gemini API"""
-        start_time = time.time()
-        try:
-            # Log the prompt
-            prompt_preview = text[:2000] + "..." if len(text) > 2000 else text
-            logger.info(f"[{module_name}] GEMINI VLM TEXT QUERY:")
-            logger.info(f"[{module_name}] PROMPT: {prompt_preview}")
-            
-            # Generate response
-            response = self._call_generate_content([text])
-            
-            # Check for safety filter or content policy issues
-            if hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
-                if hasattr(candidate, 'finish_reason') and candidate.finish_reason == 12:
-                    logger.warning(f"[{module_name}] Gemini safety filter triggered (finish_reason=12). Returning default response.")
-                    return "I cannot analyze this content due to safety restrictions. I'll proceed with a basic action: press 'A' to continue."
-            
-            result = response.text
-            duration = time.time() - start_time
-            
-            # Extract token usage if available
-            token_usage = {}
-            if hasattr(response, 'usage_metadata'):
-                usage = response.usage_metadata
-                token_usage = {
-                    "prompt_tokens": getattr(usage, 'prompt_token_count', 0),
-                    "completion_tokens": getattr(usage, 'candidates_token_count', 0),
-                    "total_tokens": getattr(usage, 'total_token_count', 0)
-                }
-            
-            # Log the interaction
-            log_llm_interaction(
-                interaction_type=f"gemini_{module_name}",
-                prompt=text,
-                response=result,
-                duration=duration,
-                metadata={"model": self.model_name, "backend": "gemini", "has_image": False, "token_usage": token_usage},
-                model_info={"model": self.model_name, "backend": "gemini"}
-            )
-            
-            # Log the response
-            result_preview = result[:1000] + "..." if len(result) > 1000 else result
-            logger.info(f"[{module_name}] RESPONSE: {result_preview}")
-            logger.info(f"[{module_name}] ---")
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error in Gemini text query: {e}")
-            # Return a safe default response
-            logger.warning(f"[{module_name}] Returning default response due to error: {e}")
-            return "I encountered an error processing the request. I'll proceed with a basic action: press 'A' to continue."
+    @retry_with_exponential_backoff_async
+    async def _call_generate_content_async(self, content_parts):
+        """Awaits the generate_content_async method with exponential backoff."""
+        return await self.model.generate_content_async(content_parts)
+    
+    def _record_interaction(self, response, result: str, text: str, module_name: str, duration: float,
+                            has_image: bool) -> Optional[Dict[str, Any]]:
+        # Extract token usage if available
+        token_usage = {}
+        if hasattr(response, 'usage_metadata'):
+            usage = response.usage_metadata
+            token_usage = {
+                "prompt_tokens": getattr(usage, 'prompt_token_count', 0),
+                "completion_tokens": getattr(usage, 'candidates_token_count', 0),
+                "total_tokens": getattr(usage, 'total_token_count', 0)
+            }
+        
+        # Log the interaction
+        log_llm_interaction(
+            interaction_type=f"gemini_{module_name}",
+            prompt=text,
+            response=result,
+            duration=duration,
+            metadata={"model": self.model_name, "backend": "gemini", "has_image": has_image, "token_usage": token_usage},
+            model_info={"model": self.model_name, "backend": "gemini"}
+        )
+        return token_usage
 
 class VLM:
     """Main VLM class that supports multiple backends"""
@@ -782,7 +1218,11 @@ class VLM:
         'vertex': VertexBackend,  # Added Vertex backend
     }
     
-    def __init__(self, model_name: str, backend: str = 'openai', port: int = 8010, **kwargs):
+    def __init__(self, model_name: str, backend: str = 'openai', port: int = 8010,
+                 cache: Optional[VLMResponseCache] = None, image_pipeline: Optional[ImagePipeline] = None,
+                 retry_policy: Optional[RetryPolicy] = None, fallback_backend: Optional[str] = None,
+                 fallback_model: Optional[str] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 **kwargs):
         """
         Initialize VLM with specified backend
         
@@ -790,28 +1230,55 @@ class VLM:
             model_name: Name of the model to use
             backend: Backend type ('openai', 'openrouter', 'local', 'gemini', 'ollama')
             port: Port for Ollama backend (legacy)
+            cache: Optional response cache consulted before every query
+            image_pipeline: Frame resizing/encoding for image queries (default: native PNG)
+            retry_policy: Retries, deadline and hedging for API calls (default: DEFAULT_RETRY_POLICY)
+            fallback_backend: Secondary backend used when the primary fails or its circuit is open
+            fallback_model: Model for the fallback backend (default: model_name)
+            circuit_breaker: Failure counter guarding the primary (default: CircuitBreaker())
             **kwargs: Additional arguments passed to backend
         """
         self.model_name = model_name
         self.backend_type = backend.lower()
+        self.cache = cache
         
         # Auto-detect backend based on model name if not explicitly specified
         if backend == 'auto':
             self.backend_type = self._auto_detect_backend(model_name)
         
-        if self.backend_type not in self.BACKENDS:
-            raise ValueError(f"Unsupported backend: {self.backend_type}. Available: {list(self.BACKENDS.keys())}")
+        self.backend = self._create_backend(self.backend_type, model_name, port, image_pipeline, retry_policy, **kwargs)
+        
+        # Optional failover target while the primary is failing
+        self.fallback_type = fallback_backend.lower() if fallback_backend else None
+        self.fallback_backend = None
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        if self.fallback_type:
+            self.fallback_backend = self._create_backend(self.fallback_type, fallback_model or model_name, port,
+                                                         image_pipeline, retry_policy)
+        
+        logger.info(f"VLM initialized with {self.backend_type} backend using model: {model_name}")
+        if self.fallback_backend is not None:
+            logger.info(f"VLM fallback: {self.fallback_type} backend using model: {fallback_model or model_name}")
+    
+    def _create_backend(self, backend_type: str, model_name: str, port: int,
+                        image_pipeline: Optional[ImagePipeline], retry_policy: Optional[RetryPolicy], **kwargs):
+        if backend_type not in self.BACKENDS:
+            raise ValueError(f"Unsupported backend: {backend_type}. Available: {list(self.BACKENDS.keys())}")
         
         # Initialize the appropriate backend
-        backend_class = self.BACKENDS[self.backend_type]
+        backend_class = self.BACKENDS[backend_type]
         
         # Pass port parameter for legacy Ollama backend
-        if self.backend_type == 'ollama':
-            self.backend = backend_class(model_name, port=port, **kwargs)
+        if backend_type == 'ollama':
+            backend = backend_class(model_name, port=port, **kwargs)
         else:
-            self.backend = backend_class(model_name, **kwargs)
+            backend = backend_class(model_name, **kwargs)
         
-        logger.info(f"VLM initialized with {self.backend_type} backend using model: {model_name}")
+        if image_pipeline is not None:
+            backend.image_pipeline = image_pipeline
+        if retry_policy is not None:
+            backend.retry_policy = retry_policy
+        return backend
     
     def _auto_detect_backend(self, model_name: str) -> str:
         """Auto-detect backend based on model name"""
@@ -827,36 +1294,181 @@ class VLM:
             # Default to OpenAI for unknown models
             return 'openai'
     
+    def _cache_lookup(self, text: str, img, module_name: str) -> tuple:
+        """(cache key, cached response or None); (None, None) without a cache"""
+        if self.cache is None:
+            return None, None
+        pipeline = self.backend.image_pipeline.settings() if img is not None else None
+        key = self.cache.make_key(self.backend_type, self.model_name, text, img, self.backend.sampling_params,
+                                  pipeline)
+        result = self.cache.get(key)
+        log_llm_cache_lookup(module_name, result is not None)
+        if result is not None:
+            # Keep the log complete (and actions counted); cached entries are not counted as calls
+            log_llm_interaction(
+                interaction_type=f"{self.backend_type}_{module_name}",
+                prompt=text,
+                response=result,
+                duration=0.0,
+                metadata={"model": self.model_name, "backend": self.backend_type, "has_image": img is not None, "cached": True},
+                model_info={"model": self.model_name, "backend": self.backend_type}
+            )
+        return key, result
+    
+    def _cache_store(self, key: Optional[str], result: str):
+        # Gemini backends return canned text or a text-only fallback instead of raising; never replay those
+        if (key is not None and result and not isinstance(result, FallbackResponse)
+                and result not in (GEMINI_SAFETY_RESPONSE, GEMINI_ERROR_RESPONSE)):
+            self.cache.put(key, str(result), self.model_name)
+    
+    def _log_error(self, e: Exception, text: str, module_name: str, has_image: bool):
+        # Only log errors that aren't already logged by the backend
+        duration = 0  # Backend tracks actual duration
+        log_llm_error(
+            interaction_type=f"{self.backend.__class__.__name__.lower()}_{module_name}",
+            prompt=text,
+            error=str(e),
+            metadata={"model": self.model_name, "backend": self.backend.__class__.__name__, "duration": duration, "has_image": has_image}
+        )
+    
+    def _primary_allowed(self) -> bool:
+        """Whether to try the primary backend (always, unless a fallback exists and the circuit is open)"""
+        if self.fallback_backend is None:
+            return True
+        if self.circuit_breaker.allow():
+            return True
+        logger.info(f"Circuit open; routing query to fallback {self.fallback_type} backend")
+        return False
+    
+    def _primary_succeeded(self):
+        if self.fallback_backend is not None:
+            self.circuit_breaker.record_success()
+    
+    def _primary_failed(self, error) -> bool:
+        """Record a primary failure; True when the query should be retried on the fallback"""
+        if self.fallback_backend is None:
+            return False
+        self.circuit_breaker.record_failure()
+        logger.warning(f"Primary {self.backend_type} backend failed ({error}); failing over to {self.fallback_type}")
+        return True
+    
+    def _call_backend(self, method: str, *args) -> tuple:
+        """(result, served by primary) for a backend query method, with failover"""
+        if self._primary_allowed():
+            try:
+                result = getattr(self.backend, method)(*args)
+            except Exception as e:
+                if not self._primary_failed(e):
+                    raise
+            else:
+                # Gemini backends report errors as canned text; count those as failures
+                if result != GEMINI_ERROR_RESPONSE:
+                    self._primary_succeeded()
+                    return result, True
+                if not self._primary_failed("error response"):
+                    return result, True
+        return getattr(self.fallback_backend, method)(*args), False
+    
+    async def _call_backend_async(self, method: str, *args) -> tuple:
+        """Async version of _call_backend"""
+        if self._primary_allowed():
+            try:
+                result = await getattr(self.backend, method)(*args)
+            except Exception as e:
+                if not self._primary_failed(e):
+                    raise
+            else:
+                if result != GEMINI_ERROR_RESPONSE:
+                    self._primary_succeeded()
+                    return result, True
+                if not self._primary_failed("error response"):
+                    return result, True
+        return await getattr(self.fallback_backend, method)(*args), False
+    
     def get_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
         """Process an image and text prompt"""
+        key, cached = self._cache_lookup(text, img, module_name)
+        if cached is not None:
+            return cached
         try:
             # Backend handles its own logging, so we don't duplicate it here
-            result = self.backend.get_query(img, text, module_name)
-            return result
+            result, from_primary = self._call_backend('get_query', img, text, module_name)
         except Exception as e:
-            # Only log errors that aren't already logged by the backend
-            duration = 0  # Backend tracks actual duration
-            log_llm_error(
-                interaction_type=f"{self.backend.__class__.__name__.lower()}_{module_name}",
-                prompt=text,
-                error=str(e),
-                metadata={"model": self.model_name, "backend": self.backend.__class__.__name__, "duration": duration, "has_image": True}
-            )
+            self._log_error(e, text, module_name, has_image=True)
             raise
+        if from_primary:
+            self._cache_store(key, result)
+        return result
     
     def get_text_query(self, text: str, module_name: str = "Unknown") -> str:
         """Process a text-only prompt"""
+        key, cached = self._cache_lookup(text, None, module_name)
+        if cached is not None:
+            return cached
         try:
             # Backend handles its own logging, so we don't duplicate it here
-            result = self.backend.get_text_query(text, module_name)
-            return result
+            result, from_primary = self._call_backend('get_text_query', text, module_name)
         except Exception as e:
-            # Only log errors that aren't already logged by the backend
-            duration = 0  # Backend tracks actual duration
-            log_llm_error(
-                interaction_type=f"{self.backend.__class__.__name__.lower()}_{module_name}",
-                prompt=text,
-                error=str(e),
-                metadata={"model": self.model_name, "backend": self.backend.__class__.__name__, "duration": duration, "has_image": False}
-            )
+            self._log_error(e, text, module_name, has_image=False)
+            raise
+        if from_primary:
+            self._cache_store(key, result)
+        return result
+    
+    def stream_query(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> Iterator[str]:
+        """Process an image and text prompt, yielding the response as it is generated"""
+        key, cached = self._cache_lookup(text, img, module_name)
+        if cached is not None:
+            yield cached
+            return
+        pieces = []
+        from_primary = self._primary_allowed()
+        try:
+            try:
+                backend = self.backend if from_primary else self.fallback_backend
+                for piece in backend.stream_query(img, text, module_name):
+                    pieces.append(piece)
+                    yield piece
+            except Exception as e:
+                # Fail over only if nothing has been handed to the consumer yet
+                if pieces or not from_primary or not self._primary_failed(e):
+                    raise
+                from_primary = False
+                for piece in self.fallback_backend.stream_query(img, text, module_name):
+                    pieces.append(piece)
+                    yield piece
+        except Exception as e:
+            self._log_error(e, text, module_name, has_image=True)
+            raise
+        if from_primary:
+            self._primary_succeeded()
+            if not any(isinstance(piece, FallbackResponse) for piece in pieces):
+                self._cache_store(key, "".join(pieces))
+    
+    async def get_query_async(self, img: Union[Image.Image, np.ndarray], text: str, module_name: str = "Unknown") -> str:
+        """Process an image and text prompt without blocking the event loop"""
+        key, cached = self._cache_lookup(text, img, module_name)
+        if cached is not None:
+            return cached
+        try:
+            result, from_primary = await self._call_backend_async('get_query_async', img, text, module_name)
+        except Exception as e:
+            self._log_error(e, text, module_name, has_image=True)
             raise
+        if from_primary:
+            self._cache_store(key, result)
+        return result
+    
+    async def get_text_query_async(self, text: str, module_name: str = "Unknown") -> str:
+        """Process a text-only prompt without blocking the event loop"""
+        key, cached = self._cache_lookup(text, None, module_name)
+        if cached is not None:
+            return cached
+        try:
+            result, from_primary = await self._call_backend_async('get_text_query_async', text, module_name)
+        except Exception as e:
+            self._log_error(e, text, module_name, has_image=False)
+            raise
+        if from_primary:
+            self._cache_store(key, result)
+        return result
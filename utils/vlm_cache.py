@@ -0,0 +1,173 @@
+"""
+Content-addressed cache for VLM responses.
+
+Responses are keyed on backend, model, sampling parameters, the prompt text and
+a hash of the image (exact pixel hash, or a perceptual dHash that also matches
+frames differing only by a few pixels). Lookups hit an in-memory LRU first and
+then a sqlite store under .pokeagent_cache, so checkpoint replays, test runs and
+repeated identical situations (same menu, same dialogue frame, same prompt) are
+answered without a network call. Entries older than the TTL count as misses.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(".pokeagent_cache", "vlm_cache.sqlite")
+DEFAULT_MEMORY_ENTRIES = 512
+IMAGE_HASH_MODES = ("exact", "perceptual")
+
+
+def image_fingerprint(img, mode: str = "exact") -> str:
+    """
+    Hash of an image (PIL Image or numpy array).
+
+    exact:      sha256 over size, mode and raw pixels
+    perceptual: 64-bit difference hash of a 9x8 grayscale thumbnail
+    """
+    if img is None:
+        return "none"
+    if mode not in IMAGE_HASH_MODES:
+        raise ValueError(f"Unknown image hash mode: {mode} (expected one of {', '.join(IMAGE_HASH_MODES)})")
+    image = img if hasattr(img, 'convert') else Image.fromarray(np.asarray(img))
+
+    if mode == "perceptual":
+        pixels = np.asarray(image.convert("L").resize((9, 8), Image.BILINEAR), dtype=np.int16)
+        bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+        return "d" + format(int("".join("1" if b else "0" for b in bits), 2), "016x")
+
+    digest = hashlib.sha256(f"{image.size}:{image.mode}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class VLMResponseCache:
+    """In-memory LRU in front of a sqlite response store"""
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 ttl_seconds: Optional[float] = None, image_hash: str = "exact"):
+        """
+        Args:
+            path: sqlite file (None keeps the cache in memory only)
+            max_memory_entries: LRU size in front of the sqlite store
+            ttl_seconds: Entries older than this are ignored and dropped (None = never expire)
+            image_hash: "exact" or "perceptual" image keys
+        """
+        if image_hash not in IMAGE_HASH_MODES:
+            raise ValueError(f"Unknown image hash mode: {image_hash} (expected one of {', '.join(IMAGE_HASH_MODES)})")
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.image_hash = image_hash
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (response, created)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'stores': 0}
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, model TEXT, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def make_key(self, backend: str, model: str, prompt: str, img=None,
+                 params: Optional[Dict[str, Any]] = None,
+                 image_settings: Optional[Dict[str, Any]] = None) -> str:
+        """Cache key for one query (image_settings: resize/encoding the image is sent with)"""
+        key = {
+            "backend": backend,
+            "model": model,
+            "params": params or {},
+            "image": image_fingerprint(img, self.image_hash),
+            "prompt": prompt,
+        }
+        if image_settings:
+            key["image_settings"] = image_settings
+        payload = json.dumps(key, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response, or None on a miss"""
+        with self._lock:
+            entry = self._memory.get(key)
+            source = 'memory_hits'
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                entry = tuple(row) if row else None
+                source = 'disk_hits'
+
+            if entry is not None and self._expired(entry[1]):
+                self._stats['expired'] += 1
+                self._memory.pop(key, None)
+                if self._db is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                entry = None
+
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            self._remember(key, entry)
+            self._stats['hits'] += 1
+            self._stats[source] += 1
+            return entry[0]
+
+    def put(self, key: str, response: str, model: str = ""):
+        with self._lock:
+            entry = (response, time.time())
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, model, created) VALUES (?, ?, ?, ?)",
+                    (key, response, model, entry[1]),
+                )
+                self._db.commit()
+            self._stats['stores'] += 1
+
+    def _remember(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry (memory and disk)"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            stats = dict(self._stats, memory_entries=len(self._memory),
+                         hit_rate=self._stats['hits'] / lookups if lookups else 0.0)
+            if self._db is not None:
+                stats['disk_entries'] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return stats
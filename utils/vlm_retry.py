@@ -0,0 +1,313 @@
+"""
+Retry policy and circuit breaker for VLM backend calls.
+
+RetryPolicy retries only transient failures (rate limits, 5xx, timeouts and
+connection errors), honours Retry-After headers, caps each backoff and stops
+once a total deadline is spent, so a struggling API costs a step seconds rather
+than minutes. It can also hedge: when a call runs longer than a percentile of
+recent latencies, a duplicate request is sent and the first answer wins.
+
+CircuitBreaker counts consecutive failures of the primary backend; once open,
+VLM sends queries to the configured fallback backend until a trial call after
+reset_timeout succeeds.
+
+Retries belong to RetryPolicy alone: SDK clients are built with their own
+retries off, and each attempt reads remaining_deadline() to cap its request
+timeout so one slow attempt cannot outlive the policy's deadline.
+"""
+
+import asyncio
+import contextvars
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+# Transient error types (by class name, so no SDK has to be importable here)
+TRANSIENT_ERROR_NAMES = frozenset({
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",  # openai
+    "ConnectError", "ReadError", "RemoteProtocolError", "TimeoutException",  # httpx
+    "ReadTimeout", "ConnectTimeout", "PoolTimeout", "WriteTimeout",
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded",  # google
+    "TooManyRequests", "BadGateway", "GatewayTimeout",
+})
+
+
+# Monotonic time by which the current RetryPolicy call must finish (None: no deadline)
+_deadline_at: contextvars.ContextVar = contextvars.ContextVar("retry_deadline_at", default=None)
+
+
+def remaining_deadline() -> Optional[float]:
+    """Seconds left of the enclosing RetryPolicy deadline, or None outside one"""
+    deadline_at = _deadline_at.get()
+    if deadline_at is None:
+        return None
+    return max(0.0, deadline_at - time.monotonic())
+
+
+class RetryBudgetExceeded(Exception):
+    """Retries or the deadline ran out; the last backend error is the __cause__"""
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """HTTP status code carried by an SDK exception, if any"""
+    for attr in ("status_code", "code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Server-requested wait from retry-after-ms / Retry-After (seconds or HTTP date)"""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: BaseException, extra: Tuple[type, ...] = ()) -> bool:
+    """Transient failure worth retrying (extra: backend-specific retryable types)"""
+    if extra and isinstance(exc, extra):
+        return True
+    status = error_status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(exc).__mro__)
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies"""
+
+    def __init__(self, window: int = 100):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="vlm-hedge")
+        return _hedge_executor
+
+
+@dataclass
+class RetryPolicy:
+    """How backend calls are retried"""
+    max_retries: int = 5
+    initial_delay: float = 1.0
+    exponential_base: float = 2.0
+    max_delay: float = 20.0  # Cap on a single backoff (Retry-After may exceed it within the deadline)
+    jitter: bool = True
+    deadline: Optional[float] = 90.0  # Total seconds for all attempts and waits (None = unbounded)
+    hedge_percentile: Optional[float] = None  # e.g. 0.95: duplicate calls slower than the p95 latency
+    hedge_min_samples: int = 20  # Latencies needed before hedging starts
+    retry_on: Optional[Tuple[type, ...]] = None  # Retry exactly these types instead of the transient ones
+
+    def backoff(self, retry: int, exc: BaseException) -> float:
+        """Seconds to wait before retry number `retry` (1-based)"""
+        delay = min(self.max_delay, self.initial_delay * self.exponential_base ** (retry - 1))
+        if self.jitter:
+            delay *= random.uniform(0.5, 1.0)
+        requested = retry_after_seconds(exc)
+        return max(delay, requested) if requested is not None else delay
+
+    def hedge_delay(self, tracker: Optional[LatencyTracker]) -> Optional[float]:
+        if self.hedge_percentile is None or tracker is None or len(tracker) < self.hedge_min_samples:
+            return None
+        return tracker.percentile(self.hedge_percentile)
+
+    def _next_delay(self, retry: int, exc: BaseException, start: float, extra: Tuple[type, ...]) -> float:
+        """Backoff before the next attempt, or raise if the error is final or the budget is spent"""
+        retryable = isinstance(exc, self.retry_on) if self.retry_on is not None else is_retryable(exc, extra)
+        if not retryable:
+            raise exc
+        if retry > self.max_retries:
+            raise RetryBudgetExceeded(f"Maximum number of retries ({self.max_retries}) exceeded: {exc}") from exc
+        delay = self.backoff(retry, exc)
+        if self.deadline is not None and time.monotonic() - start + delay > self.deadline:
+            raise RetryBudgetExceeded(f"Retry deadline of {self.deadline:.0f}s exhausted: {exc}") from exc
+        logger.warning(f"Retryable error ({type(exc).__name__}: {exc}); retry {retry}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def call(self, func: Callable, args: tuple = (), kwargs: Optional[dict] = None,
+             extra_retryable: Tuple[type, ...] = (), tracker: Optional[LatencyTracker] = None):
+        """Run func under this policy"""
+        kwargs = kwargs or {}
+        start = time.monotonic()
+        token = _deadline_at.set(start + self.deadline if self.deadline is not None else None)
+        retry = 0
+        try:
+            while True:
+                attempt_start = time.monotonic()
+                try:
+                    hedge_after = self.hedge_delay(tracker)
+                    if hedge_after is None:
+                        result = func(*args, **kwargs)
+                    else:
+                        result = self._hedged_call(func, args, kwargs, hedge_after)
+                    if tracker is not None:
+                        tracker.record(time.monotonic() - attempt_start)
+                    return result
+                except Exception as e:
+                    retry += 1
+                    time.sleep(self._next_delay(retry, e, start, extra_retryable))
+        finally:
+            _deadline_at.reset(token)
+
+    async def call_async(self, func: Callable, args: tuple = (), kwargs: Optional[dict] = None,
+                         extra_retryable: Tuple[type, ...] = (), tracker: Optional[LatencyTracker] = None):
+        """Await func under this policy (sleeps without blocking the event loop)"""
+        kwargs = kwargs or {}
+        start = time.monotonic()
+        token = _deadline_at.set(start + self.deadline if self.deadline is not None else None)
+        retry = 0
+        try:
+            while True:
+                attempt_start = time.monotonic()
+                try:
+                    hedge_after = self.hedge_delay(tracker)
+                    if hedge_after is None:
+                        result = await func(*args, **kwargs)
+                    else:
+                        result = await self._hedged_call_async(func, args, kwargs, hedge_after)
+                    if tracker is not None:
+                        tracker.record(time.monotonic() - attempt_start)
+                    return result
+                except Exception as e:
+                    retry += 1
+                    await asyncio.sleep(self._next_delay(retry, e, start, extra_retryable))
+        finally:
+            _deadline_at.reset(token)
+
+    @staticmethod
+    def _hedged_call(func, args, kwargs, hedge_after: float):
+        executor = _get_hedge_executor()
+        # Worker threads see the caller's deadline through a copy of its context
+        primary = executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+        logger.info(f"Call slower than {hedge_after:.1f}s; sending a hedged duplicate")
+        pending = {primary, executor.submit(contextvars.copy_context().run, func, *args, **kwargs)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()  # The slower request finishes in the background
+                error = future.exception()
+        raise error
+
+    @staticmethod
+    async def _hedged_call_async(func, args, kwargs, hedge_after: float):
+        primary = asyncio.ensure_future(func(*args, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+        logger.info(f"Call slower than {hedge_after:.1f}s; sending a hedged duplicate")
+        pending = {primary, asyncio.ensure_future(func(*args, **kwargs))}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                error = task.exception()
+        raise error
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open trial after reset_timeout"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether the primary should be tried (one trial call at a time once half-open)"""
+        with self._lock:
+            state = self._state()
+            if state == "half-open":
+                self._opened_at = time.monotonic()  # Further calls wait for this trial's outcome
+                return True
+            return state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Circuit closed: primary backend recovered")
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()